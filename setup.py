@@ -11,6 +11,10 @@ setup(
         "Pillow>=10.0.0",
         "python-dotenv>=1.0.0",
     ],
+    extras_require={
+        # Pinyin aliases in the installed-app index ("打开weixin")
+        "pinyin": ["pypinyin>=0.49"],
+    },
     entry_points={
         "console_scripts": [
             "android-agent=android_phone.main:main",
@@ -1,7 +1,15 @@
 """Android Phone MCP Server"""
 
-try:
-    from .server import app
-    __all__ = ["app"]
-except ImportError:
-    pass
+__all__ = ["app"]
+
+
+def __getattr__(name):
+    # The MCP app is imported lazily so that `import android_phone.main`
+    # (the CLI entry point) does not pull in the MCP SDK.
+    if name == "app":
+        try:
+            from .server import app
+        except ImportError as e:
+            raise AttributeError(f"android_phone.app is unavailable: {e}") from e
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,25 @@
+"""
+Offline benchmark suite.
+
+Runs the controller, the agent loop and the MCP tools against a fake
+uiautomator2 device and a local mock of the Ark API, and reports timings as
+JSON so that runs can be compared:
+
+    python -m android_phone.bench --realistic --output bench.json
+"""
+
+from android_phone.bench.fake_device import FakeDevice, REALISTIC_LATENCY, synthetic_frames, synthetic_hierarchy
+from android_phone.bench.mock_ark import MockArkServer, scripted_task
+from android_phone.bench.scenarios import BenchConfig, SCENARIOS, run_benchmarks
+
+__all__ = [
+    "FakeDevice",
+    "REALISTIC_LATENCY",
+    "synthetic_frames",
+    "synthetic_hierarchy",
+    "MockArkServer",
+    "scripted_task",
+    "BenchConfig",
+    "SCENARIOS",
+    "run_benchmarks",
+]
@@ -0,0 +1,37 @@
+import argparse
+import json
+import sys
+
+from android_phone.bench.scenarios import BenchConfig, SCENARIOS, run_benchmarks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Android Phone MCP offline benchmarks")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run (default: all). Choices: {', '.join(SCENARIOS)}")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed iterations per scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed warm-up iterations")
+    parser.add_argument("--realistic", action="store_true", help="Simulate realistic device RPC latency")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for --realistic latencies")
+    parser.add_argument("--model-delay", type=float, default=0.0, help="Mock model response delay (s)")
+    parser.add_argument("--agent-steps", type=int, default=5, help="Scripted steps per agent run")
+    parser.add_argument("--output", "-o", help="Write JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    options = dict(iterations=args.iterations, warmup=args.warmup,
+                   model_delay=args.model_delay, agent_steps=args.agent_steps)
+    if args.realistic:
+        config = BenchConfig.realistic(scale=args.latency_scale, **options)
+    else:
+        config = BenchConfig(**options)
+
+    report = run_benchmarks(args.scenarios or None, config)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
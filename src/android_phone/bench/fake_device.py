@@ -0,0 +1,353 @@
+"""
+Fake uiautomator2 device for offline benchmarks and replays.
+
+Serves pre-recorded (or synthetic) frames and UI hierarchies and simulates
+per-RPC latency, so that the Python side of the controller and the agent can
+be measured without a phone attached.
+"""
+
+import shlex
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+# Per-RPC latencies (seconds) observed on a mid-range phone over USB.
+REALISTIC_LATENCY: Dict[str, float] = {
+    "screenshot": 0.18,
+    "dump_hierarchy": 1.1,
+    "info": 0.03,
+    "window_size": 0.02,
+    "app_current": 0.05,
+    "shell": 0.06,
+    "click": 0.06,
+    "double_click": 0.12,
+    "long_click": 0.06,
+    "swipe": 0.08,
+    "send_keys": 0.15,
+    "clear_text": 0.08,
+    "press": 0.06,
+    "app_start": 0.4,
+    "app_stop": 0.2,
+}
+
+
+class ShellResponse(NamedTuple):
+    """Same shape as ``uiautomator2.abstract.ShellResponse``."""
+    output: str
+    exit_code: int
+
+
+def synthetic_frames(count: int = 4, size: Tuple[int, int] = (1080, 2400)) -> List[Image.Image]:
+    """Generate distinct phone-sized frames with some UI-like blocks."""
+    frames = []
+    for i in range(count):
+        image = Image.new("RGB", size, (250, 250, 250))
+        draw = ImageDraw.Draw(image)
+        w, h = size
+        # Status bar + title bar
+        draw.rectangle([0, 0, w, 80], fill=(30, 30, 30))
+        draw.rectangle([0, 80, w, 240], fill=(40 + 40 * i % 200, 120, 200))
+        # List rows, shifted per frame to emulate scrolling
+        row_h = 180
+        offset = (i * 60) % row_h
+        for r in range(-1, h // row_h + 1):
+            top = 260 + r * row_h - offset
+            shade = 200 + ((r + i) % 3) * 15
+            draw.rectangle([32, top, w - 32, top + row_h - 24], fill=(shade, shade, shade))
+            draw.rectangle([64, top + 40, 64 + 300 + (r % 4) * 80, top + 80], fill=(60, 60, 60))
+        frames.append(image)
+    return frames
+
+
+def synthetic_hierarchy(index: int = 0, size: Tuple[int, int] = (1080, 2400), rows: int = 10,
+                        package: str = "com.example.list") -> str:
+    """Generate a uiautomator-style hierarchy with a scrollable list of rows."""
+    w, h = size
+    row_h = 180
+    nodes = []
+    for r in range(rows):
+        n = index * rows + r
+        top = 260 + r * row_h
+        if top + row_h > h:
+            break
+        nodes.append(
+            f'<node index="{r}" text="Item {n}" resource-id="{package}:id/title" '
+            f'class="android.widget.TextView" package="{package}" content-desc="" '
+            f'checkable="false" checked="false" clickable="true" enabled="true" focusable="true" '
+            f'focused="false" scrollable="false" long-clickable="false" password="false" '
+            f'selected="false" bounds="[32,{top}][{w - 32},{top + row_h - 24}]" />'
+        )
+    return (
+        '<?xml version=\'1.0\' encoding=\'UTF-8\' standalone=\'yes\' ?>'
+        '<hierarchy rotation="0">'
+        f'<node index="0" text="" resource-id="" class="android.widget.FrameLayout" package="{package}" '
+        'content-desc="" checkable="false" checked="false" clickable="false" enabled="true" focusable="false" '
+        'focused="false" scrollable="false" long-clickable="false" password="false" selected="false" '
+        f'bounds="[0,0][{w},{h}]">'
+        f'<node index="0" text="Example" resource-id="{package}:id/toolbar" class="android.widget.TextView" '
+        f'package="{package}" content-desc="" checkable="false" checked="false" clickable="false" enabled="true" '
+        'focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" '
+        f'selected="false" bounds="[0,80][{w},240]" />'
+        f'<node index="1" text="" resource-id="{package}:id/list" class="androidx.recyclerview.widget.RecyclerView" '
+        f'package="{package}" content-desc="" checkable="false" checked="false" clickable="false" enabled="true" '
+        'focusable="true" focused="false" scrollable="true" long-clickable="false" password="false" '
+        f'selected="false" bounds="[0,240][{w},{h}]">'
+        + "".join(nodes) +
+        '</node></node></hierarchy>'
+    )
+
+
+class FakeSelector:
+    """Minimal stand-in for ``device(text=...)`` selectors."""
+
+    def __init__(self, device: "FakeDevice", **kwargs):
+        self._device = device
+        self._kwargs = kwargs
+
+    def _matches(self) -> bool:
+        xml = self._device.current_hierarchy()
+        text = self._kwargs.get("text")
+        resource_id = self._kwargs.get("resourceId")
+        if text is not None and f'text="{text}"' in xml:
+            return True
+        if resource_id is not None and f'resource-id="{resource_id}"' in xml:
+            return True
+        return False
+
+    def exists(self, timeout: float = 0) -> bool:
+        self._device._rpc("exists")
+        return self._matches()
+
+    def click(self):
+        self._device._rpc("click")
+        self._device._on_action()
+
+
+class FakeDevice:
+    """
+    In-memory replacement for a ``uiautomator2.Device``.
+
+    Args:
+        frames: Frames to serve from ``screenshot()``. Defaults to synthetic frames.
+        hierarchies: XML hierarchies to serve, indexed like ``frames``.
+        latency: Per-RPC simulated latency in seconds (missing keys cost nothing).
+        advance_on_action: Move to the next frame after each input action.
+        packages: Packages returned by ``pm list packages -3``.
+        system_packages: Extra packages returned by ``pm list packages`` (without ``-3``).
+        labels: App labels, by package, reported by ``aapt dump badging`` on the device.
+        device_aapt: Whether ``/data/local/tmp/aapt`` exists on the device.
+    """
+
+    def __init__(
+        self,
+        frames: Optional[List[Image.Image]] = None,
+        hierarchies: Optional[List[str]] = None,
+        latency: Optional[Dict[str, float]] = None,
+        advance_on_action: bool = True,
+        packages: Optional[List[str]] = None,
+        system_packages: Optional[List[str]] = None,
+        labels: Optional[Dict[str, str]] = None,
+        device_aapt: bool = True,
+    ):
+        self.frames = frames if frames is not None else synthetic_frames()
+        size = self.frames[0].size if self.frames else (1080, 2400)
+        self.hierarchies = hierarchies if hierarchies is not None else [
+            synthetic_hierarchy(i, size) for i in range(len(self.frames))
+        ]
+        self.latency = dict(latency or {})
+        self.advance_on_action = advance_on_action
+        self.packages = packages if packages is not None else ["com.example.list", "com.tencent.mm"]
+        self.system_packages = system_packages if system_packages is not None else ["com.android.settings"]
+        self.labels = labels if labels is not None else {"com.example.list": "Example", "com.tencent.mm": "微信"}
+        self.device_aapt = device_aapt
+        # Package brought to the foreground by app_start()
+        self.foreground: Optional[str] = None
+        self.frame_index = 0
+        self.calls: List[Tuple[str, Tuple[Any, ...]]] = []
+        self.shell_commands: List[str] = []
+        self.shell_handler: Optional[Callable[[str], Optional[ShellResponse]]] = None
+        self._lock = threading.Lock()
+
+    # --- helpers ---
+
+    def _rpc(self, name: str, *args):
+        with self._lock:
+            self.calls.append((name, args))
+        delay = self.latency.get(name, 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _on_action(self):
+        if self.advance_on_action and self.frames:
+            with self._lock:
+                self.frame_index = (self.frame_index + 1) % len(self.frames)
+
+    def call_count(self, name: str) -> int:
+        with self._lock:
+            return sum(1 for call, _ in self.calls if call == name)
+
+    def current_frame(self) -> Image.Image:
+        return self.frames[self.frame_index % len(self.frames)]
+
+    def current_hierarchy(self) -> str:
+        if not self.hierarchies:
+            return '<hierarchy rotation="0" />'
+        return self.hierarchies[self.frame_index % len(self.hierarchies)]
+
+    # --- observation ---
+
+    def screenshot(self, filename: Optional[str] = None, format: str = "pillow", display_id: Optional[int] = None):
+        self._rpc("screenshot")
+        # u2 hands out a fresh image per call; callers resize in place.
+        image = self.current_frame().copy()
+        if filename:
+            image.save(filename)
+            return None
+        return image
+
+    def dump_hierarchy(self, compressed: bool = False, pretty: bool = False, max_depth: Optional[int] = None) -> str:
+        self._rpc("dump_hierarchy")
+        return self.current_hierarchy()
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        self._rpc("info")
+        w, h = self.current_frame().size
+        return {
+            "productName": "fake",
+            "sdkInt": 33,
+            "displayWidth": w,
+            "displayHeight": h,
+            "displayRotation": 0,
+            "screenOn": True,
+        }
+
+    def window_size(self) -> Tuple[int, int]:
+        self._rpc("window_size")
+        return self.current_frame().size
+
+    def app_current(self) -> Dict[str, Any]:
+        self._rpc("app_current")
+        return {"package": self.foreground or "com.example.list", "activity": f".Page{self.frame_index}"}
+
+    def app_info(self, package_name: str) -> Dict[str, Any]:
+        self._rpc("app_info", package_name)
+        if package_name not in self.packages + self.system_packages:
+            raise RuntimeError(f"package {package_name} not installed")
+        return {"versionName": "1.0", "versionCode": 1}
+
+    def __call__(self, **kwargs) -> FakeSelector:
+        return FakeSelector(self, **kwargs)
+
+    # --- input ---
+
+    def click(self, x: int, y: int):
+        self._rpc("click", x, y)
+        self._on_action()
+
+    def double_click(self, x: int, y: int, duration: float = 0.1):
+        self._rpc("double_click", x, y)
+        self._on_action()
+
+    def long_click(self, x: int, y: int, duration: float = 0.5):
+        self._rpc("long_click", x, y, duration)
+        self._on_action()
+
+    def swipe(self, fx: int, fy: int, tx: int, ty: int, duration: Optional[float] = None, steps: Optional[int] = None):
+        self._rpc("swipe", fx, fy, tx, ty, duration)
+        self._on_action()
+
+    def send_keys(self, text: str, clear: bool = False):
+        self._rpc("send_keys", text)
+        self._on_action()
+
+    def clear_text(self):
+        self._rpc("clear_text")
+
+    def press(self, key, meta=None):
+        self._rpc("press", key)
+        self._on_action()
+
+    def shell(self, cmdargs, timeout: int = 60) -> ShellResponse:
+        cmd = cmdargs if isinstance(cmdargs, str) else " ".join(cmdargs)
+        self._rpc("shell", cmd)
+        with self._lock:
+            self.shell_commands.append(cmd)
+        if self.shell_handler:
+            response = self.shell_handler(cmd)
+            if response is not None:
+                return response
+        if cmd.startswith("pm list packages"):
+            packages = self.packages if "-3" in cmd else self.system_packages + self.packages
+            return ShellResponse("".join(f"package:{p}\n" for p in packages), 0)
+        if cmd.startswith("pm path "):
+            package = cmd.split()[-1]
+            if package not in self.packages + self.system_packages:
+                return ShellResponse("", 1)
+            return ShellResponse(f"package:/data/app/{package}-1/base.apk\n", 0)
+        if cmd.startswith("/data/local/tmp/aapt "):
+            return self._aapt(cmd.split()[1:])
+        if cmd.startswith("dumpsys package "):
+            return ShellResponse("Packages:\n  nonLocalizedLabel=null\n", 0)
+        if cmd.startswith("getprop persist.sys.locale"):
+            return ShellResponse("zh-CN\n", 0)
+        if cmd.startswith("am start"):
+            return self._am_start(shlex.split(cmd))
+        if "input " in cmd:
+            self._on_action()
+        return ShellResponse("", 0)
+
+    def _aapt(self, args: List[str]) -> ShellResponse:
+        """``aapt version`` / ``aapt dump badging <apk>`` of the on-device aapt."""
+        if not self.device_aapt:
+            return ShellResponse("/system/bin/sh: /data/local/tmp/aapt: not found\n", 127)
+        if args[:1] == ["version"]:
+            return ShellResponse("Android Asset Packaging Tool, v0.2-fake\n", 0)
+        package = args[-1].split("/")[-2].rsplit("-", 1)[0]
+        label = self.labels.get(package, "")
+        badging = f"package: name='{package}' versionCode='1' versionName='1.0'\n"
+        return ShellResponse(badging + (f"application-label:'{label}'\n" if label else ""), 0)
+
+    def _am_start(self, args: List[str]) -> ShellResponse:
+        """``am start``: a component or package comes to the foreground, settings actions open Settings."""
+        flags: Dict[str, str] = {}
+        positional: List[str] = []
+        i = 2
+        while i < len(args):
+            if args[i] in ("--es", "--ei", "--ez", "--ef"):
+                i += 3
+            elif args[i].startswith("-"):
+                flags[args[i]] = args[i + 1] if i + 1 < len(args) else ""
+                i += 2
+            else:
+                positional.append(args[i])
+                i += 1
+        package = None
+        if "-n" in flags:
+            package = flags["-n"].split("/", 1)[0]
+        elif positional:
+            package = positional[0]
+        elif flags.get("-a", "").startswith("android.settings."):
+            package = "com.android.settings"
+        if package is not None and package not in self.packages + self.system_packages:
+            return ShellResponse(f"Error: Activity not started, unable to resolve Intent {{ pkg={package} }}\n", 0)
+        if package is not None:
+            self.foreground = package
+        self._on_action()
+        return ShellResponse("Starting: Intent { }\n", 0)
+
+    def app_start(self, package_name: str, activity: Optional[str] = None, wait: bool = False, stop: bool = False):
+        self._rpc("app_start", package_name)
+        self.foreground = package_name
+        self._on_action()
+
+    def app_stop(self, package_name: str):
+        self._rpc("app_stop", package_name)
+
+    def screen_on(self):
+        self._rpc("screen_on")
+
+    def unlock(self):
+        self._rpc("unlock")
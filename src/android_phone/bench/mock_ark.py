@@ -0,0 +1,187 @@
+"""
+Local mock of the Ark chat-completions endpoint.
+
+Replays scripted ``Thought/Action`` responses with a configurable delay so that
+the agent loop can be benchmarked without network access or an API key. It also
+simulates a provider prefix cache: ``usage.prompt_tokens_details.cached_tokens``
+counts the leading messages that are identical to the previous request (roughly
+4 bytes per token), ``/context/create`` + ``/context/chat/completions``
+answer like the Ark Context API, and ``"stream": true`` is answered with
+OpenAI-style server-sent events.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DEFAULT_USAGE = {"prompt_tokens": 1200, "completion_tokens": 40, "total_tokens": 1240}
+
+
+def _estimate_tokens(message: Dict[str, Any]) -> int:
+    return len(json.dumps(message, ensure_ascii=False)) // 4
+
+
+def _cached_prefix_tokens(previous: List[Dict[str, Any]], messages: List[Dict[str, Any]]) -> int:
+    """Tokens of the leading messages shared with the previous request."""
+    cached = 0
+    for old, new in zip(previous, messages):
+        if old != new:
+            break
+        cached += _estimate_tokens(new)
+    return cached
+
+
+def scripted_task(clicks: int = 5) -> List[str]:
+    """A simple script: ``clicks`` click actions followed by ``finished``."""
+    responses = []
+    for i in range(clicks):
+        x = 100 + (i * 137) % 800
+        y = 200 + (i * 211) % 700
+        responses.append(
+            f"Thought: Step {i + 1}, tap the next row.\n"
+            f"Action: click(point='<point>{x} {y}</point>')"
+        )
+    responses.append("Thought: The task is done.\nAction: finished(content='done')")
+    return responses
+
+
+class MockArkServer:
+    """
+    Threaded HTTP server answering ``POST .../chat/completions``.
+
+    Args:
+        responses: Assistant contents returned in order.
+        delay: Seconds to wait before answering each request.
+        usage: ``usage`` block attached to every answer.
+        loop: Start over at the first response once the script is exhausted.
+    """
+
+    def __init__(self, responses: List[str], delay: float = 0.0, usage: Optional[Dict[str, Any]] = None,
+                 loop: bool = True):
+        self.responses = list(responses)
+        self.delay = delay
+        self.usage = dict(usage or DEFAULT_USAGE)
+        self.loop = loop
+        self.requests: List[Dict[str, Any]] = []
+        self.contexts: Dict[str, List[Dict[str, Any]]] = {}
+        self._last_messages: List[Dict[str, Any]] = []
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/v3/chat/completions"
+
+    def _next_response(self) -> str:
+        with self._lock:
+            if self._cursor >= len(self.responses):
+                if not self.loop:
+                    return "Thought: Script exhausted.\nAction: finished(content='script exhausted')"
+                self._cursor = 0
+            content = self.responses[self._cursor]
+            self._cursor += 1
+            return content
+
+    def reset(self):
+        with self._lock:
+            self._cursor = 0
+            self.requests.clear()
+            self._last_messages = []
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                try:
+                    payload = json.loads(body)
+                except json.JSONDecodeError:
+                    payload = {}
+                messages = payload.get("messages", [])
+                if self.path.endswith("/context/create"):
+                    with server._lock:
+                        context_id = f"ctx-mock-{len(server.contexts)}"
+                        server.contexts[context_id] = messages
+                    self._reply({"id": context_id, "model": payload.get("model", "mock"),
+                                 "mode": payload.get("mode"), "ttl": payload.get("ttl")})
+                    return
+
+                context = server.contexts.get(payload.get("context_id"), [])
+                full = context + messages
+                with server._lock:
+                    cached = sum(_estimate_tokens(m) for m in context) if context else \
+                        _cached_prefix_tokens(server._last_messages, full)
+                    server._last_messages = full
+                    server.requests.append({
+                        "path": self.path,
+                        "bytes": len(body),
+                        "messages": len(messages),
+                        "cached_tokens": cached,
+                    })
+                if server.delay > 0:
+                    time.sleep(server.delay)
+                content = server._next_response()
+                usage = dict(server.usage)
+                usage["prompt_tokens_details"] = {"cached_tokens": cached}
+                if payload.get("stream"):
+                    self._stream(content, usage)
+                    return
+                self._reply({
+                    "id": "mock",
+                    "object": "chat.completion",
+                    "model": payload.get("model", "mock"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+            def _reply(self, body: Dict[str, Any]):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, content: str, usage: Dict[str, Any]):
+                chunks = [content[i:i + 16] for i in range(0, len(content), 16)]
+                events = [{"choices": [{"index": 0, "delta": {"content": chunk}}]} for chunk in chunks]
+                events.append({"choices": [], "usage": usage})
+                data = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+                body = data.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockArkServer":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "MockArkServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
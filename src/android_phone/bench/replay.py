@@ -0,0 +1,150 @@
+"""
+Deterministic replay of archived trajectories.
+
+Feeds the frames and hierarchies of a :class:`TrajectoryArchive` through a
+real :class:`AndroidController` backed by a :class:`FakeDevice`, and answers
+model requests with the recorded raw outputs. Everything on the Python side
+(encoding, request construction, parsing, history pruning, logging) runs for
+real, so slow runs can be re-profiled offline.
+"""
+
+import logging
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from android_phone.bench.fake_device import FakeDevice
+from android_phone.core.trajectory import TrajectoryArchive
+from android_phone.integrations.volcengine import VolcengineGUIClient
+
+logger = logging.getLogger(__name__)
+
+
+class RecordedModelClient(VolcengineGUIClient):
+    """
+    Volcengine client whose transport answers with recorded model outputs.
+
+    Args:
+        steps: Archived step entries (``raw_content``, ``usage``, ``timings_ms``).
+        device: Fake device to advance to the next recorded frame after each answer.
+        latency_scale: Multiplier applied to the recorded model latency (0 = instant).
+    """
+
+    def __init__(self, steps: List[Dict[str, Any]], device: Optional[FakeDevice] = None,
+                 latency_scale: float = 0.0, **kwargs):
+        kwargs.setdefault("api_key", "replay")
+        super().__init__(**kwargs)
+        self.steps = steps
+        self.device = device
+        self.latency_scale = latency_scale
+        self.cursor = 0
+
+    def _send(self, headers: Dict[str, str], payload: Dict[str, Any], url: Optional[str] = None,
+              timeout: Optional[float] = None) -> Dict[str, Any]:
+        if self.cursor >= len(self.steps):
+            content = "Thought: Recording exhausted.\nAction: finished(content='replay exhausted')"
+            usage: Dict[str, Any] = {}
+        else:
+            recorded = self.steps[self.cursor]
+            content = recorded.get("raw_content", "")
+            usage = recorded.get("usage") or {}
+            model_ms = recorded.get("timings_ms", {}).get("model", 0.0)
+            if self.latency_scale > 0 and model_ms:
+                time.sleep(model_ms / 1000 * self.latency_scale)
+        self.cursor += 1
+        if self.device is not None:
+            self.device.frame_index = min(self.cursor, len(self.device.frames) - 1)
+        return {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage}
+
+
+def load_replay_device(archive: TrajectoryArchive, latency: Optional[Dict[str, float]] = None) -> FakeDevice:
+    """
+    Build a fake device serving one frame/hierarchy per recorded step.
+
+    Frames are upscaled back to the recorded device geometry so that the
+    controller performs the same resize/encode work as in the original run.
+    A zoom() close-up is not a device frame: its step keeps showing the
+    previous full frame, which the replayed agent crops again.
+    """
+    meta = archive.load_meta()
+    steps = archive.load_steps()
+    window_size = tuple(meta.get("window_size") or ())
+
+    frames: List[Image.Image] = []
+    hierarchies: List[str] = []
+    last_frame = None
+    last_hierarchy = '<hierarchy rotation="0" />'
+    frame_cache: Dict[str, Image.Image] = {}
+    for entry in steps:
+        digest = entry.get("frame")
+        if (entry.get("observation") or {}).get("zoom"):
+            digest = None
+        if digest:
+            if digest not in frame_cache:
+                image = archive.load_frame(digest)
+                if len(window_size) == 2 and image.size != window_size:
+                    image = image.resize(window_size, Image.Resampling.BILINEAR)
+                frame_cache[digest] = image
+            last_frame = frame_cache[digest]
+        if entry.get("hierarchy"):
+            last_hierarchy = archive.load_hierarchy(entry["hierarchy"])
+        # Close-ups and dropped blobs (size cap) repeat the previous full frame
+        frames.append(last_frame if last_frame is not None else Image.new("RGB", window_size or (1080, 2400)))
+        hierarchies.append(last_hierarchy)
+
+    if not frames:
+        raise ValueError(f"Trajectory archive has no steps: {archive.path}")
+    return FakeDevice(frames=frames, hierarchies=hierarchies, latency=latency, advance_on_action=False)
+
+
+def replay_trajectory(path: str, latency_scale: float = 0.0, device_latency: Optional[Dict[str, float]] = None,
+                      log_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Replay an archived task against ``AutonomousAgent`` and compare it with the recording.
+
+    Args:
+        path: Trajectory archive directory (``.log/trajectories/<task_id>``).
+        latency_scale: Replay recorded model latency scaled by this factor (0 = none).
+        device_latency: Simulated per-RPC device latency for the fake device.
+        log_dir: Where the replayed task logs go (temporary directory by default).
+    """
+    from android_phone.core.agent import AutonomousAgent
+    from android_phone.core.controller import AndroidController
+
+    archive = TrajectoryArchive(path)
+    meta = archive.load_meta()
+    steps = archive.load_steps()
+    device = load_replay_device(archive, latency=device_latency)
+
+    controller = AndroidController()
+    controller._device = device
+    client = RecordedModelClient(steps, device=device, latency_scale=latency_scale,
+                                 eco_mode=meta.get("eco_mode", False))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Pinned rather than read from the environment: local verification retries, app launches and
+        # shortcuts would touch the device without a recorded model answer and desync the replay
+        agent = AutonomousAgent(controller, client, eco_mode=meta.get("eco_mode", False),
+                                log_dir=log_dir or tmp_dir, settle_delay=(0.0, 0.0), archive=False,
+                                observation_mode=meta.get("observation_mode", "screenshot"),
+                                adaptive_resolution=meta.get("adaptive_resolution", True),
+                                verify_actions=False, fast_open=False, shortcuts=False)
+        started = time.perf_counter()
+        outcome = agent.run(meta.get("goal", ""), max_steps=max(len(steps), 1))
+        wall_s = time.perf_counter() - started
+
+    recorded_actions = [entry.get("action") for entry in steps]
+    return {
+        "task_id": meta.get("task_id"),
+        "goal": meta.get("goal"),
+        "recorded_status": meta.get("status"),
+        "recorded_steps": len(steps),
+        "replayed_status": outcome.get("status"),
+        "replayed_steps": outcome.get("steps"),
+        "deterministic": outcome.get("steps") == len(steps) and client.cursor == len(steps),
+        "recorded_actions": recorded_actions,
+        "wall_s": round(wall_s, 3),
+        "python_ms_per_step": round(wall_s * 1000 / max(outcome.get("steps", 1), 1), 3),
+    }
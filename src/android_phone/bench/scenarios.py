@@ -0,0 +1,500 @@
+"""
+Benchmark scenarios.
+
+Each scenario takes a :class:`BenchConfig` and returns a JSON-serializable dict
+with timing statistics (milliseconds) plus scenario-specific counters.
+"""
+
+import asyncio
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from android_phone.bench.fake_device import FakeDevice, REALISTIC_LATENCY
+from android_phone.bench.mock_ark import MockArkServer, scripted_task
+
+SCENARIOS: Dict[str, Callable[["BenchConfig"], Dict[str, Any]]] = {}
+
+
+@dataclass
+class BenchConfig:
+    iterations: int = 20
+    warmup: int = 2
+    latency: Dict[str, float] = field(default_factory=dict)
+    model_delay: float = 0.0
+    agent_steps: int = 5
+
+    @classmethod
+    def realistic(cls, scale: float = 1.0, **kwargs) -> "BenchConfig":
+        latency = {k: v * scale for k, v in REALISTIC_LATENCY.items()}
+        return cls(latency=latency, **kwargs)
+
+
+def scenario(name: str):
+    """Register a benchmark scenario under ``name``."""
+    def decorator(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return decorator
+
+
+def summarize(timings: List[float]) -> Dict[str, Any]:
+    """Turn a list of durations (seconds) into millisecond statistics."""
+    ms = sorted(t * 1000 for t in timings)
+    if not ms:
+        return {"iterations": 0}
+    p95_index = min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))
+    return {
+        "iterations": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(ms[p95_index], 3),
+        "min_ms": round(ms[0], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def measure(fn: Callable[[], Any], iterations: int, warmup: int = 0) -> Dict[str, Any]:
+    """Call ``fn`` ``warmup + iterations`` times and summarize the timed calls."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def make_controller(config: BenchConfig, **device_kwargs):
+    from android_phone.core.controller import AndroidController
+
+    device = FakeDevice(latency=config.latency, **device_kwargs)
+    controller = AndroidController()
+    controller._device = device
+    return controller, device
+
+
+@scenario("get_screenshot")
+def bench_get_screenshot(config: BenchConfig) -> Dict[str, Any]:
+    controller, device = make_controller(config)
+    result = measure(lambda: controller.get_screenshot(scale=0.5, quality=60), config.iterations, config.warmup)
+    result["image_b64_bytes"] = len(controller.get_screenshot(scale=0.5, quality=60))
+    return result
+
+
+@scenario("observation_levels")
+def bench_observation_levels(config: BenchConfig) -> Dict[str, Any]:
+    """Encode time and payload size of each adaptive observation level."""
+    from android_phone.core.observation import NORMAL_LEVELS, ECO_LEVELS
+
+    controller, device = make_controller(config)
+    # A copy is not the controller's last frame, so every iteration really encodes (no rendition cache hits)
+    frame = controller.capture_frame().copy()
+    result: Dict[str, Any] = {}
+    for mode, levels in (("normal", NORMAL_LEVELS), ("eco", ECO_LEVELS)):
+        for scale, quality in levels:
+            encode = lambda: controller.encode_frame(frame, scale=scale, quality=quality)
+            entry = measure(encode, config.iterations, config.warmup)
+            entry["image_b64_bytes"] = len(encode())
+            result[f"{mode}_{scale}_{quality}"] = entry
+    result["rendition_hits"] = controller.frame_stats["rendition_hits"]
+    return result
+
+
+@scenario("compact_hierarchy")
+def bench_compact_hierarchy(config: BenchConfig) -> Dict[str, Any]:
+    """Cached reads next to an uncached dump, and what a cache hit costs with a fresh vs expired last frame."""
+    controller, device = make_controller(config)
+    result = measure(controller.get_compact_ui_hierarchy, config.iterations, config.warmup)
+    result["dump_hierarchy_calls"] = device.call_count("dump_hierarchy")
+    result["hierarchy_cache"] = dict(controller.hierarchy_stats)
+    result["dump"] = measure(lambda: controller.dump_hierarchy(cache=False), config.iterations, config.warmup)
+    screenshots = device.call_count("screenshot")
+    result["hit_fresh_frame"] = measure(lambda: controller.dump_hierarchy(max_age=float("inf")),
+                                        config.iterations, config.warmup)
+    result["hit_fresh_frame"]["screenshots"] = device.call_count("screenshot") - screenshots
+    screenshots = device.call_count("screenshot")
+    result["hit_new_frame"] = measure(lambda: controller.dump_hierarchy(max_age=0), config.iterations, config.warmup)
+    result["hit_new_frame"]["screenshots"] = device.call_count("screenshot") - screenshots
+    return result
+
+
+@scenario("screen_state")
+def bench_screen_state(config: BenchConfig) -> Dict[str, Any]:
+    """Screenshot + info + hierarchy: sequential RPCs vs concurrent capture_screen_state."""
+    latency = config.latency or REALISTIC_LATENCY
+    controller, device = make_controller(BenchConfig(latency=latency))
+
+    def sequential():
+        controller.get_screenshot(scale=0.5)
+        controller.get_info()
+        controller.get_compact_ui_hierarchy()
+
+    iterations = max(1, config.iterations // 4)
+    results = {
+        "latency_profile": "config" if config.latency else "realistic",
+        "sequential": measure(sequential, iterations, min(config.warmup, 1)),
+        "concurrent": measure(lambda: controller.capture_screen_state(include_hierarchy=True, scale=0.5),
+                              iterations, min(config.warmup, 1)),
+    }
+    results["speedup"] = round(results["sequential"]["mean_ms"] / results["concurrent"]["mean_ms"], 2)
+    return results
+
+
+@scenario("history_pruning")
+def bench_history_pruning(config: BenchConfig) -> Dict[str, Any]:
+    from android_phone.integrations.volcengine import VolcengineGUIClient
+
+    client = VolcengineGUIClient(api_key="bench")
+    image_url = "data:image/jpeg;base64," + "A" * 100_000
+    for i in range(30):
+        client.history.append({
+            "role": "user",
+            "content": [
+                {"type": "text", "text": f"Action 'click' executed. Result: Click successful. Step {i}"},
+                {"type": "image_url", "image_url": {"url": image_url}},
+            ],
+        })
+        client.history.append({"role": "assistant", "content": f"Thought: step {i}\nAction: wait()"})
+
+    def prune():
+        pruned = client._prune_history_turns(client.history, max_turns=10)
+        client._prune_history_images(pruned, max_images=4)
+
+    result = measure(prune, config.iterations, config.warmup)
+    result["history_messages"] = len(client.history)
+    return result
+
+
+@scenario("agent_run")
+def bench_agent_run(config: BenchConfig) -> Dict[str, Any]:
+    from android_phone.core.agent import AutonomousAgent
+    from android_phone.integrations.volcengine import VolcengineGUIClient
+
+    controller, device = make_controller(config)
+    steps: List[int] = []
+    with MockArkServer(scripted_task(config.agent_steps), delay=config.model_delay) as server, \
+            tempfile.TemporaryDirectory() as log_dir:
+        client = VolcengineGUIClient(api_key="bench")
+        client.API_URL = server.url
+        agent = AutonomousAgent(controller, client, log_dir=log_dir, settle_delay=(0.0, 0.0))
+
+        def run():
+            server.reset()
+            outcome = agent.run("benchmark task", max_steps=config.agent_steps + 1)
+            steps.append(outcome["steps"])
+
+        iterations = max(1, config.iterations // 4)
+        result = measure(run, iterations, min(config.warmup, 1))
+        result["steps_per_run"] = steps[-1] if steps else 0
+        result["model_requests_per_run"] = len(server.requests)
+        result["request_bytes_last"] = server.requests[-1]["bytes"] if server.requests else 0
+    if result.get("steps_per_run"):
+        result["mean_ms_per_step"] = round(result["mean_ms"] / result["steps_per_run"], 3)
+    return result
+
+
+@scenario("prefix_cache")
+def bench_prefix_cache(config: BenchConfig) -> Dict[str, Any]:
+    """Share of prompt tokens served from the (simulated) provider prefix cache per history policy."""
+    from android_phone.core.agent import AutonomousAgent
+    from android_phone.integrations.volcengine import VolcengineGUIClient
+
+    steps = max(config.agent_steps, 24)
+    results: Dict[str, Any] = {"steps": steps}
+    for policy, prefix_stable in (("sliding", False), ("block", True)):
+        controller, device = make_controller(config)
+        with MockArkServer(scripted_task(steps), delay=config.model_delay) as server, \
+                tempfile.TemporaryDirectory() as log_dir:
+            client = VolcengineGUIClient(api_key="bench", prefix_stable=prefix_stable)
+            client.API_URL = server.url
+            agent = AutonomousAgent(controller, client, log_dir=log_dir, settle_delay=(0.0, 0.0))
+            started = time.perf_counter()
+            agent.run("benchmark task", max_steps=steps + 1)
+            elapsed = time.perf_counter() - started
+            cached = [r["cached_tokens"] for r in server.requests]
+            sent = sum(r["bytes"] for r in server.requests) // 4
+            results[policy] = {
+                "requests": len(server.requests),
+                "cached_tokens": sum(cached),
+                "estimated_prompt_tokens": sent,
+                "cached_ratio": round(sum(cached) / sent, 3) if sent else 0.0,
+                "wall_ms": round(elapsed * 1000, 3),
+            }
+    return results
+
+
+@scenario("payload_assembly")
+def bench_payload_assembly(config: BenchConfig) -> Dict[str, Any]:
+    """CPU time and allocations of building each request body: json.dumps per request vs cached fragments."""
+    import json
+    import tracemalloc
+    from android_phone.integrations.payload import encode_payload
+    from android_phone.integrations.volcengine import VolcengineGUIClient
+
+    controller, device = make_controller(config)
+    image_b64 = controller.get_screenshot(scale=0.5, quality=60)
+    answer = {"choices": [{"message": {"content": "Thought: ok\nAction: wait()"}}], "usage": {}}
+    steps = max(config.iterations, 12)
+    results: Dict[str, Any] = {"steps": steps, "image_b64_bytes": len(image_b64)}
+    encoders = {
+        "json_per_request": lambda payload: json.dumps(payload).encode("utf-8"),
+        "fragments": encode_payload,
+    }
+    for name, encode in encoders.items():
+        client = VolcengineGUIClient(api_key="bench")
+        cpu: List[float] = []
+        peaks: List[int] = []
+        sizes: List[int] = []
+
+        def send(headers, payload, url=None, timeout=None):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            started = time.process_time()
+            body = encode(payload)
+            cpu.append(time.process_time() - started)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            sizes.append(len(body))
+            return answer
+
+        client._send = send
+        tracemalloc.start()
+        try:
+            for step in range(steps):
+                client.ask(f"Step {step}", image_b64)
+        finally:
+            tracemalloc.stop()
+        # Steady state: the history window is full after the first few steps
+        tail = slice(steps // 2, None)
+        results[name] = {
+            "encode_cpu_ms": round(statistics.fmean(cpu[tail]) * 1000, 3),
+            "encode_peak_kb": round(statistics.fmean(peaks[tail]) / 1024, 1),
+            "body_bytes": sizes[-1],
+        }
+    return results
+
+
+class _TargetDevice(FakeDevice):
+    """FakeDevice whose screen only advances when a click lands on the current target row."""
+
+    def __init__(self, targets: List[str], **kwargs):
+        super().__init__(advance_on_action=False, **kwargs)
+        self.targets = targets
+
+    def target_bounds(self):
+        from android_phone.core.hierarchy import find_nodes, parse_bounds, parse_hierarchy
+
+        nodes = find_nodes(parse_hierarchy(self.current_hierarchy()), text=self.targets[self.frame_index])
+        return parse_bounds(nodes[0].get("bounds")) if nodes else None
+
+    def click(self, x: int, y: int):
+        self._rpc("click", x, y)
+        bounds = self.target_bounds() if self.frame_index < len(self.targets) else None
+        if bounds and bounds[0] <= x < bounds[2] and bounds[1] <= y < bounds[3]:
+            with self._lock:
+                self.frame_index += 1
+
+
+class _TapPolicy:
+    """
+    Stand-in model that taps the current target row: by element number when
+    the observation carries Set-of-Mark labels, otherwise by its centre plus
+    Gaussian aiming noise (0-1000 coordinates), like a VLM estimating points.
+    """
+
+    SYSTEM_PROMPT = ""
+
+    def __init__(self, device: _TargetDevice, noise: float, seed: int):
+        import random
+
+        self.device = device
+        self.noise = noise
+        self.rng = random.Random(seed)
+
+    def reset_session(self):
+        pass
+
+    def ask(self, instruction: str, image_b64: str) -> Dict[str, Any]:
+        import re
+        from android_phone.integrations.parser import parse_action_from_text
+
+        device = self.device
+        if device.frame_index >= len(device.targets):
+            text = "Thought: done\nAction: finished(content='done')"
+        else:
+            target = device.targets[device.frame_index]
+            mark = re.search(rf"\[(\d+)\] {re.escape(target)}(?:;|$)", instruction)
+            if mark:
+                text = f"Thought: tap {target}\nAction: click(element={mark.group(1)})"
+            else:
+                x1, y1, x2, y2 = device.target_bounds()
+                w, h = device.current_frame().size
+                x = round((x1 + x2) / 2 * 1000 / w + self.rng.gauss(0, self.noise))
+                y = round((y1 + y2) / 2 * 1000 / h + self.rng.gauss(0, self.noise))
+                text = f"Thought: tap {target}\nAction: click(point='<point>{x} {y}</point>')"
+        parsed = parse_action_from_text(text)
+        return {"thought": parsed["thought"], "action_parsed": parsed["action_parsed"], "raw_content": text, "usage": {}}
+
+
+def _tap_tasks(config: BenchConfig, **agent_kwargs) -> Dict[str, Any]:
+    """Run the _TapPolicy tasks with the given agent options; steps per task and click-failure rate."""
+    from android_phone.bench.fake_device import synthetic_frames, synthetic_hierarchy
+    from android_phone.core.agent import AutonomousAgent
+    from android_phone.core.controller import AndroidController
+
+    # Four screens per task, the target is a different row on each; aiming noise of 25/1000 of the screen
+    # is about 60px vertically, against rows 156px tall
+    rows, screens, noise = 10, 4, 25.0
+    tasks = max(2, config.iterations // 4)
+    frames = synthetic_frames(screens + 1)
+    hierarchies = [synthetic_hierarchy(i, frames[0].size, rows) for i in range(screens + 1)]
+    steps, clicks, no_effect, retries, timings = [], 0, 0, 0, []
+    with tempfile.TemporaryDirectory() as log_dir:
+        for task in range(tasks):
+            targets = [f"Item {i * rows + (task + 3 * i) % rows}" for i in range(screens)]
+            device = _TargetDevice(targets, frames=frames, hierarchies=hierarchies, latency=config.latency)
+            controller = AndroidController()
+            controller._device = device
+            agent = AutonomousAgent(controller, _TapPolicy(device, noise, seed=task), log_dir=log_dir,
+                                    settle_delay=(0.0, 0.0), adaptive_resolution=False, **agent_kwargs)
+            started = time.perf_counter()
+            outcome = agent.run("open the marked rows", max_steps=screens * 5)
+            timings.append(time.perf_counter() - started)
+            steps.append(outcome["steps"])
+            clicks += outcome["click_stats"]["clicks"]
+            no_effect += outcome["click_stats"]["no_effect_clicks"]
+            retries += outcome["effect_stats"]["retries"]
+    return {
+        **summarize(timings),
+        "aim_noise": noise,
+        "steps_per_task": round(statistics.fmean(steps), 3),
+        "clicks": clicks,
+        "click_failure_rate": round(no_effect / clicks, 3) if clicks else 0.0,
+        "local_retries": retries,
+    }
+
+
+@scenario("set_of_mark")
+def bench_set_of_mark(config: BenchConfig) -> Dict[str, Any]:
+    """Steps per task and click-failure rate: coordinate clicks vs Set-of-Mark click(element=N)."""
+    return {mode: _tap_tasks(config, observation_mode=mode, verify_actions=False) for mode in ("screenshot", "som")}
+
+
+@scenario("action_verification")
+def bench_action_verification(config: BenchConfig) -> Dict[str, Any]:
+    """Coordinate clicks with and without post-action verification (missed taps retried on the nearest element)."""
+    return {name: _tap_tasks(config, observation_mode="screenshot", verify_actions=verify)
+            for name, verify in (("unverified", False), ("verified", True))}
+
+
+@scenario("frame_reuse")
+def bench_frame_reuse(config: BenchConfig) -> Dict[str, Any]:
+    """An MCP client observing one screen at several scales plus a zoom: fresh captures vs last-frame reuse."""
+    from android_phone import server
+
+    latency = config.latency or REALISTIC_LATENCY
+    controller, device = make_controller(BenchConfig(latency=latency), advance_on_action=False)
+    original = server._controller
+    server._controller = controller
+
+    def observe(max_age):
+        def run():
+            for scale in (0.3, 0.5, 0.3):
+                asyncio.run(server.get_screen_state(scale=scale, max_age=max_age))
+            server.zoom(500, 500, max_age=max_age)
+            # The next observation follows an action
+            controller.invalidate_screen()
+        return run
+
+    iterations = max(1, config.iterations // 4)
+    results: Dict[str, Any] = {"latency_profile": "config" if config.latency else "realistic"}
+    try:
+        for name, max_age in (("fresh", 0), ("reused", 5.0)):
+            before = device.call_count("screenshot")
+            results[name] = measure(observe(max_age), iterations, min(config.warmup, 1))
+            results[name]["screenshots_per_observation"] = (
+                (device.call_count("screenshot") - before) / (iterations + min(config.warmup, 1))
+            )
+    finally:
+        server._controller = original
+    results["frame_stats"] = dict(controller.frame_stats)
+    results["speedup"] = round(results["fresh"]["mean_ms"] / results["reused"]["mean_ms"], 2)
+    return results
+
+
+@scenario("press_keys")
+def bench_press_keys(config: BenchConfig) -> Dict[str, Any]:
+    keys = ["back", "back", "delete", "delete", "enter"]
+    controller, device = make_controller(config)
+
+    def sequential():
+        for key in keys:
+            controller.press_key(key)
+
+    results = {
+        "keys": len(keys),
+        "sequential": measure(sequential, config.iterations, config.warmup),
+    }
+    calls_before = device.call_count("shell")
+    results["coalesced"] = measure(lambda: controller.press_keys(keys), config.iterations, config.warmup)
+    results["coalesced"]["shell_calls_per_sequence"] = (
+        (device.call_count("shell") - calls_before) / (config.iterations + config.warmup)
+    )
+    results["sequential"]["shell_calls_per_sequence"] = len(keys)
+    return results
+
+
+@scenario("mcp_tools")
+def bench_mcp_tools(config: BenchConfig) -> Dict[str, Any]:
+    from android_phone import server
+
+    controller, device = make_controller(config)
+    original = server._controller
+    server._controller = controller
+    try:
+        results = {
+            "get_screen_state": measure(lambda: asyncio.run(server.get_screen_state(scale=0.5, max_age=0)),
+                                        config.iterations, config.warmup),
+            "get_screen_state_xml": measure(lambda: asyncio.run(server.get_screen_state(include_xml=True, scale=0.5, max_age=0)),
+                                            config.iterations, config.warmup),
+            "tap": measure(lambda: server.tap(500, 500, normalized=True), config.iterations, config.warmup),
+            "press_key": measure(lambda: server.press_key("back"), config.iterations, config.warmup),
+        }
+    finally:
+        server._controller = original
+    return results
+
+
+def run_benchmarks(names: Optional[List[str]] = None, config: Optional[BenchConfig] = None) -> Dict[str, Any]:
+    """
+    Run the selected scenarios (all by default) and return a JSON-ready report.
+    """
+    config = config or BenchConfig()
+    selected = names or list(SCENARIOS)
+    unknown = [n for n in selected if n not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(unknown)}")
+
+    results = {}
+    for name in selected:
+        started = time.perf_counter()
+        results[name] = SCENARIOS[name](config)
+        results[name]["wall_s"] = round(time.perf_counter() - started, 3)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": asdict(config),
+        },
+        "results": results,
+    }
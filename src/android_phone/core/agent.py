@@ -2,154 +2,430 @@ import time
 import random
 import logging
 import os
-from typing import Dict, Any, Optional
+import threading
+from contextlib import nullcontext
+from typing import Dict, Any, Optional, Tuple, Callable
 
+from android_phone.core.apps import OPEN_VERBS, AppIndex
 from android_phone.core.controller import AndroidController
+from android_phone.core.fingerprint import frame_fingerprint, fingerprint_distance
+from android_phone.core.health import ConnectionMonitor
+from android_phone.core.profiling import TaskProfiler
+from android_phone.core.shortcuts import ShortcutRegistry
 from android_phone.core.logger import TaskLogger
-from android_phone.integrations.volcengine import VolcengineGUIClient
+from android_phone.core.observation import AdaptiveResolution, CHANGING_ACTIONS, is_uncertain
+from android_phone.core.trajectory import TrajectoryArchive, DEFAULT_MAX_BYTES
+from android_phone.core.verify import NO_EFFECT, RETRYABLE_ACTIONS, VERIFIED_ACTIONS, Effect, classify_effect, snap_target
+from android_phone.integrations.backends import VLMBackend
 from android_phone.integrations.parser import parse_action_from_text
+from android_phone.integrations.prompt import with_set_of_mark
 
 logger = logging.getLogger(__name__)
 
+# JPEG quality of zoom() close-ups, which are sent at full resolution
+ZOOM_QUALITY = 85
+# "screenshot": plain frames, actions use points; "som": Set-of-Mark boxes, actions may use element=N
+OBSERVATION_MODES = ("screenshot", "som")
+CLICK_ACTIONS = ("click", "left_double", "right_single", "long_press")
+
+# Sent after an answer that could not be parsed, with a new screenshot
+FORMAT_ERROR = (
+    "Error: I could not parse your previous output. "
+    "Please provide the next step strictly in the format:\n"
+    "Thought: ...\n"
+    "Action: function(...)\n"
+    "Example: Action: click(point='<point>500 500</point>')"
+)
+# Text-only re-prompt: the screenshot is already in the conversation
+FORMAT_REMINDER = "The screen has not changed since the last screenshot. " + FORMAT_ERROR
+
 class AutonomousAgent:
-    def __init__(self, controller: AndroidController, client: VolcengineGUIClient, eco_mode: bool = False):
+    def __init__(self, controller: AndroidController, client: VLMBackend, eco_mode: bool = False,
+                 log_dir: str = ".log", settle_delay: Tuple[float, float] = (0.1, 1.0),
+                 archive: Optional[bool] = None, archive_hierarchy: bool = True,
+                 adaptive_resolution: Optional[bool] = None,
+                 on_model_delta: Optional[Callable[[str], None]] = None,
+                 observation_mode: Optional[str] = None, format_retries: int = 1,
+                 verify_actions: Optional[bool] = None, fast_open: Optional[bool] = None,
+                 app_index: Optional[AppIndex] = None, shortcuts: Optional[bool] = None,
+                 shortcut_registry: Optional[ShortcutRegistry] = None, profile: Optional[bool] = None):
         self.controller = controller
         self.client = client
+        # Streams the model's answer chunk by chunk (e.g. to print the thought live)
+        self.on_model_delta = on_model_delta
+        # Screenshots are never encoded larger than the backend accepts
+        max_image_size = getattr(client, "max_image_size", None)
+        self.max_image_size = tuple(max_image_size) if isinstance(max_image_size, (tuple, list)) else (1080, 1920)
         self.eco_mode = eco_mode
+        # (min, max) seconds to wait for the UI to settle after each action
+        self.settle_delay = settle_delay
+        # Directories are created on first use, not at construction time
         self.screenshot_dir = os.path.join(os.getcwd(), ".active_screenshots")
-        if not os.path.exists(self.screenshot_dir):
-            os.makedirs(self.screenshot_dir, exist_ok=True)
-        
-        self.task_logger = TaskLogger(log_dir=".log", expire_days=10)
+        self.log_dir = log_dir
+        self._task_logger: Optional[TaskLogger] = None
+
+        # Opt-in trajectory archive (frames, hierarchies, raw model output, timings)
+        if archive is None:
+            archive = os.environ.get("ANDROID_AGENT_ARCHIVE", "").lower() in ("1", "true", "yes")
+        self.archive_enabled = archive
+        self.archive_hierarchy = archive_hierarchy
+        self.archive_dir = os.path.join(log_dir, "trajectories")
+        self.archive_max_bytes = int(float(os.environ.get("ANDROID_AGENT_ARCHIVE_MAX_MB", 0)) * 1024 * 1024) or DEFAULT_MAX_BYTES
+
+        # Observation resolution starts low and escalates only when a step goes wrong
+        if adaptive_resolution is None:
+            adaptive_resolution = os.environ.get("ANDROID_AGENT_ADAPTIVE", "1").lower() not in ("0", "false", "no")
+        self.adaptive_resolution = adaptive_resolution
+        self.resolution = AdaptiveResolution.for_mode(eco_mode, adaptive_resolution)
+
+        # Set-of-Mark: number the interactive elements on the screenshot and accept click(element=N)
+        if observation_mode is None:
+            observation_mode = os.environ.get("ANDROID_AGENT_OBSERVATION", "screenshot").lower()
+        if observation_mode not in OBSERVATION_MODES:
+            raise ValueError(f"Unknown observation mode '{observation_mode}', expected one of {OBSERVATION_MODES}")
+        self.observation_mode = observation_mode
+        # Text-only re-prompts after an unparseable answer, before falling back to a new screenshot
+        self.format_retries = format_retries
+
+        # Check what each action did on screen (the post-action frame is reused as the next observation)
+        if verify_actions is None:
+            verify_actions = os.environ.get("ANDROID_AGENT_VERIFY", "1").lower() not in ("0", "false", "no")
+        self.verify_actions = verify_actions
+
+        # Goals starting with "打开<app>" open the app locally (installed-app index) before the first model call
+        if fast_open is None:
+            fast_open = os.environ.get("ANDROID_AGENT_FAST_OPEN", "1").lower() not in ("0", "false", "no")
+        self.fast_open = fast_open
+        self._app_index = app_index
+
+        # Goals matching a registered shortcut jump to their page with an intent / deep link first
+        if shortcuts is None:
+            shortcuts = os.environ.get("ANDROID_AGENT_SHORTCUTS", "1").lower() not in ("0", "false", "no")
+        self.shortcuts = shortcuts
+        self._shortcut_registry = shortcut_registry
+
+        # cProfile per step + tracemalloc snapshots, written to <log_dir>/profiles/<task_id>/
+        if profile is None:
+            profile = os.environ.get("ANDROID_AGENT_PROFILE", "").lower() in ("1", "true", "yes")
+        self.profile = profile
+        self._profiler: Optional[TaskProfiler] = None
+
+    @property
+    def task_logger(self) -> TaskLogger:
+        """Lazily created task logger (creates the log directory on first use)."""
+        if self._task_logger is None:
+            self._task_logger = TaskLogger(log_dir=self.log_dir, expire_days=10)
+        return self._task_logger
+
+    @property
+    def app_index(self) -> AppIndex:
+        """Lazily created index of the installed apps (persisted under the log directory)."""
+        if self._app_index is None:
+            self._app_index = AppIndex(self.controller, log_dir=self.log_dir)
+        return self._app_index
+
+    @property
+    def shortcut_registry(self) -> ShortcutRegistry:
+        """Lazily loaded shortcut registry (registry file plus the built-in shortcuts)."""
+        if self._shortcut_registry is None:
+            self._shortcut_registry = ShortcutRegistry()
+        return self._shortcut_registry
 
-    def run(self, goal: str, max_steps: int = 50) -> Dict[str, Any]:
+    def _open_archive(self, task_id: str, goal: str) -> Optional[TrajectoryArchive]:
+        """Create the task's trajectory archive if archiving is enabled."""
+        if not self.archive_enabled:
+            return None
+        try:
+            archive = TrajectoryArchive.create(self.archive_dir, task_id, max_bytes=self.archive_max_bytes)
+            window_size = None
+            try:
+                window_size = list(self.controller.device.window_size())
+            except Exception as e:
+                logger.warning(f"Could not read window size for archive: {e}")
+            archive.start(task_id, goal, window_size=window_size, eco_mode=self.eco_mode,
+                          observation_mode=self.observation_mode, adaptive_resolution=self.adaptive_resolution,
+                          model=getattr(self.client, "model", None))
+            logger.info(f"Archiving trajectory to {archive.path}")
+            return archive
+        except Exception as e:
+            logger.error(f"Failed to create trajectory archive: {e}")
+            return None
+
+    def _archive_step(self, archive: Optional[TrajectoryArchive], **kwargs):
+        if archive is None:
+            return
+        try:
+            archive.record_step(**kwargs)
+        except Exception as e:
+            logger.error(f"Failed to archive step: {e}")
+
+    def _archive_finish(self, archive: Optional[TrajectoryArchive], result: str, status: str, steps: int):
+        if archive is None:
+            return
+        try:
+            archive.finish(result, status, steps)
+        except Exception as e:
+            logger.error(f"Failed to finalize trajectory archive: {e}")
+
+    def _result(self, task_id: str, archive: Optional[TrajectoryArchive], status: str, result: str, steps: int,
+                total_usage: Dict[str, int], stats: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        End the task: log ``task_end``, finalize the archive and build the dict returned by ``run()``.
+
+        Args:
+            status: "completed", "failed", "cancelled" or "error".
+            result: Final message (the model's ``finished`` content or the reason the task stopped).
+            steps: Steps taken.
+            total_usage: Accumulated token usage.
+            stats: Per-task counters (``click_stats``, ``parse_stats``, ``effect_stats``).
+        """
+        self.task_logger.log_task_end(task_id, result, total_usage, steps)
+        self._archive_finish(archive, result, status, steps)
+        return {"status": status, "result": result, "total_usage": total_usage, "steps": steps, **stats}
+
+    def run(self, goal: str, max_steps: int = 50, cancel_event: Optional[threading.Event] = None,
+            on_step: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Run the autonomous task loop.
-        Returns a dictionary containing result, usage stats, and step count.
+        Returns a dictionary containing result, usage stats, and step count
+        (plus the ``profile`` summary when profiling is on).
+
+        Args:
+            goal: Natural language goal.
+            max_steps: Step budget.
+            cancel_event: When set, the task stops before its next step with status "cancelled".
+            on_step: Called with ``step``, ``max_steps``, ``thought``, ``action`` and ``total_usage``
+                once the model has answered for a step.
         """
+        self._profiler = None
+        # Keep the health monitor from swapping the connection under a running step
+        monitor = getattr(self.controller, "health", None)
+        hold = monitor.in_use() if isinstance(monitor, ConnectionMonitor) else nullcontext()
+        try:
+            with hold:
+                result = self._run(goal, max_steps, cancel_event, on_step)
+        finally:
+            profile = self._finish_profile()
+        if profile is not None:
+            result["profile"] = profile
+        return result
+
+    def _run(self, goal: str, max_steps: int, cancel_event: Optional[threading.Event],
+             on_step: Optional[Callable[[Dict[str, Any]], None]]) -> Dict[str, Any]:
         logger.info(f"Starting autonomous task: {goal}")
         
         task_id = self.task_logger.generate_task_id()
         self.task_logger.log_task_start(task_id, goal)
+        archive = self._open_archive(task_id, goal)
+        if self.profile:
+            self._start_profile(task_id)
         
         # 1. Reset Session
         self.client.reset_session()
+        self._configure_prompt()
         
         # Initial instruction
         instruction = goal
+        self.resolution.reset()
+        # Outcome of the previous step, used to pick the next observation resolution
+        prev_action_type: Optional[str] = None
+        prev_ok: Optional[bool] = None
+        prev_uncertain = False
+        prev_fingerprint: Optional[bytes] = None
+        frame = None
+        # Legend of the Set-of-Mark elements on the current observation
+        legend = ""
+        click_stats = {"clicks": 0, "element_clicks": 0, "failed_clicks": 0, "no_effect_clicks": 0}
+        # Unparseable answers, answers fixed by the tolerant parser, text-only re-prompts and how many of them worked
+        parse_stats = {"failures": 0, "repaired": 0, "reprompts": 0, "recovered": 0}
+        # Verified actions by outcome, local retries on a snapped target and how many of them changed the screen
+        effect_stats = {"verified": 0, "no_effect": 0, "navigation": 0, "partial_change": 0,
+                        "retries": 0, "retry_recovered": 0}
+        # Reported with every result (the dicts are updated in place)
+        stats = {"click_stats": click_stats, "parse_stats": parse_stats, "effect_stats": effect_stats}
+        # Frame captured by the verification of the previous action
+        next_frame = None
+        # (image_b64, observation) of a zoom() close-up to send instead of the next screenshot
+        pending_observation: Optional[Tuple[str, Dict[str, Any]]] = None
         
         # Token usage stats
         total_usage = {
             "prompt_tokens": 0,
             "completion_tokens": 0,
-            "total_tokens": 0
+            "total_tokens": 0,
+            "cached_tokens": 0
         }
         
+        # 1b. Shortcut intent or "打开<app>": navigate locally; a goal with nothing left needs no model call at all
+        opened = self._run_shortcut(task_id, goal) if self.shortcuts else None
+        if opened is None and self.fast_open:
+            opened = self._open_app_locally(task_id, goal)
+        if opened is not None:
+            target, rest = opened
+            if not rest:
+                result = f"Opened {target}"
+                return self._result(task_id, archive, "completed", result, 0, total_usage, stats)
+            instruction = f"{goal}\n{target} has already been opened, continue from the current screen."
+
         for step in range(max_steps):
+            if cancel_event is not None and cancel_event.is_set():
+                result = "Cancelled before completion."
+                logger.info(f"Task cancelled after {step} steps")
+                return self._result(task_id, archive, "cancelled", result, step, total_usage, stats)
+
             logger.info(f"Step {step + 1}/{max_steps}")
+            if self._profiler is not None:
+                self._profiler.begin_step(step)
+            
+            timings: Dict[str, float] = {}
             
             # 2. Capture Screenshot
             # Use lower quality/scale for API efficiency if needed, but 720p is good
+            started = time.perf_counter()
             try:
-                # scale=0.5 for speed and token saving (usually sufficient for UI)
-                # In eco mode, use lower resolution and quality
-                if self.eco_mode:
-                    image_b64 = self.controller.get_screenshot(scale=0.3, quality=50)
+                if pending_observation is not None:
+                    image_b64, observation = pending_observation
+                    pending_observation = None
+                    # The close-up carries no marks; the legend belonged to the previous full frame
+                    legend = ""
                 else:
-                    image_b64 = self.controller.get_screenshot(scale=0.5, quality=60)
+                    frame = next_frame if next_frame is not None else self._capture_observation()
+                    next_frame = None
+                    fingerprint = self._fingerprint(frame)
+                    if step > 0:
+                        self._update_resolution(prev_action_type, prev_ok, prev_uncertain, prev_fingerprint, fingerprint)
+                        if (prev_action_type in CLICK_ACTIONS and prev_ok
+                                and not self._screen_changed(prev_fingerprint, fingerprint)):
+                            click_stats["no_effect_clicks"] += 1
+                    prev_fingerprint = fingerprint
+                    observed, legend = self._annotate(frame)
+                    scale, quality = self.resolution.settings
+                    image_b64 = self.controller.encode_frame(observed, scale=scale, quality=quality,
+                                                             max_size=self.max_image_size)
+                    observation = self.resolution.describe(image_b64)
             except Exception as e:
                 logger.error(f"Failed to capture screenshot: {e}")
-                return {
-                    "status": "error",
-                    "result": f"Error: Failed to capture screenshot - {e}",
-                    "total_usage": total_usage,
-                    "steps": step + 1
-                }
+                return self._result(task_id, archive, "error", f"Error: Failed to capture screenshot - {e}", step + 1,
+                                    total_usage, stats)
+
+            timings["capture"] = (time.perf_counter() - started) * 1000
+            logger.info(f"Observation: scale={observation['scale']} quality={observation['quality']} "
+                        f"bytes={observation['bytes']} ({observation['reason']})")
+            
+            hierarchy = None
+            if archive is not None and self.archive_hierarchy:
+                started = time.perf_counter()
+                try:
+                    hierarchy = self.controller.get_compact_ui_hierarchy()
+                except Exception as e:
+                    logger.warning(f"Failed to capture hierarchy for archive: {e}")
+                timings["hierarchy"] = (time.perf_counter() - started) * 1000
 
             # 3. Call Volcengine
+            if legend:
+                instruction = f"{instruction}\nMarked elements: {legend}"
+            started = time.perf_counter()
             try:
                 # parsed_result contains 'thought' and 'action_parsed'
-                response = self.client.ask(instruction, image_b64)
+                if self.on_model_delta is not None:
+                    response = self.client.ask(instruction, image_b64, on_delta=self.on_model_delta)
+                else:
+                    response = self.client.ask(instruction, image_b64)
             except Exception as e:
                 logger.error(f"Volcengine API failed: {e}")
-                return {
-                    "status": "error",
-                    "result": f"Error: Volcengine API failed - {e}",
-                    "total_usage": total_usage,
-                    "steps": step + 1
-                }
+                return self._result(task_id, archive, "error", f"Error: Volcengine API failed - {e}", step + 1,
+                                    total_usage, stats)
+
+            timings["model"] = (time.perf_counter() - started) * 1000
+            self._count_parse(response, parse_stats)
+
+            # 3b. Unparseable answer: re-ask with text only instead of spending a new screenshot
+            recorded = False
+            for _ in range(self.format_retries):
+                if response.get("action_parsed"):
+                    break
+                logger.warning(f"No structured action found, re-prompting without a screenshot. "
+                               f"Raw content: {response.get('raw_content', '')}")
+                usage = self._record_response(task_id, step, instruction, image_b64, response, observation, total_usage)
+                self._archive_step(archive, step=step, instruction=instruction, image_b64=image_b64,
+                                   observation=observation, raw_content=response.get("raw_content", ""),
+                                   usage=usage, action=None, timings=timings, hierarchy=hierarchy, result="unparsed")
+                recorded = True
+                started = time.perf_counter()
+                try:
+                    if self.on_model_delta is not None:
+                        response = self.client.ask_text(FORMAT_REMINDER, on_delta=self.on_model_delta)
+                    else:
+                        response = self.client.ask_text(FORMAT_REMINDER)
+                except Exception as e:
+                    logger.warning(f"Format re-prompt failed: {e}")
+                    break
+                recorded = False
+                instruction, image_b64, timings = FORMAT_REMINDER, None, {"model": (time.perf_counter() - started) * 1000}
+                parse_stats["reprompts"] += 1
+                self._count_parse(response, parse_stats)
+                parse_stats["recovered"] += bool(response.get("action_parsed"))
 
             # 4. Parse and Execute
             action_data = response.get("action_parsed")
             thought = response.get("thought")
             raw_content = response.get("raw_content", "")
-            usage = response.get("usage", {})
-            
-            # Update token stats
-            if usage:
-                total_usage["prompt_tokens"] += usage.get("prompt_tokens", 0)
-                total_usage["completion_tokens"] += usage.get("completion_tokens", 0)
-                total_usage["total_tokens"] += usage.get("total_tokens", 0)
-                logger.info(f"Token Usage (Step): {usage}")
-            
-            # Log step details
-            self.task_logger.log_step(
-                task_id=task_id,
-                step=step,
-                instruction=instruction,
-                image_b64=image_b64,
-                model_response=response,
-                usage=usage,
-                action=action_data
-            )
+            usage = response.get("usage", {}) if recorded else self._record_response(
+                task_id, step, instruction, image_b64, response, observation, total_usage)
             
             logger.info(f"Thought: {thought}")
+            if on_step is not None:
+                try:
+                    on_step({"step": step + 1, "max_steps": max_steps, "thought": thought, "action": action_data,
+                             "total_usage": dict(total_usage)})
+                except Exception as e:
+                    logger.warning(f"on_step callback failed: {e}")
+            step_record = dict(step=step, instruction=instruction, image_b64=image_b64, observation=observation,
+                               raw_content=raw_content, usage=usage, action=action_data, timings=timings,
+                               hierarchy=hierarchy)
+            prev_action_type, prev_ok, prev_uncertain = None, None, is_uncertain(thought)
             if not action_data:
                 logger.warning(f"No structured action found. Raw content: {raw_content}")
-                instruction = (
-                    "Error: I could not parse your previous output. "
-                    "Please provide the next step strictly in the format:\n"
-                    "Thought: ...\n"
-                    "Action: function(...)\n"
-                    "Example: Action: click(point='<point>500 500</point>')"
-                )
+                if not recorded:
+                    self._archive_step(archive, result="unparsed", **step_record)
+                instruction = FORMAT_ERROR
                 continue
 
             action_type = action_data.get("type")
             logger.info(f"Executing Action: {action_type} - {action_data}")
 
             result_msg = ""
+            success: Optional[bool] = None
+            verify = self.verify_actions and action_type in VERIFIED_ACTIONS and prev_fingerprint is not None
+            activity_before = self.controller.current_activity() if verify else ""
+            started = time.perf_counter()
             
             if action_type == "finished":
                 content = action_data.get("content", "")
                 logger.info(f"Task Finished: {content}")
-                self.task_logger.log_task_end(task_id, content, total_usage, step + 1)
-                return {
-                    "status": "completed",
-                    "result": content,
-                    "total_usage": total_usage,
-                    "steps": step + 1
-                }
+                self._archive_step(archive, result=content, **step_record)
+                return self._result(task_id, archive, "completed", content, step + 1, total_usage, stats)
             
             elif action_type == "click":
                 success = self._handle_click(action_data)
-                result_msg = "Click successful" if success else "Click failed"
+                result_msg = "Click successful" if success else self._click_failure(action_data, "Click failed")
                 
             elif action_type == "left_double":
                 # Double click
                 success = self._handle_click(action_data, double=True)
-                result_msg = "Double click successful" if success else "Double click failed"
+                result_msg = "Double click successful" if success else self._click_failure(action_data, "Double click failed")
 
             elif action_type == "right_single":
                 # Right click (usually long press or context menu on Android, but u2 has no right click)
                 # Map to normal click or long click? Prompt says "right_single".
                 # Let's map to normal click for now or ignore.
                 success = self._handle_click(action_data)
-                result_msg = "Right click (mapped to tap) successful" if success else "Right click failed"
+                result_msg = ("Right click (mapped to tap) successful" if success
+                              else self._click_failure(action_data, "Right click failed"))
 
             elif action_type == "long_press":
                 success = self._handle_long_press(action_data)
-                result_msg = "Long press successful" if success else "Long press failed"
+                result_msg = "Long press successful" if success else self._click_failure(action_data, "Long press failed")
 
             elif action_type == "type":
                 content = action_data.get("content", "")
@@ -160,6 +436,9 @@ class AutonomousAgent:
                 success = self._handle_scroll(action_data)
                 result_msg = "Scroll successful" if success else "Scroll failed"
                 
+            elif action_type == "scroll_until_found":
+                success, result_msg = self._handle_scroll_until_found(action_data)
+
             elif action_type == "drag":
                 success = self._handle_drag(action_data)
                 result_msg = "Drag successful" if success else "Drag failed"
@@ -169,9 +448,23 @@ class AutonomousAgent:
                 success = self.controller.press_key(key)
                 result_msg = f"Pressed key '{key}' successful" if success else "Key press failed"
                 
+            elif action_type == "zoom":
+                success, result_msg, close_up = self._handle_zoom(action_data, frame)
+                if close_up is not None:
+                    pending_observation = close_up
+
             elif action_type == "wait":
-                time.sleep(5)
-                result_msg = "Waited 5 seconds"
+                # Return as soon as the screen changes instead of always sleeping 5s
+                try:
+                    waited = self.controller.wait_for_change(timeout=5.0)
+                    if waited["changed"]:
+                        result_msg = f"Screen changed after {waited['elapsed_ms'] / 1000:.1f} seconds"
+                    else:
+                        result_msg = "Waited 5 seconds, the screen did not change"
+                except Exception as e:
+                    logger.warning(f"wait_for_change failed, sleeping instead: {e}")
+                    time.sleep(5)
+                    result_msg = "Waited 5 seconds"
                 
             elif action_type == "screenshot":
                 filename = action_data.get("filename")
@@ -181,53 +474,326 @@ class AutonomousAgent:
                     filename = f"{filename}.png"
                 
                 # Force save to screenshot_dir
+                os.makedirs(self.screenshot_dir, exist_ok=True)
                 save_path = os.path.join(self.screenshot_dir, os.path.basename(filename))
                 
                 try:
-                    self.controller.get_screenshot(save_path=save_path)
+                    # No input since the step's observation: save that frame instead of capturing again
+                    self.controller.save_screenshot(save_path, max_age=float("inf"))
                     result_msg = f"Screenshot saved to {save_path}"
-                    logger.info(result_msg)
                 except Exception as e:
                     logger.error(f"Failed to save screenshot: {e}")
                     result_msg = f"Failed to save screenshot: {e}"
+                    success = False
 
             else:
                 result_msg = f"Unknown action type: {action_type}"
+                success = False
                 logger.warning(result_msg)
 
+            timings["action"] = (time.perf_counter() - started) * 1000
+            if action_type in CLICK_ACTIONS:
+                click_stats["clicks"] += 1
+                click_stats["element_clicks"] += "element" in action_data
+                click_stats["failed_clicks"] += not success
+
+            # Short wait for UI to settle (random 0.1-1s by default); zoom does not touch the UI
+            if action_type != "zoom":
+                self._settle()
+
+            # 5. Verify what the action actually did on screen
+            if verify and success:
+                started = time.perf_counter()
+                try:
+                    result_msg, next_frame, effect, retried = self._verify_action(
+                        action_type, action_data, result_msg, prev_fingerprint, activity_before)
+                    logger.info(f"Effect of '{action_type}': {effect.to_dict()}")
+                    effect_stats["verified"] += 1
+                    effect_stats[effect.outcome] += 1
+                    effect_stats["retries"] += retried
+                    effect_stats["retry_recovered"] += retried and effect.outcome != NO_EFFECT
+                except Exception as e:
+                    logger.warning(f"Could not verify the effect of '{action_type}': {e}")
+                timings["verify"] = (time.perf_counter() - started) * 1000
+
+            prev_action_type, prev_ok = action_type, success
+            self._archive_step(archive, result=result_msg, **step_record)
+
             # Update instruction for next turn
             instruction = f"Action '{action_type}' executed. Result: {result_msg}. Continue to {goal}."
-            
-            # Short wait for UI to settle (random 0.1-1s)
-            sleep_time = random.uniform(0.1, 1.0)
+
+        result = f"Max steps reached without completion."
+        return self._result(task_id, archive, "failed", result, max_steps, total_usage, stats)
+
+    def _take_screenshot(self):
+        # Raw frame; it is encoded at the adaptive (scale, quality) in run()
+        return self.controller.capture_frame()
+
+    def _start_profile(self, task_id: str):
+        try:
+            self._profiler = TaskProfiler(task_id, log_dir=self.log_dir)
+            self._profiler.start()
+        except Exception as e:
+            logger.error(f"Failed to start profiling: {e}")
+            self._profiler = None
+
+    def _finish_profile(self) -> Optional[Dict[str, Any]]:
+        """Write the profile of the task that just ended and record it in the task log."""
+        profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return None
+        try:
+            summary = profiler.finish()
+        except Exception as e:
+            logger.error(f"Failed to write profile: {e}")
+            return None
+        logger.info(f"Profile written to {summary['dir']}")
+        self.task_logger.log_event(profiler.task_id, "profile", dir=summary["dir"],
+                                   top_cumulative=summary["top_cumulative"][:5],
+                                   memory_growth=summary.get("memory_growth", [])[:5])
+        return {"dir": summary["dir"], "wall_s": summary["wall_s"], "steps": summary["steps"]}
+
+    def _run_shortcut(self, task_id: str, goal: str) -> Optional[Tuple[str, str]]:
+        """
+        Start the intent of the first registered shortcut matching the goal.
+
+        Returns:
+            (what was opened, rest of the goal) if the target page is ready, else None.
+        """
+        try:
+            match = self.shortcut_registry.match(goal)
+        except Exception as e:
+            logger.warning(f"Shortcut registry unavailable, leaving the goal to the model: {e}")
+            return None
+        if match is None:
+            self.task_logger.log_event(task_id, "shortcut", hit=False)
+            return None
+        shortcut, params, rest = match
+        outcome = self.shortcut_registry.execute(self.controller, shortcut, params)
+        logger.info(f"Shortcut {shortcut.name}: {'ready' if outcome['ok'] else outcome.get('error')}")
+        self.task_logger.log_event(task_id, "shortcut", hit=True, params=params, **outcome)
+        return (shortcut.title, rest) if outcome["ok"] else None
+
+    def _open_app_locally(self, task_id: str, goal: str) -> Optional[Tuple[str, str]]:
+        """
+        Resolve "打开<app>..." / "open <app>..." against the installed-app index
+        and launch the app without the model.
+
+        Returns:
+            ("label (package)", rest of the goal) if the app is now in the foreground, else None.
+        """
+        if not OPEN_VERBS.match(goal):
+            return None
+        try:
+            match = self.app_index.match_goal(goal)
+        except Exception as e:
+            logger.warning(f"App index unavailable, leaving the goal to the model: {e}")
+            return None
+        if match is None:
+            self.task_logger.log_event(task_id, "app_open", hit=False)
+            return None
+        package, rest = match
+        label = self.app_index.label(package)
+        launched = self.controller.launch_app(package) and self.controller.wait_for_app(package)
+        logger.info(f"Opened {label} ({package}) locally" if launched else f"Could not open {label} ({package})")
+        self.task_logger.log_event(task_id, "app_open", hit=True, package=package, label=label, launched=launched)
+        return (f"{label} ({package})", rest) if launched else None
+
+    def _record_response(self, task_id: str, step: int, instruction: str, image_b64: Optional[str],
+                         response: Dict[str, Any], observation: Dict[str, Any],
+                         total_usage: Dict[str, int]) -> Dict[str, Any]:
+        """Add a model answer's token usage to the task totals and write it to the task log."""
+        usage = response.get("usage", {})
+        
+        # Update token stats
+        if usage:
+            total_usage["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            total_usage["completion_tokens"] += usage.get("completion_tokens", 0)
+            total_usage["total_tokens"] += usage.get("total_tokens", 0)
+            total_usage["cached_tokens"] += usage.get("cached_tokens", 0)
+            logger.info(f"Token Usage (Step): {usage}")
+        
+        # Log step details
+        self.task_logger.log_step(
+            task_id=task_id,
+            step=step,
+            instruction=instruction,
+            image_b64=image_b64,
+            model_response=response,
+            usage=usage,
+            action=response.get("action_parsed"),
+            observation=observation
+        )
+        return usage
+
+    @staticmethod
+    def _count_parse(response: Dict[str, Any], parse_stats: Dict[str, int]):
+        if not response.get("action_parsed"):
+            parse_stats["failures"] += 1
+        elif response.get("repaired"):
+            parse_stats["repaired"] += 1
+
+    def _settle(self):
+        sleep_time = random.uniform(*self.settle_delay)
+        if sleep_time > 0:
             logger.info(f"Sleeping for {sleep_time:.2f}s...")
             time.sleep(sleep_time)
 
-        result = f"Max steps reached without completion."
-        self.task_logger.log_task_end(task_id, result, total_usage, max_steps)
-        return {
-            "status": "failed",
-            "result": result,
-            "total_usage": total_usage,
-            "steps": max_steps
-        }
+    def _classify(self, before: Optional[bytes], frame, activity_before: str) -> Effect:
+        after = self._fingerprint(frame)
+        unchanged = not self._screen_changed(before, after)
+        # The activity only needs reading again if the screen changed at all
+        activity_after = activity_before if unchanged else self.controller.current_activity()
+        return classify_effect(before, after, activity_before, activity_after,
+                               change_threshold=self.resolution.change_threshold)
+
+    def _verify_action(self, action_type: str, action: Dict[str, Any], result_msg: str, before: Optional[bytes],
+                       activity_before: str) -> Tuple[str, Any, Effect, bool]:
+        """
+        Capture the screen after an action and classify its effect. A tap that
+        changed nothing and missed every interactive element is retried once on
+        the nearest one.
+
+        Returns:
+            (result message for the model, frame after the action, effect, whether it was retried)
+        """
+        frame = self._capture_observation()
+        effect = self._classify(before, frame, activity_before)
+        if effect.outcome != NO_EFFECT:
+            return f"{result_msg}, {effect.describe()}", frame, effect, False
+        message = f"{result_msg}, but {effect.describe()}"
+        if action_type not in RETRYABLE_ACTIONS or "element" in action:
+            return message, frame, effect, False
+
+        target = self._target(action)
+        if target is None:
+            return message, frame, effect, False
+        # Uncached: the retry invalidates it right away, and keying it would cost another screenshot
+        snapped = snap_target(self.controller.dump_hierarchy(cache=False), *target, screen_size=frame.size)
+        if snapped is None:
+            return message, frame, effect, False
+        (px, py), label = snapped
+        logger.info(f"'{action_type}' had no effect, retrying on the nearest element '{label}' at ({px}, {py})")
+        if action_type == "long_press":
+            ok = self.controller.long_press(px, py)
+        else:
+            ok = self._tap(px, py, double=action_type == "left_double")
+        if not ok:
+            return message, frame, effect, True
+        self._settle()
+        frame = self._capture_observation()
+        effect = self._classify(before, frame, activity_before)
+        nx, ny = self.controller.normalize_coordinates(px, py, scale=1000)
+        name = f" '{label}'" if label else ""
+        message += f"; retried on the nearest element{name} at <point>{nx} {ny}</point>: {effect.describe()}"
+        return message, frame, effect, True
+
+    def _configure_prompt(self):
+        """
+        Extend (or restore) the client's system prompt for the observation mode.
+        The client is only touched when the mode changes, and always gets the
+        same string for the same mode, so its prompt caches stay valid across runs.
+        """
+        base = getattr(type(self.client), "SYSTEM_PROMPT", None)
+        if not isinstance(base, str):
+            return
+        prompt = with_set_of_mark(base) if self.observation_mode == "som" else base
+        if self.client.SYSTEM_PROMPT is prompt:
+            return
+        if prompt is base:
+            del self.client.SYSTEM_PROMPT
+        else:
+            self.client.SYSTEM_PROMPT = prompt
+
+    def _annotate(self, frame) -> Tuple[Any, str]:
+        """
+        Frame to send to the model and its Set-of-Mark legend. In screenshot
+        mode (or if the hierarchy cannot be read) the raw frame is sent.
+        """
+        if self.observation_mode != "som":
+            return frame, ""
+        from android_phone.core.som import marks_legend
+
+        try:
+            annotated, marks = self.controller.annotate_frame(frame)
+        except Exception as e:
+            logger.warning(f"Set-of-Mark annotation failed, sending the plain screenshot: {e}")
+            self.controller.marks = {}
+            return frame, ""
+        logger.info(f"Set-of-Mark: {len(marks)} element(s) marked")
+        return annotated, marks_legend(marks)
+
+    def _screen_changed(self, prev_fingerprint: Optional[bytes], fingerprint: Optional[bytes]) -> bool:
+        if not prev_fingerprint or not fingerprint:
+            return True
+        return fingerprint_distance(prev_fingerprint, fingerprint) >= self.resolution.change_threshold
+
+    def _update_resolution(self, prev_action_type: Optional[str], prev_ok: Optional[bool], prev_uncertain: bool,
+                           prev_fingerprint: Optional[bytes], fingerprint: Optional[bytes]):
+        """Pick the observation resolution for this step from the previous step's outcome."""
+        screen_changed = None
+        if prev_action_type in CHANGING_ACTIONS and prev_fingerprint and fingerprint:
+            screen_changed = fingerprint_distance(prev_fingerprint, fingerprint) >= self.resolution.change_threshold
+        self.resolution.update(action_ok=prev_ok, screen_changed=screen_changed, uncertain=prev_uncertain)
+
+    @staticmethod
+    def _fingerprint(frame) -> Optional[bytes]:
+        try:
+            fingerprint = frame_fingerprint(frame)
+        except Exception as e:
+            logger.debug(f"Could not fingerprint frame: {e}")
+            return None
+        return fingerprint if isinstance(fingerprint, bytes) else None
+
+    def _capture_observation(self):
+        """
+        Capture the step's raw frame. If the device dropped and a health
+        monitor is attached, reconnect once instead of failing the task.
+        """
+        try:
+            return self._take_screenshot()
+        except Exception as e:
+            monitor = getattr(self.controller, "health", None)
+            if not isinstance(monitor, ConnectionMonitor):
+                raise
+            logger.warning(f"Screenshot failed ({e}), trying to recover the device connection...")
+            if not monitor.ensure_connected():
+                raise
+            return self._take_screenshot()
 
     def _denormalize(self, x: int, y: int) -> tuple[int, int]:
         return self.controller.denormalize_coordinates(x, y, scale=1000)
 
-    def _handle_click(self, action: Dict[str, Any], double: bool = False) -> bool:
+    def _target(self, action: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+        """Pixel target of a click-like action: a Set-of-Mark element's exact centre, else its point."""
+        if "element" in action:
+            return self.controller.resolve_mark(action["element"])
         x = action.get("x")
         y = action.get("y")
         if x is None or y is None:
+            return None
+        return self._denormalize(x, y)
+
+    def _click_failure(self, action: Dict[str, Any], message: str) -> str:
+        if "element" in action and self.controller.resolve_mark(action["element"]) is None:
+            return f"{message}: element {action['element']} is not marked on the current screen"
+        return message
+
+    def _handle_click(self, action: Dict[str, Any], double: bool = False) -> bool:
+        target = self._target(action)
+        if target is None:
             return False
         
-        px, py = self._denormalize(x, y)
+        return self._tap(*target, double=double)
+
+    def _tap(self, px: int, py: int, double: bool = False) -> bool:
         if double:
             # u2 doesn't have explicit double click on coords in basic wrapper, 
             # but we can do click twice.
             # self.controller.device.double_click(x, y) if exposed.
             # AndroidController wraps device.
             try:
+                self.controller.invalidate_screen()
                 self.controller.device.double_click(px, py)
                 return True
             except:
@@ -272,6 +838,39 @@ class AutonomousAgent:
             
         return self.controller.swipe(start_x, start_y, end_x, end_y)
 
+    def _handle_scroll_until_found(self, action: Dict[str, Any]) -> Tuple[bool, str]:
+        """Scroll locally (hierarchy checks only, no model calls) until the content is visible."""
+        content = action.get("content", "")
+        if not content:
+            return False, "scroll_until_found failed: no content given"
+        result = self.controller.scroll_until_found(query=content, direction=action.get("direction", "down"))
+        if not result.get("found"):
+            return False, f"'{content}' not found after {result.get('swipes', 0)} swipe(s) ({result.get('reason')})"
+        nx, ny = self.controller.normalize_coordinates(*result["center"], scale=1000)
+        return True, f"Found '{content}' after {result['swipes']} swipe(s) at <point>{nx} {ny}</point>"
+
+    def _handle_zoom(self, action: Dict[str, Any], frame) -> Tuple[bool, str, Optional[Tuple[str, Dict[str, Any]]]]:
+        """Crop the step's full-resolution frame around the point; the crop becomes the next observation."""
+        x, y = action.get("x"), action.get("y")
+        if x is None or y is None or frame is None:
+            return False, "Zoom failed: no point given", None
+        width = min(max(action.get("width") or 300, 20), 1000)
+        height = min(max(action.get("height") or 200, 20), 1000)
+        try:
+            frame_w, frame_h = frame.size
+            image_b64, box = self.controller.zoom(
+                x * frame_w // 1000, y * frame_h // 1000, width * frame_w // 1000, height * frame_h // 1000,
+                quality=ZOOM_QUALITY, max_size=self.max_image_size, frame=frame)
+        except Exception as e:
+            logger.error(f"Zoom failed: {e}")
+            return False, f"Zoom failed: {e}", None
+        region = [box[0] * 1000 // frame_w, box[1] * 1000 // frame_h, box[2] * 1000 // frame_w, box[3] * 1000 // frame_h]
+        observation = {"scale": 1.0, "quality": ZOOM_QUALITY, "zoom": region, "reason": "zoom",
+                       "bytes": len(image_b64) * 3 // 4 - image_b64.count("=", -2)}
+        message = (f"The next image is a full-resolution close-up of the screen region {region} (x1 y1 x2 y2). "
+                   f"It is for reading only; keep using full-screen coordinates for actions")
+        return True, message, (image_b64, observation)
+
     def _handle_drag(self, action: Dict[str, Any]) -> bool:
         start_x = action.get("start_x")
         start_y = action.get("start_y")
@@ -288,9 +887,7 @@ class AutonomousAgent:
 
     def _handle_long_press(self, action: Dict[str, Any]) -> bool:
         """Handle long_press action."""
-        x = action.get("x")
-        y = action.get("y")
-        if x is None or y is None:
+        target = self._target(action)
+        if target is None:
             return False
-        px, py = self._denormalize(x, y)
-        return self.controller.long_press(px, py)
+        return self.controller.long_press(*target)
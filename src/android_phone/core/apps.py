@@ -0,0 +1,335 @@
+"""
+Installed-app index.
+
+Maps the human-readable names of installed apps (labels, CJK names, English
+names, pinyin) to package names, so that "打开微信" / "open WeChat" can be
+resolved and launched locally, before any model call. The index is persisted
+per device and built off the critical path: ``start_refresh()`` lists the
+packages and looks up labels on a background thread (only for new packages
+and for labels that failed before), and lookups never wait for it. Until the
+first refresh, lookups fall back to the built-in labels, the aliases file and
+package names.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Labels of common apps, used when the device cannot report a label and as extra aliases
+BUILTIN_LABELS: Dict[str, List[str]] = {
+    "com.tencent.mm": ["微信", "WeChat"],
+    "com.tencent.mobileqq": ["QQ"],
+    "com.tencent.wework": ["企业微信", "WeCom"],
+    "com.tencent.qqmusic": ["QQ音乐"],
+    "com.tencent.mtt": ["QQ浏览器"],
+    "com.eg.android.AlipayGphone": ["支付宝", "Alipay"],
+    "com.taobao.taobao": ["淘宝", "Taobao"],
+    "com.jingdong.app.mall": ["京东", "JD"],
+    "com.xunmeng.pinduoduo": ["拼多多"],
+    "com.sankuai.meituan": ["美团"],
+    "com.ss.android.ugc.aweme": ["抖音", "Douyin"],
+    "com.smile.gifmaker": ["快手"],
+    "com.ss.android.article.news": ["今日头条"],
+    "com.sina.weibo": ["微博", "Weibo"],
+    "com.xingin.xhs": ["小红书"],
+    "com.zhihu.android": ["知乎", "Zhihu"],
+    "tv.danmaku.bili": ["哔哩哔哩", "B站", "bilibili"],
+    "com.netease.cloudmusic": ["网易云音乐"],
+    "com.autonavi.minimap": ["高德地图"],
+    "com.baidu.BaiduMap": ["百度地图"],
+    "com.alibaba.android.rimet": ["钉钉", "DingTalk"],
+    "com.tdx.AndroidNew": ["通达信"],
+    "ctrip.android.view": ["携程"],
+    "com.android.settings": ["设置", "Settings"],
+    "com.android.chrome": ["Chrome"],
+    "com.google.android.youtube": ["YouTube"],
+}
+
+# "打开微信..." / "open WeChat ..." (leading politeness and the verb are dropped)
+OPEN_VERBS = re.compile(r"^\s*(?:请|麻烦)?(?:帮我|给我)?(?:打开|启动|开启|进入|open|launch|start)\s*", re.IGNORECASE)
+# Words that may follow the app name ("打开微信app", "open WeChat app")
+APP_SUFFIX = re.compile(r"^\s*(?:app|应用|软件|客户端)", re.IGNORECASE)
+# Separators between the app name and the rest of the goal
+LEADING_SEPARATORS = re.compile(r"^[\s,，.。;；:：、!！]*(?:然后|并且|并|再|and then|and|then)?[\s,，.。;；:：、]*",
+                                re.IGNORECASE)
+
+DEFAULT_TTL = 600.0
+# Least seconds between the refreshes a lookup miss triggers
+MISS_REFRESH_INTERVAL = 30.0
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case, without whitespace and punctuation (so "QQ 音乐" == "qq音乐")."""
+    return re.sub(r"[\s\-_·.,，。'\"()（）]+", "", name).lower()
+
+
+def pinyin_aliases(label: str) -> List[str]:
+    """Full pinyin and initials of a CJK label ("微信" -> "weixin", "wx"); needs the optional pypinyin."""
+    if not re.search(r"[一-鿿]", label):
+        return []
+    try:
+        from pypinyin import lazy_pinyin
+    except ImportError:
+        return []
+    syllables = [s for s in lazy_pinyin(label) if s.strip()]
+    full = normalize_name("".join(syllables))
+    initials = normalize_name("".join(s[0] for s in syllables))
+    return [a for a in dict.fromkeys([full, initials]) if len(a) > 1]
+
+
+def _parse_packages(output: str) -> List[str]:
+    return [line.replace("package:", "").strip() for line in output.splitlines() if line.strip()]
+
+
+class AppIndex:
+    """
+    Installed packages with their labels and aliases, persisted per device.
+
+    Args:
+        controller: Device controller.
+        path: JSON cache file (default ``<log_dir>/apps/<serial>.json``).
+        log_dir: Directory for the default cache path.
+        aliases_file: Extra ``{package: [alias, ...]}`` JSON (env ``ANDROID_AGENT_APP_ALIASES``).
+        ttl: Seconds before the installed package list is checked again.
+    """
+
+    def __init__(self, controller, path: Optional[str] = None, log_dir: str = ".log",
+                 aliases_file: Optional[str] = None, ttl: float = DEFAULT_TTL):
+        self.controller = controller
+        if path is None:
+            serial = getattr(controller, "serial", None) or "default"
+            path = os.path.join(log_dir, "apps", f"{re.sub(r'[^A-Za-z0-9_.-]', '_', serial)}.json")
+        self.path = Path(path)
+        self.aliases_file = aliases_file or os.environ.get("ANDROID_AGENT_APP_ALIASES")
+        self.ttl = ttl
+        # package -> {"label": str, "aliases": [normalized names], "labelled": label lookup succeeded}.
+        # Entries are replaced, never mutated, so a copy of the dict is a consistent snapshot.
+        self.apps: Dict[str, Dict[str, object]] = {}
+        self._checked_at = 0.0
+        self._refreshed = False
+        # Guards self.apps and the timestamps; _refresh_lock serializes the (slow) refreshes
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._load()
+
+    # --- persistence ---
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.apps = data.get("apps", {})
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable app index {self.path}: {e}")
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with self._lock:
+                apps = dict(self.apps)
+            tmp.write_text(json.dumps({"updated_at": time.time(), "apps": apps}, ensure_ascii=False, indent=1),
+                           encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception as e:
+            logger.warning(f"Could not save app index {self.path}: {e}")
+
+    def _extra_aliases(self) -> Dict[str, List[str]]:
+        if not self.aliases_file:
+            return {}
+        try:
+            with open(self.aliases_file, encoding="utf-8") as f:
+                return {pkg: list(names) for pkg, names in json.load(f).items()}
+        except Exception as e:
+            logger.warning(f"Could not read app aliases {self.aliases_file}: {e}")
+            return {}
+
+    # --- refresh ---
+
+    def _installed(self) -> List[str]:
+        """Third-party packages plus the installed system apps that have a built-in label."""
+        device = self.controller.device
+        packages = _parse_packages(device.shell("pm list packages -3").output)
+        everything = set(_parse_packages(device.shell("pm list packages").output))
+        return packages + [p for p in BUILTIN_LABELS if p in everything and p not in packages]
+
+    @staticmethod
+    def _entry(package: str, labels: Optional[List[str]], extra: Dict[str, List[str]]) -> Dict[str, object]:
+        """Index entry from the looked-up labels (None: lookup failed or not done yet)."""
+        names = (labels or []) + BUILTIN_LABELS.get(package, []) + extra.get(package, [])
+        label = next(iter(labels or []), "") or next(iter(BUILTIN_LABELS.get(package, [])), "") \
+            or package.rsplit(".", 1)[-1]
+        aliases = [normalize_name(n) for n in names if n]
+        for name in names:
+            aliases += pinyin_aliases(name) if name else []
+        return {"label": label, "aliases": [a for a in dict.fromkeys(aliases) if a], "labelled": labels is not None}
+
+    def sync_packages(self) -> Dict[str, int]:
+        """
+        Sync the index with the installed package list (two shell calls, no
+        label lookups). New packages get entries from the built-in labels,
+        the aliases file and their package name until refresh() labels them.
+
+        Returns:
+            Counts of added and removed packages.
+        """
+        installed = self._installed()
+        extra = self._extra_aliases()
+        with self._lock:
+            added = [p for p in installed if p not in self.apps]
+            removed = [p for p in self.apps if p not in set(installed)]
+            for package in removed:
+                del self.apps[package]
+            for package in added:
+                self.apps[package] = self._entry(package, None, extra)
+            self._checked_at = time.monotonic()
+        if added or removed:
+            logger.info(f"App index: +{len(added)} -{len(removed)} packages ({len(self.apps)} total)")
+        return {"added": len(added), "removed": len(removed)}
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """
+        Sync the package list and look up the labels of new packages and of
+        packages whose lookup failed before. Slow (a few shell calls per
+        package): run it through start_refresh() on the critical path.
+
+        Returns:
+            Counts of added, removed and labelled packages.
+        """
+        with self._refresh_lock:
+            if not force and self._refreshed and time.monotonic() - self._checked_at < self.ttl:
+                return {"added": 0, "removed": 0, "labelled": 0}
+            counts = self.sync_packages()
+            extra = self._extra_aliases()
+            with self._lock:
+                pending = [p for p, entry in self.apps.items() if not entry.get("labelled")]
+            labelled = 0
+            for package in pending:
+                labels = self.controller.app_labels(package)
+                if labels is None:
+                    continue
+                with self._lock:
+                    if package in self.apps:
+                        self.apps[package] = self._entry(package, labels, extra)
+                        labelled += 1
+            self._refreshed = True
+            if counts["added"] or counts["removed"] or labelled:
+                self._save()
+            return {**counts, "labelled": labelled}
+
+    def start_refresh(self, force: bool = False) -> bool:
+        """
+        Refresh on a background thread unless one is already running.
+
+        Returns:
+            True if a refresh was started.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            if not force and self._refreshed and time.monotonic() - self._checked_at < self.ttl:
+                return False
+            self._thread = threading.Thread(target=self._refresh_quietly, args=(force,), name="app-index",
+                                            daemon=True)
+            self._thread.start()
+            return True
+
+    def _refresh_quietly(self, force: bool):
+        try:
+            self.refresh(force=force)
+        except Exception as e:
+            logger.warning(f"App index refresh failed: {e}")
+
+    # --- lookup ---
+
+    def _table(self) -> Tuple[Dict[str, Dict[str, object]], bool]:
+        """
+        Entries to match against and whether they are known to be installed.
+        Starts a background refresh when the index is stale; never waits for it.
+        """
+        self.start_refresh()
+        with self._lock:
+            apps = dict(self.apps)
+        if apps:
+            return apps, True
+        # Cold index: built-in labels and the aliases file, installation checked per match
+        extra = self._extra_aliases()
+        return {package: self._entry(package, None, extra) for package in {**BUILTIN_LABELS, **extra}}, False
+
+    def _is_installed(self, package: str) -> bool:
+        """One ``pm path`` call, for matches made before the package list is known."""
+        try:
+            return "package:" in self.controller.device.shell(f"pm path {package}").output
+        except Exception as e:
+            logger.debug(f"pm path {package} failed: {e}")
+            return False
+
+    def _on_miss(self):
+        # A newly installed app: list the packages again, at most every MISS_REFRESH_INTERVAL
+        with self._lock:
+            recent = time.monotonic() - self._checked_at < MISS_REFRESH_INTERVAL
+        if not recent:
+            self.start_refresh(force=True)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Package whose label or alias is ``name``, or a package name itself."""
+        apps, installed = self._table()
+        key = normalize_name(name)
+        if name in apps and (installed or self._is_installed(name)):
+            return name
+        for package, entry in apps.items():
+            if key in entry["aliases"] and (installed or self._is_installed(package)):
+                return package
+        self._on_miss()
+        if "." in name and name not in apps and self._is_installed(name):
+            return name
+        return None
+
+    def label(self, package: str) -> str:
+        with self._lock:
+            entry = self.apps.get(package)
+        if entry is None and package in BUILTIN_LABELS:
+            return BUILTIN_LABELS[package][0]
+        return entry["label"] if entry else package
+
+    def match_goal(self, goal: str) -> Optional[Tuple[str, str]]:
+        """
+        Resolve a goal that starts with opening an app ("打开微信给妈妈发消息").
+
+        Returns:
+            (package, rest of the goal after the app name), or None.
+        """
+        verb = OPEN_VERBS.match(goal)
+        if not verb:
+            return None
+        rest = goal[verb.end():]
+        apps, installed = self._table()
+        # Match on the normalized text, then map the match length back onto the original
+        positions = [i for i, ch in enumerate(rest) if normalize_name(ch)]
+        text = "".join(normalize_name(rest[i]) for i in positions)
+        candidates = [(len(alias), package, alias)
+                      for package, entry in apps.items()
+                      for alias in entry["aliases"] if text.startswith(alias)]
+        for length, package, alias in sorted(candidates, reverse=True):
+            consumed = positions[length - 1] + 1
+            # An ASCII alias must end on a word boundary ("qq" does not match "qqmail")
+            following = rest[consumed:consumed + 1]
+            if alias.isascii() and following.isascii() and following.isalnum():
+                continue
+            if installed or self._is_installed(package):
+                break
+        else:
+            self._on_miss()
+            return None
+        remainder = APP_SUFFIX.sub("", rest[consumed:], count=1)
+        remainder = LEADING_SEPARATORS.sub("", remainder, count=1).strip()
+        return package, remainder
@@ -1,13 +1,90 @@
 import base64
 import io
 import logging
+import os
+import re
+import shlex
+import threading
+import time
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import Optional, Tuple, Dict, Any, List
-import uiautomator2 as u2
-from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# Thumbnail used to key the hierarchy cache: fine enough (8x8 px cells on a
+# 1080x2400 screen) that a changed digit or toggle alters it, cheap to compute
+HIERARCHY_KEY_SIZE = (135, 300)
+
+# Seconds a captured frame may be reused by latest_frame() when no input happened since
+FRAME_MAX_AGE = 1.0
+# Encoded renditions (size / format / quality) kept for the last frame
+RENDITION_CACHE_SIZE = 8
+
+
+class InputBatch:
+    """Result holder for ``AndroidController.batch_input()``."""
+
+    def __init__(self):
+        self.commands: List[str] = []
+        self.ok = True
+        self.error: Optional[str] = None
+        self.failed_command: Optional[str] = None
+
+
+def coalesce_shell_commands(commands: List[str]) -> List[str]:
+    """
+    Merge consecutive ``input keyevent`` commands into one invocation with
+    several key codes (``input keyevent 4 4 66``). Order is preserved.
+    """
+    merged: List[str] = []
+    for cmd in commands:
+        if merged and cmd.startswith("input keyevent ") and merged[-1].startswith("input keyevent "):
+            merged[-1] = f"{merged[-1]} {cmd[len('input keyevent '):]}"
+        else:
+            merged.append(cmd)
+    return merged
+
+
+# "application-label:'WeChat'" / "application-label-zh-CN:'微信'" in ``aapt dump badging`` output
+BADGING_LABEL = re.compile(r"^application-label(?:-([\w-]+))?:'(.*)'$", re.MULTILINE)
+
+
+# aapt binaries tried on the device for app labels (``ANDROID_AGENT_DEVICE_AAPT`` first):
+# a static build pushed to /data/local/tmp, or one shipped with the ROM
+DEVICE_AAPT_CANDIDATES = ("/data/local/tmp/aapt", "/data/local/tmp/aapt-arm-pie", "/data/local/tmp/aapt2",
+                          "aapt", "aapt2")
+# "nonLocalizedLabel=Notes" in ``dumpsys package`` (apps with a literal label in the manifest)
+DUMPSYS_LABEL = re.compile(r"nonLocalizedLabel=(.+?)\s*$", re.MULTILINE)
+
+
+def parse_badging_labels(output: str, locale: Optional[str] = None) -> List[str]:
+    """
+    Application labels from ``aapt dump badging`` output, best match first.
+
+    Args:
+        output: Badging output.
+        locale: Device locale ("zh-CN"); its label, then its language's, come first.
+    """
+    labels: Dict[str, str] = {}
+    for config, label in BADGING_LABEL.findall(output):
+        if label:
+            labels.setdefault(config or "", label)
+    preferred = []
+    if locale:
+        preferred += [locale, locale.split("-", 1)[0]]
+    preferred.append("")
+    ordered = [labels[c] for c in preferred if c in labels] + list(labels.values())
+    return list(dict.fromkeys(ordered))
+
+
+def _exit_code(result) -> int:
+    """Exit code of a u2 ``ShellResponse`` (0 if the backend does not report one)."""
+    code = getattr(result, "exit_code", 0)
+    return code if isinstance(code, int) else 0
+
+
 class AndroidController:
     """
     Android Device Controller wrapping uiautomator2.
@@ -17,6 +94,30 @@ class AndroidController:
     def __init__(self, serial: Optional[str] = None):
         self.serial = serial
         self._device = None
+        self.health = None  # Optional ConnectionMonitor, see start_health_monitor()
+        # Shell input events queued while inside batch_input(), per thread (see _input_state())
+        self._input_local = threading.local()
+        # Worker threads for concurrent observation RPCs, see capture_screen_state()
+        self._capture_pool = None
+        # Last hierarchy dump as ((frame key, foreground activity), xml); cleared by every action
+        self._hierarchy_cache: Optional[Tuple[Tuple[bytes, str], str]] = None
+        self.hierarchy_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        # Set-of-Mark elements of the last annotated observation, by number
+        self.marks: Dict[int, Any] = {}
+        # Device locale for app labels, see app_labels() ("" once looked up and unknown)
+        self._locale: Optional[str] = None
+        # aapt binary on the device, see app_labels() ("" once probed and missing)
+        self._aapt: Optional[str] = None
+        # Last captured frame as (image, monotonic / epoch time the capture started); cleared by every action
+        self.frame_max_age = float(os.environ.get("ANDROID_FRAME_MAX_AGE", FRAME_MAX_AGE))
+        self._last_frame: Optional[Tuple[Any, float, float]] = None
+        # Bumped by every action, so a capture that was in flight during one is not kept
+        self._frame_generation = 0
+        self._frame_lock = threading.Lock()
+        # Base64 renditions of the last frame by (size, format, quality), least recently used first
+        self._renditions: "OrderedDict[Tuple[Tuple[int, int], str, int], str]" = OrderedDict()
+        self.frame_stats = {"captures": 0, "reuses": 0, "rendition_hits": 0, "rendition_misses": 0,
+                            "invalidations": 0}
         
     @property
     def device(self):
@@ -27,6 +128,10 @@ class AndroidController:
 
     def connect(self) -> bool:
         """Connect to the Android device."""
+        # Imported lazily: uiautomator2 pulls in adbutils/requests/lxml and
+        # is not needed for CLI help or the MCP handshake.
+        import uiautomator2 as u2
+
         try:
             logger.info(f"Connecting to device {self.serial if self.serial else '(default)'}...")
             self._device = u2.connect(self.serial)
@@ -36,6 +141,64 @@ class AndroidController:
             logger.error(f"Connection failed: {e}")
             raise ConnectionError(f"Failed to connect to Android device: {e}")
 
+    def reconnect(self) -> bool:
+        """Drop the current connection and connect again."""
+        self._device = None
+        return self.connect()
+
+    def ping(self) -> bool:
+        """
+        Cheap health check. Goes through the on-device uiautomator service,
+        so it fails both when the USB/ADB link and when the service drops.
+        """
+        if self._device is None:
+            return False
+        try:
+            self._device.info
+            return True
+        except Exception as e:
+            logger.warning(f"Ping failed: {e}")
+            return False
+
+    def warm_up(self) -> Dict[str, float]:
+        """
+        Prime the uiautomator service, the screenshot path and the screen
+        geometry right after connecting, so that the first real step is not
+        slow. Returns per-stage durations in milliseconds.
+        """
+        timings = {}
+        stages = [
+            ("info", lambda: self.device.info),
+            ("window_size", lambda: self.device.window_size()),
+            ("screenshot", lambda: self.device.screenshot(format='pillow')),
+            ("dump_hierarchy", lambda: self.device.dump_hierarchy(compressed=True)),
+        ]
+        for name, stage in stages:
+            started = time.perf_counter()
+            try:
+                stage()
+            except Exception as e:
+                logger.warning(f"Warm-up stage '{name}' failed: {e}")
+            timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Device warm-up finished: {timings}")
+        return timings
+
+    def start_health_monitor(self, **kwargs):
+        """
+        Start (or return the running) background connection monitor.
+        Keyword arguments are passed to ``ConnectionMonitor``.
+        """
+        from android_phone.core.health import ConnectionMonitor
+
+        if self.health is None:
+            self.health = ConnectionMonitor(self, **kwargs)
+        return self.health.start()
+
+    def stop_health_monitor(self):
+        if self.health is not None:
+            self.health.stop()
+            self.health = None
+
     def get_info(self) -> Dict[str, Any]:
         """Get device information."""
         return self.device.info
@@ -58,7 +221,8 @@ class AndroidController:
         y = int((norm_y / scale) * h)
         return (x, y)
 
-    def get_screenshot(self, quality: int = 70, max_size: Tuple[int, int] = (1080, 1920), scale: float = 1.0, save_path: str = None) -> str:
+    def get_screenshot(self, quality: int = 70, max_size: Tuple[int, int] = (1080, 1920), scale: float = 1.0,
+                       save_path: str = None, max_age: float = 0.0) -> str:
         """
         Capture screenshot and return as base64 string.
         
@@ -67,6 +231,8 @@ class AndroidController:
             max_size: Max (width, height) to resize to. Preserves aspect ratio.
             scale: Scaling factor (0.1 to 1.0). Applied BEFORE max_size constraint.
             save_path: If provided, save the screenshot to this path (PNG or JPEG).
+            max_age: Reuse the last frame if it is at most this many seconds old
+                and no action happened since (0: always capture).
         """
         try:
             # uiautomator2 returns PIL Image by default with format='pillow'
@@ -78,33 +244,418 @@ class AndroidController:
             
             # Temporary file approach is safest across versions, but slow.
             # Let's try in-memory.
-            image = self.device.screenshot(format='pillow')
+            image = self.latest_frame(max_age)
             
             # Save original if requested
             if save_path:
                 image.save(save_path)
                 logger.info(f"Screenshot saved to {save_path}")
             
-            # Apply scale first if needed
-            if scale < 1.0 and scale > 0:
-                new_w = int(image.size[0] * scale)
-                new_h = int(image.size[1] * scale)
-                image.thumbnail((new_w, new_h), Image.Resampling.LANCZOS)
-
-            # Resize if needed
-            if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-                image.thumbnail(max_size, Image.Resampling.LANCZOS)
-                
-            # Convert to JPEG bytes
-            buffer = io.BytesIO()
-            image.save(buffer, format="JPEG", quality=quality)
-            image_bytes = buffer.getvalue()
-            
-            return base64.b64encode(image_bytes).decode('utf-8')
+            return self.encode_frame(image, quality=quality, max_size=max_size, scale=scale)
         except Exception as e:
             logger.error(f"Screenshot failed: {e}")
             raise RuntimeError(f"Failed to capture screenshot: {e}")
 
+    def encode_frame(self, image, quality: int = 70, max_size: Tuple[int, int] = (1080, 1920), scale: float = 1.0) -> str:
+        """
+        Downscale a captured frame and encode it as base64 JPEG. The input
+        image is left untouched, so one frame can be encoded several ways.
+        
+        Args:
+            image: PIL image from capture_frame().
+            quality: JPEG quality (1-100).
+            max_size: Max (width, height) to resize to. Preserves aspect ratio.
+            scale: Scaling factor (0.1 to 1.0). Applied BEFORE max_size constraint.
+        """
+        from PIL import Image
+
+        w, h = image.size
+        ratio = scale if 0 < scale < 1.0 else 1.0
+        ratio = min(ratio, max_size[0] / w, max_size[1] / h)
+        size = (max(1, round(w * ratio)), max(1, round(h * ratio))) if ratio < 1.0 else (w, h)
+
+        # Renditions of the last captured frame are cached (several scales / qualities of one frame)
+        original = image
+        last = self._last_frame
+        key = (size, "JPEG", quality)
+        if last is not None and last[0] is original:
+            with self._frame_lock:
+                cached = self._renditions.get(key)
+                if cached is not None:
+                    self._renditions.move_to_end(key)
+                    self.frame_stats["rendition_hits"] += 1
+                    return cached
+                self.frame_stats["rendition_misses"] += 1
+
+        if size != (w, h):
+            image = image.resize(size, Image.Resampling.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality)
+        encoded = base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+        with self._frame_lock:
+            if self._last_frame is not None and self._last_frame[0] is original:
+                self._renditions[key] = encoded
+                if len(self._renditions) > RENDITION_CACHE_SIZE:
+                    self._renditions.popitem(last=False)
+        return encoded
+
+    def zoom(self, x: int, y: int, width: int, height: int, quality: int = 85,
+             max_size: Tuple[int, int] = (1080, 1920), frame=None) -> Tuple[str, Tuple[int, int, int, int]]:
+        """
+        Full-resolution close-up of a screen region, so small text can be read
+        without raising the resolution of every observation.
+        
+        Args:
+            x: Region centre X in pixels.
+            y: Region centre Y in pixels.
+            width: Region width in pixels (clamped to the frame).
+            height: Region height in pixels (clamped to the frame).
+            quality: JPEG quality of the crop.
+            max_size: Upper bound for the encoded crop (only hit by very large regions).
+            frame: PIL frame to crop; captures the current screen if omitted.
+        
+        Returns:
+            (base64 JPEG of the crop, pixel box (x1, y1, x2, y2))
+        """
+        if frame is None:
+            frame = self.capture_frame()
+        frame_w, frame_h = frame.size
+        width = max(1, min(int(width), frame_w))
+        height = max(1, min(int(height), frame_h))
+        # Keep the whole box on screen by shifting it rather than shrinking it
+        x1 = min(max(0, int(x) - width // 2), frame_w - width)
+        y1 = min(max(0, int(y) - height // 2), frame_h - height)
+        box = (x1, y1, x1 + width, y1 + height)
+        return self.encode_frame(frame.crop(box), quality=quality, max_size=max_size), box
+
+    def capture_screen_state(self, include_hierarchy: bool = False, compact: bool = True, scale: float = 1.0,
+                             quality: int = 70, max_size: Tuple[int, int] = (1080, 1920),
+                             max_age: float = 0.0) -> Dict[str, Any]:
+        """
+        Screenshot, device info and (optionally) the UI hierarchy of the same moment.
+
+        The info and hierarchy RPCs run on worker threads while the screenshot
+        is taken and encoded here, so the slow hierarchy dump overlaps the
+        rest instead of following it. uiautomator2 serves each RPC as an
+        independent HTTP request, so concurrent observation calls are safe.
+
+        Args:
+            include_hierarchy: Also dump the UI hierarchy.
+            compact: Simplify the hierarchy (see get_compact_ui_hierarchy).
+            scale: Screenshot scaling factor.
+            quality: JPEG quality.
+            max_size: Max (width, height) of the encoded screenshot.
+            max_age: Reuse the last frame if it is at most this many seconds old
+                and no action happened since (0: always capture).
+
+        Returns:
+            ``image``, ``info``, ``xml`` (if requested), ``capture_timestamp``
+            (epoch seconds when the screenshot was started, together with the
+            other captures; earlier for a reused frame) and ``capture_ms``.
+        """
+        pool = self._pool()
+        device = self.device
+        started = time.perf_counter()
+        captured_at = time.time()
+        info_future = pool.submit(lambda: device.info)
+        xml_future = activity_future = None
+        cached = self._hierarchy_cache
+        if include_hierarchy:
+            activity_future = pool.submit(self.current_activity)
+            if cached is None:
+                # Nothing to reuse: start the slow dump right away
+                xml_future = pool.submit(device.dump_hierarchy, compressed=True)
+        recent = self._recent_frame(max_age)
+        if recent is not None:
+            frame = recent[0]
+        else:
+            try:
+                frame = self.capture_frame()
+            except Exception as e:
+                logger.error(f"Screenshot failed: {e}")
+                raise RuntimeError(f"Failed to capture screenshot: {e}")
+            recent = self._last_frame
+        if recent is not None and recent[0] is frame:
+            captured_at = recent[2]
+
+        key = None
+        if include_hierarchy:
+            key = self._screen_key(frame, activity_future.result())
+            if cached is not None and cached[0] != key:
+                # Screen changed since the cached dump: fetch while the frame is encoded
+                xml_future = pool.submit(device.dump_hierarchy, compressed=True)
+        image_b64 = self.encode_frame(frame, quality=quality, max_size=max_size, scale=scale)
+
+        result = {"image": image_b64, "info": info_future.result(), "capture_timestamp": round(captured_at, 3)}
+        if include_hierarchy:
+            if xml_future is None:
+                self.hierarchy_stats["hits"] += 1
+                raw_xml = cached[1]
+            else:
+                try:
+                    raw_xml = xml_future.result()
+                except Exception as e:
+                    logger.error(f"Dump hierarchy failed: {e}")
+                    raise RuntimeError(f"Failed to get UI hierarchy: {e}")
+                self.hierarchy_stats["misses"] += 1
+                self._hierarchy_cache = (key, raw_xml)
+            result["xml"] = self.compact_hierarchy(raw_xml) if compact else raw_xml
+        result["capture_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def _pool(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        if self._capture_pool is None:
+            self._capture_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="capture")
+        return self._capture_pool
+
+    # --- Hierarchy cache ---
+
+    def current_activity(self) -> str:
+        """Foreground "package/activity", or "" if it cannot be read."""
+        try:
+            current = self.device.app_current()
+            return f"{current.get('package')}/{current.get('activity')}"
+        except Exception as e:
+            logger.debug(f"app_current failed: {e}")
+            return ""
+
+    def _screen_key(self, frame, activity: str) -> Tuple[bytes, str]:
+        from android_phone.core.fingerprint import frame_fingerprint
+
+        return frame_fingerprint(frame, size=HIERARCHY_KEY_SIZE), activity
+
+    def dump_hierarchy(self, cache: bool = True, max_age: Optional[float] = None) -> str:
+        """
+        Raw (compressed) hierarchy XML shared by every hierarchy reader.
+
+        The last dump is reused while the screen fingerprint and the
+        foreground activity are unchanged. The fingerprint is taken from the
+        last frame when it is at most ``max_age`` seconds old (see
+        latest_frame), so a hit costs one app_current RPC; with an older frame
+        it costs a screenshot plus app_current, and that capture becomes the
+        last frame. Any action clears the cache, and the next read dumps right
+        away, computing the key alongside.
+
+        Args:
+            cache: False skips the cache (and its key screenshot) for callers
+                that read once after every action anyway.
+            max_age: Oldest last frame the key may use (default ``frame_max_age``);
+                0 always captures, for callers polling a screen that changes by itself.
+        """
+        if not cache:
+            return self.device.dump_hierarchy(compressed=True)
+        cached = self._hierarchy_cache
+        pool = self._pool()
+        if cached is not None:
+            activity = pool.submit(self.current_activity)
+            key = self._screen_key(self.latest_frame(max_age), activity.result())
+            if key == cached[0]:
+                self.hierarchy_stats["hits"] += 1
+                return cached[1]
+            xml = self.device.dump_hierarchy(compressed=True)
+        else:
+            key_future = pool.submit(lambda: self._screen_key(self.latest_frame(max_age), self.current_activity()))
+            xml = self.device.dump_hierarchy(compressed=True)
+            try:
+                key = key_future.result()
+            except Exception as e:
+                logger.debug(f"Hierarchy cache key failed: {e}")
+                self.hierarchy_stats["misses"] += 1
+                return xml
+        self.hierarchy_stats["misses"] += 1
+        self._hierarchy_cache = (key, xml)
+        return xml
+
+    def annotate_frame(self, frame, max_marks: Optional[int] = None):
+        """
+        Draw numbered Set-of-Mark boxes over the interactive nodes on ``frame``
+        and remember them for click_mark() / resolve_mark().
+
+        Returns:
+            (annotated copy of the frame, list of marks)
+        """
+        from android_phone.core.som import MAX_MARKS, draw_marks, extract_marks
+
+        marks = extract_marks(self.dump_hierarchy(), screen_size=frame.size, max_marks=max_marks or MAX_MARKS)
+        self.marks = {mark.id: mark for mark in marks}
+        return draw_marks(frame, marks), marks
+
+    def resolve_mark(self, element: int) -> Optional[Tuple[int, int]]:
+        """Pixel centre of Set-of-Mark element ``element`` of the last annotated frame."""
+        mark = self.marks.get(int(element))
+        return mark.center if mark is not None else None
+
+    def click_mark(self, element: int) -> bool:
+        """Click the centre of a Set-of-Mark element's exact bounds."""
+        center = self.resolve_mark(element)
+        if center is None:
+            logger.warning(f"Element {element} is not marked on the current screen")
+            return False
+        return self.click(*center)
+
+    def invalidate_hierarchy(self):
+        """Forget the cached hierarchy."""
+        if self._hierarchy_cache is not None:
+            self._hierarchy_cache = None
+            self.hierarchy_stats["invalidations"] += 1
+
+    def capture_frame(self):
+        """Capture the raw screen as a PIL image (no resize / encode); it becomes the last frame."""
+        generation = self._frame_generation
+        started, started_at = time.monotonic(), time.time()
+        frame = self.device.screenshot(format='pillow')
+        with self._frame_lock:
+            self.frame_stats["captures"] += 1
+            if generation == self._frame_generation:
+                self._last_frame = (frame, started, started_at)
+                self._renditions.clear()
+        return frame
+
+    def _recent_frame(self, max_age: Optional[float]) -> Optional[Tuple[Any, float, float]]:
+        if max_age is None:
+            max_age = self.frame_max_age
+        last = self._last_frame
+        if max_age <= 0 or last is None or time.monotonic() - last[1] > max_age:
+            return None
+        with self._frame_lock:
+            self.frame_stats["reuses"] += 1
+        return last
+
+    def latest_frame(self, max_age: Optional[float] = None):
+        """
+        The last captured frame if no action happened since and it is at most
+        ``max_age`` seconds old (default ``frame_max_age``), else a new capture.
+        """
+        recent = self._recent_frame(max_age)
+        return recent[0] if recent is not None else self.capture_frame()
+
+    def save_screenshot(self, path: str, max_age: Optional[float] = None) -> str:
+        """Save the latest frame (see latest_frame) to ``path`` (PNG or JPEG)."""
+        self.latest_frame(max_age).save(path)
+        logger.info(f"Screenshot saved to {path}")
+        return path
+
+    def invalidate_frame(self):
+        """Forget the last frame and its renditions."""
+        with self._frame_lock:
+            self._frame_generation += 1
+            if self._last_frame is not None:
+                self._last_frame = None
+                self._renditions.clear()
+                self.frame_stats["invalidations"] += 1
+
+    def invalidate_screen(self):
+        """Forget everything observed on the current screen (called by every action)."""
+        self.invalidate_hierarchy()
+        self.invalidate_frame()
+
+    def get_frame_fingerprint(self, region: Optional[Tuple[int, int, int, int]] = None) -> bytes:
+        """Capture the screen and return its fingerprint (see core/fingerprint.py)."""
+        from android_phone.core.fingerprint import frame_fingerprint
+
+        return frame_fingerprint(self.capture_frame(), region=region)
+
+    def wait_for_element(
+        self,
+        text: Optional[str] = None,
+        description: Optional[str] = None,
+        resource_id: Optional[str] = None,
+        state: str = "appear",
+        timeout: float = 10.0,
+        interval: float = 0.3,
+        exact: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Poll the hierarchy until an element appears (or disappears).
+
+        Returns as soon as the condition holds, with ``matched``,
+        ``elapsed_ms``, ``polls`` and (for "appear") the element. Nothing
+        matches until a dump has succeeded, so a failing dump never counts as
+        "disappeared".
+        """
+        from android_phone.core.hierarchy import parse_hierarchy, find_nodes, node_summary
+
+        if state not in ("appear", "disappear"):
+            raise ValueError(f"state must be 'appear' or 'disappear', got {state!r}")
+        if not (text or description or resource_id):
+            raise ValueError("wait_for_element requires text, description or resource_id")
+
+        started = time.perf_counter()
+        polls = 0
+        last_xml = None
+        matches: list = []
+        seen = False
+        while True:
+            poll_started = time.perf_counter()
+            polls += 1
+            try:
+                # A fresh key frame on every poll: the screen may change without any action
+                xml = self.dump_hierarchy(max_age=0)
+                # Unchanged dump -> reuse the previous match result
+                if xml != last_xml:
+                    matches = find_nodes(parse_hierarchy(xml), text=text, description=description,
+                                         resource_id=resource_id, exact=exact)
+                    last_xml = xml
+                seen = True
+            except Exception as e:
+                logger.warning(f"wait_for_element: dump failed: {e}")
+
+            present = bool(matches)
+            elapsed = time.perf_counter() - started
+            if seen and present == (state == "appear"):
+                result = {"matched": True, "state": state, "elapsed_ms": round(elapsed * 1000), "polls": polls}
+                if present:
+                    result["element"] = node_summary(matches[0])
+                return result
+            if elapsed >= timeout:
+                result = {"matched": False, "state": state, "elapsed_ms": round(elapsed * 1000), "polls": polls}
+                if not seen:
+                    result["error"] = "hierarchy dump failed on every poll"
+                return result
+            time.sleep(max(0.0, interval - (time.perf_counter() - poll_started)))
+
+    def wait_for_change(
+        self,
+        region: Optional[Tuple[int, int, int, int]] = None,
+        threshold: float = 0.02,
+        timeout: float = 10.0,
+        interval: float = 0.2,
+    ) -> Dict[str, Any]:
+        """
+        Poll frame fingerprints until the screen (or a pixel region of it)
+        differs from the first frame by at least ``threshold`` (0-1).
+
+        Returns ``changed``, ``distance``, ``elapsed_ms`` and ``polls``.
+        """
+        from android_phone.core.fingerprint import fingerprint_distance
+
+        started = time.perf_counter()
+        baseline = self.get_frame_fingerprint(region)
+        polls = 0
+        distance = 0.0
+        while True:
+            elapsed = time.perf_counter() - started
+            if elapsed >= timeout:
+                return {"changed": False, "distance": round(distance, 4), "elapsed_ms": round(elapsed * 1000),
+                        "polls": polls}
+            time.sleep(min(interval, max(0.0, timeout - elapsed)))
+            polls += 1
+            try:
+                distance = fingerprint_distance(baseline, self.get_frame_fingerprint(region))
+            except Exception as e:
+                logger.warning(f"wait_for_change: capture failed: {e}")
+                continue
+            if distance >= threshold:
+                elapsed = time.perf_counter() - started
+                return {"changed": True, "distance": round(distance, 4), "elapsed_ms": round(elapsed * 1000),
+                        "polls": polls}
+
     def get_ui_hierarchy(self, compressed: bool = True) -> str:
         """
         Get UI hierarchy as XML string.
@@ -113,8 +664,9 @@ class AndroidController:
             compressed: If True, performs basic compression (not yet implemented fully, returns raw).
         """
         try:
-            xml_content = self.device.dump_hierarchy(compressed=compressed)
-            return xml_content
+            if compressed:
+                return self.dump_hierarchy()
+            return self.device.dump_hierarchy(compressed=False)
         except Exception as e:
             logger.error(f"Dump hierarchy failed: {e}")
             raise RuntimeError(f"Failed to get UI hierarchy: {e}")
@@ -124,8 +676,14 @@ class AndroidController:
         Get a simplified UI hierarchy XML to reduce context size.
         Only keeps visible, useful nodes.
         """
+        return self.compact_hierarchy(self.dump_hierarchy())
+
+    def compact_hierarchy(self, raw_xml: str) -> str:
+        """
+        Simplify an already dumped hierarchy (see get_compact_ui_hierarchy).
+        Returns the raw XML if it cannot be parsed.
+        """
         try:
-            raw_xml = self.device.dump_hierarchy(compressed=True)
             root = ET.fromstring(raw_xml)
             
             def filter_node(node):
@@ -175,7 +733,7 @@ class AndroidController:
         except Exception as e:
             logger.error(f"Compact hierarchy failed: {e}")
             # Fallback to raw
-            return self.get_ui_hierarchy()
+            return raw_xml
 
     def click_element(self, text: str = None, resource_id: str = None, timeout: float = 10.0) -> bool:
         """
@@ -199,6 +757,7 @@ class AndroidController:
             
             # Wait and click
             if d.exists(timeout=timeout):
+                self.invalidate_screen()
                 d.click()
                 logger.info(f"Clicked element: text={text}, id={resource_id}")
                 return True
@@ -209,9 +768,101 @@ class AndroidController:
             logger.error(f"Click element failed: {e}")
             return False
 
+    def scroll_until_found(
+        self,
+        text: Optional[str] = None,
+        description: Optional[str] = None,
+        resource_id: Optional[str] = None,
+        query: Optional[str] = None,
+        direction: str = "down",
+        max_swipes: int = 15,
+        container_id: Optional[str] = None,
+        exact: bool = False,
+        settle: float = 0.3,
+    ) -> Dict[str, Any]:
+        """
+        Scroll a list until an element matching text / description / resource_id
+        appears, using hierarchy dumps only (no screenshots or model calls).
+
+        Args:
+            text: Text to look for (substring unless ``exact``).
+            description: content-desc to look for (substring unless ``exact``).
+            resource_id: Resource ID to look for.
+            query: Text that may appear in either the text or the content-desc.
+            direction: Where to reveal more content: down, up, left or right.
+            max_swipes: Give up after this many swipes.
+            container_id: Resource ID of the container to scroll (default: largest scrollable).
+            exact: Require exact text/description matches.
+            settle: Seconds to wait after each swipe before re-reading the hierarchy.
+
+        Returns:
+            Dict with ``found``, ``swipes``, ``reason`` and, when found, the
+            element's ``bounds``/``center`` in pixels.
+        """
+        from android_phone.core.hierarchy import (
+            parse_hierarchy, find_nodes, find_scrollables, node_summary, node_matches,
+            parse_bounds, hierarchy_signature,
+        )
+
+        if not (text or description or resource_id or query):
+            return {"found": False, "swipes": 0, "reason": "no selector given"}
+
+        direction = direction.lower()
+        swipes = 0
+        previous_signature = None
+        while True:
+            try:
+                # Every read follows a swipe, so the cache could never hit
+                root = parse_hierarchy(self.dump_hierarchy(cache=False))
+            except Exception as e:
+                logger.error(f"scroll_until_found: dump hierarchy failed: {e}")
+                return {"found": False, "swipes": swipes, "reason": f"hierarchy error: {e}"}
+
+            matches = find_nodes(root, text=text, description=description, resource_id=resource_id,
+                                 exact=exact, query=query)
+            if matches:
+                element = node_summary(matches[0])
+                logger.info(f"scroll_until_found: found {element} after {swipes} swipe(s)")
+                return {"found": True, "swipes": swipes, "reason": "found", **element}
+
+            signature = hierarchy_signature(root)
+            if signature == previous_signature:
+                return {"found": False, "swipes": swipes, "reason": "end of list"}
+            previous_signature = signature
+
+            if swipes >= max_swipes:
+                return {"found": False, "swipes": swipes, "reason": "max swipes reached"}
+
+            scrollables = find_scrollables(root)
+            if container_id:
+                scrollables = [n for n in scrollables if node_matches(n, resource_id=container_id)]
+            container = parse_bounds(scrollables[0].get("bounds")) if scrollables else None
+            if not container:
+                return {"found": False, "swipes": swipes, "reason": "no scrollable container"}
+
+            # Swipe across the middle 50% of the container, against the reveal direction
+            x1, y1, x2, y2 = container
+            cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+            dx, dy = (x2 - x1) // 4, (y2 - y1) // 4
+            vectors = {
+                "down": (cx, cy + dy, cx, cy - dy),
+                "up": (cx, cy - dy, cx, cy + dy),
+                "right": (cx + dx, cy, cx - dx, cy),
+                "left": (cx - dx, cy, cx + dx, cy),
+            }
+            if direction not in vectors:
+                return {"found": False, "swipes": swipes, "reason": f"invalid direction: {direction}"}
+            if not self.swipe(*vectors[direction], duration=0.3):
+                return {"found": False, "swipes": swipes, "reason": "swipe failed"}
+            swipes += 1
+            if settle > 0:
+                time.sleep(settle)
+
     def click(self, x: int, y: int) -> bool:
         """Click at coordinates."""
         try:
+            self._flush_pending_input()
+            self.invalidate_screen()
             self.device.click(x, y)
             return True
         except Exception as e:
@@ -228,6 +879,8 @@ class AndroidController:
             duration: Press duration in seconds (default 0.8s for Android long-press)
         """
         try:
+            self._flush_pending_input()
+            self.invalidate_screen()
             # uiautomator2 supports long_click directly
             if hasattr(self.device, 'long_click'):
                 self.device.long_click(x, y, duration=duration)
@@ -243,6 +896,8 @@ class AndroidController:
     def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: float = 0.5) -> bool:
         """Swipe from (x1, y1) to (x2, y2)."""
         try:
+            self._flush_pending_input()
+            self.invalidate_screen()
             self.device.swipe(x1, y1, x2, y2, duration)
             return True
         except Exception as e:
@@ -252,6 +907,8 @@ class AndroidController:
     def input_text(self, text: str, clear: bool = True) -> bool:
         """Input text."""
         try:
+            self._flush_pending_input()
+            self.invalidate_screen()
             if clear:
                 self.device.clear_text()
             self.device.send_keys(text)
@@ -311,8 +968,10 @@ class AndroidController:
             }
             
             if key_lower in keycode_map:
-                self.device.shell(f"input keyevent {keycode_map[key_lower]}")
+                return self._shell_input(f"input keyevent {keycode_map[key_lower]}")
             else:
+                self._flush_pending_input()
+                self.invalidate_screen()
                 self.device.press(key)
                 
             return True
@@ -320,9 +979,111 @@ class AndroidController:
             logger.error(f"Press key failed: {e}")
             return False
 
+    def press_keys(self, keys: List[str]) -> bool:
+        """
+        Press several keys in order. Keys that map to key codes are sent as a
+        single ``input keyevent`` invocation instead of one ADB round trip each.
+        """
+        with self.batch_input() as batch:
+            for key in keys:
+                if not self.press_key(key):
+                    return False
+        return batch.ok
+
+    # --- Shell input coalescing ---
+
+    @contextmanager
+    def batch_input(self):
+        """
+        Queue shell-based input events (key events) and flush them as one
+        shell invocation on exit. Non-shell actions inside the block flush the
+        queue first, so ordering is preserved. Errors are reported on the
+        yielded ``InputBatch`` (``ok``, ``error``, ``failed_command``).
+        """
+        state = self._input_state()
+        outermost = state.depth == 0
+        if outermost:
+            state.batch = InputBatch()
+        batch = state.batch
+        state.depth += 1
+        try:
+            yield batch
+        finally:
+            state.depth -= 1
+            if outermost:
+                self._flush_pending_input()
+                state.batch = None
+
+    def _input_state(self):
+        """
+        Batching state of the calling thread (``depth``, ``pending``, ``batch``).
+        Kept per thread so a batch opened by one caller never queues or flushes
+        another thread's input events.
+        """
+        state = self._input_local
+        if not hasattr(state, "depth"):
+            state.depth = 0
+            state.pending = []
+            state.batch = None
+        return state
+
+    def _shell_input(self, cmd: str) -> bool:
+        """Run an input shell command now, or queue it when batching."""
+        self.invalidate_screen()
+        state = self._input_state()
+        if state.depth > 0:
+            state.pending.append(cmd)
+            return True
+        exit_code = _exit_code(self.device.shell(cmd))
+        if exit_code:
+            logger.error(f"Shell input failed (exit {exit_code}): {cmd}")
+            return False
+        return True
+
+    def _flush_pending_input(self) -> bool:
+        """Send queued shell input events as a single ``sh -c`` invocation."""
+        state = self._input_state()
+        if not state.pending:
+            return True
+        commands = coalesce_shell_commands(state.pending)
+        state.pending = []
+        batch = state.batch
+        if batch is not None:
+            batch.commands.extend(commands)
+
+        if len(commands) == 1:
+            script = commands[0]
+        else:
+            # "|| exit N" reports which command failed and stops the rest
+            script = "sh -c " + shlex.quote("; ".join(f"{cmd} || exit {i + 1}" for i, cmd in enumerate(commands)))
+
+        try:
+            exit_code = _exit_code(self.device.shell(script))
+        except Exception as e:
+            exit_code, error = None, str(e)
+        else:
+            error = None
+
+        if exit_code == 0 and error is None:
+            return True
+
+        if error is None:
+            failed = commands[exit_code - 1] if len(commands) > 1 and 0 < exit_code <= len(commands) else commands[0]
+            error = f"exit code {exit_code}"
+        else:
+            failed = None
+        logger.error(f"Batched input failed ({error}): {failed or commands}")
+        if batch is not None:
+            batch.ok = False
+            batch.error = error
+            batch.failed_command = failed
+        return False
+
     def launch_app(self, package_name: str) -> bool:
         """Launch an app by package name."""
         try:
+            self._flush_pending_input()
+            self.invalidate_screen()
             self.device.app_start(package_name)
             return True
         except Exception as e:
@@ -344,9 +1105,150 @@ class AndroidController:
             logger.error(f"List apps failed: {e}")
             return []
 
+    def _device_locale(self) -> Optional[str]:
+        """Device locale such as "zh-CN" (cached for the connection)."""
+        if self._locale is None:
+            locale = ""
+            for prop in ("persist.sys.locale", "ro.product.locale"):
+                try:
+                    locale = self.device.shell(f"getprop {prop}").output.strip()
+                except Exception as e:
+                    logger.debug(f"getprop {prop} failed: {e}")
+                if locale:
+                    break
+            self._locale = locale
+        return self._locale or None
+
+    def _device_aapt(self) -> Optional[str]:
+        """aapt binary usable on the device (probed once per connection), or None."""
+        if self._aapt is None:
+            found, failed = "", False
+            configured = os.environ.get("ANDROID_AGENT_DEVICE_AAPT")
+            for candidate in ((configured,) if configured else ()) + DEVICE_AAPT_CANDIDATES:
+                try:
+                    output = self.device.shell(f"{shlex.quote(candidate)} version").output
+                except Exception as e:
+                    logger.debug(f"aapt probe {candidate} failed: {e}")
+                    failed = True
+                    continue
+                if "Android Asset Packaging Tool" in output:
+                    found = candidate
+                    logger.info(f"Reading app labels with {candidate} on the device")
+                    break
+            # A probe that errored (rather than finding nothing) is retried next time
+            if found or not failed:
+                self._aapt = found
+            return found or None
+        return self._aapt or None
+
+    def app_labels(self, package_name: str) -> Optional[List[str]]:
+        """
+        Labels of an installed app as declared in its manifest, in the device
+        locale first ("微信", "WeChat").
+
+        uiautomator2's ``app_info()`` only reports the version, so labels are
+        read on the device: ``aapt dump badging`` on the installed APK when an
+        aapt binary is available there (see ``DEVICE_AAPT_CANDIDATES``), else
+        the literal label ``dumpsys package`` reports for some apps. Two or
+        three shell calls, nothing is copied off the device.
+
+        Returns:
+            Labels (possibly empty), or None if the lookup failed and is worth retrying.
+        """
+        try:
+            aapt = self._device_aapt()
+            if aapt:
+                output = self.device.shell(f"pm path {shlex.quote(package_name)}").output
+                paths = [line.split(":", 1)[1].strip() for line in output.splitlines() if line.startswith("package:")]
+                if not paths:
+                    return []
+                base = next((p for p in paths if p.endswith("/base.apk")), paths[0])
+                badging = self.device.shell(f"{shlex.quote(aapt)} dump badging {shlex.quote(base)}").output
+                labels = parse_badging_labels(badging, self._device_locale())
+                if labels:
+                    return labels
+            output = self.device.shell(f"dumpsys package {shlex.quote(package_name)}").output
+        except Exception as e:
+            logger.debug(f"Label lookup for {package_name} failed: {e}")
+            return None
+        labels = [m for m in DUMPSYS_LABEL.findall(output) if m != "null"]
+        return list(dict.fromkeys(labels))
+
+    def app_label(self, package_name: str) -> Optional[str]:
+        """Human-readable label of an installed app (as shown in the launcher), or None."""
+        return next(iter(self.app_labels(package_name) or []), None)
+
+    def start_intent(self, action: Optional[str] = None, data: Optional[str] = None,
+                     component: Optional[str] = None, package: Optional[str] = None,
+                     category: Optional[str] = None, mime_type: Optional[str] = None,
+                     extras: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Start an activity with ``am start`` (an intent or a deep link).
+
+        Args:
+            action: Intent action (e.g. "android.settings.WIFI_SETTINGS").
+            data: Data URI / deep link.
+            component: "package/activity".
+            package: Restrict resolution to this package.
+            category: Intent category.
+            mime_type: MIME type of ``data``.
+            extras: Extras; bool, int and float values use the typed flags, everything else is a string.
+        """
+        args = ["am", "start"]
+        for flag, value in (("-a", action), ("-d", data), ("-n", component), ("-c", category), ("-t", mime_type)):
+            if value:
+                args += [flag, value]
+        for key, value in (extras or {}).items():
+            if isinstance(value, bool):
+                args += ["--ez", key, "true" if value else "false"]
+            elif isinstance(value, int):
+                args += ["--ei", key, str(value)]
+            elif isinstance(value, float):
+                args += ["--ef", key, str(value)]
+            else:
+                args += ["--es", key, str(value)]
+        if package and not component:
+            args.append(package)
+        cmd = " ".join(shlex.quote(a) for a in args)
+        try:
+            self._flush_pending_input()
+            self.invalidate_screen()
+            result = self.device.shell(cmd)
+            # am start reports unresolved intents on stdout with exit code 0
+            output = getattr(result, "output", "") or ""
+            if _exit_code(result) or "Error:" in output:
+                logger.error(f"Start intent failed: {cmd}: {output.strip()}")
+                return False
+            return True
+        except Exception as e:
+            logger.error(f"Start intent failed: {e}")
+            return False
+
+    def wait_for_activity(self, prefix: str, timeout: float = 5.0, interval: float = 0.3) -> bool:
+        """Wait until the foreground "package/activity" starts with ``prefix``."""
+        return self._poll_activity(lambda current: current.startswith(prefix), timeout, interval)
+
+    def wait_for_activity_change(self, previous: str, timeout: float = 5.0, interval: float = 0.3) -> bool:
+        """Wait until the foreground "package/activity" differs from ``previous``."""
+        return self._poll_activity(lambda current: bool(current) and current != previous, timeout, interval)
+
+    def _poll_activity(self, condition, timeout: float, interval: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            if condition(self.current_activity()):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+
+    def wait_for_app(self, package_name: str, timeout: float = 5.0, interval: float = 0.3) -> bool:
+        """Wait until ``package_name`` is in the foreground."""
+        return self.wait_for_activity(f"{package_name}/", timeout=timeout, interval=interval)
+
     def unlock_device(self) -> bool:
         """Try to unlock the device."""
         try:
+            self.invalidate_screen()
             self.device.screen_on()
             self.device.unlock() # u2 built-in unlock
             return True
@@ -357,6 +1259,7 @@ class AndroidController:
     def stop_app(self, package_name: str) -> bool:
         """Stop an app."""
         try:
+            self.invalidate_screen()
             self.device.app_stop(package_name)
             return True
         except Exception as e:
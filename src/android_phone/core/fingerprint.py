@@ -0,0 +1,43 @@
+"""
+Cheap perceptual fingerprints of screen frames.
+
+A fingerprint is a tiny grayscale thumbnail (32x32 by default) of the frame or
+of a region of it. Comparing two fingerprints is enough to tell whether the
+screen changed, without encoding or sending full images anywhere.
+"""
+
+from typing import Optional, Tuple
+
+Region = Tuple[int, int, int, int]
+
+FINGERPRINT_SIZE = (32, 32)
+
+
+def frame_fingerprint(image, region: Optional[Region] = None, size: Tuple[int, int] = FINGERPRINT_SIZE) -> bytes:
+    """
+    Fingerprint a PIL image.
+
+    Args:
+        image: PIL image (any mode).
+        region: Optional pixel box ``(x1, y1, x2, y2)`` to restrict the fingerprint to.
+        size: Thumbnail size; larger is more sensitive to small changes.
+    """
+    from PIL import Image
+
+    if region:
+        image = image.crop(region)
+    return image.convert("L").resize(size, Image.Resampling.BOX).tobytes()
+
+
+def fingerprint_distance(a: Optional[bytes], b: Optional[bytes]) -> float:
+    """Mean absolute difference between two fingerprints, in [0, 1]."""
+    if not a or not b or len(a) != len(b):
+        return 1.0
+    return sum(abs(x - y) for x, y in zip(a, b)) / (255.0 * len(a))
+
+
+def changed_fraction(a: Optional[bytes], b: Optional[bytes], cell_threshold: int = 24) -> float:
+    """Share of fingerprint cells whose brightness changed by more than ``cell_threshold``, in [0, 1]."""
+    if not a or not b or len(a) != len(b):
+        return 1.0
+    return sum(1 for x, y in zip(a, b) if abs(x - y) > cell_threshold) / len(a)
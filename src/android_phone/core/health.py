@@ -0,0 +1,285 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionState(str, Enum):
+    DISCONNECTED = "disconnected"
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    RECONNECTING = "reconnecting"
+    FAILED = "failed"
+
+
+class ConnectionMonitor:
+    """
+    Background health check for an ``AndroidController``.
+
+    Pings the device every ``interval`` seconds once it has connected at least
+    once (``start()`` before the first successful connect only arms the
+    thread, so an unreachable device is not retried forever). When a ping fails the monitor
+    reconnects with jittered exponential backoff and, after a successful
+    (re)connect, runs the controller warm-up so that the next real step is
+    not slow. Reconnect counts and durations are exposed via ``metrics()``.
+
+    Once a reconnect gives up (FAILED) the thread stops retrying until
+    ``connect()`` or ``ensure_connected()`` is called explicitly. While a
+    task holds the device (``in_use()``) the thread skips its checks, so the
+    connection is never swapped under a running step.
+
+    Args:
+        controller: The controller to watch.
+        interval: Seconds between pings.
+        backoff_base: First reconnect delay in seconds.
+        backoff_max: Upper bound for the reconnect delay.
+        max_attempts: Reconnect attempts per outage before entering FAILED (None = unlimited).
+        warm_up: Run ``controller.warm_up()`` after each successful connect.
+    """
+
+    def __init__(
+        self,
+        controller,
+        interval: float = 5.0,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        max_attempts: Optional[int] = 8,
+        warm_up: bool = True,
+    ):
+        self.controller = controller
+        self.interval = interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_attempts = max_attempts
+        self.warm_up = warm_up
+
+        self._state = ConnectionState.CONNECTED if controller._device is not None else ConnectionState.DISCONNECTED
+        self._lock = threading.RLock()
+        # Serializes connect/reconnect and background checks; separate from _lock so metrics stay
+        # readable during backoff. Reentrant: a reconnect can run inside a background check.
+        self._reconnect_lock = threading.RLock()
+        # Tasks currently using the device, see in_use()
+        self._holders = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # start() was called; the thread runs once the device has connected
+        self._start_requested = False
+        self._connected_once = controller._device is not None
+        self._transitions: List[Dict[str, Any]] = []
+        self._metrics: Dict[str, Any] = {
+            "pings": 0,
+            "ping_failures": 0,
+            "last_ping_ms": None,
+            "reconnects": 0,
+            "reconnect_attempts": 0,
+            "reconnect_failures": 0,
+            "last_reconnect_ms": None,
+            "total_reconnect_ms": 0.0,
+            "last_warm_up_ms": None,
+        }
+
+    # --- state ---
+
+    @property
+    def state(self) -> ConnectionState:
+        return self._state
+
+    def _set_state(self, state: ConnectionState, reason: str = ""):
+        with self._lock:
+            if state == self._state:
+                return
+            logger.info(f"Device connection: {self._state.value} -> {state.value}{f' ({reason})' if reason else ''}")
+            self._transitions.append({"from": self._state.value, "to": state.value, "at": time.time(), "reason": reason})
+            del self._transitions[:-20]
+            self._state = state
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of connection state, ping and reconnect statistics."""
+        with self._lock:
+            data = dict(self._metrics)
+            data["state"] = self._state.value
+            data["serial"] = self.controller.serial
+            data["transitions"] = list(self._transitions)
+            return data
+
+    # --- operations ---
+
+    def _warm_up(self):
+        if not self.warm_up:
+            return
+        try:
+            timings = self.controller.warm_up()
+            with self._lock:
+                self._metrics["last_warm_up_ms"] = round(sum(timings.values()), 1)
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+
+    def connect(self, retry: bool = True) -> bool:
+        """
+        Initial connect (with warm-up).
+
+        Args:
+            retry: On failure, fall back to the backoff reconnect loop. If False,
+                the connection error is re-raised immediately.
+        """
+        with self._reconnect_lock:
+            self._set_state(ConnectionState.CONNECTING)
+            try:
+                self.controller.connect()
+            except Exception as e:
+                logger.warning(f"Initial connect failed: {e}")
+                if not retry:
+                    self._set_state(ConnectionState.DISCONNECTED, str(e))
+                    raise
+                connected = False
+            else:
+                connected = True
+                self._set_state(ConnectionState.CONNECTED)
+                self._warm_up()
+        if connected:
+            self._on_connected()
+            return True
+        return self.reconnect(reason="initial connect failed")
+
+    def ping(self) -> bool:
+        """Run one cheap health check and record its latency."""
+        started = time.perf_counter()
+        ok = self.controller.ping()
+        with self._lock:
+            self._metrics["pings"] += 1
+            self._metrics["last_ping_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            if not ok:
+                self._metrics["ping_failures"] += 1
+        return ok
+
+    def check(self) -> bool:
+        """Ping once and reconnect if the device stopped answering."""
+        if self.ping():
+            if self._state != ConnectionState.CONNECTED:
+                self._set_state(ConnectionState.CONNECTED, "ping ok")
+            return True
+        return self.reconnect(reason="ping failed")
+
+    def reconnect(self, reason: str = "") -> bool:
+        """
+        Reconnect with jittered exponential backoff.
+
+        Returns True once connected, False after ``max_attempts`` failures
+        (state FAILED) or when the monitor is stopped.
+        """
+        with self._reconnect_lock:
+            self._set_state(ConnectionState.RECONNECTING, reason)
+            started = time.perf_counter()
+            attempt = 0
+            while not self._stop.is_set():
+                attempt += 1
+                with self._lock:
+                    self._metrics["reconnect_attempts"] += 1
+                try:
+                    self.controller.reconnect()
+                    duration_ms = (time.perf_counter() - started) * 1000
+                    with self._lock:
+                        self._metrics["reconnects"] += 1
+                        self._metrics["last_reconnect_ms"] = round(duration_ms, 1)
+                        self._metrics["total_reconnect_ms"] = round(self._metrics["total_reconnect_ms"] + duration_ms, 1)
+                        reconnects = self._metrics["reconnects"]
+                    logger.info(f"Reconnected to device after {attempt} attempt(s) in {duration_ms:.0f}ms "
+                                f"(total reconnects: {reconnects})")
+                    self._set_state(ConnectionState.CONNECTED, f"attempt {attempt}")
+                    self._warm_up()
+                    self._on_connected()
+                    return True
+                except Exception as e:
+                    with self._lock:
+                        self._metrics["reconnect_failures"] += 1
+                    logger.warning(f"Reconnect attempt {attempt} failed: {e}")
+
+                if self.max_attempts is not None and attempt >= self.max_attempts:
+                    break
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+                delay = random.uniform(delay / 2, delay)
+                self._stop.wait(delay)
+
+            if self._stop.is_set():
+                self._set_state(ConnectionState.DISCONNECTED, "monitor stopped")
+            else:
+                self._set_state(ConnectionState.FAILED, f"gave up after {attempt} attempt(s)")
+            return False
+
+    def ensure_connected(self) -> bool:
+        """Make sure the device is usable, reconnecting synchronously if needed."""
+        if self._state == ConnectionState.CONNECTED and self.ping():
+            return True
+        return self.reconnect(reason="ensure_connected")
+
+    @contextmanager
+    def in_use(self):
+        """
+        Hold the device for a task. Waits for an in-flight background check or
+        reconnect to finish; until released, the background thread leaves the
+        connection alone (the task recovers through ``ensure_connected()``).
+        """
+        with self._reconnect_lock:
+            self._holders += 1
+        try:
+            yield self
+        finally:
+            with self._reconnect_lock:
+                self._holders -= 1
+
+    # --- background thread ---
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._reconnect_lock:
+                # Gave up: wait for an explicit connect() / ensure_connected() instead of retrying forever
+                if self._holders or self._state == ConnectionState.FAILED:
+                    continue
+                try:
+                    self.check()
+                except Exception as e:
+                    logger.error(f"Health check error: {e}")
+
+    def _on_connected(self):
+        with self._lock:
+            self._connected_once = True
+            if self._start_requested:
+                self._spawn()
+
+    def _spawn(self):
+        # Called with the lock held
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="android-health", daemon=True)
+        self._thread.start()
+
+    def start(self) -> "ConnectionMonitor":
+        """
+        Start the background health-check thread (idempotent). Before the
+        first successful connect this only arms it: the thread starts once
+        ``connect()`` or ``reconnect()`` succeeds.
+        """
+        with self._lock:
+            self._start_requested = True
+            self._stop.clear()
+            if self._connected_once:
+                self._spawn()
+        return self
+
+    @property
+    def running(self) -> bool:
+        """Whether the health-check thread is running."""
+        return bool(self._thread and self._thread.is_alive())
+
+    def stop(self):
+        with self._lock:
+            self._start_requested = False
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 1)
+        self._thread = None
@@ -0,0 +1,119 @@
+"""
+Helpers for querying uiautomator hierarchy dumps (full or compact XML).
+"""
+
+import hashlib
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+Bounds = Tuple[int, int, int, int]
+
+_BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+def parse_hierarchy(xml: str) -> ET.Element:
+    """Parse a hierarchy dump, tolerating an XML declaration with an encoding."""
+    if xml.startswith("<?xml"):
+        xml = xml[xml.index("?>") + 2:]
+    return ET.fromstring(xml)
+
+
+def parse_bounds(value: Optional[str]) -> Optional[Bounds]:
+    """``"[0,0][1080,1920]"`` -> ``(0, 0, 1080, 1920)``."""
+    if not value:
+        return None
+    match = _BOUNDS_RE.match(value)
+    if not match:
+        return None
+    return tuple(int(v) for v in match.groups())
+
+
+def bounds_center(bounds: Bounds) -> Tuple[int, int]:
+    x1, y1, x2, y2 = bounds
+    return (x1 + x2) // 2, (y1 + y2) // 2
+
+
+def bounds_area(bounds: Optional[Bounds]) -> int:
+    if not bounds:
+        return 0
+    x1, y1, x2, y2 = bounds
+    return max(0, x2 - x1) * max(0, y2 - y1)
+
+
+def iter_nodes(root: ET.Element) -> Iterator[ET.Element]:
+    """All ``node`` elements in document order."""
+    return root.iter("node")
+
+
+def node_matches(node: ET.Element, text: Optional[str] = None, description: Optional[str] = None,
+                 resource_id: Optional[str] = None, exact: bool = False, query: Optional[str] = None) -> bool:
+    """
+    True if the node matches every given criterion. ``text`` and
+    ``description`` match as substrings unless ``exact``; ``query`` matches
+    either of them; ``resource_id`` matches exactly or by its ``:id/name`` suffix.
+    """
+    if text is None and description is None and resource_id is None and query is None:
+        return False
+
+    def match_str(value: str, wanted: str) -> bool:
+        return value == wanted if exact else wanted in value
+
+    if query is not None and not (match_str(node.get("text", ""), query)
+                                  or match_str(node.get("content-desc", ""), query)):
+        return False
+
+    if text is not None and not match_str(node.get("text", ""), text):
+        return False
+    if description is not None and not match_str(node.get("content-desc", ""), description):
+        return False
+    if resource_id is not None:
+        rid = node.get("resource-id", "")
+        if rid != resource_id and not rid.endswith(f":id/{resource_id}"):
+            return False
+    return True
+
+
+def find_nodes(root: ET.Element, text: Optional[str] = None, description: Optional[str] = None,
+               resource_id: Optional[str] = None, exact: bool = False, query: Optional[str] = None) -> List[ET.Element]:
+    """Nodes matching the selector that have non-empty bounds."""
+    return [
+        node for node in iter_nodes(root)
+        if node_matches(node, text, description, resource_id, exact, query)
+        and bounds_area(parse_bounds(node.get("bounds")))
+    ]
+
+
+def find_scrollables(root: ET.Element) -> List[ET.Element]:
+    """Scrollable containers, largest first."""
+    nodes = [node for node in iter_nodes(root) if node.get("scrollable") == "true"]
+    return sorted(nodes, key=lambda n: bounds_area(parse_bounds(n.get("bounds"))), reverse=True)
+
+
+def node_summary(node: ET.Element) -> Dict[str, Any]:
+    """Compact JSON-friendly description of a node."""
+    summary: Dict[str, Any] = {}
+    for attr, key in (("text", "text"), ("content-desc", "description"), ("resource-id", "resource_id"),
+                      ("class", "class")):
+        if node.get(attr):
+            summary[key] = node.get(attr)
+    bounds = parse_bounds(node.get("bounds"))
+    if bounds:
+        summary["bounds"] = list(bounds)
+        summary["center"] = list(bounds_center(bounds))
+    return summary
+
+
+def hierarchy_signature(root: ET.Element) -> str:
+    """
+    Fingerprint of the visible content (text, description, id, bounds). Ignores
+    volatile attributes such as focus so that "nothing moved" compares equal.
+    """
+    digest = hashlib.sha1()
+    for node in iter_nodes(root):
+        digest.update("\x1f".join((
+            node.get("text", ""), node.get("content-desc", ""),
+            node.get("resource-id", ""), node.get("bounds", ""),
+        )).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
@@ -0,0 +1,214 @@
+"""
+Background jobs for autonomous tasks.
+
+An autonomous task runs for up to ``max_steps`` model round trips, far longer
+than an MCP client waits for one tool call. :class:`JobManager` runs tasks on a
+worker thread instead: a submit returns a job ID right away, the job's
+progress (current step, last thought, token usage so far) can be polled or
+waited on, and a cancel stops the agent before its next step.
+
+Jobs on one manager run one at a time in submission order, since they share
+the device.
+"""
+
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLED = "cancelled"
+# Agent statuses ("completed", "failed", "error") and CANCELLED end a job
+FINISHED_STATUSES = frozenset({"completed", "failed", "error", CANCELLED})
+
+# Finished jobs kept for get_task_status()
+MAX_FINISHED_JOBS = 100
+
+
+@dataclass
+class Job:
+    """
+    One submitted autonomous task.
+
+    Args:
+        job_id: Job identifier returned by ``submit``.
+        goal: Natural language goal.
+        max_steps: Agent step budget.
+    """
+    job_id: str
+    goal: str
+    max_steps: int = 50
+    status: str = QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    step: int = 0
+    last_thought: Optional[str] = None
+    last_action: Optional[Dict[str, Any]] = None
+    usage: Dict[str, int] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    # Bumped on every change, so waiters can tell whether anything happened
+    version: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "goal": self.goal,
+            "status": self.status,
+            "step": self.step,
+            "max_steps": self.max_steps,
+            "last_thought": self.last_thought,
+            "last_action": self.last_action,
+            "usage": dict(self.usage),
+            "cancel_requested": self.cancel_event.is_set(),
+            "submitted_at": round(self.submitted_at, 3),
+            "started_at": round(self.started_at, 3) if self.started_at else None,
+            "finished_at": round(self.finished_at, 3) if self.finished_at else None,
+        }
+        if self.started_at:
+            data["elapsed_s"] = round((self.finished_at or time.time()) - self.started_at, 1)
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """
+    Runs autonomous tasks as background jobs, one at a time.
+
+    Args:
+        agent_factory: Returns the agent that runs the next job (called on the worker thread).
+        max_finished: Finished jobs kept for status queries.
+    """
+
+    def __init__(self, agent_factory: Callable[[], Any], max_finished: int = MAX_FINISHED_JOBS):
+        self.agent_factory = agent_factory
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: List[str] = []
+        self._changed = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._counter = itertools.count(1)
+
+    def submit(self, goal: str, max_steps: int = 50) -> Job:
+        """Queue a task; it starts as soon as the jobs before it are done."""
+        job = Job(job_id=f"job_{next(self._counter)}_{uuid.uuid4().hex[:8]}", goal=goal, max_steps=max_steps)
+        with self._changed:
+            self._jobs[job.job_id] = job
+            self._queue.append(job.job_id)
+            self._prune()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, name="agent-jobs", daemon=True)
+                self._worker.start()
+            self._changed.notify_all()
+        logger.info(f"Submitted {job.job_id}: {goal}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._changed:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._changed:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job. A queued job never starts; a running one stops before
+        its next step (the step in progress is finished first).
+
+        Returns:
+            The job, or None if the ID is unknown.
+        """
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return job
+            job.cancel_event.set()
+            if job.status == QUEUED:
+                self._queue.remove(job_id)
+                self._finish(job, CANCELLED)
+            else:
+                job.version += 1
+            self._changed.notify_all()
+        logger.info(f"Cancellation requested for {job_id}")
+        return job
+
+    def wait(self, job_id: str, timeout: float, version: int = -1) -> Optional[Job]:
+        """Block until the job changes after ``version`` (or finishes), at most ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            job = self._jobs.get(job_id)
+            while job is not None and not job.done and job.version <= version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return job
+
+    # --- worker ---
+
+    def _work(self):
+        while True:
+            with self._changed:
+                if not self._queue:
+                    self._worker = None
+                    return
+                job = self._jobs[self._queue.pop(0)]
+                job.status, job.started_at = RUNNING, time.time()
+                job.version += 1
+                self._changed.notify_all()
+            self._run(job)
+
+    def _run(self, job: Job):
+        try:
+            agent = self.agent_factory()
+            result = agent.run(job.goal, job.max_steps, cancel_event=job.cancel_event,
+                               on_step=lambda info: self._on_step(job, info))
+        except Exception as e:
+            logger.error(f"{job.job_id} failed: {e}")
+            with self._changed:
+                job.error = str(e)
+                self._finish(job, "error")
+            return
+        with self._changed:
+            job.result = result
+            job.usage = dict(result.get("total_usage", job.usage))
+            job.step = result.get("steps", job.step)
+            self._finish(job, result.get("status", "error"))
+
+    def _on_step(self, job: Job, info: Dict[str, Any]):
+        with self._changed:
+            job.step = info["step"]
+            job.last_thought = info.get("thought")
+            job.last_action = info.get("action")
+            job.usage = dict(info.get("total_usage", {}))
+            job.version += 1
+            self._changed.notify_all()
+
+    def _finish(self, job: Job, status: str):
+        # Called with the lock held
+        job.status, job.finished_at = status, time.time()
+        job.version += 1
+        self._changed.notify_all()
+        logger.info(f"{job.job_id} {status}")
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
@@ -65,9 +65,10 @@ class TaskLogger:
         image_b64: str,
         model_response: Dict[str, Any],
         usage: Dict[str, Any],
-        action: Optional[Dict[str, Any]] = None
+        action: Optional[Dict[str, Any]] = None,
+        observation: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """记录每一步的模型调用"""
+        """记录每一步的模型调用 (observation: 本步截图的 scale / quality / 字节数)"""
         log_entry = {
             "task_id": task_id,
             "event": "step",
@@ -87,10 +88,13 @@ class TaskLogger:
             "token_usage": {
                 "prompt_tokens": usage.get("prompt_tokens", 0),
                 "completion_tokens": usage.get("completion_tokens", 0),
-                "total_tokens": usage.get("total_tokens", 0)
+                "total_tokens": usage.get("total_tokens", 0),
+                "cached_tokens": usage.get("cached_tokens", 0)
             },
             "action_executed": action
         }
+        if observation is not None:
+            log_entry["observation"] = observation
 
         with open(self._get_today_log_file(), "a", encoding="utf-8") as f:
             f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
@@ -119,6 +123,20 @@ class TaskLogger:
 
         return log_entry
 
+    def log_event(self, task_id: str, event: str, **data: Any) -> Dict[str, Any]:
+        """记录任务中的其他事件 (例如本地打开应用, 不经过模型)"""
+        log_entry = {
+            "task_id": task_id,
+            "event": event,
+            "timestamp": datetime.now().isoformat(),
+            **data
+        }
+
+        with open(self._get_today_log_file(), "a", encoding="utf-8") as f:
+            f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+
+        return log_entry
+
     def get_task_logs(self, task_id: str) -> list:
         """获取指定任务的日志"""
         logs = []
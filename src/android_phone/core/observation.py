@@ -0,0 +1,117 @@
+"""
+Adaptive observation resolution for the agent loop.
+
+Each step starts at the lowest (scale, quality) level. The level is raised for
+the next request when the previous action failed, did not change the screen,
+or the model said it was unsure, and it decays again after a run of successes.
+"""
+
+import logging
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (scale, JPEG quality), lowest first
+NORMAL_LEVELS: Tuple[Tuple[float, int], ...] = ((0.35, 50), (0.5, 60), (0.75, 70), (1.0, 80))
+ECO_LEVELS: Tuple[Tuple[float, int], ...] = ((0.3, 50), (0.4, 55), (0.5, 60))
+
+# Phrases in the model's thought that mean "I can't read this screen well"
+UNCERTAINTY_MARKERS = (
+    "not sure", "unsure", "unclear", "can't see", "cannot see", "can't read", "cannot read",
+    "too small", "blurry", "hard to read", "hard to see",
+    "不确定", "看不清", "模糊", "无法确定", "无法识别", "太小", "不清楚",
+)
+
+# Actions after which the screen is expected to change
+CHANGING_ACTIONS = frozenset({
+    "click", "left_double", "right_single", "long_press", "type", "scroll", "drag", "hotkey",
+})
+
+
+def is_uncertain(thought: Optional[str]) -> bool:
+    """True if the model's thought contains an uncertainty marker."""
+    if not thought:
+        return False
+    lowered = thought.lower()
+    return any(marker in lowered for marker in UNCERTAINTY_MARKERS)
+
+
+class AdaptiveResolution:
+    """
+    Chooses the screenshot (scale, quality) for each agent step.
+
+    Args:
+        levels: (scale, quality) pairs, lowest first.
+        decay_after: Consecutive successful steps before stepping down a level.
+        change_threshold: Fingerprint distance below which the screen counts as unchanged.
+    """
+
+    def __init__(self, levels: Sequence[Tuple[float, int]] = NORMAL_LEVELS, decay_after: int = 2,
+                 change_threshold: float = 0.005):
+        if not levels:
+            raise ValueError("levels must not be empty")
+        self.levels = tuple(levels)
+        self.decay_after = decay_after
+        self.change_threshold = change_threshold
+        self.level = 0
+        self.reason = "start"
+        self._streak = 0
+
+    @classmethod
+    def for_mode(cls, eco_mode: bool = False, adaptive: bool = True) -> "AdaptiveResolution":
+        """Policy for the agent's mode; non-adaptive pins the previous fixed settings."""
+        if not adaptive:
+            return cls([(0.3, 50)] if eco_mode else [(0.5, 60)])
+        return cls(ECO_LEVELS if eco_mode else NORMAL_LEVELS)
+
+    @property
+    def settings(self) -> Tuple[float, int]:
+        return self.levels[self.level]
+
+    def reset(self):
+        self.level = 0
+        self.reason = "start"
+        self._streak = 0
+
+    def update(self, action_ok: Optional[bool] = None, screen_changed: Optional[bool] = None,
+               uncertain: bool = False) -> str:
+        """
+        Feed the outcome of the previous step and pick the level for the next request.
+
+        Args:
+            action_ok: Whether the previous action succeeded (None if unknown).
+            screen_changed: Whether the screen changed after it (None if not expected to / unknown).
+            uncertain: Whether the model reported uncertainty.
+
+        Returns:
+            Why the level was chosen ("failed", "no_change", "uncertain", "decay", "hold").
+        """
+        reasons = []
+        if action_ok is False:
+            reasons.append("failed")
+        if screen_changed is False:
+            reasons.append("no_change")
+        if uncertain:
+            reasons.append("uncertain")
+
+        if reasons:
+            self._streak = 0
+            self.level = min(self.level + 1, len(self.levels) - 1)
+            self.reason = "+".join(reasons)
+        else:
+            self._streak += 1
+            if self._streak >= self.decay_after and self.level > 0:
+                self.level -= 1
+                self._streak = 0
+                self.reason = "decay"
+            else:
+                self.reason = "hold"
+        return self.reason
+
+    def describe(self, image_b64: Optional[str] = None) -> Dict[str, Any]:
+        """Settings used for a step, for logging (``bytes`` is the decoded image size)."""
+        scale, quality = self.settings
+        info: Dict[str, Any] = {"level": self.level, "scale": scale, "quality": quality, "reason": self.reason}
+        if image_b64 is not None:
+            info["bytes"] = len(image_b64) * 3 // 4 - image_b64.count("=", -2)
+        return info
@@ -0,0 +1,170 @@
+"""
+Built-in task profiling.
+
+With profiling on (``android-agent run --profile``, ``android-agent server
+--profile`` or ``ANDROID_AGENT_PROFILE=1``) every agent step runs under
+cProfile and tracemalloc snapshots are taken at task start and end. Results
+go to ``<log_dir>/profiles/<task_id>/``:
+
+- ``step_NNN.prof``: one cProfile dump per step (``pstats.Stats(path)``, snakeviz, ...)
+- ``task.prof``: all steps merged
+- ``start.tracemalloc`` / ``end.tracemalloc``: ``tracemalloc.Snapshot.load(path)``
+- ``summary.json`` / ``summary.txt``: top functions by cumulative time and the
+  biggest memory growth sites between start and end
+
+cProfile only sees the thread that runs the agent loop; time spent waiting on
+the capture worker threads shows up as the waiting call (``Future.result``).
+"""
+
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rows in the summary tables
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+# Stack depth kept by tracemalloc for each allocation
+TRACE_FRAMES = 10
+
+
+def _function_name(func) -> str:
+    filename, line, name = func
+    return f"{filename}:{line}({name})" if line else name
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    """Functions with the highest cumulative time, as JSON-friendly dicts."""
+    rows = []
+    for func, (cc, nc, tt, ct, _callers) in stats.stats.items():
+        rows.append({"function": _function_name(func), "calls": nc, "primitive_calls": cc,
+                     "tottime_s": round(tt, 6), "cumtime_s": round(ct, 6)})
+    rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+    return rows[:limit]
+
+
+def memory_growth(start: tracemalloc.Snapshot, end: tracemalloc.Snapshot,
+                  limit: int = TOP_ALLOCATIONS) -> List[Dict[str, Any]]:
+    """Source lines whose live allocations grew the most between two snapshots."""
+    rows = []
+    for diff in end.compare_to(start, "lineno")[:limit]:
+        if diff.size_diff <= 0:
+            break
+        frame = diff.traceback[0]
+        rows.append({"site": f"{frame.filename}:{frame.lineno}", "size_diff_kb": round(diff.size_diff / 1024, 1),
+                     "size_kb": round(diff.size / 1024, 1), "count_diff": diff.count_diff})
+    return rows
+
+
+class TaskProfiler:
+    """
+    cProfile per step plus tracemalloc snapshots for one task.
+
+    Args:
+        task_id: Task the profile belongs to.
+        log_dir: Log directory; files go to ``<log_dir>/profiles/<task_id>/``.
+        top: Rows of the cumulative-time table in the summary.
+    """
+
+    def __init__(self, task_id: str, log_dir: str = ".log", top: int = TOP_FUNCTIONS):
+        self.task_id = task_id
+        self.dir = Path(log_dir) / "profiles" / task_id
+        self.top = top
+        self.steps = 0
+        self._profile: Optional[cProfile.Profile] = None
+        self._step_started = 0.0
+        self._step_times: List[float] = []
+        self._started_tracing = False
+        self._start_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started = 0.0
+
+    def start(self):
+        """Take the start snapshot (starts tracemalloc unless it is already tracing)."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._started_tracing = True
+        self._start_snapshot = tracemalloc.take_snapshot()
+        self._start_snapshot.dump(str(self.dir / "start.tracemalloc"))
+        self._started = time.perf_counter()
+        logger.info(f"Profiling task {self.task_id} into {self.dir}")
+
+    def begin_step(self, step: int):
+        """Start profiling step ``step`` (0-based); ends the previous step if it is still open."""
+        self.end_step()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Another profiler (coverage, a debugger) owns the hook: keep going without cProfile
+            logger.warning(f"cProfile unavailable for step {step + 1}: {e}")
+            return
+        self._profile = profile
+        self._step_started = time.perf_counter()
+        self.steps = step + 1
+
+    def end_step(self):
+        """Stop profiling the current step and dump it."""
+        if self._profile is None:
+            return
+        self._profile.disable()
+        self._step_times.append(time.perf_counter() - self._step_started)
+        self._profile.dump_stats(str(self.dir / f"step_{self.steps:03d}.prof"))
+        self._profile = None
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        End the last step, take the end snapshot and write the merged profile and summary.
+
+        Returns:
+            The summary (also written to ``summary.json``).
+        """
+        self.end_step()
+        summary: Dict[str, Any] = {
+            "task_id": self.task_id,
+            "dir": str(self.dir),
+            "steps": self.steps,
+            "wall_s": round(time.perf_counter() - self._started, 3),
+            "step_wall_s": [round(t, 3) for t in self._step_times],
+        }
+
+        step_files = sorted(self.dir.glob("step_*.prof"))
+        if step_files:
+            stats = pstats.Stats(str(step_files[0]))
+            for path in step_files[1:]:
+                stats.add(str(path))
+            stats.dump_stats(str(self.dir / "task.prof"))
+            summary["top_cumulative"] = top_functions(stats, self.top)
+            text = io.StringIO()
+            stats.stream = text
+            stats.sort_stats("cumulative").print_stats(self.top)
+            report = text.getvalue()
+        else:
+            summary["top_cumulative"] = []
+            report = "No step was profiled.\n"
+
+        if self._start_snapshot is not None and tracemalloc.is_tracing():
+            end_snapshot = tracemalloc.take_snapshot()
+            end_snapshot.dump(str(self.dir / "end.tracemalloc"))
+            summary["memory_growth"] = memory_growth(self._start_snapshot, end_snapshot)
+            current, peak = tracemalloc.get_traced_memory()
+            summary["traced_memory_kb"] = {"current": round(current / 1024, 1), "peak": round(peak / 1024, 1)}
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        growth = "\n".join(f"{row['size_diff_kb']:>10.1f} KiB  {row['site']}" for row in summary.get("memory_growth", []))
+        (self.dir / "summary.json").write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+        (self.dir / "summary.txt").write_text(
+            f"Task {self.task_id}: {self.steps} steps, {summary['wall_s']} s\n\n"
+            f"== Top functions by cumulative time ==\n{report}\n"
+            f"== Memory growth (task start -> end) ==\n{growth or 'none'}\n",
+            encoding="utf-8")
+        return summary
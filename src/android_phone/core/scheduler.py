@@ -0,0 +1,406 @@
+"""
+Task queue and scheduler for running many goals across several devices.
+
+Goals are queued as :class:`TaskSpec` (priority, device affinity, retries).
+Each device gets one worker thread, so a phone never runs two tasks at once,
+and a global cap limits how many devices work at the same time. Workers
+pick the highest-priority task they are eligible for, transient failures are
+re-queued, and :func:`summarize_outcomes` turns the results into a
+throughput / latency report.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Agent statuses worth another attempt (device dropped, model API down...).
+# "failed" (max steps reached) is a property of the goal, not transient.
+RETRYABLE_STATUSES = frozenset({"error"})
+
+
+@dataclass
+class TaskSpec:
+    """
+    One queued goal.
+
+    Args:
+        goal: Natural language goal for the agent.
+        priority: Higher runs first; ties run in submission order.
+        serial: Only run on this device.
+        required_app: Only run on devices that have this package installed.
+        max_steps: Agent step budget.
+        eco_mode: Run the agent in eco mode.
+        max_retries: Extra attempts after a transient failure.
+    """
+    goal: str
+    priority: int = 0
+    serial: Optional[str] = None
+    required_app: Optional[str] = None
+    max_steps: int = 50
+    eco_mode: bool = False
+    max_retries: int = 1
+    task_id: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TaskSpec":
+        known = set(cls.__dataclass_fields__)
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown task field(s): {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+
+@dataclass
+class TaskOutcome:
+    spec: TaskSpec
+    status: str
+    result: str = ""
+    serial: Optional[str] = None
+    attempts: int = 0
+    steps: int = 0
+    usage: Dict[str, Any] = field(default_factory=dict)
+    queued_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def latency_s(self) -> Optional[float]:
+        """Queue-to-finish time."""
+        return None if self.finished_at is None else self.finished_at - self.queued_at
+
+    @property
+    def run_s(self) -> Optional[float]:
+        """Time on the device (last attempt)."""
+        if self.finished_at is None or self.started_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["latency_s"] = None if self.latency_s is None else round(self.latency_s, 3)
+        data["run_s"] = None if self.run_s is None else round(self.run_s, 3)
+        return data
+
+
+def load_tasks(path: str) -> List[TaskSpec]:
+    """
+    Read a task file: a JSON list, JSON lines (one object or goal string per
+    line), or plain text with one goal per line (``#`` starts a comment).
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    stripped = text.strip()
+    if stripped.startswith("["):
+        items = json.loads(stripped)
+    else:
+        items = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            items.append(json.loads(line) if line[0] in "{\"" else line)
+    return [TaskSpec(goal=item) if isinstance(item, str) else TaskSpec.from_dict(item) for item in items]
+
+
+def discover_devices() -> List[str]:
+    """Serials of the devices adb reports as ready."""
+    # adbutils comes with uiautomator2; imported lazily like the rest of the device stack
+    import adbutils
+
+    return [d.serial for d in adbutils.adb.device_list()]
+
+
+class AgentRunner:
+    """
+    Default task runner: one warm ``AndroidController`` per device, a fresh
+    agent per task.
+
+    Args:
+        backend: Backend name for ``create_backend`` (env default when None).
+        model: Model id override.
+        base_url: Endpoint override.
+        log_dir: Agent log directory.
+    """
+
+    def __init__(self, backend: Optional[str] = None, model: Optional[str] = None,
+                 base_url: Optional[str] = None, log_dir: str = ".log"):
+        self.backend = backend
+        self.model = model
+        self.base_url = base_url
+        self.log_dir = log_dir
+        self._controllers: Dict[str, Any] = {}
+        self._apps: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def controller(self, serial: str):
+        from android_phone.core.controller import AndroidController
+
+        with self._lock:
+            controller = self._controllers.get(serial)
+            if controller is None:
+                controller = self._controllers[serial] = AndroidController(serial)
+        if controller.health is None:
+            monitor = controller.start_health_monitor()
+            try:
+                monitor.connect(retry=False)
+            except Exception:
+                # Drop the armed monitor so the next task connects again
+                controller.stop_health_monitor()
+                raise
+        return controller
+
+    def has_app(self, serial: str, package: str) -> bool:
+        """Whether ``package`` is installed on the device (package list cached per device)."""
+        if serial not in self._apps:
+            self._apps[serial] = set(self.controller(serial).list_apps())
+        return package in self._apps[serial]
+
+    def __call__(self, spec: TaskSpec, serial: str) -> Dict[str, Any]:
+        from android_phone.core.agent import AutonomousAgent
+        from android_phone.integrations.backends import create_backend
+
+        controller = self.controller(serial)
+        client = create_backend(self.backend, model=self.model, base_url=self.base_url, eco_mode=spec.eco_mode)
+        agent = AutonomousAgent(controller, client, eco_mode=spec.eco_mode, log_dir=self.log_dir)
+        return agent.run(spec.goal, max_steps=spec.max_steps)
+
+    def close(self):
+        for controller in self._controllers.values():
+            controller.stop_health_monitor()
+
+
+class Scheduler:
+    """
+    Dispatch queued goals to idle devices.
+
+    Args:
+        devices: Device serials; one worker (and at most one running task) each.
+        runner: ``runner(spec, serial) -> agent result dict``.
+        max_concurrency: Devices allowed to run at the same time (default: all).
+        app_checker: ``app_checker(serial, package) -> bool`` for ``required_app``
+            affinity; defaults to ``runner.has_app`` when available.
+        retry_delay: Seconds a failed task waits before it can be picked again.
+    """
+
+    def __init__(self, devices: List[str], runner: Callable[[TaskSpec, str], Dict[str, Any]],
+                 max_concurrency: Optional[int] = None,
+                 app_checker: Optional[Callable[[str, str], bool]] = None, retry_delay: float = 2.0):
+        if not devices:
+            raise ValueError("Scheduler needs at least one device")
+        self.devices = list(dict.fromkeys(devices))
+        self.runner = runner
+        self.max_concurrency = max(1, min(max_concurrency or len(self.devices), len(self.devices)))
+        self.app_checker = app_checker or getattr(runner, "has_app", None)
+        self.retry_delay = retry_delay
+        self.outcomes: List[TaskOutcome] = []
+        # Heap of (-priority, seq, not_before, outcome)
+        self._queue: List[Any] = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._cond = threading.Condition()
+        # (serial, package) -> installed; filled by submit() outside the lock, only read under it
+        self._app_cache: Dict[Any, bool] = {}
+
+    def submit(self, spec: TaskSpec) -> TaskOutcome:
+        """Queue a task; returns its (live) outcome record."""
+        seq = next(self._seq)
+        if spec.task_id is None:
+            spec.task_id = f"task-{seq}"
+        self._check_apps(spec)
+        outcome = TaskOutcome(spec=spec, status="queued", queued_at=time.monotonic())
+        with self._cond:
+            self.outcomes.append(outcome)
+            if spec.serial and spec.serial not in self.devices:
+                self._finish(outcome, "unschedulable", f"Device {spec.serial} is not available")
+            else:
+                heapq.heappush(self._queue, (-spec.priority, seq, 0.0, outcome))
+            self._cond.notify_all()
+        return outcome
+
+    def _finish(self, outcome: TaskOutcome, status: str, result: str):
+        outcome.status = status
+        outcome.result = result
+        outcome.finished_at = time.monotonic()
+
+    def _eligible(self, spec: TaskSpec, serial: str) -> bool:
+        if spec.serial and spec.serial != serial:
+            return False
+        if spec.required_app:
+            return self._has_app(serial, spec.required_app)
+        return True
+
+    def _check_apps(self, spec: TaskSpec):
+        """
+        Resolve ``required_app`` on every device the task may run on. The
+        checker connects to the device, so this runs before the task is queued
+        and without the lock: a slow or unreachable device must not stall the
+        workers.
+        """
+        if not spec.required_app or self.app_checker is None:
+            return
+        for serial in self.devices:
+            key = (serial, spec.required_app)
+            if (spec.serial and spec.serial != serial) or key in self._app_cache:
+                continue
+            try:
+                installed = bool(self.app_checker(serial, spec.required_app))
+            except Exception as e:
+                logger.warning(f"Could not check {spec.required_app} on {serial}: {e}")
+                installed = False
+            with self._cond:
+                self._app_cache[key] = installed
+
+    def _has_app(self, serial: str, package: str) -> bool:
+        # Called with the lock held: only reads what _check_apps() resolved
+        if self.app_checker is None:
+            return True
+        return self._app_cache.get((serial, package), False)
+
+    def _drop_unschedulable(self):
+        """Fail tasks that no device can ever run (missing required app everywhere)."""
+        keep = []
+        for item in self._queue:
+            spec = item[3].spec
+            if spec.required_app and not any(self._eligible(spec, s) for s in self.devices):
+                self._finish(item[3], "unschedulable", f"No device has {spec.required_app} installed")
+            else:
+                keep.append(item)
+        if len(keep) != len(self._queue):
+            self._queue = keep
+            heapq.heapify(self._queue)
+
+    def _take(self, serial: str) -> Optional[TaskOutcome]:
+        """Block until a task this device may run is available; None when all work is done."""
+        with self._cond:
+            while True:
+                if not self._queue and self._running == 0:
+                    self._cond.notify_all()
+                    return None
+                now = time.monotonic()
+                wake_at = None
+                # The global cap is checked before picking, so a task is never
+                # parked on a device that is waiting for a free slot
+                candidates = sorted(self._queue) if self._running < self.max_concurrency else []
+                for item in candidates:
+                    not_before, outcome = item[2], item[3]
+                    if not self._eligible(outcome.spec, serial):
+                        continue
+                    if not_before > now:
+                        wake_at = not_before if wake_at is None else min(wake_at, not_before)
+                        continue
+                    self._queue.remove(item)
+                    heapq.heapify(self._queue)
+                    self._running += 1
+                    return outcome
+                self._cond.wait(timeout=None if wake_at is None else max(0.0, wake_at - now))
+
+    def _worker(self, serial: str):
+        while True:
+            outcome = self._take(serial)
+            if outcome is None:
+                return
+            try:
+                self._run(outcome, serial)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+
+    def _run(self, outcome: TaskOutcome, serial: str):
+        spec = outcome.spec
+        outcome.attempts += 1
+        outcome.serial = serial
+        outcome.status = "running"
+        outcome.started_at = time.monotonic()
+        logger.info(f"[{spec.task_id}] attempt {outcome.attempts} on {serial}: {spec.goal}")
+        try:
+            result = self.runner(spec, serial) or {}
+            status = result.get("status", "error")
+            message = str(result.get("result", ""))
+            outcome.steps = result.get("steps", 0)
+            outcome.usage = result.get("total_usage", {})
+        except Exception as e:
+            logger.error(f"[{spec.task_id}] crashed on {serial}: {e}")
+            status, message = "error", str(e)
+
+        if status in RETRYABLE_STATUSES and outcome.attempts <= spec.max_retries:
+            logger.warning(f"[{spec.task_id}] {status} ({message}), re-queueing")
+            outcome.status = "retrying"
+            outcome.result = message
+            with self._cond:
+                heapq.heappush(self._queue, (-spec.priority, next(self._seq),
+                                             time.monotonic() + self.retry_delay, outcome))
+            return
+        self._finish(outcome, status, message)
+        logger.info(f"[{spec.task_id}] {status} on {serial} after {outcome.attempts} attempt(s)")
+
+    def run(self, tasks: Optional[List[TaskSpec]] = None) -> Dict[str, Any]:
+        """Run queued (plus ``tasks``) to completion and return the summary report."""
+        started = time.monotonic()
+        for spec in tasks or []:
+            self.submit(spec)
+        with self._cond:
+            self._drop_unschedulable()
+        workers = [threading.Thread(target=self._worker, args=(serial,), name=f"scheduler-{serial}", daemon=True)
+                   for serial in self.devices]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return summarize_outcomes(self.outcomes, time.monotonic() - started, self.devices, self.max_concurrency)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize_outcomes(outcomes: List[TaskOutcome], wall_s: float, devices: Optional[List[str]] = None,
+                       max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """Throughput / latency report for a finished batch."""
+    by_status: Dict[str, int] = {}
+    per_device: Dict[str, Dict[str, Any]] = {serial: {"tasks": 0, "busy_s": 0.0} for serial in devices or []}
+    latencies, run_times = [], []
+    for outcome in outcomes:
+        by_status[outcome.status] = by_status.get(outcome.status, 0) + 1
+        if outcome.latency_s is not None and outcome.started_at is not None:
+            latencies.append(outcome.latency_s)
+        if outcome.run_s is not None:
+            run_times.append(outcome.run_s)
+            device = per_device.setdefault(outcome.serial, {"tasks": 0, "busy_s": 0.0})
+            device["tasks"] += 1
+            device["busy_s"] += outcome.run_s
+    for device in per_device.values():
+        device["busy_s"] = round(device["busy_s"], 3)
+        device["utilization"] = round(device["busy_s"] / wall_s, 3) if wall_s > 0 else 0.0
+
+    finished = sum(count for status, count in by_status.items() if status in ("completed", "failed", "error"))
+    report: Dict[str, Any] = {
+        "tasks": len(outcomes),
+        "by_status": by_status,
+        "retries": sum(max(0, o.attempts - 1) for o in outcomes),
+        "wall_s": round(wall_s, 3),
+        "throughput_per_min": round(finished / wall_s * 60, 3) if wall_s > 0 else 0.0,
+        "devices": per_device,
+        "max_concurrency": max_concurrency,
+        "outcomes": [o.to_dict() for o in outcomes],
+    }
+    if latencies:
+        report["latency_s"] = {
+            "mean": round(statistics.fmean(latencies), 3),
+            "p50": round(_percentile(latencies, 0.5), 3),
+            "p95": round(_percentile(latencies, 0.95), 3),
+            "max": round(max(latencies), 3),
+        }
+    if run_times:
+        report["run_s"] = {"mean": round(statistics.fmean(run_times), 3), "max": round(max(run_times), 3)}
+    return report
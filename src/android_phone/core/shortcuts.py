@@ -0,0 +1,236 @@
+"""
+Intent / deep-link shortcut registry.
+
+Many tasks start by navigating to the same page ("打开WLAN设置", "打开网址
+https://...", "微信扫一扫"). A shortcut maps a goal pattern to an ``am start``
+intent (action, data URI / deep link, component, extras) that jumps straight
+there, followed by a readiness check. The agent tries the registry before its
+first model call; the model only takes over for the rest of the goal.
+
+Registry file (``ANDROID_AGENT_SHORTCUTS_FILE``), entries are tried in order
+and before the built-in ones::
+
+    {"shortcuts": [
+        {"name": "taobao_search",
+         "description": "Taobao search results",
+         "patterns": ["^(?:在)?淘宝(?:上)?搜索?(?P<query>\\\\S+)"],
+         "intent": {"action": "android.intent.action.VIEW",
+                    "data": "taobao://s.taobao.com/search?q={query|url}"},
+         "ready": {"activity": "com.taobao.taobao/", "timeout": 8}}
+    ]}
+
+``{name}`` in the intent is replaced by the named group of the pattern (or
+``defaults``); ``{name|url}`` URL-encodes the value. Whatever follows the match
+in the goal is handed to the model.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from android_phone.core.apps import LEADING_SEPARATORS
+
+logger = logging.getLogger(__name__)
+
+# Intent fields understood by AndroidController.start_intent()
+INTENT_FIELDS = ("action", "data", "component", "package", "category", "mime_type", "extras")
+# Readiness conditions: foreground "package/activity" prefix and/or an element on screen
+READY_FIELDS = ("activity", "text", "description", "resource_id", "timeout")
+
+DEFAULT_READY_TIMEOUT = 5.0
+
+_PLACEHOLDER = re.compile(r"\{(\w+)(\|url)?\}")
+
+BUILTIN_SHORTCUTS: List[Dict[str, Any]] = [
+    {
+        "name": "wifi_settings",
+        "description": "Wi-Fi settings",
+        "patterns": [r"^(?:打开|进入)?(?:WLAN|Wi-?Fi|无线网络?)设置", r"^(?:open|go to) (?:the )?(?:wi-?fi|wlan) settings"],
+        "intent": {"action": "android.settings.WIFI_SETTINGS"},
+    },
+    {
+        "name": "bluetooth_settings",
+        "description": "Bluetooth settings",
+        "patterns": [r"^(?:打开|进入)?蓝牙设置", r"^(?:open|go to) (?:the )?bluetooth settings"],
+        "intent": {"action": "android.settings.BLUETOOTH_SETTINGS"},
+    },
+    {
+        "name": "display_settings",
+        "description": "display settings",
+        "patterns": [r"^(?:打开|进入)?(?:显示|显示和亮度|屏幕)设置", r"^(?:open|go to) (?:the )?display settings"],
+        "intent": {"action": "android.settings.DISPLAY_SETTINGS"},
+    },
+    {
+        "name": "open_url",
+        "description": "the web page",
+        "patterns": [r"^(?:打开|访问|open|visit)\s*(?:网址|网页|链接|the )?\s*(?P<url>https?://[^\s,，。]+)"],
+        "intent": {"action": "android.intent.action.VIEW", "data": "{url}"},
+    },
+]
+
+
+def _render(value: Any, params: Dict[str, str]) -> Any:
+    """Substitute ``{name}`` / ``{name|url}`` placeholders (KeyError on a missing parameter)."""
+    if isinstance(value, dict):
+        return {k: _render(v, params) for k, v in value.items()}
+    if not isinstance(value, str):
+        return value
+
+    def substitute(match):
+        text = params[match.group(1)]
+        return urllib.parse.quote(text, safe="") if match.group(2) else text
+
+    return _PLACEHOLDER.sub(substitute, value)
+
+
+@dataclass
+class Shortcut:
+    """
+    A goal pattern and the intent that navigates to it.
+
+    Args:
+        name: Unique name (used by the MCP ``run_shortcut`` tool).
+        patterns: Regexes matched at the start of the goal (case-insensitive); named groups become parameters.
+        intent: ``am start`` fields (see ``INTENT_FIELDS``), with ``{param}`` placeholders.
+        description: What the intent opens, e.g. "Wi-Fi settings" (shown to the model).
+        ready: Readiness check (see ``READY_FIELDS``); by default the foreground activity must change.
+        defaults: Parameter values used when a group did not match.
+    """
+    name: str
+    patterns: List[str]
+    intent: Dict[str, Any]
+    description: str = ""
+    ready: Dict[str, Any] = field(default_factory=dict)
+    defaults: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        unknown = set(self.intent) - set(INTENT_FIELDS)
+        if unknown:
+            raise ValueError(f"Shortcut {self.name!r}: unknown intent fields {sorted(unknown)}")
+        unknown = set(self.ready) - set(READY_FIELDS)
+        if unknown:
+            raise ValueError(f"Shortcut {self.name!r}: unknown ready fields {sorted(unknown)}")
+        self._compiled = [re.compile(p, re.IGNORECASE) for p in self.patterns]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Shortcut":
+        patterns = data.get("patterns") or ([data["pattern"]] if "pattern" in data else [])
+        return cls(name=data["name"], patterns=list(patterns), intent=dict(data["intent"]),
+                   description=data.get("description", ""), ready=dict(data.get("ready", {})),
+                   defaults=dict(data.get("defaults", {})))
+
+    def match(self, goal: str) -> Optional[Tuple[Dict[str, str], str]]:
+        """(parameters, rest of the goal) if a pattern matches the start of ``goal``."""
+        for pattern in self._compiled:
+            m = pattern.match(goal.strip())
+            if m:
+                params = dict(self.defaults)
+                params.update({k: v.strip() for k, v in m.groupdict().items() if v is not None})
+                rest = LEADING_SEPARATORS.sub("", goal.strip()[m.end():], count=1).strip()
+                return params, rest
+        return None
+
+    def render(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """The intent with its placeholders filled in."""
+        return _render(self.intent, {**self.defaults, **params})
+
+    @property
+    def params(self) -> List[str]:
+        """Parameter names (named groups of the patterns and defaults)."""
+        names = set(self.defaults)
+        for pattern in self._compiled:
+            names.update(pattern.groupindex)
+        return sorted(names)
+
+    @property
+    def title(self) -> str:
+        return self.description or self.name
+
+
+class ShortcutRegistry:
+    """
+    Ordered shortcuts: entries of the registry file first, then the built-in ones.
+
+    Args:
+        shortcuts: Shortcut definitions (dicts or ``Shortcut``); default: the registry file plus ``BUILTIN_SHORTCUTS``.
+        path: Registry JSON file (env ``ANDROID_AGENT_SHORTCUTS_FILE``).
+        builtin: Include ``BUILTIN_SHORTCUTS``.
+    """
+
+    def __init__(self, shortcuts: Optional[List[Any]] = None, path: Optional[str] = None, builtin: bool = True):
+        self.path = path or os.environ.get("ANDROID_AGENT_SHORTCUTS_FILE")
+        entries: List[Any] = list(shortcuts or [])
+        if self.path:
+            entries += self._load(self.path)
+        if builtin:
+            entries += BUILTIN_SHORTCUTS
+        self.shortcuts: List[Shortcut] = []
+        for entry in entries:
+            shortcut = entry if isinstance(entry, Shortcut) else Shortcut.from_dict(entry)
+            # The first definition of a name wins, so the file can override a built-in shortcut
+            if self.get(shortcut.name) is None:
+                self.shortcuts.append(shortcut)
+
+    @staticmethod
+    def _load(path: str) -> List[Dict[str, Any]]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read shortcut registry {path}: {e}")
+            return []
+        return data.get("shortcuts", []) if isinstance(data, dict) else data
+
+    def get(self, name: str) -> Optional[Shortcut]:
+        return next((s for s in self.shortcuts if s.name == name), None)
+
+    def match(self, goal: str) -> Optional[Tuple[Shortcut, Dict[str, str], str]]:
+        """First shortcut matching the goal, as (shortcut, parameters, rest of the goal)."""
+        for shortcut in self.shortcuts:
+            matched = shortcut.match(goal)
+            if matched is not None:
+                return shortcut, matched[0], matched[1]
+        return None
+
+    def execute(self, controller, shortcut: Shortcut, params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Start the shortcut's intent and wait until its target is ready.
+
+        Returns:
+            ``ok`` (intent started and target ready), ``started``, ``ready``, ``elapsed_ms``
+            and ``error`` on failure.
+        """
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"name": shortcut.name, "ok": False, "started": False, "ready": False}
+        try:
+            intent = shortcut.render(params or {})
+        except KeyError as e:
+            result["error"] = f"missing parameter {e.args[0]!r}"
+            return result
+
+        ready = shortcut.ready
+        timeout = float(ready.get("timeout", DEFAULT_READY_TIMEOUT))
+        before = "" if ready.get("activity") else controller.current_activity()
+        result["started"] = controller.start_intent(**intent)
+        if not result["started"]:
+            result["error"] = "am start failed"
+        else:
+            deadline = time.monotonic() + timeout
+            if ready.get("activity"):
+                result["ready"] = controller.wait_for_activity(ready["activity"], timeout=timeout)
+            else:
+                result["ready"] = controller.wait_for_activity_change(before, timeout=timeout)
+            selector = {k: ready[k] for k in ("text", "description", "resource_id") if ready.get(k)}
+            if result["ready"] and selector:
+                remaining = max(deadline - time.monotonic(), 0.5)
+                result["ready"] = controller.wait_for_element(timeout=remaining, **selector)["matched"]
+            if not result["ready"]:
+                result["error"] = "target not ready"
+        result["ok"] = result["started"] and result["ready"]
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+        return result
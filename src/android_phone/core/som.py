@@ -0,0 +1,127 @@
+"""
+Set-of-Mark observations.
+
+Numbered boxes are drawn over the interactive nodes of the UI hierarchy, so
+the model can answer ``click(element=N)`` instead of guessing coordinates.
+The controller resolves the number back to the node's exact bounds.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from android_phone.core.hierarchy import Bounds, bounds_area, bounds_center, iter_nodes, parse_bounds, parse_hierarchy
+
+logger = logging.getLogger(__name__)
+
+# Attributes that make a node worth marking
+INTERACTIVE_ATTRS = ("clickable", "long-clickable", "checkable", "scrollable")
+EDITABLE_CLASSES = ("EditText", "AutoCompleteTextView")
+# Smaller nodes are usually decorations inside a larger target
+MIN_SIDE = 24
+MAX_MARKS = 60
+LABEL_CHARS = 24
+
+# Box colours, cycled so that neighbouring marks are easy to tell apart
+COLORS = [(230, 25, 75), (60, 180, 75), (0, 130, 200), (245, 130, 48), (145, 30, 180), (0, 128, 128)]
+
+
+@dataclass
+class Mark:
+    id: int
+    bounds: Bounds
+    label: str = ""
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        return bounds_center(self.bounds)
+
+
+def _label(node) -> str:
+    text = node.get("text") or node.get("content-desc") or ""
+    if not text:
+        resource_id = node.get("resource-id") or ""
+        text = resource_id.rsplit("/", 1)[-1]
+    text = " ".join(text.split())
+    return text[:LABEL_CHARS - 1] + "…" if len(text) > LABEL_CHARS else text
+
+
+def _interactive(node) -> bool:
+    if any(node.get(attr) == "true" for attr in INTERACTIVE_ATTRS):
+        return True
+    return (node.get("class") or "").endswith(EDITABLE_CLASSES)
+
+
+def _descendant_label(node) -> str:
+    """Label of a clickable container, taken from its first labelled descendant."""
+    for child in node.iter("node"):
+        label = _label(child)
+        if label:
+            return label
+    return ""
+
+
+def extract_marks(xml: str, screen_size: Optional[Tuple[int, int]] = None, max_marks: int = MAX_MARKS) -> List[Mark]:
+    """
+    Interactive, on-screen nodes of a hierarchy dump, numbered from 1 in
+    reading order (top to bottom, left to right).
+
+    Scrollable containers are only kept when nothing else covers them, and a
+    node with the same bounds as an already kept one is skipped.
+    """
+    root = parse_hierarchy(xml)
+    candidates = []
+    seen = set()
+    for node in iter_nodes(root):
+        if not _interactive(node) or node.get("enabled") == "false":
+            continue
+        bounds = parse_bounds(node.get("bounds"))
+        if not bounds:
+            continue
+        if screen_size:
+            x1, y1, x2, y2 = bounds
+            bounds = (max(0, x1), max(0, y1), min(screen_size[0], x2), min(screen_size[1], y2))
+        if bounds[2] - bounds[0] < MIN_SIDE or bounds[3] - bounds[1] < MIN_SIDE or bounds in seen:
+            continue
+        seen.add(bounds)
+        only_scrollable = node.get("scrollable") == "true" and not any(
+            node.get(attr) == "true" for attr in INTERACTIVE_ATTRS if attr != "scrollable")
+        candidates.append((only_scrollable, bounds, _label(node) or _descendant_label(node)))
+
+    # Containers that only scroll are big and would hide everything inside them
+    kept = [c for c in candidates if not c[0]] or candidates
+    kept.sort(key=lambda c: (c[1][1], c[1][0], bounds_area(c[1])))
+    if len(kept) > max_marks:
+        logger.debug(f"Set-of-Mark: {len(kept)} interactive nodes, keeping the first {max_marks}")
+    return [Mark(id=i + 1, bounds=bounds, label=label) for i, (_, bounds, label) in enumerate(kept[:max_marks])]
+
+
+def draw_marks(image, marks: List[Mark]):
+    """Copy of ``image`` with a numbered box per mark (drawn at full resolution, before any downscale)."""
+    from PIL import ImageDraw, ImageFont
+
+    annotated = image.convert("RGB") if image.mode != "RGB" else image.copy()
+    draw = ImageDraw.Draw(annotated)
+    font_px = max(14, annotated.width // 30)
+    try:
+        font = ImageFont.load_default(size=font_px)
+    except TypeError:  # Pillow < 10.1 has a single bitmap size
+        font = ImageFont.load_default()
+    line = max(2, annotated.width // 360)
+    for mark in marks:
+        color = COLORS[(mark.id - 1) % len(COLORS)]
+        x1, y1, x2, y2 = mark.bounds
+        draw.rectangle([x1, y1, x2 - 1, y2 - 1], outline=color, width=line)
+        tag = str(mark.id)
+        left, top, right, bottom = draw.textbbox((0, 0), tag, font=font)
+        pad = max(2, font_px // 6)
+        tag_w, tag_h = right - left + 2 * pad, bottom - top + 2 * pad
+        # Tag sits in the top-left corner, inside the box so it never covers a neighbour's tag
+        draw.rectangle([x1, y1, x1 + tag_w, y1 + tag_h], fill=color)
+        draw.text((x1 + pad - left, y1 + pad - top), tag, fill=(255, 255, 255), font=font)
+    return annotated
+
+
+def marks_legend(marks: List[Mark]) -> str:
+    """One-line text index of the marks (``[1] Settings; [2] Search...``)."""
+    return "; ".join(f"[{m.id}] {m.label}" if m.label else f"[{m.id}]" for m in marks)
@@ -0,0 +1,180 @@
+import base64
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class TrajectoryArchive:
+    """
+    Per-task trajectory archive used to reproduce and re-profile runs offline.
+
+    Layout (one directory per task):
+        meta.json                 goal, device geometry, final result
+        steps.jsonl               one entry per step (frame/hierarchy refs, observation, raw model output, timings)
+        frames/<sha1>.webp        deduplicated observation frames
+        hierarchies/<sha1>.xml.gz deduplicated compact hierarchies
+
+    Frames and hierarchies are content-addressed, so a static screen is stored
+    once. Once ``max_bytes`` is reached, further blobs are dropped (the step
+    entry keeps a ``null`` reference) while step metadata is still recorded.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, webp_quality: int = 75):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.webp_quality = webp_quality
+        self.frames_dir = self.path / "frames"
+        self.hierarchies_dir = self.path / "hierarchies"
+        self.bytes_written = 0
+        self.dropped = 0
+        self._known: Dict[str, str] = {}
+
+    @classmethod
+    def create(cls, root: str, task_id: str, **kwargs) -> "TrajectoryArchive":
+        """Create a fresh archive directory ``<root>/<task_id>``."""
+        archive = cls(os.path.join(root, task_id), **kwargs)
+        archive.frames_dir.mkdir(parents=True, exist_ok=True)
+        archive.hierarchies_dir.mkdir(parents=True, exist_ok=True)
+        return archive
+
+    # --- writing ---
+
+    def _write_blob(self, path: Path, data: bytes) -> bool:
+        if self.bytes_written + len(data) > self.max_bytes:
+            self.dropped += 1
+            logger.warning(f"Trajectory archive size cap reached ({self.max_bytes} bytes), dropping {path.name}")
+            return False
+        path.write_bytes(data)
+        self.bytes_written += len(data)
+        return True
+
+    def add_frame(self, image_b64: str) -> Optional[str]:
+        """Store a base64 JPEG frame as WebP. Returns its content hash, or None if dropped."""
+        if not image_b64:
+            return None
+        raw = base64.b64decode(image_b64)
+        digest = hashlib.sha1(raw).hexdigest()
+        if digest in self._known:
+            return digest
+
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.open(io.BytesIO(raw)).save(buffer, format="WEBP", quality=self.webp_quality)
+        if not self._write_blob(self.frames_dir / f"{digest}.webp", buffer.getvalue()):
+            return None
+        self._known[digest] = "frame"
+        return digest
+
+    def add_hierarchy(self, xml: str) -> Optional[str]:
+        """Store a (compact) hierarchy gzip-compressed. Returns its content hash, or None if dropped."""
+        if not xml:
+            return None
+        raw = xml.encode("utf-8")
+        digest = hashlib.sha1(raw).hexdigest()
+        if digest in self._known:
+            return digest
+        if not self._write_blob(self.hierarchies_dir / f"{digest}.xml.gz", gzip.compress(raw)):
+            return None
+        self._known[digest] = "hierarchy"
+        return digest
+
+    def _write_meta(self, meta: Dict[str, Any]):
+        with open(self.path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def start(self, task_id: str, goal: str, **extra):
+        """Record task metadata (goal, device geometry, observation settings...)."""
+        meta = {"task_id": task_id, "goal": goal, "started_at": datetime.now().isoformat()}
+        meta.update(extra)
+        self._write_meta(meta)
+
+    def record_step(
+        self,
+        step: int,
+        instruction: str,
+        image_b64: Optional[str],
+        raw_content: str,
+        usage: Dict[str, Any],
+        action: Optional[Dict[str, Any]] = None,
+        result: str = "",
+        timings: Optional[Dict[str, float]] = None,
+        hierarchy: Optional[str] = None,
+        observation: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Append one step. Blobs are deduplicated by content hash.
+
+        ``observation`` describes the sent image (scale, quality, and the
+        ``zoom`` region when it was a close-up rather than the full screen).
+        """
+        entry = {
+            "step": step,
+            "timestamp": datetime.now().isoformat(),
+            "instruction": instruction,
+            "frame": self.add_frame(image_b64),
+            "observation": observation,
+            "hierarchy": self.add_hierarchy(hierarchy) if hierarchy else None,
+            "raw_content": raw_content,
+            "usage": usage,
+            "action": action,
+            "result": result,
+            "timings_ms": timings or {},
+        }
+        with open(self.path / "steps.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+    def finish(self, result: str, status: str, steps: int):
+        """Add the task outcome and archive statistics to meta.json."""
+        meta = self.load_meta()
+        meta.update({
+            "finished_at": datetime.now().isoformat(),
+            "status": status,
+            "result": result,
+            "steps": steps,
+            "archive_bytes": self.bytes_written,
+            "dropped_blobs": self.dropped,
+        })
+        self._write_meta(meta)
+
+    # --- reading ---
+
+    def load_meta(self) -> Dict[str, Any]:
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return {}
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_steps(self) -> List[Dict[str, Any]]:
+        steps = []
+        steps_path = self.path / "steps.jsonl"
+        if not steps_path.exists():
+            return steps
+        with open(steps_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    steps.append(json.loads(line))
+        return steps
+
+    def load_frame(self, digest: str):
+        """Return the archived frame as a PIL image."""
+        from PIL import Image
+
+        with Image.open(self.frames_dir / f"{digest}.webp") as image:
+            return image.convert("RGB")
+
+    def load_hierarchy(self, digest: str) -> str:
+        return gzip.decompress((self.hierarchies_dir / f"{digest}.xml.gz").read_bytes()).decode("utf-8")
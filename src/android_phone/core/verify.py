@@ -0,0 +1,103 @@
+"""
+Post-action effect verification.
+
+An input RPC that went through says nothing about what happened on screen.
+After each action the agent compares the frame (and foreground activity)
+before and after it, classifies the effect, and reports that to the model
+instead of a blanket "Click successful".
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from android_phone.core.fingerprint import changed_fraction, fingerprint_distance
+
+logger = logging.getLogger(__name__)
+
+NO_EFFECT = "no_effect"
+NAVIGATION = "navigation"
+PARTIAL_CHANGE = "partial_change"
+
+# Actions whose effect is checked (zoom / wait / screenshot do not touch the UI)
+VERIFIED_ACTIONS = frozenset({"click", "left_double", "right_single", "long_press", "type", "scroll", "drag", "hotkey"})
+# Actions worth one local retry on a snapped target when they had no effect
+RETRYABLE_ACTIONS = frozenset({"click", "left_double", "right_single", "long_press"})
+
+# Share of changed fingerprint cells from which a change counts as a new screen
+NAVIGATION_FRACTION = 0.5
+# How far (share of the screen width) a missed tap may be snapped to the nearest interactive element
+SNAP_RADIUS = 0.08
+
+
+@dataclass
+class Effect:
+    outcome: str
+    distance: float
+    changed: float
+    activity_before: str = ""
+    activity_after: str = ""
+
+    def describe(self) -> str:
+        """Short English description for the next instruction."""
+        if self.outcome == NO_EFFECT:
+            return "the screen did not change"
+        if self.outcome == NAVIGATION:
+            if self.activity_after and self.activity_after != self.activity_before:
+                return f"a new screen opened ({self.activity_after})"
+            return "the screen changed completely"
+        return f"part of the screen changed ({self.changed:.0%})"
+
+    def to_dict(self):
+        return {"outcome": self.outcome, "distance": round(self.distance, 4), "changed": round(self.changed, 3)}
+
+
+def classify_effect(before: Optional[bytes], after: Optional[bytes], activity_before: str = "",
+                    activity_after: str = "", change_threshold: float = 0.005,
+                    navigation_fraction: float = NAVIGATION_FRACTION) -> Effect:
+    """
+    Classify the effect of an action from frame fingerprints taken before and after it.
+
+    Args:
+        before, after: Fingerprints (see ``frame_fingerprint``).
+        activity_before, activity_after: Foreground "package/activity" ("" if unknown).
+        change_threshold: Fingerprint distance below which the screen counts as unchanged.
+        navigation_fraction: Share of changed cells from which the change counts as a new screen.
+    """
+    distance = fingerprint_distance(before, after)
+    changed = changed_fraction(before, after)
+    if activity_before and activity_after and activity_before != activity_after:
+        outcome = NAVIGATION
+    elif distance < change_threshold:
+        outcome = NO_EFFECT
+    elif changed >= navigation_fraction:
+        outcome = NAVIGATION
+    else:
+        outcome = PARTIAL_CHANGE
+    return Effect(outcome, distance, changed, activity_before, activity_after)
+
+
+def snap_target(xml: str, x: int, y: int, screen_size: Tuple[int, int],
+                radius: float = SNAP_RADIUS) -> Optional[Tuple[Tuple[int, int], str]]:
+    """
+    Nearest interactive element to a tap that missed, as ``((cx, cy), label)``.
+
+    Returns None when the point already lies on an interactive element (tapping
+    it again would not help) or nothing is within ``radius`` of the screen width.
+    """
+    from android_phone.core.som import extract_marks
+
+    marks = extract_marks(xml, screen_size=screen_size, max_marks=1000)
+    best = None
+    for mark in marks:
+        x1, y1, x2, y2 = mark.bounds
+        dx = max(x1 - x, 0, x - (x2 - 1))
+        dy = max(y1 - y, 0, y - (y2 - 1))
+        if dx == 0 and dy == 0:
+            return None
+        gap = (dx * dx + dy * dy) ** 0.5
+        if best is None or gap < best[0]:
+            best = (gap, mark)
+    if best is None or best[0] > radius * screen_size[0]:
+        return None
+    return best[1].center, best[1].label
@@ -0,0 +1,71 @@
+"""
+Pluggable VLM backends for the autonomous agent.
+
+A backend is anything that satisfies :class:`VLMBackend`. Two are built in:
+``volcengine`` (Ark, the default) and ``openai`` (any OpenAI-compatible
+``/chat/completions`` endpoint, e.g. a local vLLM / llama.cpp server).
+"""
+
+import os
+from typing import Any, Callable, Dict, Optional, Protocol, Tuple, Type, runtime_checkable
+
+from .openai_compat import OpenAICompatibleClient
+from .volcengine import VolcengineGUIClient
+
+DEFAULT_BACKEND = "volcengine"
+
+BACKENDS: Dict[str, Type[OpenAICompatibleClient]] = {
+    VolcengineGUIClient.name: VolcengineGUIClient,
+    OpenAICompatibleClient.name: OpenAICompatibleClient,
+}
+
+
+@runtime_checkable
+class VLMBackend(Protocol):
+    """What ``AutonomousAgent`` needs from a model backend."""
+
+    name: str
+    model: str
+    # Largest (width, height) screenshot worth sending to this backend
+    max_image_size: Tuple[int, int]
+    max_history_turns: int
+    max_history_images: int
+
+    def ask(self, instruction: str, image_b64: str,
+            on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Send one step; returns ``thought``, ``action_parsed``, ``raw_content`` and ``usage``."""
+        ...
+
+    def ask_text(self, instruction: str, on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Send a text-only turn that refers to the screenshot already in the history."""
+        ...
+
+    def reset_session(self) -> None:
+        """Forget the conversation history."""
+        ...
+
+
+def register_backend(name: str, cls: Type[OpenAICompatibleClient]):
+    """Make a backend class selectable by ``name`` (CLI ``--backend`` / ``ANDROID_AGENT_BACKEND``)."""
+    BACKENDS[name] = cls
+
+
+def create_backend(name: Optional[str] = None, model: Optional[str] = None, base_url: Optional[str] = None,
+                   api_key: Optional[str] = None, eco_mode: bool = False, **kwargs) -> VLMBackend:
+    """
+    Build the configured backend.
+
+    Args:
+        name: Backend name; defaults to ``ANDROID_AGENT_BACKEND`` or "volcengine".
+        model: Model id; defaults to ``ANDROID_AGENT_MODEL`` or the backend's default.
+        base_url: Endpoint base URL; defaults to ``ANDROID_AGENT_BASE_URL`` or the backend's default.
+        api_key: API key; defaults to the backend's own variable (``ARK_API_KEY`` / ``VLM_API_KEY``).
+        eco_mode: Use the backend's smaller history limits.
+        **kwargs: Passed to the backend constructor (request policy options...).
+    """
+    name = (name or os.environ.get("ANDROID_AGENT_BACKEND") or DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}'. Available: {', '.join(sorted(BACKENDS))}")
+    model = model or os.environ.get("ANDROID_AGENT_MODEL") or None
+    base_url = base_url or os.environ.get("ANDROID_AGENT_BASE_URL") or None
+    return BACKENDS[name](api_key=api_key, model=model, base_url=base_url, eco_mode=eco_mode, **kwargs)
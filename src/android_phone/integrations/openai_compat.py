@@ -0,0 +1,569 @@
+"""
+Generic client for OpenAI-compatible chat-completions endpoints.
+
+Holds everything that does not depend on the provider: multi-turn history
+with prefix-stable eviction and cached serialized message fragments, the
+request policy (retries, deadline, hedging, client-side rate limiting),
+streaming and response parsing. ``VolcengineGUIClient`` is a subclass, and
+the same class can point at a local VLM server (vLLM, llama.cpp, LM Studio,
+Ollama's ``/v1`` API...).
+"""
+
+import os
+import json
+import math
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Dict, Any, List, Callable, Tuple
+from .prompt import COMPUTER_USE_DOUBAO
+from .parser import parse_action_from_text
+from .payload import MessageList, dumps_message, encode_payload
+from .ratelimit import RateLimiter, estimate_request_tokens, shared_limiter
+
+logger = logging.getLogger(__name__)
+
+
+# HTTP statuses worth retrying: throttling, timeouts and transient server errors
+RETRYABLE_STATUS = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for transient failures (network errors, timeouts, 429 / 5xx); False for e.g. 400 / 401."""
+    import httpx
+
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, TimeoutError))
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a ``Retry-After`` header, if the server sent one."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _has_image(msg: Dict[str, Any]) -> bool:
+    return msg["role"] == "user" and isinstance(msg["content"], list) and \
+        any(item.get("type") == "image_url" for item in msg["content"])
+
+
+class OpenAICompatibleClient:
+    """
+    GUI agent client for any OpenAI-compatible ``/chat/completions`` endpoint.
+
+    Subclasses describe a provider through class attributes: endpoint, default
+    model, environment prefix and the backend's image / history limits.
+    """
+
+    name = "openai"
+    display_name = "OpenAI-compatible"
+    API_URL = "http://127.0.0.1:8000/v1/chat/completions"
+    DEFAULT_MODEL = "ui-tars"
+    SYSTEM_PROMPT = COMPUTER_USE_DOUBAO
+    # Prefix of the environment variables read by this backend (<PREFIX>_API_KEY, <PREFIX>_MAX_RETRIES...)
+    ENV_PREFIX = "VLM"
+    REQUIRES_API_KEY = False
+
+    # Backend limits: largest screenshot worth sending and how much history to keep
+    max_image_size: Tuple[int, int] = (1080, 1920)
+    max_history_turns = 10
+    max_history_images = 4
+    eco_history_turns = 5
+    eco_history_images = 2
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, eco_mode: bool = False,
+                 base_url: Optional[str] = None, prefix_stable: bool = True,
+                 max_retries: Optional[int] = None, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 request_timeout: float = 120.0, deadline: Optional[float] = None,
+                 hedge_percentile: Optional[float] = None, hedge_min_samples: int = 5, hedge_min_delay: float = 1.0,
+                 rate_limiter: Optional[RateLimiter] = None):
+        """
+        Args:
+            api_key: API key (defaults to ``<PREFIX>_API_KEY``); optional for local servers.
+            model: Model / endpoint id (defaults to ``DEFAULT_MODEL``).
+            eco_mode: Keep fewer turns and images in the request.
+            base_url: Endpoint base URL (``http://host:port/v1``) or full
+                ``.../chat/completions`` URL. Defaults to ``API_URL``.
+            prefix_stable: Evict history in append-only blocks so consecutive
+                requests share a byte-identical prefix (provider prefix caching).
+                False restores the per-step sliding window.
+            max_retries: Retries of transient failures (``<PREFIX>_MAX_RETRIES``, default 3).
+            backoff_base: First retry delay in seconds; doubles per retry, with full jitter.
+            backoff_max: Upper bound of a single retry delay.
+            request_timeout: Timeout of a single HTTP attempt.
+            deadline: Total time budget of one ask() including retries
+                (``<PREFIX>_REQUEST_DEADLINE``, default 300s).
+            hedge_percentile: Send a duplicate request once the first has been
+                running longer than this latency percentile (e.g. 0.95) and use
+                whichever answers first (``<PREFIX>_HEDGE_PERCENTILE``, off by default).
+            hedge_min_samples: Latency samples needed before hedging kicks in.
+            hedge_min_delay: Never hedge earlier than this many seconds.
+            rate_limiter: RPM/TPM limiter. Defaults to the process-wide limiter
+                configured by ``<PREFIX>_RPM`` / ``<PREFIX>_TPM`` (and
+                ``<PREFIX>_RATE_LIMIT_FILE`` to share it across processes); none if unset.
+        """
+        self.api_key = api_key or os.environ.get(f"{self.ENV_PREFIX}_API_KEY")
+        self.model = model or self.DEFAULT_MODEL
+        self.eco_mode = eco_mode
+        if base_url:
+            base_url = base_url.rstrip("/")
+            self.API_URL = base_url if base_url.endswith("/chat/completions") else f"{base_url}/chat/completions"
+        self.history: List[Dict[str, Any]] = [] # Conversation history
+        self.prefix_stable = prefix_stable
+        # Window into self.history that is sent; both only move forward, in blocks
+        self._history_start = 0
+        self._image_floor = 0
+        # Serialized history messages keyed by (index, image stripped): each is encoded once
+        self._fragments: Dict[Tuple[int, bool], Tuple[Dict[str, Any], bytes]] = {}
+        self._system_fragment: Optional[Tuple[str, bytes]] = None
+        self.cache_stats = {"requests": 0, "prefix_breaks": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+        # Request policy: classified retries, per-request deadline, optional hedging
+        if max_retries is None:
+            max_retries = int(self._env("MAX_RETRIES", 3))
+        if deadline is None:
+            deadline = float(self._env("REQUEST_DEADLINE", 300))
+        if hedge_percentile is None and self._env("HEDGE_PERCENTILE"):
+            hedge_percentile = float(self._env("HEDGE_PERCENTILE"))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self._latencies: deque = deque(maxlen=50)
+        self._stats_lock = threading.Lock()
+        self.request_stats = {"requests": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                              "failures": 0, "deadline_exceeded": 0, "limiter_waits": 0, "limiter_wait_s": 0.0}
+
+        if rate_limiter is None and (self._env("RPM") or self._env("TPM")):
+            rate_limiter = shared_limiter(
+                self.ENV_PREFIX,
+                rpm=float(self._env("RPM")) if self._env("RPM") else None,
+                tpm=float(self._env("TPM")) if self._env("TPM") else None,
+                lock_file=self._env("RATE_LIMIT_FILE") or None,
+            )
+        self.rate_limiter = rate_limiter
+
+    def _env(self, name: str, default: Any = None) -> Any:
+        return os.environ.get(f"{self.ENV_PREFIX}_{name}", default)
+
+    @property
+    def history_limits(self) -> Tuple[int, int]:
+        """(max turns, max previous images) for the current mode."""
+        if self.eco_mode:
+            return self.eco_history_turns, self.eco_history_images
+        return self.max_history_turns, self.max_history_images
+
+    def reset_session(self):
+        """Clear conversation history."""
+        self.history = []
+        self._history_start = 0
+        self._image_floor = 0
+        self._fragments = {}
+        logger.info(f"{self.display_name} session history cleared.")
+
+    def _prune_history_images(self, history: List[Dict[str, Any]], max_images: int = 4) -> List[Dict[str, Any]]:
+        """
+        Prune images from history to ensure total images <= max_images.
+        Keeps the most recent images.
+        
+        Args:
+            history: The list of history messages (User/Assistant).
+            max_images: Maximum number of images to keep in history (excluding the current new message).
+        """
+        # Deep copy to avoid modifying original history if needed, 
+        # but here we might just create a new list of messages.
+        # Actually, we should probably construct a new list where older images are removed.
+        
+        pruned_history = []
+        
+        # Count images from the end
+        image_count = 0
+        
+        # Iterate backwards
+        for msg in reversed(history):
+            new_msg = msg.copy()
+            if msg["role"] == "user" and isinstance(msg["content"], list):
+                # Check for image_url
+                has_image = any(item.get("type") == "image_url" for item in msg["content"])
+                
+                if has_image:
+                    if image_count < max_images:
+                        image_count += 1
+                        # Keep image
+                        pruned_history.insert(0, new_msg)
+                    else:
+                        # Remove image, keep text
+                        new_content = [item for item in msg["content"] if item.get("type") != "image_url"]
+                        new_msg["content"] = new_content
+                        pruned_history.insert(0, new_msg)
+                else:
+                    pruned_history.insert(0, new_msg)
+            else:
+                pruned_history.insert(0, new_msg)
+                
+        return pruned_history
+
+    def _prune_history_turns(self, history: List[Dict[str, Any]], max_turns: int = 10) -> List[Dict[str, Any]]:
+        """
+        Prune older conversation turns to keep context within limits, 
+        but always try to preserve the latest context.
+        """
+        # A turn consists of user + assistant message usually.
+        # Simple implementation: keep last N messages
+        if len(history) > max_turns * 2:
+            return history[-(max_turns * 2):]
+        return history
+
+    def _stable_window(self, max_turns: int = 10, max_images: int = 4) -> List[Tuple[int, bool]]:
+        """
+        History to send as ``(index, strip_image)`` pairs, evicted in blocks
+        rather than one message per step.
+
+        When the window exceeds ``max_turns`` turns it is cut back to half in
+        one go, and when it holds more than ``max_images`` images the oldest
+        ones are stripped down to half as well. Between those evictions every
+        request is the previous request plus the new turn, so the prefix stays
+        byte-identical and the provider's prefix cache can be reused.
+        """
+        moved = False
+        if len(self.history) - self._history_start > max_turns * 2:
+            # Messages are appended in (user, assistant) pairs, so this stays on a user message
+            self._history_start = len(self.history) - max(1, max_turns // 2) * 2
+            moved = True
+
+        first = max(self._history_start, self._image_floor)
+        with_images = [i for i in range(first, len(self.history)) if _has_image(self.history[i])]
+        if len(with_images) > max_images:
+            self._image_floor = with_images[-max(1, max_images // 2)]
+            moved = True
+
+        if moved:
+            self.cache_stats["prefix_breaks"] += 1
+            logger.info(f"History evicted (start={self._history_start}, image floor={self._image_floor})")
+
+        return [(i, i < self._image_floor and _has_image(self.history[i]))
+                for i in range(self._history_start, len(self.history))]
+
+    def _sliding_window(self, max_turns: int = 10, max_images: int = 4) -> List[Tuple[int, bool]]:
+        """Per-step sliding window, same selection as ``_prune_history_turns`` + ``_prune_history_images``."""
+        start = max(0, len(self.history) - max_turns * 2)
+        with_images = [i for i in range(start, len(self.history)) if _has_image(self.history[i])]
+        stripped = set(with_images[:max(0, len(with_images) - max_images)])
+        return [(i, i in stripped) for i in range(start, len(self.history))]
+
+    def _window_message(self, index: int, strip_image: bool) -> Dict[str, Any]:
+        msg = self.history[index]
+        if strip_image:
+            msg = {**msg, "content": [item for item in msg["content"] if item.get("type") != "image_url"]}
+        return msg
+
+    def _fragment(self, index: int, strip_image: bool) -> Tuple[Dict[str, Any], bytes]:
+        """Window message and its serialized JSON, encoded on first use and cached."""
+        key = (index, strip_image)
+        cached = self._fragments.get(key)
+        # History is append-only; the identity check guards against it being replaced wholesale
+        if cached is None or (not strip_image and cached[0] is not self.history[index]):
+            msg = self._window_message(index, strip_image)
+            cached = self._fragments[key] = (msg, dumps_message(msg))
+        return cached
+
+    def _stable_history(self, max_turns: int = 10, max_images: int = 4) -> List[Dict[str, Any]]:
+        """Messages of ``_stable_window``."""
+        return [self._window_message(i, strip) for i, strip in self._stable_window(max_turns, max_images)]
+
+    def _build_messages(self, new_user_msg: Dict[str, Any], new_fragment: bytes) -> MessageList:
+        """System prompt + history window + new message, with every fragment serialized at most once."""
+        max_turns, max_images = self.history_limits
+        if self.prefix_stable:
+            window = self._stable_window(max_turns=max_turns, max_images=max_images)
+        else:
+            window = self._sliding_window(max_turns=max_turns, max_images=max_images)
+
+        if self._system_fragment is None or self._system_fragment[0] != self.SYSTEM_PROMPT:
+            self._system_fragment = (self.SYSTEM_PROMPT,
+                                     dumps_message({"role": "system", "content": self.SYSTEM_PROMPT}))
+        entries = [self._fragment(i, strip) for i, strip in window]
+        # Forget fragments that left the window (evicted turns, images that are now stripped)
+        self._fragments = {key: self._fragments[key] for key in window}
+        return MessageList(
+            [{"role": "system", "content": self.SYSTEM_PROMPT}] + [msg for msg, _ in entries] + [new_user_msg],
+            [self._system_fragment[1]] + [fragment for _, fragment in entries] + [new_fragment],
+        )
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _prepare_request(self, headers: Dict[str, str], messages: List[Dict[str, Any]],
+                         payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Provider hook: adjust the payload and pick the URL (None means ``API_URL``)."""
+        return payload, None
+
+    def ask(self, instruction: str, image_b64: Optional[str],
+            on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Send instruction and screenshot to the model (with history).
+        
+        Args:
+            instruction: User instruction (e.g. "Open WeChat").
+            image_b64: Base64 encoded screenshot, or None for a text-only turn.
+            on_delta: If given, the answer is streamed and each text chunk is
+                passed to it as it arrives (a retried attempt streams again from the start).
+            
+        Returns:
+            Parsed response containing thought and structured action.
+        """
+        if self.REQUIRES_API_KEY and not self.api_key:
+            raise ValueError(f"{self.ENV_PREFIX}_API_KEY is not set")
+
+        # Imported lazily to keep module import (CLI / MCP startup) cheap
+        import httpx
+            
+        headers = self._headers()
+        
+        # Prepare new user message; the data URL and its JSON are built once per frame
+        new_user_msg = {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": instruction
+                }
+            ]
+        }
+        if image_b64 is not None:
+            image_url = image_b64 if image_b64.startswith("http") else f"data:image/jpeg;base64,{image_b64}"
+            new_user_msg["content"].append({
+                "type": "image_url",
+                "image_url": {
+                    "url": image_url
+                }
+            })
+        new_fragment = dumps_message(new_user_msg)
+        
+        # System + history window (pruned to the backend's limits, fewer in eco mode) + new user message
+        messages = self._build_messages(new_user_msg, new_fragment)
+        
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.1
+        }
+        
+        try:
+            payload, url = self._prepare_request(headers, messages, payload)
+
+            logger.info(f"Sending request to {self.display_name} API (model: {self.model}, history_len: {len(self.history)})...")
+            resp_json = self._request(headers, payload, url=url, on_delta=on_delta)
+            content = resp_json['choices'][0]['message']['content']
+            usage = dict(resp_json.get('usage') or {})
+            usage["cached_tokens"] = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+            self.cache_stats["requests"] += 1
+            self.cache_stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            self.cache_stats["cached_tokens"] += usage["cached_tokens"]
+            
+            # Parse the response
+            parsed_result = parse_action_from_text(content)
+            parsed_result["raw_content"] = content
+            parsed_result["usage"] = usage
+            
+            # Update history (only once a request succeeded, so retries and hedges never duplicate turns)
+            self._fragments[(len(self.history), False)] = (new_user_msg, new_fragment)
+            self.history.append(new_user_msg)
+            self.history.append({
+                "role": "assistant",
+                "content": content
+            })
+            
+            return parsed_result
+                
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error: {e.response.text}")
+            raise RuntimeError(f"{self.display_name} API Error: {e.response.status_code} - {e.response.text}")
+        except Exception as e:
+            logger.error(f"Request failed: {e}")
+            raise RuntimeError(f"{self.display_name} Request Failed: {e}")
+
+    def ask_text(self, instruction: str, on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Text-only follow-up turn (e.g. a format correction): the screenshot the
+        model should refer to is already in the history, so no image is sent.
+        """
+        return self.ask(instruction, None, on_delta=on_delta)
+
+    def _count(self, key: str, value: int = 1):
+        with self._stats_lock:
+            self.request_stats[key] += value
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds after which to hedge, or None if hedging is off or there are too few samples."""
+        if not self.hedge_percentile:
+            return None
+        with self._stats_lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.hedge_min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(self.hedge_percentile * len(samples)) - 1))
+        return max(self.hedge_min_delay, samples[index])
+
+    def _timed_send(self, headers: Dict[str, str], payload: Dict[str, Any], url: Optional[str],
+                    timeout: float, on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        self._count("attempts")
+        started = time.monotonic()
+        if on_delta is not None:
+            result = self._send_stream(headers, payload, on_delta, url=url, timeout=timeout)
+        else:
+            result = self._send(headers, payload, url=url, timeout=timeout)
+        with self._stats_lock:
+            self._latencies.append(time.monotonic() - started)
+        return result
+
+    def _attempt(self, headers: Dict[str, str], payload: Dict[str, Any], url: Optional[str],
+                 deadline: float, on_delta: Optional[Callable[[str], None]] = None, tokens: int = 0) -> Dict[str, Any]:
+        """One attempt, hedged with a duplicate request if the first one is slower than usual."""
+        if self.rate_limiter is not None:
+            waited = self.rate_limiter.acquire(tokens, timeout=max(0.0, deadline - time.monotonic()))
+            if waited > 0.001:
+                self._count("limiter_waits")
+                self._count("limiter_wait_s", waited)
+        remaining = deadline - time.monotonic()
+        timeout = min(self.request_timeout, remaining)
+        # Streams are never hedged: two interleaved streams cannot feed one callback
+        hedge_delay = self._hedge_delay() if on_delta is None else None
+        if hedge_delay is None or hedge_delay >= remaining:
+            return self._timed_send(headers, payload, url, timeout, on_delta)
+
+        # The losing request cannot be cancelled mid-flight; it finishes in the background
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="vlm-hedge")
+        try:
+            primary = pool.submit(self._timed_send, headers, payload, url, timeout)
+            done, _ = wait([primary], timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            # A hedge is optional: never queue for budget that other agents are waiting for
+            if self.rate_limiter is not None and not self.rate_limiter.try_acquire(tokens):
+                logger.info("Rate limit budget exhausted, not hedging")
+                done, _ = wait([primary], timeout=max(0.0, deadline - time.monotonic()))
+                if not done:
+                    raise TimeoutError("Request deadline exceeded")
+                return primary.result()
+
+            self._count("hedges")
+            logger.info(f"Request slower than p{self.hedge_percentile * 100:g} ({hedge_delay:.2f}s), sending hedge")
+            hedge = pool.submit(self._timed_send, headers, payload, url,
+                                min(self.request_timeout, deadline - time.monotonic()))
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    raise TimeoutError("Request deadline exceeded while waiting for hedged requests")
+                for future in done:
+                    if future.exception() is None:
+                        if future is hedge:
+                            self._count("hedge_wins")
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            pool.shutdown(wait=False)
+
+    def _request(self, headers: Dict[str, str], payload: Dict[str, Any], url: Optional[str] = None,
+                 on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Send with the request policy: transient failures are retried with
+        jittered exponential backoff until ``max_retries`` or the deadline.
+        """
+        self._count("requests")
+        deadline = time.monotonic() + self.deadline
+        tokens = estimate_request_tokens(payload) if self.rate_limiter is not None else 0
+        retries = 0
+        while True:
+            try:
+                result = self._attempt(headers, payload, url, deadline, on_delta, tokens)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.settle(tokens, (result.get("usage") or {}).get("total_tokens", 0))
+                return result
+            except Exception as e:
+                out_of_time = deadline - time.monotonic() <= 0
+                if not is_retryable(e) or retries >= self.max_retries or out_of_time:
+                    self._count("failures")
+                    if out_of_time:
+                        self._count("deadline_exceeded")
+                    raise
+                # Full jitter: uniform in [0, base * 2^n], capped; honour Retry-After on 429/503
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** retries)))
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    delay = max(delay, min(retry_after, self.backoff_max))
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                if status == 429 and self.rate_limiter is not None:
+                    # Our budget is too generous for the account: hold every agent sharing it
+                    self.rate_limiter.pause(delay)
+                if time.monotonic() + delay >= deadline:
+                    self._count("failures")
+                    self._count("deadline_exceeded")
+                    raise
+                retries += 1
+                self._count("retries")
+                logger.warning(f"{self.display_name} request failed ({e!r}), retry {retries}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _send(self, headers: Dict[str, str], payload: Dict[str, Any], url: Optional[str] = None,
+              timeout: Optional[float] = None) -> Dict[str, Any]:
+        """POST the payload (to ``API_URL`` unless ``url`` is given) and return the decoded JSON."""
+        import httpx
+
+        # Increase timeout to 120s for complex reasoning
+        with httpx.Client(timeout=timeout or 120.0) as client:
+            response = client.post(url or self.API_URL, headers=headers, content=encode_payload(payload))
+            response.raise_for_status()
+            return response.json()
+
+    def _send_stream(self, headers: Dict[str, str], payload: Dict[str, Any], on_delta: Callable[[str], None],
+                     url: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        POST with ``stream: true`` and read the server-sent events, passing each
+        content delta to ``on_delta``. Returns the same shape as ``_send``.
+        """
+        import httpx
+
+        payload = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+        parts: List[str] = []
+        usage: Dict[str, Any] = {}
+        with httpx.Client(timeout=timeout or 120.0) as client:
+            with client.stream("POST", url or self.API_URL, headers=headers, content=encode_payload(payload)) as response:
+                if response.is_error:
+                    response.read()
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    if chunk.get("usage"):
+                        usage = chunk["usage"]
+                    for choice in chunk.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            parts.append(delta)
+                            on_delta(delta)
+        return {"choices": [{"message": {"role": "assistant", "content": "".join(parts)}}], "usage": usage}
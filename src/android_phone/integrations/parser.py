@@ -4,6 +4,43 @@ from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+KNOWN_ACTIONS = ["click", "left_double", "right_single", "drag", "hotkey", "type", "scroll", "wait", "finished",
+                 "long_press", "scroll_until_found", "zoom", "screenshot"]
+# Names models commonly use instead of the prompt's
+ACTION_ALIASES = {
+    "tap": "click",
+    "double_click": "left_double",
+    "double_tap": "left_double",
+    "long_click": "long_press",
+    "input": "type",
+    "input_text": "type",
+    "press": "hotkey",
+    "press_key": "hotkey",
+    "finish": "finished",
+    "done": "finished",
+}
+# Arguments an action cannot run without (any one of the alternatives)
+REQUIRED_ARGS = {
+    "click": (("x", "y"), ("element",)),
+    "left_double": (("x", "y"), ("element",)),
+    "right_single": (("x", "y"), ("element",)),
+    "long_press": (("x", "y"), ("element",)),
+    "drag": (("start_x", "start_y", "end_x", "end_y"),),
+    "type": (("content",),),
+    "hotkey": (("key",),),
+    "zoom": (("x", "y"),),
+    "scroll_until_found": (("content",),),
+    "finished": (("content",),),
+}
+# Argument a lone positional string stands for
+POSITIONAL_ARG = {"type": "content", "finished": "content", "scroll_until_found": "content",
+                  "hotkey": "key", "scroll": "direction", "screenshot": "filename"}
+
+_NUM = r"(-?\d+(?:\.\d+)?)"
+_POINT_ARG = re.compile(
+    r"\b(start_point|end_point|point)\s*[=:]\s*['\"]?\s*(?:<point>)?\s*[(\[]?\s*" + _NUM + r"\s*[,\s]\s*" + _NUM
+    + r"(?:\s*[,\s]\s*" + _NUM + r"\s*[,\s]\s*" + _NUM + r")?\s*[)\]]?\s*(?:</point>)?\s*['\"]?")
+
 def parse_action_from_text(text: str) -> Dict[str, Any]:
     """
     Parse the model output text into structured thought and action.
@@ -35,8 +72,7 @@ def parse_action_from_text(text: str) -> Dict[str, Any]:
         # Fallback: try to find the function call pattern directly in the text
         # Look for pattern: func_name(arg=...)
         # We look for known function names
-        known_funcs = ["click", "left_double", "right_single", "drag", "hotkey", "type", "scroll", "wait", "finished", "long_press"]
-        func_pattern = r'(' + '|'.join(known_funcs) + r')\((.*)\)'
+        func_pattern = r'(' + '|'.join(KNOWN_ACTIONS) + r')\((.*)\)'
         func_match_fallback = re.search(func_pattern, text, re.DOTALL)
         if func_match_fallback:
             action_raw = func_match_fallback.group(0)
@@ -46,59 +82,142 @@ def parse_action_from_text(text: str) -> Dict[str, Any]:
 
     if action_raw:
         result["action_raw"] = action_raw
-        
-        # Parse specific function call
-        # e.g. click(point='<point>500 500</point>')
-        # e.g. type(content='hello')
-        
-        # Regex to match function name and arguments
-        # Matches: func_name(arg1='val1', arg2='val2')
-        func_match = re.match(r'(\w+)\((.*)\)', action_raw, re.DOTALL)
-        if func_match:
-            func_name = func_match.group(1)
-            args_str = func_match.group(2)
-            
-            parsed_action = {"type": func_name}
-            
-            # Extract point: point='<point>x y</point>'
-            point_match = re.search(r"point=['\"]<point>(\d+)\s+(\d+)</point>['\"]", args_str)
-            if point_match:
-                parsed_action["x"] = int(point_match.group(1))
-                parsed_action["y"] = int(point_match.group(2))
-                
-            # Extract start_point (drag): start_point='<point>x y</point>'
-            start_point_match = re.search(r"start_point=['\"]<point>(\d+)\s+(\d+)</point>['\"]", args_str)
-            if start_point_match:
-                parsed_action["start_x"] = int(start_point_match.group(1))
-                parsed_action["start_y"] = int(start_point_match.group(2))
-                
-            # Extract end_point (drag): end_point='<point>x y</point>'
-            end_point_match = re.search(r"end_point=['\"]<point>(\d+)\s+(\d+)</point>['\"]", args_str)
-            if end_point_match:
-                parsed_action["end_x"] = int(end_point_match.group(1))
-                parsed_action["end_y"] = int(end_point_match.group(2))
-                
-            # Extract content (type/finished): content='...'
-            # Handle escaped quotes carefully
-            content_match = re.search(r"content=['\"](.*?)['\"](?=\s*(?:,|$))", args_str)
-            if content_match:
-                parsed_action["content"] = content_match.group(1)
-                
-            # Extract key (hotkey): key='...'
-            key_match = re.search(r"key=['\"](.*?)['\"]", args_str)
-            if key_match:
-                parsed_action["key"] = key_match.group(1)
-                
-            # Extract direction (scroll): direction='...'
-            dir_match = re.search(r"direction=['\"](.*?)['\"]", args_str)
-            if dir_match:
-                parsed_action["direction"] = dir_match.group(1)
-
-            # Extract filename (screenshot): filename='...'
-            filename_match = re.search(r"filename=['\"](.*?)['\"]", args_str)
-            if filename_match:
-                parsed_action["filename"] = filename_match.group(1)
-
-            result["action_parsed"] = parsed_action
-            
+        result["action_parsed"] = _parse_call(action_raw)
+
+    # Near-miss syntax (other point notations, code fences, aliases) is rewritten and parsed again
+    if not _is_complete(result["action_parsed"]):
+        repaired = repair_action_text(text)
+        parsed = _parse_call(repaired) if repaired else None
+        if _is_complete(parsed):
+            logger.info(f"Repaired action output: {repaired}")
+            result["action_raw"] = repaired
+            result["action_parsed"] = parsed
+            result["repaired"] = True
+
     return result
+
+
+def _parse_call(action_raw: str) -> Optional[Dict[str, Any]]:
+    """Parse one canonical call such as ``click(point='<point>500 500</point>')``."""
+    # Regex to match function name and arguments
+    # Matches: func_name(arg1='val1', arg2='val2')
+    func_match = re.match(r'(\w+)\((.*)\)', action_raw, re.DOTALL)
+    if not func_match:
+        return None
+    func_name = func_match.group(1)
+    args_str = func_match.group(2)
+
+    parsed_action = {"type": func_name}
+
+    # Extract point: point='<point>x y</point>'
+    point_match = re.search(r"point=['\"]<point>(\d+)\s+(\d+)</point>['\"]", args_str)
+    if point_match:
+        parsed_action["x"] = int(point_match.group(1))
+        parsed_action["y"] = int(point_match.group(2))
+
+    # Extract element (Set-of-Mark): element=N / element='N'
+    element_match = re.search(r"element=['\"]?\[?(\d+)\]?['\"]?", args_str)
+    if element_match:
+        parsed_action["element"] = int(element_match.group(1))
+
+    # Extract start_point (drag): start_point='<point>x y</point>'
+    start_point_match = re.search(r"start_point=['\"]<point>(\d+)\s+(\d+)</point>['\"]", args_str)
+    if start_point_match:
+        parsed_action["start_x"] = int(start_point_match.group(1))
+        parsed_action["start_y"] = int(start_point_match.group(2))
+
+    # Extract end_point (drag): end_point='<point>x y</point>'
+    end_point_match = re.search(r"end_point=['\"]<point>(\d+)\s+(\d+)</point>['\"]", args_str)
+    if end_point_match:
+        parsed_action["end_x"] = int(end_point_match.group(1))
+        parsed_action["end_y"] = int(end_point_match.group(2))
+
+    # Extract content (type/finished): content='...'
+    # Handle escaped quotes carefully
+    content_match = re.search(r"content=['\"](.*?)['\"](?=\s*(?:,|$))", args_str)
+    if content_match:
+        parsed_action["content"] = content_match.group(1)
+
+    # Extract key (hotkey): key='...'
+    key_match = re.search(r"key=['\"](.*?)['\"]", args_str)
+    if key_match:
+        parsed_action["key"] = key_match.group(1)
+
+    # Extract direction (scroll): direction='...'
+    dir_match = re.search(r"direction=['\"](.*?)['\"]", args_str)
+    if dir_match:
+        parsed_action["direction"] = dir_match.group(1)
+
+    # Extract size (zoom): size='w h'
+    size_match = re.search(r"size=['\"](\d+)\s+(\d+)['\"]", args_str)
+    if size_match:
+        parsed_action["width"] = int(size_match.group(1))
+        parsed_action["height"] = int(size_match.group(2))
+
+    # Extract filename (screenshot): filename='...'
+    filename_match = re.search(r"filename=['\"](.*?)['\"]", args_str)
+    if filename_match:
+        parsed_action["filename"] = filename_match.group(1)
+
+    return parsed_action
+
+
+def _is_complete(action: Optional[Dict[str, Any]]) -> bool:
+    """Whether a parsed action is a known one with the arguments it needs to run."""
+    if not action or action.get("type") not in KNOWN_ACTIONS:
+        return False
+    alternatives = REQUIRED_ARGS.get(action.get("type"))
+    return alternatives is None or any(all(k in action for k in keys) for keys in alternatives)
+
+
+def _canonical_point(match) -> str:
+    name = match.group(1)
+    values = [float(v) for v in match.groups()[1:] if v is not None]
+    if len(values) == 4:
+        # A bounding box: aim at its centre
+        values = [(values[0] + values[2]) / 2, (values[1] + values[3]) / 2]
+    return f"{name}='<point>{round(values[0])} {round(values[1])}</point>'"
+
+
+def repair_action_text(text: str) -> Optional[str]:
+    """
+    Rewrite a near-miss model answer into the canonical action syntax.
+
+    Handles code fences, the function name's case and common aliases (``tap``,
+    ``double_click``...), points written as ``(x, y)``, ``[x, y]``, ``x,y``, a
+    ``[x1, y1, x2, y2]`` box (its centre), UI-TARS ``start_box`` /
+    ``<|box_start|>`` tokens or ``x=.., y=..``, bare positional arguments and
+    unquoted strings.
+
+    Returns:
+        The repaired call (e.g. ``click(point='<point>500 300</point>')``), or None if no call was found.
+    """
+    if not text:
+        return None
+    cleaned = re.sub(r"```\w*", "", text).replace("`", "")
+    markers = list(re.finditer(r"action\s*[:：]", cleaned, re.IGNORECASE))
+    if markers:
+        cleaned = cleaned[markers[-1].end():]
+    names = sorted(set(KNOWN_ACTIONS) | set(ACTION_ALIASES), key=len, reverse=True)
+    call = re.search(r"\b(" + "|".join(names) + r")\s*\((.*)\)", cleaned, re.IGNORECASE | re.DOTALL)
+    if not call:
+        return None
+    name = call.group(1).lower()
+    name = ACTION_ALIASES.get(name, name)
+    args = call.group(2).strip()
+
+    args = re.sub(r"<\|box_(?:start|end)\|>", "", args)
+    args = re.sub(r"\bstart_box\b", "start_point" if name == "drag" else "point", args)
+    args = re.sub(r"\bend_box\b", "end_point", args)
+    args = re.sub(r"\b(?:coordinates?|coords?|position)\s*(?=[=:])", "point", args)
+    args = re.sub(r"\bx\s*=\s*['\"]?" + _NUM + r"['\"]?\s*,\s*y\s*=\s*['\"]?" + _NUM + r"['\"]?", r"point=(\1, \2)", args)
+    if "=" not in args:
+        if re.match(r"['\"]?\s*(?:<point>)?\s*[(\[]?\s*-?\d", args):
+            args = f"point={args}"
+        elif args and name in POSITIONAL_ARG:
+            args = f"{POSITIONAL_ARG[name]}={args}"
+    args = _POINT_ARG.sub(_canonical_point, args)
+    # Unquoted string arguments: content=hello -> content='hello'
+    args = re.sub(r"\b(content|key|direction|filename)\s*[=:]\s*(?![\s'\"])([^,)]+)",
+                  lambda m: f"{m.group(1)}='{m.group(2).strip()}'", args)
+    return f"{name}({args})"
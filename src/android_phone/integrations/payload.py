@@ -0,0 +1,58 @@
+"""
+Request bodies assembled from pre-serialized message fragments.
+
+A chat-completions request repeats the system prompt and most of the history
+(with ~100 KB base64 screenshots) on every step. ``httpx.post(json=...)``
+re-serializes all of it each time. Instead, each message is serialized once,
+the client caches the bytes alongside its history, and the body is a join of
+those fragments. :class:`MessageList` keeps the message dicts too, so anything
+that inspects ``payload["messages"]`` (providers' ``_prepare_request``, token
+estimates, replay) works unchanged.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def dumps_message(message: Dict[str, Any]) -> bytes:
+    """Serialized JSON of one message (same encoding as ``httpx``'s ``json=``)."""
+    return json.dumps(message).encode("utf-8")
+
+
+class MessageList(list):
+    """
+    List of chat messages carrying each message's serialized JSON in ``fragments``.
+
+    Slicing keeps the fragments, so ``messages[1:]`` is still zero-copy.
+    """
+
+    def __init__(self, messages: Iterable[Dict[str, Any]] = (), fragments: Optional[List[bytes]] = None):
+        super().__init__(messages)
+        self.fragments = list(fragments) if fragments is not None else [dumps_message(m) for m in self]
+        if len(self.fragments) != len(self):
+            raise ValueError("MessageList needs one fragment per message")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return MessageList(list.__getitem__(self, index), self.fragments[index])
+        return list.__getitem__(self, index)
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    """
+    Request body for ``payload``. When ``payload["messages"]`` is a
+    :class:`MessageList` its fragments are joined instead of re-serialized.
+    """
+    messages = payload.get("messages")
+    if not isinstance(messages, MessageList):
+        return json.dumps(payload).encode("utf-8")
+    rest = {key: value for key, value in payload.items() if key != "messages"}
+    head = json.dumps(rest).encode("utf-8")[:-1]
+    parts = [head, b", " if rest else b"", b'"messages": [']
+    for i, fragment in enumerate(messages.fragments):
+        if i:
+            parts.append(b", ")
+        parts.append(fragment)
+    parts.append(b"]}")
+    # A single join: the body is the only large allocation
+    return b"".join(parts)
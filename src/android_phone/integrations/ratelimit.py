@@ -0,0 +1,278 @@
+"""
+Client-side rate limiting for model requests.
+
+Providers such as Ark enforce requests-per-minute (RPM) and tokens-per-minute
+(TPM) quotas per account. When several agents share an account (batch runs,
+several MCP sessions) they trip those limits and get 429s. A
+:class:`RateLimiter` keeps one token bucket per quota. Requests wait in FIFO
+order until both buckets have room. The limiter is shared by every client of
+a backend in the process (:func:`shared_limiter`). With a ``lock_file`` the
+bucket state lives in a small JSON file guarded by ``fcntl.flock``, so
+separate processes on the same machine share the budget too.
+"""
+
+import base64
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rough token accounting for the TPM budget
+TEXT_BYTES_PER_TOKEN = 4
+IMAGE_PATCH = 28                # Vision encoders bill roughly one token per 28x28 patch
+DEFAULT_IMAGE_TOKENS = 1000     # When the image size cannot be read
+COMPLETION_RESERVE = 300        # Expected answer length (Thought + Action)
+FILE_POLL_INTERVAL = 0.25       # Re-read the shared file at least this often while waiting
+
+
+def _image_size(url: str) -> Optional[Tuple[int, int]]:
+    """(width, height) of a base64 JPEG / PNG data URL, read from the header only."""
+    if not url.startswith("data:"):
+        return None
+    encoded = url.partition(",")[2]
+    # The header sits in the first few hundred bytes of encoder output
+    head = base64.b64decode(encoded[:4096 - 4096 % 4] or "", validate=False)
+    if head.startswith(b"\x89PNG") and len(head) >= 24:
+        return int.from_bytes(head[16:20], "big"), int.from_bytes(head[20:24], "big")
+    if not head.startswith(b"\xff\xd8"):
+        return None
+    i = 2
+    while i + 9 < len(head):
+        if head[i] != 0xFF:
+            return None
+        marker = head[i + 1]
+        length = int.from_bytes(head[i + 2:i + 4], "big")
+        # SOF0-SOF15 carry the frame size (C4/C8/CC are not frames)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            return int.from_bytes(head[i + 7:i + 9], "big"), int.from_bytes(head[i + 5:i + 7], "big")
+        i += 2 + length
+    return None
+
+
+def image_tokens(url: str) -> int:
+    """Estimated prompt tokens of one image (one per 28x28 patch)."""
+    try:
+        size = _image_size(url)
+    except Exception:
+        size = None
+    if not size:
+        return DEFAULT_IMAGE_TOKENS
+    width, height = size
+    return math.ceil(width / IMAGE_PATCH) * math.ceil(height / IMAGE_PATCH)
+
+
+def estimate_request_tokens(payload: Dict[str, Any], completion_tokens: int = COMPLETION_RESERVE) -> int:
+    """Estimated total tokens (prompt, images and answer) of a chat-completions payload."""
+    text_bytes = 0
+    images = 0
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            text_bytes += len(content.encode("utf-8"))
+            continue
+        for item in content or []:
+            if item.get("type") == "text":
+                text_bytes += len(item.get("text", "").encode("utf-8"))
+            elif item.get("type") == "image_url":
+                images += image_tokens(item["image_url"]["url"])
+    return math.ceil(text_bytes / TEXT_BYTES_PER_TOKEN) + images + completion_tokens
+
+
+class TokenBucket:
+    """
+    Budget of ``rate_per_min`` units per minute.
+
+    Args:
+        rate_per_min: Refill rate.
+        burst_s: How many seconds of budget the bucket can hold (60 = a full
+            minute's quota may be spent at once, like a provider's minute window).
+    """
+
+    def __init__(self, rate_per_min: float, burst_s: float = 60.0):
+        self.rate = rate_per_min / 60.0
+        self.capacity = max(1.0, rate_per_min * burst_s / 60.0)
+        self.level = self.capacity
+        self.updated = time.time()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + max(0.0, now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (requests larger than the bucket wait for a full bucket)."""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"level": self.level, "updated": self.updated}
+
+    def load(self, data: Dict[str, float]):
+        self.level = min(self.capacity, float(data.get("level", self.level)))
+        self.updated = float(data.get("updated", self.updated))
+
+
+class RateLimiter:
+    """
+    RPM + TPM limiter with fair (FIFO) waiting.
+
+    Args:
+        rpm: Requests per minute (None = unlimited).
+        tpm: Tokens per minute (None = unlimited).
+        burst_s: Seconds of budget each bucket can hold.
+        lock_file: Share the buckets with other processes through this file.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None, burst_s: float = 60.0,
+                 lock_file: Optional[str] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.lock_file = lock_file
+        self._buckets: Dict[str, TokenBucket] = {}
+        if rpm:
+            self._buckets["rpm"] = TokenBucket(rpm, burst_s)
+        if tpm:
+            self._buckets["tpm"] = TokenBucket(tpm, burst_s)
+        self._paused_until = 0.0
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self.stats = {"acquired": 0, "waited": 0, "wait_s": 0.0, "max_wait_s": 0.0, "timeouts": 0, "pauses": 0}
+
+    @contextmanager
+    def _state(self) -> Iterator[None]:
+        """Hold the bucket state; with ``lock_file``, load it from and save it back to the shared file."""
+        if not self.lock_file:
+            yield
+            return
+        # POSIX only; imported here so the module stays importable everywhere
+        import fcntl
+
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = b""
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                raw += chunk
+            try:
+                data = json.loads(raw) if raw else {}
+            except ValueError:
+                data = {}
+            for name, bucket in self._buckets.items():
+                if name in data:
+                    bucket.load(data[name])
+            self._paused_until = float(data.get("paused_until", 0.0))
+            yield
+            data = {name: bucket.to_dict() for name, bucket in self._buckets.items()}
+            data["paused_until"] = self._paused_until
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, json.dumps(data).encode("utf-8"))
+        finally:
+            os.close(fd)  # Closing releases the flock
+
+    def _try_take(self, tokens: float) -> float:
+        """Take one request and ``tokens`` if both fit; otherwise return the seconds to wait."""
+        with self._state():
+            now = time.time()
+            if self._paused_until > now:
+                return self._paused_until - now
+            needs = {"rpm": 1, "tpm": tokens}
+            for name, bucket in self._buckets.items():
+                bucket.refill(now)
+            delay = max((bucket.wait_time(needs[name]) for name, bucket in self._buckets.items()), default=0.0)
+            if delay > 0:
+                return delay
+            for name, bucket in self._buckets.items():
+                bucket.level -= needs[name]
+            return 0.0
+
+    def acquire(self, tokens: float = 0, timeout: Optional[float] = None) -> float:
+        """
+        Block until a request of ``tokens`` fits the budget; callers are served
+        in arrival order. Returns the seconds spent waiting.
+
+        Raises:
+            TimeoutError: The budget did not free up within ``timeout`` seconds.
+        """
+        ticket = object()
+        started = time.monotonic()
+        with self._cond:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    delay: Optional[float] = None
+                    if self._queue[0] is ticket:
+                        delay = self._try_take(tokens)
+                        if delay <= 0:
+                            break
+                        if self.lock_file:
+                            delay = min(delay, FILE_POLL_INTERVAL)
+                    if timeout is not None:
+                        left = started + timeout - time.monotonic()
+                        if left <= 0:
+                            self.stats["timeouts"] += 1
+                            raise TimeoutError("Rate limiter wait exceeded the request deadline")
+                        delay = left if delay is None else min(delay, left)
+                    self._cond.wait(delay)
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            self.stats["acquired"] += 1
+            if waited > 0.001:
+                self.stats["waited"] += 1
+                self.stats["wait_s"] += waited
+                self.stats["max_wait_s"] = max(self.stats["max_wait_s"], waited)
+        return waited
+
+    def try_acquire(self, tokens: float = 0) -> bool:
+        """Take budget only if it is available now and nobody is queued (used for optional hedges)."""
+        with self._cond:
+            if self._queue or self._try_take(tokens) > 0:
+                return False
+            self.stats["acquired"] += 1
+            return True
+
+    def settle(self, estimated: float, actual: float):
+        """Correct the TPM bucket once the real ``usage.total_tokens`` is known."""
+        if "tpm" not in self._buckets or not actual:
+            return
+        with self._cond:
+            with self._state():
+                bucket = self._buckets["tpm"]
+                bucket.refill(time.time())
+                # May go negative: an underestimate is paid back before the next request
+                bucket.level = min(bucket.capacity, bucket.level + estimated - actual)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        """Hold every request for ``seconds`` (the provider answered 429)."""
+        with self._cond:
+            with self._state():
+                self._paused_until = max(self._paused_until, time.time() + seconds)
+            self.stats["pauses"] += 1
+
+
+_LIMITERS: Dict[Tuple[Any, ...], RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def shared_limiter(name: str, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                   lock_file: Optional[str] = None, burst_s: float = 60.0) -> RateLimiter:
+    """The process-wide limiter for ``name`` (one per backend and configuration)."""
+    key = (name, rpm, tpm, lock_file, burst_s)
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(key)
+        if limiter is None:
+            limiter = _LIMITERS[key] = RateLimiter(rpm=rpm, tpm=tpm, burst_s=burst_s, lock_file=lock_file)
+            logger.info(f"Rate limiter for {name}: rpm={rpm}, tpm={tpm}" + (f", shared via {lock_file}" if lock_file else ""))
+        return limiter
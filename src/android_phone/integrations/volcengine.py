@@ -1,174 +1,90 @@
-import os
-import httpx
-import json
+import time
 import logging
-from typing import Optional, Dict, Any, List
-from .prompt import COMPUTER_USE_DOUBAO
-from .parser import parse_action_from_text
+from typing import Optional, Dict, Any, List, Tuple
+from .openai_compat import OpenAICompatibleClient
 
 logger = logging.getLogger(__name__)
 
-class VolcengineGUIClient:
+
+class VolcengineGUIClient(OpenAICompatibleClient):
     """
     Client for Volcengine GUI Agent API.
     """
     
+    name = "volcengine"
+    display_name = "Volcengine"
     API_URL = "https://ark.cn-beijing.volces.com/api/v3/chat/completions" # Use Chat API as per updated docs logic
-    
-    def __init__(self, api_key: Optional[str] = None, model: str = "doubao-seed-1-6-vision-250815", eco_mode: bool = False):
-        self.api_key = api_key or os.environ.get("ARK_API_KEY")
-        self.model = model
-        self.eco_mode = eco_mode
-        self.history: List[Dict[str, Any]] = [] # Conversation history
-        
-    def reset_session(self):
-        """Clear conversation history."""
-        self.history = []
-        logger.info("Volcengine session history cleared.")
+    DEFAULT_MODEL = "doubao-seed-1-6-vision-250815"
+    ENV_PREFIX = "ARK"
+    REQUIRES_API_KEY = True
 
-    def _prune_history_images(self, history: List[Dict[str, Any]], max_images: int = 4) -> List[Dict[str, Any]]:
+    # Doubao vision models: screenshots up to 1080p, 10 turns / 4 previous images of history
+    max_image_size = (1080, 1920)
+    max_history_turns = 10
+    max_history_images = 4
+    
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, eco_mode: bool = False,
+                 context_cache: Optional[bool] = None, context_ttl: int = 3600, **kwargs):
         """
-        Prune images from history to ensure total images <= max_images.
-        Keeps the most recent images.
-        
         Args:
-            history: The list of history messages (User/Assistant).
-            max_images: Maximum number of images to keep in history (excluding the current new message).
+            api_key: Ark API key (defaults to ``ARK_API_KEY``).
+            model: Model / endpoint id.
+            eco_mode: Keep fewer turns and images in the request.
+            context_cache: Cache the system prompt with the Ark Context API
+                (``common_prefix`` mode). Defaults to ``ARK_CONTEXT_CACHE``.
+            context_ttl: Lifetime of the cached context in seconds.
+            **kwargs: Request policy and history options, see ``OpenAICompatibleClient``.
         """
-        # Deep copy to avoid modifying original history if needed, 
-        # but here we might just create a new list of messages.
-        # Actually, we should probably construct a new list where older images are removed.
-        
-        pruned_history = []
-        
-        # Count images from the end
-        image_count = 0
-        
-        # Iterate backwards
-        for msg in reversed(history):
-            new_msg = msg.copy()
-            if msg["role"] == "user" and isinstance(msg["content"], list):
-                # Check for image_url
-                has_image = any(item.get("type") == "image_url" for item in msg["content"])
-                
-                if has_image:
-                    if image_count < max_images:
-                        image_count += 1
-                        # Keep image
-                        pruned_history.insert(0, new_msg)
-                    else:
-                        # Remove image, keep text
-                        new_content = [item for item in msg["content"] if item.get("type") != "image_url"]
-                        new_msg["content"] = new_content
-                        pruned_history.insert(0, new_msg)
-                else:
-                    pruned_history.insert(0, new_msg)
-            else:
-                pruned_history.insert(0, new_msg)
-                
-        return pruned_history
+        super().__init__(api_key=api_key, model=model, eco_mode=eco_mode, **kwargs)
+        if context_cache is None:
+            context_cache = self._env("CONTEXT_CACHE", "").lower() in ("1", "true", "yes")
+        self.context_cache = context_cache
+        self.context_ttl = context_ttl
+        self._context_id: Optional[str] = None
+        self._context_expires = 0.0
+        # System prompt the context was created with (it changes in Set-of-Mark mode)
+        self._context_prompt: Optional[str] = None
 
-    def _prune_history_turns(self, history: List[Dict[str, Any]], max_turns: int = 10) -> List[Dict[str, Any]]:
-        """
-        Prune older conversation turns to keep context within limits, 
-        but always try to preserve the latest context.
-        """
-        # A turn consists of user + assistant message usually.
-        # Simple implementation: keep last N messages
-        if len(history) > max_turns * 2:
-            return history[-(max_turns * 2):]
-        return history
+    def _context_url(self, path: str) -> str:
+        """Ark Context API URL next to ``API_URL`` (``.../api/v3/context/<path>``)."""
+        return self.API_URL.rsplit("/chat/completions", 1)[0] + f"/context/{path}"
 
-    def ask(self, instruction: str, image_b64: str) -> Dict[str, Any]:
+    def _get_context(self, headers: Dict[str, str]) -> Optional[str]:
         """
-        Send instruction and screenshot to Volcengine GUI model (with history).
-        
-        Args:
-            instruction: User instruction (e.g. "Open WeChat").
-            image_b64: Base64 encoded screenshot.
-            
-        Returns:
-            Parsed response containing thought and structured action.
+        Id of a ``common_prefix`` context holding the system prompt, created on
+        first use and renewed when it expires. Disables context caching if the
+        endpoint rejects it (not every model supports the Context API).
         """
-        if not self.api_key:
-            raise ValueError("ARK_API_KEY is not set")
-            
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # Prepare new user message
-        new_user_msg = {
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": instruction
-                },
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{image_b64}" if not image_b64.startswith("http") else image_b64
-                    }
-                }
-            ]
-        }
-        
-        # Prune history images (keep max 4 previous images + 1 current = 5 total)
-        # Also prune history length to avoid token limit issues
-        # In eco mode, we can be more aggressive with pruning
-        max_turns = 5 if self.eco_mode else 10
-        max_images = 2 if self.eco_mode else 4
-        
-        pruned_history = self._prune_history_turns(self.history, max_turns=max_turns)
-        pruned_history = self._prune_history_images(pruned_history, max_images=max_images)
-        
-        # Construct full messages: System + Pruned History + New User Message
-        messages = [
-            {
-                "role": "system",
-                "content": COMPUTER_USE_DOUBAO
-            }
-        ] + pruned_history + [new_user_msg]
-        
+        if (self._context_id and time.monotonic() < self._context_expires
+                and self._context_prompt == self.SYSTEM_PROMPT):
+            return self._context_id
         payload = {
             "model": self.model,
-            "messages": messages,
-            "temperature": 0.1
+            "mode": "common_prefix",
+            "messages": [{"role": "system", "content": self.SYSTEM_PROMPT}],
+            "ttl": self.context_ttl,
         }
-        
         try:
-            logger.info(f"Sending request to Volcengine API (model: {self.model}, history_len: {len(self.history)})...")
-            # Increase timeout to 120s for complex reasoning
-            with httpx.Client(timeout=120.0) as client:
-                response = client.post(self.API_URL, headers=headers, json=payload)
-                response.raise_for_status()
-                
-                resp_json = response.json()
-                content = resp_json['choices'][0]['message']['content']
-                usage = resp_json.get('usage', {})
-                
-                # Parse the response
-                parsed_result = parse_action_from_text(content)
-                parsed_result["raw_content"] = content
-                parsed_result["usage"] = usage
-                
-                # Update history
-                self.history.append(new_user_msg)
-                self.history.append({
-                    "role": "assistant",
-                    "content": content
-                })
-                
-                return parsed_result
-                
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error: {e.response.text}")
-            raise RuntimeError(f"Volcengine API Error: {e.response.status_code} - {e.response.text}")
+            resp_json = self._send(headers, payload, url=self._context_url("create"))
+            self._context_id = resp_json["id"]
+            self._context_prompt = self.SYSTEM_PROMPT
+            # Renew a little early so an in-flight request never hits an expired context
+            self._context_expires = time.monotonic() + self.context_ttl * 0.9
+            logger.info(f"Created Ark context {self._context_id} (ttl={self.context_ttl}s)")
+            return self._context_id
         except Exception as e:
-            logger.error(f"Request failed: {e}")
-            raise RuntimeError(f"Volcengine Request Failed: {e}")
+            logger.warning(f"Ark context cache unavailable, falling back to plain requests: {e}")
+            self.context_cache = False
+            self._context_id = None
+            return None
+
+    def _prepare_request(self, headers: Dict[str, str], messages: List[Dict[str, Any]],
+                         payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        context_id = self._get_context(headers) if self.context_cache else None
+        if not context_id:
+            return payload, None
+        # The system prompt lives in the cached context
+        return {**payload, "context_id": context_id, "messages": messages[1:]}, self._context_url("chat/completions")
 
     def parse_action(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -2,25 +2,33 @@ import argparse
 import sys
 import os
 import logging
-from dotenv import load_dotenv
-
-from android_phone.core.controller import AndroidController
-from android_phone.integrations.volcengine import VolcengineGUIClient
-from android_phone.core.agent import AutonomousAgent
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("AndroidPhoneCLI")
 
-def run_task(goal: str, max_steps: int, eco_mode: bool = False):
+def run_task(goal: str, max_steps: int, eco_mode: bool = False, archive: bool = False,
+             backend: str = None, model: str = None, base_url: str = None, stream: bool = False,
+             observation: str = None, profile: bool = False):
     """Run autonomous task"""
+    # Imported here so that `android-agent --help` stays fast
+    from dotenv import load_dotenv
+    from android_phone.core.controller import AndroidController
+    from android_phone.integrations.backends import create_backend
+    from android_phone.core.agent import AutonomousAgent
+
     # Load env
     load_dotenv()
     
-    api_key = os.getenv("ARK_API_KEY")
-    if not api_key:
-        logger.error("Please set ARK_API_KEY environment variable or in .env file")
+    try:
+        client = create_backend(backend, model=model, base_url=base_url, eco_mode=eco_mode)
+    except ValueError as e:
+        logger.error(str(e))
         return
+    if client.REQUIRES_API_KEY and not client.api_key:
+        logger.error(f"Please set {client.ENV_PREFIX}_API_KEY environment variable or in .env file")
+        return
+    logger.info(f"Using backend '{client.name}' (model: {client.model}, url: {client.API_URL})")
 
     if eco_mode:
         logger.info("Running in Eco Mode")
@@ -28,7 +36,8 @@ def run_task(goal: str, max_steps: int, eco_mode: bool = False):
     logger.info("Initializing Controller...")
     controller = AndroidController()
     try:
-        controller.connect()
+        # Connect + warm-up; the monitor reconnects if the link drops mid-task
+        controller.start_health_monitor().connect(retry=False)
         info = controller.get_info()
         logger.info(f"Connected to device: {info.get('productName')} ({controller.serial})")
     except Exception as e:
@@ -36,15 +45,61 @@ def run_task(goal: str, max_steps: int, eco_mode: bool = False):
         return
 
     logger.info("Initializing Agent...")
-    client = VolcengineGUIClient(eco_mode=eco_mode)
-    agent = AutonomousAgent(controller, client, eco_mode=eco_mode)
+    on_delta = (lambda text: print(text, end="", flush=True)) if stream else None
+    agent = AutonomousAgent(controller, client, eco_mode=eco_mode, archive=archive or None, on_model_delta=on_delta,
+                            observation_mode=observation, profile=profile or None)
 
     logger.info(f"Starting task: {goal}")
     try:
         result = agent.run(goal, max_steps=max_steps)
         logger.info(f"Task Result: {result}")
+        if result.get("profile"):
+            with open(os.path.join(result["profile"]["dir"], "summary.txt"), encoding="utf-8") as f:
+                print(f.read())
     except Exception as e:
         logger.error(f"Task execution failed: {e}")
+    finally:
+        logger.info(f"Model request metrics: {client.request_stats}")
+        if controller.health is not None:
+            logger.info(f"Connection metrics: {controller.health.metrics()}")
+        controller.stop_health_monitor()
+
+def run_batch(tasks_file: str = None, goals: list = None, devices: list = None, concurrency: int = None,
+              steps: int = 50, eco_mode: bool = False, retries: int = 1, report: str = None,
+              backend: str = None, model: str = None, base_url: str = None):
+    """Run a queue of tasks across the connected devices"""
+    import json
+    from dotenv import load_dotenv
+    from android_phone.core.scheduler import AgentRunner, Scheduler, TaskSpec, discover_devices, load_tasks
+
+    load_dotenv()
+
+    specs = load_tasks(tasks_file) if tasks_file else []
+    specs += [TaskSpec(goal=goal, max_steps=steps, eco_mode=eco_mode, max_retries=retries) for goal in goals or []]
+    if not specs:
+        logger.error("No tasks: pass a tasks file and/or --goal")
+        return
+    try:
+        serials = devices or discover_devices()
+    except Exception as e:
+        logger.error(f"Failed to list devices: {e}")
+        return
+    if not serials:
+        logger.error("No devices connected")
+        return
+
+    logger.info(f"Running {len(specs)} task(s) on {len(serials)} device(s): {', '.join(serials)}")
+    runner = AgentRunner(backend=backend, model=model, base_url=base_url)
+    try:
+        summary = Scheduler(serials, runner, max_concurrency=concurrency).run(specs)
+    finally:
+        runner.close()
+    output = json.dumps(summary, ensure_ascii=False, indent=2)
+    if report:
+        with open(report, "w", encoding="utf-8") as f:
+            f.write(output)
+        logger.info(f"Batch report written to {report}")
+    print(output)
 
 def main():
     parser = argparse.ArgumentParser(description="Android Phone Autonomous Agent CLI")
@@ -56,14 +111,67 @@ def main():
     run_parser.add_argument("--steps", type=int, default=50, help="Max steps")
     run_parser.add_argument("--eco", action="store_true", help="Enable Eco Mode")
 
+    run_parser.add_argument("--archive", action="store_true",
+                            help="Archive the trajectory (frames, hierarchies, model outputs) under .log/trajectories")
+    run_parser.add_argument("--backend", default=None,
+                            help="Model backend: volcengine (default) or openai (any OpenAI-compatible endpoint). "
+                                 "Env: ANDROID_AGENT_BACKEND")
+    run_parser.add_argument("--model", default=None, help="Model id (env: ANDROID_AGENT_MODEL)")
+    run_parser.add_argument("--base-url", default=None,
+                            help="Endpoint base URL, e.g. http://127.0.0.1:8000/v1 (env: ANDROID_AGENT_BASE_URL)")
+    run_parser.add_argument("--stream", action="store_true", help="Stream the model output to the terminal")
+    run_parser.add_argument("--profile", action="store_true",
+                            help="Profile each step (cProfile + tracemalloc) into .log/profiles/<task_id>/")
+    run_parser.add_argument("--observation", choices=["screenshot", "som"], default=None,
+                            help="som: number the interactive elements on the screenshot and allow click(element=N) "
+                                 "(env: ANDROID_AGENT_OBSERVATION)")
+
+    # Command: batch (Run many tasks across devices)
+    batch_parser = subparsers.add_parser("batch", help="Run a queue of tasks across the connected devices")
+    batch_parser.add_argument("tasks", nargs="?", default=None,
+                              help="Tasks file: JSON list, JSON lines or one goal per line")
+    batch_parser.add_argument("--goal", action="append", default=[], help="Extra goal (repeatable)")
+    batch_parser.add_argument("--devices", default=None, help="Comma-separated serials (default: all adb devices)")
+    batch_parser.add_argument("--concurrency", type=int, default=None,
+                              help="Max devices running at the same time (default: all)")
+    batch_parser.add_argument("--steps", type=int, default=50, help="Max steps for --goal tasks")
+    batch_parser.add_argument("--eco", action="store_true", help="Enable Eco Mode for --goal tasks")
+    batch_parser.add_argument("--retries", type=int, default=1, help="Retries after a transient error for --goal tasks")
+    batch_parser.add_argument("--report", default=None, help="Write the JSON summary report to this file")
+    batch_parser.add_argument("--backend", default=None, help="Model backend (env: ANDROID_AGENT_BACKEND)")
+    batch_parser.add_argument("--model", default=None, help="Model id (env: ANDROID_AGENT_MODEL)")
+    batch_parser.add_argument("--base-url", default=None, help="Endpoint base URL (env: ANDROID_AGENT_BASE_URL)")
+
+    # Command: replay (Replay an archived trajectory offline)
+    replay_parser = subparsers.add_parser("replay", help="Replay an archived trajectory without device or API")
+    replay_parser.add_argument("archive", help="Trajectory directory (e.g. .log/trajectories/<task_id>)")
+    replay_parser.add_argument("--latency-scale", type=float, default=0.0,
+                               help="Replay recorded model latency scaled by this factor (default: 0, instant)")
+
     # Command: server (Start MCP Server)
     server_parser = subparsers.add_parser("server", help="Start MCP Server")
+    server_parser.add_argument("--profile", action="store_true",
+                               help="Profile every autonomous task (env: ANDROID_AGENT_PROFILE=1)")
 
     args = parser.parse_args()
 
     if args.command == "run":
-        run_task(args.goal, args.steps, eco_mode=args.eco)
+        run_task(args.goal, args.steps, eco_mode=args.eco, archive=args.archive,
+                 backend=args.backend, model=args.model, base_url=args.base_url, stream=args.stream,
+                 observation=args.observation, profile=args.profile)
+    elif args.command == "batch":
+        devices = [d.strip() for d in args.devices.split(",") if d.strip()] if args.devices else None
+        run_batch(args.tasks, goals=args.goal, devices=devices, concurrency=args.concurrency, steps=args.steps,
+                  eco_mode=args.eco, retries=args.retries, report=args.report,
+                  backend=args.backend, model=args.model, base_url=args.base_url)
+    elif args.command == "replay":
+        import json
+        from android_phone.bench.replay import replay_trajectory
+        report = replay_trajectory(args.archive, latency_scale=args.latency_scale)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
     elif args.command == "server":
+        if args.profile:
+            os.environ["ANDROID_AGENT_PROFILE"] = "1"
         from android_phone.server import app
         app.run()
     else:
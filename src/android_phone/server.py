@@ -4,12 +4,15 @@
 依赖: scrcpy (投屏), uiautomator2 (自动化), Pillow (图像处理)
 """
 
+import asyncio
+import os
 import subprocess
 import json
 import logging
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 
 from android_phone.core.controller import AndroidController
 from android_phone.integrations.volcengine import VolcengineGUIClient
@@ -24,55 +27,293 @@ logger = logging.getLogger(__name__)
 
 app = FastMCP("android-phone-mcp")
 
-# Global Controller & Client
-controller = AndroidController()
-volcengine_client = VolcengineGUIClient()
-agent = AutonomousAgent(controller, volcengine_client)
+# Global Controller & Client.
+# Constructed lazily on first use so that importing the server (and the MCP
+# handshake) does not pay for device libraries or create files in the cwd.
+_controller: Optional[AndroidController] = None
+_volcengine_client: Optional[VolcengineGUIClient] = None
+_agent: Optional[AutonomousAgent] = None
+# Installed-app indexes by device serial
+_app_indexes: Dict[str, Any] = {}
+_shortcut_registry = None
+# Background autonomous tasks (one at a time on the server's agent)
+_job_manager = None
+# How often a waiting tool re-checks a job, so a cancelled call stops following it promptly
+JOB_POLL_SECONDS = 5.0
+
+
+def get_controller() -> AndroidController:
+    global _controller
+    if _controller is None:
+        _controller = AndroidController()
+    return _controller
+
+
+def get_volcengine_client() -> VolcengineGUIClient:
+    global _volcengine_client
+    if _volcengine_client is None:
+        _volcengine_client = VolcengineGUIClient()
+    return _volcengine_client
+
+
+def get_model_client():
+    """
+    Backend for the autonomous agent, chosen by ANDROID_AGENT_BACKEND (Volcengine by default).
+
+    Always its own instance: background jobs run while other tools are served, and
+    ask_volcengine_agent / reset_volcengine_session must not touch a running task's history.
+    """
+    from android_phone.integrations.backends import create_backend
+
+    return create_backend()
+
+
+def get_app_index():
+    """Installed-app index of the current device (persisted under .log/apps)."""
+    from android_phone.core.apps import AppIndex
+
+    controller = get_controller()
+    serial = controller.serial or "default"
+    if serial not in _app_indexes:
+        _app_indexes[serial] = AppIndex(controller)
+    return _app_indexes[serial]
+
+
+def get_shortcut_registry():
+    """Intent / deep-link shortcuts (ANDROID_AGENT_SHORTCUTS_FILE plus the built-in ones)."""
+    global _shortcut_registry
+    if _shortcut_registry is None:
+        from android_phone.core.shortcuts import ShortcutRegistry
+
+        _shortcut_registry = ShortcutRegistry()
+    return _shortcut_registry
+
+
+def get_agent() -> AutonomousAgent:
+    global _agent
+    if _agent is None:
+        _agent = AutonomousAgent(get_controller(), get_model_client(), shortcut_registry=get_shortcut_registry(),
+                                 app_index=get_app_index())
+    return _agent
+
+
+def get_job_manager():
+    global _job_manager
+    if _job_manager is None:
+        from android_phone.core.jobs import JobManager
+
+        _job_manager = JobManager(get_agent)
+    return _job_manager
+
+
+async def _follow_job(job_id: str, timeout: float, ctx: Optional[Context]):
+    """Wait for a job (at most ``timeout`` seconds), sending a progress notification whenever it changes."""
+    manager = get_job_manager()
+    deadline = time.monotonic() + timeout
+    version = -1
+    while True:
+        wait = min(max(deadline - time.monotonic(), 0.0), JOB_POLL_SECONDS)
+        job = await asyncio.to_thread(manager.wait, job_id, wait, version)
+        if job is None:
+            return None
+        if job.version != version:
+            version = job.version
+            if ctx is not None:
+                message = f"[{job.status}] step {job.step}/{job.max_steps}"
+                if job.last_thought:
+                    message += f": {job.last_thought}"
+                try:
+                    await ctx.report_progress(job.step, job.max_steps, message)
+                except Exception as e:
+                    logger.debug(f"Progress notification failed: {e}")
+        if job.done or time.monotonic() >= deadline:
+            return job
+
+
+def __getattr__(name: str):
+    # Backwards compatible access to the lazily constructed singletons
+    getters = {"controller": get_controller, "volcengine_client": get_volcengine_client, "agent": get_agent}
+    if name in getters:
+        return getters[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 _scrcpy_process: Optional[subprocess.Popen] = None
 
 @app.tool()
-def run_autonomous_task(goal: str, max_steps: int = 50) -> str:
+async def run_autonomous_task(goal: str, max_steps: int = 50, ctx: Optional[Context] = None) -> str:
     """
-    运行自主任务.
+    运行自主任务, 等待任务结束后返回结果.
     Agent 会自动: 截图 -> 分析 -> 操作 -> 循环, 直到完成任务.
+    任务在后台运行 (不阻塞服务器), 每一步发送进度通知 (当前步数、模型的思考).
+    长任务建议使用 submit_autonomous_task + get_task_status, 避免客户端调用超时.
     
     Args:
         goal: 任务目标 (例如 "打开通达信 app，找到上证指数页面，返回 K 线图").
         max_steps: 最大尝试步数 (默认 50).
     """
     try:
-        result = agent.run(goal, max_steps)
-        return json.dumps({"status": "ok", "result": result}, ensure_ascii=False)
+        manager = get_job_manager()
+        job = manager.submit(goal, max_steps)
+        try:
+            job = await _follow_job(job.job_id, float("inf"), ctx)
+        except asyncio.CancelledError:
+            # The client gave up on the call: stop the task too
+            manager.cancel(job.job_id)
+            raise
+        if job.error is not None:
+            return json.dumps({"status": "error", "message": job.error}, ensure_ascii=False)
+        return json.dumps({"status": "ok", "result": job.result}, ensure_ascii=False)
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
 
 @app.tool()
-def connect(serial: str = None) -> str:
+def submit_autonomous_task(goal: str, max_steps: int = 50) -> str:
     """
-    连接 Android 设备.
-    
+    在后台提交自主任务, 立即返回 job_id.
+    之后用 get_task_status 查询进度 / wait_for_task 等待, 用 cancel_task 取消.
+    多个任务按提交顺序依次运行 (共用同一台设备).
+
     Args:
-        serial: 设备序列号 (可选). 如果为空，连接第一个可用设备.
+        goal: 任务目标.
+        max_steps: 最大尝试步数 (默认 50).
     """
     try:
-        if serial:
-            controller.serial = serial
-        
-        controller.connect()
-        info = controller.get_info()
-        
-        return json.dumps({
-            "status": "connected",
-            "device": info.get("productName", "Unknown"),
-            "androidVersion": info.get("sdkInt", "Unknown"),
-            "manufacturer": info.get("product", "Unknown"),
-        }, ensure_ascii=False, indent=2)
+        job = get_job_manager().submit(goal, max_steps)
+        return json.dumps({"status": "ok", "job_id": job.job_id, "job": job.to_dict()}, ensure_ascii=False)
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
 
 @app.tool()
-def get_screen_state(include_xml: bool = False, compact_xml: bool = True, scale: float = 1.0) -> str:
+def get_task_status(job_id: str = "") -> str:
+    """
+    查询后台任务的状态: queued / running / completed / failed / error / cancelled,
+    当前步数、最近一步的思考和动作、目前为止的 Token 用量, 结束后包含任务结果.
+
+    Args:
+        job_id: submit_autonomous_task 返回的 job_id. 为空时列出所有任务.
+    """
+    manager = get_job_manager()
+    if not job_id:
+        jobs = [{k: v for k, v in job.to_dict().items() if k != "result"} for job in manager.list()]
+        return json.dumps({"status": "ok", "jobs": jobs}, ensure_ascii=False)
+    job = manager.get(job_id)
+    if job is None:
+        return json.dumps({"status": "error", "message": f"Unknown job '{job_id}'"}, ensure_ascii=False)
+    return json.dumps({"status": "ok", "job": job.to_dict()}, ensure_ascii=False)
+
+@app.tool()
+async def wait_for_task(job_id: str, timeout: float = 60.0, ctx: Optional[Context] = None) -> str:
+    """
+    等待后台任务结束 (最多 timeout 秒), 期间每一步发送进度通知.
+    超时后返回当前状态, 任务继续运行.
+
+    Args:
+        job_id: submit_autonomous_task 返回的 job_id.
+        timeout: 最长等待秒数 (默认 60).
+    """
+    try:
+        job = await _follow_job(job_id, timeout, ctx)
+        if job is None:
+            return json.dumps({"status": "error", "message": f"Unknown job '{job_id}'"}, ensure_ascii=False)
+        return json.dumps({"status": "ok", "job": job.to_dict()}, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+@app.tool()
+def cancel_task(job_id: str) -> str:
+    """
+    取消后台任务. 排队中的任务不再运行; 运行中的任务在当前一步结束后停止,
+    并在任务日志中记录结束 (状态 cancelled).
+
+    Args:
+        job_id: submit_autonomous_task 返回的 job_id.
+    """
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        return json.dumps({"status": "error", "message": f"Unknown job '{job_id}'"}, ensure_ascii=False)
+    return json.dumps({"status": "ok", "job": job.to_dict()}, ensure_ascii=False)
+
+@app.tool()
+async def run_task_batch(tasks: List[Dict[str, Any]], devices: Optional[List[str]] = None,
+                         max_concurrency: Optional[int] = None) -> str:
+    """
+    批量运行自主任务, 分发到多台设备 (每台设备同一时间只运行一个任务).
+    运行结束后返回吞吐量/延迟汇总报告.
+
+    Args:
+        tasks: 任务列表, 每项为 {"goal": ..., "priority": 0, "serial": 可选, "required_app": 可选包名,
+            "max_steps": 50, "eco_mode": false, "max_retries": 1}. 优先级高的先执行.
+        devices: 设备序列号列表 (可选). 为空时使用 adb 已连接的全部设备.
+        max_concurrency: 同时运行任务的设备数上限 (可选, 默认全部).
+    """
+    from android_phone.core.scheduler import AgentRunner, Scheduler, TaskSpec, discover_devices
+
+    try:
+        specs = [TaskSpec.from_dict(task) for task in tasks]
+        serials = devices or await asyncio.to_thread(discover_devices)
+        runner = AgentRunner()
+        try:
+            # The batch runs in a worker thread so the event loop keeps serving other tools
+            scheduler = Scheduler(serials, runner, max_concurrency=max_concurrency)
+            summary = await asyncio.to_thread(scheduler.run, specs)
+        finally:
+            runner.close()
+        return json.dumps({"status": "ok", **summary}, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+@app.tool()
+async def connect(serial: str = None) -> str:
+    """
+    连接 Android 设备.
+    
+    Args:
+        serial: 设备序列号 (可选). 如果为空，连接第一个可用设备.
+    """
+    def run() -> str:
+        try:
+            controller = get_controller()
+            if serial and serial != controller.serial:
+                controller.stop_health_monitor()
+                controller.serial = serial
+
+            # Connect + warm-up; the background health checks start once connected
+            monitor = controller.start_health_monitor()
+            try:
+                monitor.connect(retry=False)
+            except Exception:
+                controller.stop_health_monitor()
+                raise
+            # Build the installed-app index in the background, off the first task's critical path
+            get_app_index().start_refresh()
+            info = controller.get_info()
+
+            return json.dumps({
+                "status": "connected",
+                "device": info.get("productName", "Unknown"),
+                "androidVersion": info.get("sdkInt", "Unknown"),
+                "manufacturer": info.get("product", "Unknown"),
+                "warm_up_ms": monitor.metrics().get("last_warm_up_ms"),
+            }, ensure_ascii=False, indent=2)
+        except Exception as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+    return await asyncio.to_thread(run)
+
+@app.tool()
+def get_connection_status() -> str:
+    """
+    获取设备连接健康状态 (连接状态机、ping 延迟、重连次数与耗时).
+    """
+    controller = get_controller()
+    if controller.health is None:
+        state = "connected" if controller._device is not None else "disconnected"
+        return json.dumps({"status": "ok", "state": state, "monitor": False}, ensure_ascii=False)
+    return json.dumps({"status": "ok", "monitor": True, **controller.health.metrics()}, ensure_ascii=False)
+
+@app.tool()
+async def get_screen_state(include_xml: bool = False, compact_xml: bool = True, scale: float = 1.0,
+                           max_age: Optional[float] = None) -> str:
     """
     获取当前屏幕状态 (截图 + 可选 XML).
     Agent 应该在每次操作前调用此工具来观察环境.
@@ -81,28 +322,57 @@ def get_screen_state(include_xml: bool = False, compact_xml: bool = True, scale:
         include_xml: 是否包含 UI 树.
         compact_xml: 是否简化 UI 树 (默认 True).
         scale: 截图缩放比例 (0.1 - 1.0), 默认 1.0. 调小可以节省 Token.
+        max_age: 复用最近一帧截图的最大时长 (秒). 上次截图之后没有任何操作且不超过该时长时,
+            不重新截图 (同一帧的不同 scale 只编码一次). 默认 ANDROID_FRAME_MAX_AGE (1 秒), 0 表示总是重新截图.
     
     Returns:
         JSON string containing:
         - image: Base64 encoded JPEG image (resized to max 1080p).
         - xml: UI hierarchy XML string (if include_xml is True).
         - info: Device info (width, height, etc).
+        - capture_timestamp: 截图与 UI 树共同的采集时间 (epoch 秒), 两者描述同一时刻.
+    """
+    def run() -> str:
+        try:
+            # Screenshot/encode overlap the (slow) hierarchy dump
+            controller = get_controller()
+            state = controller.capture_screen_state(include_hierarchy=include_xml, compact=compact_xml, scale=scale,
+                                                    max_age=controller.frame_max_age if max_age is None else max_age)
+            return json.dumps({"status": "ok", **state}, ensure_ascii=False)
+        except Exception as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+    return await asyncio.to_thread(run)
+
+@app.tool()
+def zoom(x: int, y: int, width: int = 300, height: int = 200, normalized: bool = True,
+         max_age: Optional[float] = None) -> str:
+    """
+    获取屏幕某个区域的全分辨率特写 (只裁剪该区域). 用于读取小字 (如股票行情),
+    这样 get_screen_state 可以保持低 scale, 只在需要细节时付出代价.
+    
+    Args:
+        x: 区域中心 X.
+        y: 区域中心 Y.
+        width: 区域宽度 (默认 300).
+        height: 区域高度 (默认 200).
+        normalized: 是否为归一化坐标 (0-1000), 默认 True. False 时为像素.
+        max_age: 复用最近一帧截图的最大时长 (秒), 同 get_screen_state. 0 表示重新截图.
+    
+    Returns:
+        JSON: image (区域的 Base64 JPEG), box (区域 [x1, y1, x2, y2], 与输入坐标体系相同).
     """
     try:
-        image_b64 = controller.get_screenshot(scale=scale)
-        result = {
-            "status": "ok",
-            "image": image_b64,
-            "info": controller.get_info()
-        }
-        
-        if include_xml:
-            if compact_xml:
-                result["xml"] = controller.get_compact_ui_hierarchy()
-            else:
-                result["xml"] = controller.get_ui_hierarchy()
-            
-        return json.dumps(result, ensure_ascii=False)
+        controller = get_controller()
+        frame = controller.latest_frame(max_age)
+        frame_w, frame_h = frame.size
+        if normalized:
+            x, y = x * frame_w // 1000, y * frame_h // 1000
+            width, height = width * frame_w // 1000, height * frame_h // 1000
+        image_b64, box = controller.zoom(x, y, width, height, frame=frame)
+        if normalized:
+            box = (box[0] * 1000 // frame_w, box[1] * 1000 // frame_h, box[2] * 1000 // frame_w, box[3] * 1000 // frame_h)
+        return json.dumps({"status": "ok", "image": image_b64, "box": list(box)}, ensure_ascii=False)
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
 
@@ -115,13 +385,69 @@ def tap_element(text: str = None, resource_id: str = None) -> str:
         text: 元素文本 (例如 "微信", "发送").
         resource_id: 元素资源ID (例如 "com.tencent.mm:id/text").
     """
-    if controller.click_element(text=text, resource_id=resource_id):
+    if get_controller().click_element(text=text, resource_id=resource_id):
         return json.dumps({"status": "ok", "action": "tap_element", "target": {"text": text, "id": resource_id}}, ensure_ascii=False)
     else:
         return json.dumps({"status": "error", "message": "Failed to find or click element"}, ensure_ascii=False)
 
 @app.tool()
-def ask_volcengine_agent(instruction: str) -> str:
+async def wait_for_element(text: str = None, description: str = None, resource_id: str = None,
+                           state: str = "appear", timeout: float = 10.0) -> str:
+    """
+    等待元素出现或消失 (服务端轮询 UI 树, 条件满足立即返回). 替代客户端循环调用 get_screen_state.
+    
+    Args:
+        text: 元素文本 (包含匹配).
+        description: 元素 content-desc (包含匹配).
+        resource_id: 元素资源ID.
+        state: "appear" (等待出现) 或 "disappear" (等待消失).
+        timeout: 超时时间 (秒).
+    
+    Returns:
+        JSON: matched, elapsed_ms, polls, 以及出现时元素的 bounds / center.
+    """
+    def run() -> str:
+        try:
+            result = get_controller().wait_for_element(text=text, description=description, resource_id=resource_id,
+                                                       state=state, timeout=timeout)
+            return json.dumps({"status": "ok" if result["matched"] else "timeout", **result}, ensure_ascii=False)
+        except Exception as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+    return await asyncio.to_thread(run)
+
+@app.tool()
+async def wait_for_change(region: Optional[List[int]] = None, threshold: float = 0.02, timeout: float = 10.0) -> str:
+    """
+    等待屏幕 (或指定区域) 发生变化, 变化后立即返回. 适合等待页面加载/动画结束.
+    
+    Args:
+        region: 可选区域 [x1, y1, x2, y2], 0-1000 归一化坐标. 为空时比较整个屏幕.
+        threshold: 变化阈值 (0-1, 帧指纹的平均差异), 默认 0.02.
+        timeout: 超时时间 (秒).
+    
+    Returns:
+        JSON: changed, distance, elapsed_ms, polls.
+    """
+    def run() -> str:
+        try:
+            controller = get_controller()
+            pixel_region = None
+            if region:
+                if len(region) != 4:
+                    raise ValueError("region must be [x1, y1, x2, y2]")
+                x1, y1 = controller.denormalize_coordinates(region[0], region[1])
+                x2, y2 = controller.denormalize_coordinates(region[2], region[3])
+                pixel_region = (x1, y1, x2, y2)
+            result = controller.wait_for_change(region=pixel_region, threshold=threshold, timeout=timeout)
+            return json.dumps({"status": "ok" if result["changed"] else "timeout", **result}, ensure_ascii=False)
+        except Exception as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+    return await asyncio.to_thread(run)
+
+@app.tool()
+async def ask_volcengine_agent(instruction: str) -> str:
     """
     将当前屏幕和指令发送给火山引擎 GUI Agent 模型，获取操作建议.
     
@@ -133,21 +459,25 @@ def ask_volcengine_agent(instruction: str) -> str:
     Returns:
         模型的回复 (JSON). 通常包含对屏幕的分析和建议的下一步动作.
     """
-    try:
-        # 1. Capture screen
-        image_b64 = controller.get_screenshot(quality=60, max_size=(720, 1280)) # Optimize for API
-        
-        # 2. Call Volcengine API
-        response = volcengine_client.ask(instruction, image_b64)
-        
-        # 3. Return raw response (Agent can parse it)
-        return json.dumps({
-            "status": "ok",
-            "model_response": response
-        }, ensure_ascii=False)
-        
-    except Exception as e:
-        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+    def run() -> str:
+        try:
+            # 1. Capture screen (reusing a frame the client has just observed)
+            controller = get_controller()
+            image_b64 = controller.get_screenshot(quality=60, max_size=(720, 1280), max_age=controller.frame_max_age) # Optimize for API
+
+            # 2. Call Volcengine API
+            response = get_volcengine_client().ask(instruction, image_b64)
+
+            # 3. Return raw response (Agent can parse it)
+            return json.dumps({
+                "status": "ok",
+                "model_response": response
+            }, ensure_ascii=False)
+
+        except Exception as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+    return await asyncio.to_thread(run)
 
 @app.tool()
 def reset_volcengine_session() -> str:
@@ -156,7 +486,7 @@ def reset_volcengine_session() -> str:
     当开始一个新的任务时，建议先调用此工具.
     """
     try:
-        volcengine_client.reset_session()
+        get_volcengine_client().reset_session()
         return json.dumps({"status": "ok", "message": "Session reset successfully"}, ensure_ascii=False)
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
@@ -171,6 +501,7 @@ def tap(x: int, y: int, normalized: bool = False) -> str:
         y: Y 坐标
         normalized: 如果为 True, 坐标应为 0-1000 的归一化坐标.
     """
+    controller = get_controller()
     if normalized:
         x, y = controller.denormalize_coordinates(x, y)
         
@@ -190,6 +521,7 @@ def swipe(x1: int, y1: int, x2: int, y2: int, duration: float = 0.5, normalized:
         duration: 持续时间 (秒)
         normalized: 如果为 True, 坐标应为 0-1000 的归一化坐标.
     """
+    controller = get_controller()
     if normalized:
         x1, y1 = controller.denormalize_coordinates(x1, y1)
         x2, y2 = controller.denormalize_coordinates(x2, y2)
@@ -199,6 +531,33 @@ def swipe(x1: int, y1: int, x2: int, y2: int, duration: float = 0.5, normalized:
     else:
         return json.dumps({"status": "error", "message": "Failed to swipe"}, ensure_ascii=False)
 
+@app.tool()
+async def scroll_until_found(text: str = None, description: str = None, resource_id: str = None,
+                             direction: str = "down", max_swipes: int = 15) -> str:
+    """
+    在本地滚动列表直到找到目标元素 (只读取 UI 树, 不截图, 不调用模型).
+    到达列表末尾 (UI 树不再变化) 时停止.
+    
+    Args:
+        text: 元素文本 (包含匹配).
+        description: 元素 content-desc (包含匹配).
+        resource_id: 元素资源ID.
+        direction: 要显示更多内容的方向: down, up, left, right.
+        max_swipes: 最大滑动次数.
+    
+    Returns:
+        JSON: found, swipes, reason, 以及找到时元素的 bounds / center (像素坐标).
+    """
+    def run() -> str:
+        try:
+            result = get_controller().scroll_until_found(text=text, description=description, resource_id=resource_id,
+                                                         direction=direction, max_swipes=max_swipes)
+            return json.dumps({"status": "ok" if result["found"] else "not_found", **result}, ensure_ascii=False)
+        except Exception as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+    return await asyncio.to_thread(run)
+
 @app.tool()
 def input_text(text: str, clear: bool = True) -> str:
     """
@@ -208,7 +567,7 @@ def input_text(text: str, clear: bool = True) -> str:
         text: 要输入的文本
         clear: 是否先清空输入框 (默认 True)
     """
-    if controller.input_text(text, clear):
+    if get_controller().input_text(text, clear):
         return json.dumps({"status": "ok", "action": "input", "text": text}, ensure_ascii=False)
     else:
         return json.dumps({"status": "error", "message": "Failed to input text"}, ensure_ascii=False)
@@ -221,11 +580,25 @@ def press_key(key: str) -> str:
     Args:
         key: home, back, recent, enter, delete, volume_up, volume_down, power
     """
-    if controller.press_key(key):
+    if get_controller().press_key(key):
         return json.dumps({"status": "ok", "action": "press_key", "key": key}, ensure_ascii=False)
     else:
         return json.dumps({"status": "error", "message": f"Failed to press key {key}"}, ensure_ascii=False)
 
+@app.tool()
+def press_keys(keys: List[str]) -> str:
+    """
+    按顺序按下多个按键 (例如 ["back", "back", "home"]).
+    键码类按键会合并为一次 shell 调用, 比多次调用 press_key 更快.
+    
+    Args:
+        keys: 按键列表, 支持 press_key 的所有按键名
+    """
+    if get_controller().press_keys(keys):
+        return json.dumps({"status": "ok", "action": "press_keys", "keys": keys}, ensure_ascii=False)
+    else:
+        return json.dumps({"status": "error", "message": f"Failed to press keys {keys}"}, ensure_ascii=False)
+
 @app.tool()
 def launch_app(package_name: str) -> str:
     """
@@ -234,7 +607,7 @@ def launch_app(package_name: str) -> str:
     Args:
         package_name: 应用包名 (例如 com.tencent.mm)
     """
-    if controller.launch_app(package_name):
+    if get_controller().launch_app(package_name):
         return json.dumps({"status": "ok", "action": "launch_app", "package": package_name}, ensure_ascii=False)
     else:
         return json.dumps({"status": "error", "message": f"Failed to launch {package_name}"}, ensure_ascii=False)
@@ -247,17 +620,103 @@ def stop_app(package_name: str) -> str:
     Args:
         package_name: 应用包名
     """
-    if controller.stop_app(package_name):
+    if get_controller().stop_app(package_name):
         return json.dumps({"status": "ok", "action": "stop_app", "package": package_name}, ensure_ascii=False)
     else:
         return json.dumps({"status": "error", "message": f"Failed to stop {package_name}"}, ensure_ascii=False)
 
 @app.tool()
-def list_apps() -> str:
+async def open_app(name: str) -> str:
+    """
+    按应用名称打开应用, 在本地解析, 不调用模型.
+    支持应用显示名称、中文名、英文名、拼音 (需安装 pypinyin) 或包名.
+
+    Args:
+        name: 应用名称 (例如 "微信", "WeChat", "weixin") 或包名
+    """
+    def run() -> str:
+        try:
+            index = get_app_index()
+            package = index.resolve(name)
+            if package is None:
+                return json.dumps({"status": "error", "message": f"App '{name}' is not installed"}, ensure_ascii=False)
+            controller = get_controller()
+            if controller.launch_app(package) and controller.wait_for_app(package):
+                return json.dumps({"status": "ok", "action": "open_app", "package": package, "label": index.label(package)},
+                                  ensure_ascii=False)
+            return json.dumps({"status": "error", "message": f"Failed to open {package}"}, ensure_ascii=False)
+        except Exception as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+    return await asyncio.to_thread(run)
+
+@app.tool()
+def list_shortcuts() -> str:
+    """
+    列出已注册的快捷跳转 (Intent / Deep Link), 包括名称、匹配的目标模式和参数.
+    """
+    try:
+        shortcuts = [
+            {"name": s.name, "description": s.description, "patterns": s.patterns,
+             "params": s.params}
+            for s in get_shortcut_registry().shortcuts
+        ]
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+    return json.dumps({"status": "ok", "shortcuts": shortcuts}, ensure_ascii=False)
+
+@app.tool()
+def run_shortcut(name: str = "", goal: str = "", params: Optional[Dict[str, str]] = None) -> str:
+    """
+    通过 Intent / Deep Link 直接跳转到指定页面, 并等待页面就绪. 不调用模型.
+
+    Args:
+        name: 快捷跳转名称 (见 list_shortcuts)
+        goal: 或者给出任务目标, 使用第一个匹配的快捷跳转 (例如 "打开WLAN设置")
+        params: 按名称调用时的参数 (例如 {"url": "https://example.com"})
+    """
+    try:
+        registry = get_shortcut_registry()
+        rest = ""
+        if name:
+            shortcut = registry.get(name)
+            if shortcut is None:
+                return json.dumps({"status": "error", "message": f"Unknown shortcut '{name}'"}, ensure_ascii=False)
+        elif goal:
+            match = registry.match(goal)
+            if match is None:
+                return json.dumps({"status": "error", "message": "No shortcut matches the goal"}, ensure_ascii=False)
+            shortcut, matched, rest = match
+            params = {**matched, **(params or {})}
+        else:
+            return json.dumps({"status": "error", "message": "Provide a shortcut name or a goal"}, ensure_ascii=False)
+        outcome = registry.execute(get_controller(), shortcut, params)
+        outcome.update(status="ok" if outcome.pop("ok") else "error", rest=rest)
+        return json.dumps(outcome, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+@app.tool()
+def list_apps(with_labels: bool = False) -> str:
     """
     列出已安装的第三方应用包名.
+
+    Args:
+        with_labels: 同时返回应用名称 (来自本地应用索引; 名称在后台查询, 尚未查到的应用
+            暂时使用内置名称或包名, labels_pending 为仍在查询的数量)
     """
-    apps = controller.list_apps()
+    if with_labels:
+        try:
+            index = get_app_index()
+            index.sync_packages()
+            index.start_refresh()
+            entries = list(index.apps.items())
+            apps = [{"package": package, "label": entry["label"]} for package, entry in entries]
+            pending = sum(not entry.get("labelled") for _, entry in entries)
+        except Exception as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+        return json.dumps({"status": "ok", "apps": apps, "labels_pending": pending}, ensure_ascii=False)
+    apps = get_controller().list_apps()
     return json.dumps({"status": "ok", "apps": apps}, ensure_ascii=False)
 
 @app.tool()
@@ -265,7 +724,7 @@ def unlock_device() -> str:
     """
     尝试唤醒并解锁屏幕.
     """
-    if controller.unlock_device():
+    if get_controller().unlock_device():
         return json.dumps({"status": "ok", "action": "unlock"}, ensure_ascii=False)
     else:
         return json.dumps({"status": "error", "message": "Failed to unlock"}, ensure_ascii=False)
@@ -0,0 +1,29 @@
+"""
+测试共用 fixture
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench import FakeDevice
+from android_phone.core.controller import AndroidController
+
+
+@pytest.fixture
+def fake_controller():
+    """
+    AndroidController 工厂, 使用离线 FakeDevice.
+
+    fake_controller(advance_on_action=False, ...) 的关键字参数透传给 FakeDevice;
+    也可以直接传入设备实例: fake_controller(device).
+    """
+    def make(device=None, **kwargs):
+        controller = AndroidController()
+        controller._device = device or FakeDevice(**kwargs)
+        return controller
+    return make
@@ -0,0 +1,286 @@
+"""
+应用名称索引与本地打开应用测试 (名称解析、持久化、增量刷新、Agent 快捷路径)
+"""
+
+import asyncio
+import json
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench.fake_device import ShellResponse
+from android_phone.core.agent import AutonomousAgent
+from android_phone.core.apps import AppIndex, normalize_name
+from android_phone.core.controller import parse_badging_labels
+
+FINISHED = {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {"total_tokens": 5}}
+
+
+def _index(controller, tmp_path, **kwargs):
+    return AppIndex(controller, path=str(tmp_path / "apps.json"), **kwargs)
+
+
+def _label_lookups(controller):
+    return sum("dump badging" in cmd for cmd in controller._device.shell_commands)
+
+
+class TestAppIndex:
+    """测试应用索引的建立与持久化"""
+
+    def test_labels_and_builtin_system_apps(self, fake_controller, tmp_path):
+        index = _index(fake_controller(advance_on_action=False), tmp_path)
+
+        assert index.refresh() == {"added": 3, "removed": 0, "labelled": 3}
+        assert index.label("com.tencent.mm") == "微信"
+        assert index.label("com.android.settings") == "设置"
+        assert "wechat" in index.apps["com.tencent.mm"]["aliases"]
+
+    def test_resolve(self, fake_controller, tmp_path):
+        index = _index(fake_controller(advance_on_action=False), tmp_path)
+        index.refresh()
+
+        assert index.resolve("微信") == "com.tencent.mm"
+        assert index.resolve("WeChat") == "com.tencent.mm"
+        assert index.resolve("com.example.list") == "com.example.list"
+        assert index.resolve("Example") == "com.example.list"
+        assert index.resolve("支付宝") is None
+
+    def test_persisted(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        _index(controller, tmp_path).refresh()
+        lookups = _label_lookups(controller)
+
+        index = _index(controller, tmp_path)
+        index.refresh(force=True)
+
+        assert index.label("com.tencent.mm") == "微信"
+        assert _label_lookups(controller) == lookups
+
+    def test_incremental_refresh(self, fake_controller, tmp_path):
+        """测试只为新安装的应用查询名称"""
+        controller = fake_controller(advance_on_action=False)
+        index = _index(controller, tmp_path)
+        index.refresh()
+        controller._device.packages.remove("com.example.list")
+        controller._device.packages.append("com.zhihu.android")
+        before = _label_lookups(controller)
+
+        assert index.refresh(force=True) == {"added": 1, "removed": 1, "labelled": 1}
+        assert _label_lookups(controller) == before + 1
+        assert index.resolve("知乎") == "com.zhihu.android"
+
+    def test_failed_labels_retried(self, fake_controller, tmp_path):
+        """测试名称查询失败的应用在下次刷新时重试"""
+        controller = fake_controller(advance_on_action=False)
+        lookup = controller.app_labels
+        controller.app_labels = Mock(return_value=None)
+        index = _index(controller, tmp_path)
+        index.refresh()
+        assert index.label("com.example.list") == "list"
+
+        controller.app_labels = lookup
+        assert index.refresh(force=True)["labelled"] == 3
+        assert index.label("com.example.list") == "Example"
+
+    def test_newly_installed_found_on_miss(self, fake_controller, tmp_path):
+        """测试未命中时在后台重新列出应用, 且有最小间隔"""
+        controller = fake_controller(advance_on_action=False)
+        index = _index(controller, tmp_path)
+        index.refresh()
+        controller._device.packages.append("com.zhihu.android")
+
+        assert index.resolve("com.zhihu.android") == "com.zhihu.android"
+        index._checked_at = 0.0
+        assert index.resolve("知乎") is None
+        index._thread.join(5)
+        assert index.resolve("知乎") == "com.zhihu.android"
+        assert index.start_refresh() is False
+
+    def test_aliases_file(self, fake_controller, tmp_path):
+        aliases = tmp_path / "aliases.json"
+        aliases.write_text(json.dumps({"com.example.list": ["列表"]}, ensure_ascii=False), encoding="utf-8")
+
+        index = _index(fake_controller(advance_on_action=False), tmp_path, aliases_file=str(aliases))
+
+        assert index.resolve("列表") == "com.example.list"
+
+    def test_normalize(self):
+        assert normalize_name("QQ 音乐") == normalize_name("qq音乐")
+
+
+class TestColdIndex:
+    """测试索引建立期间不阻塞查找"""
+
+    def test_lookup_does_not_wait_for_labels(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        release = threading.Event()
+        controller.app_labels = Mock(side_effect=lambda package: release.wait(5) and None)
+        index = _index(controller, tmp_path)
+
+        assert index.match_goal("打开微信发消息") == ("com.tencent.mm", "发消息")
+        assert index.match_goal("打开支付宝") is None
+        assert index._thread.is_alive()
+        release.set()
+        index._thread.join(5)
+
+    def test_cold_checks_installation(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        controller.app_labels = Mock(return_value=None)
+        index = _index(controller, tmp_path)
+
+        assert index.resolve("支付宝") is None
+        assert "pm path com.eg.android.AlipayGphone" in controller._device.shell_commands
+        index._thread.join(5)
+
+
+class TestAppLabels:
+    """测试在设备上读取应用名称"""
+
+    BADGING = ("package: name='com.tencent.mm' versionCode='1'\n"
+               "application-label:'WeChat'\n"
+               "application-label-zh:'微信'\n"
+               "application-label-zh-CN:'微信'\n"
+               "application-label-zh-TW:'微信台灣'\n")
+
+    def test_locale_first(self):
+        assert parse_badging_labels(self.BADGING, "zh-CN") == ["微信", "WeChat", "微信台灣"]
+        assert parse_badging_labels(self.BADGING, "en-US") == ["WeChat", "微信", "微信台灣"]
+        assert parse_badging_labels("package: name='x'\n") == []
+
+    def test_app_info_has_no_label(self, fake_controller):
+        """测试 uiautomator2 的 app_info 只有版本信息, 名称来自设备上的 aapt, 不拉取 APK"""
+        controller = fake_controller(advance_on_action=False)
+
+        assert "label" not in controller.device.app_info("com.tencent.mm")
+        assert controller.app_label("com.tencent.mm") == "微信"
+        assert controller.app_labels("com.unknown.app") == []
+        assert controller._device.call_count("pull") == 0
+
+    def test_dumpsys_fallback(self, fake_controller):
+        """测试设备上没有 aapt 时使用 dumpsys package"""
+        controller = fake_controller(advance_on_action=False, device_aapt=False)
+        controller._device.shell_handler = lambda cmd: (
+            ShellResponse("  nonLocalizedLabel=Notes\n", 0) if cmd == "dumpsys package com.example.list" else None)
+
+        assert controller.app_labels("com.example.list") == ["Notes"]
+        assert controller.app_labels("com.tencent.mm") == []
+
+    def test_lookup_error_is_retryable(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        controller._device.shell_handler = Mock(side_effect=RuntimeError("adb offline"))
+
+        assert controller.app_labels("com.tencent.mm") is None
+
+    def test_all_labels_indexed(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False, packages=["com.example.notes"], system_packages=[])
+        controller._device.shell_handler = lambda cmd: (
+            ShellResponse("application-label:'Notes'\napplication-label-zh-CN:'便签'\n", 0)
+            if "dump badging" in cmd else None)
+        index = _index(controller, tmp_path)
+        index.refresh()
+
+        assert index.resolve("Notes") == "com.example.notes"
+        assert index.label("com.example.notes") == "便签"
+
+
+class TestMatchGoal:
+    """测试从目标中识别要打开的应用"""
+
+    @pytest.mark.parametrize("goal, expected", [
+        ("打开微信给妈妈发消息", ("com.tencent.mm", "给妈妈发消息")),
+        ("打开设置", ("com.android.settings", "")),
+        ("请帮我打开微信，然后搜索公众号", ("com.tencent.mm", "搜索公众号")),
+        ("open WeChat app", ("com.tencent.mm", "")),
+        ("Open wechat and check messages", ("com.tencent.mm", "check messages")),
+    ])
+    def test_matched(self, fake_controller, tmp_path, goal, expected):
+        assert _index(fake_controller(advance_on_action=False), tmp_path).match_goal(goal) == expected
+
+    @pytest.mark.parametrize("goal", ["给妈妈发微信", "打开支付宝", "open wechatpay"])
+    def test_not_matched(self, fake_controller, tmp_path, goal):
+        assert _index(fake_controller(advance_on_action=False), tmp_path).match_goal(goal) is None
+
+
+class TestAgentFastOpen:
+    """测试 Agent 在调用模型前本地打开应用"""
+
+    def test_open_only_needs_no_model(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+
+        result = AutonomousAgent(controller, client, log_dir=str(tmp_path)).run("打开微信", max_steps=3)
+
+        assert result["status"] == "completed"
+        assert result["steps"] == 0
+        assert "com.tencent.mm" in result["result"]
+        client.ask.assert_not_called()
+        assert ("app_start", ("com.tencent.mm",)) in controller._device.calls
+
+    def test_rest_of_goal_left_to_model(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [FINISHED]
+
+        result = AutonomousAgent(controller, client, log_dir=str(tmp_path),
+                                 settle_delay=(0, 0)).run("打开微信给妈妈发消息", max_steps=3)
+
+        assert result["steps"] == 1
+        instruction = client.ask.call_args.args[0]
+        assert instruction.startswith("打开微信给妈妈发消息")
+        assert "微信 (com.tencent.mm) has already been opened" in instruction
+
+    def test_event_logged(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [FINISHED]
+        agent = AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0))
+
+        agent.run("打开支付宝", max_steps=2)
+
+        events = [json.loads(line) for f in tmp_path.glob("*.jsonl") for line in f.read_text(encoding="utf-8").splitlines()]
+        assert any(e.get("event") == "app_open" and e.get("hit") is False for e in events)
+        assert controller._device.call_count("app_start") == 0
+
+    def test_disabled(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [FINISHED]
+
+        result = AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0),
+                                 fast_open=False).run("打开微信", max_steps=2)
+
+        assert result["steps"] == 1
+        assert controller._device.call_count("app_start") == 0
+
+
+class TestServerOpenApp:
+    """测试 MCP open_app / list_apps 工具"""
+
+    def test_open_app(self, fake_controller, monkeypatch, tmp_path):
+        from android_phone import server
+
+        controller = fake_controller(advance_on_action=False)
+        monkeypatch.setattr(server, "_controller", controller)
+        monkeypatch.setattr(server, "_app_indexes", {"default": _index(controller, tmp_path)})
+
+        result = json.loads(asyncio.run(server.open_app("WeChat")))
+
+        assert result == {"status": "ok", "action": "open_app", "package": "com.tencent.mm", "label": "微信"}
+        assert json.loads(asyncio.run(server.open_app("支付宝")))["status"] == "error"
+
+    def test_list_with_labels(self, fake_controller, monkeypatch, tmp_path):
+        from android_phone import server
+
+        controller = fake_controller(advance_on_action=False)
+        monkeypatch.setattr(server, "_controller", controller)
+        monkeypatch.setattr(server, "_app_indexes", {"default": _index(controller, tmp_path)})
+
+        apps = json.loads(server.list_apps(with_labels=True))["apps"]
+
+        assert {"package": "com.tencent.mm", "label": "微信"} in apps
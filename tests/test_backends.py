@@ -0,0 +1,106 @@
+"""
+可插拔 VLM 后端测试 (Volcengine / OpenAI 兼容本地服务)
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench import MockArkServer, scripted_task
+from android_phone.core.agent import AutonomousAgent
+from android_phone.integrations.backends import VLMBackend, create_backend
+from android_phone.integrations.openai_compat import OpenAICompatibleClient
+from android_phone.integrations.volcengine import VolcengineGUIClient
+
+
+class TestCreateBackend:
+    """测试后端选择"""
+
+    def test_default_is_volcengine(self, monkeypatch):
+        monkeypatch.delenv("ANDROID_AGENT_BACKEND", raising=False)
+
+        client = create_backend(api_key="k")
+
+        assert isinstance(client, VolcengineGUIClient)
+        assert isinstance(client, VLMBackend)
+
+    def test_openai_from_env(self, monkeypatch):
+        monkeypatch.setenv("ANDROID_AGENT_BACKEND", "openai")
+        monkeypatch.setenv("ANDROID_AGENT_BASE_URL", "http://127.0.0.1:8000/v1/")
+        monkeypatch.setenv("ANDROID_AGENT_MODEL", "ui-tars-7b")
+
+        client = create_backend()
+
+        assert type(client) is OpenAICompatibleClient
+        assert client.API_URL == "http://127.0.0.1:8000/v1/chat/completions"
+        assert client.model == "ui-tars-7b"
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            create_backend("nope")
+
+    def test_local_backend_needs_no_key(self, monkeypatch):
+        monkeypatch.delenv("VLM_API_KEY", raising=False)
+        client = OpenAICompatibleClient()
+
+        assert "Authorization" not in client._headers()
+
+
+class TestOpenAICompatible:
+    """测试 OpenAI 兼容客户端 (本地 Mock 服务)"""
+
+    def test_ask(self):
+        with MockArkServer(scripted_task(1)) as server:
+            client = OpenAICompatibleClient(base_url=server.url)
+            result = client.ask("go", "aGVsbG8=")
+
+        assert result["action_parsed"]["type"] == "click"
+        assert len(client.history) == 2
+
+    def test_stream(self):
+        """测试流式输出逐块回调且结果与非流式一致"""
+        chunks = []
+        with MockArkServer(scripted_task(1)) as server:
+            client = OpenAICompatibleClient(base_url=server.url)
+            result = client.ask("go", "aGVsbG8=", on_delta=chunks.append)
+
+        assert len(chunks) > 1
+        assert "".join(chunks) == result["raw_content"]
+        assert result["action_parsed"]["type"] == "click"
+        assert result["usage"]["completion_tokens"] == 40
+
+    def test_eco_history_limits(self):
+        client = OpenAICompatibleClient(eco_mode=True)
+
+        assert client.history_limits == (client.eco_history_turns, client.eco_history_images)
+
+
+class TestAgentLimits:
+    """测试 Agent 遵守后端的图片尺寸限制"""
+
+    def test_max_image_size(self, fake_controller, tmp_path):
+        import base64
+        import io
+        from PIL import Image
+
+        controller = fake_controller()
+        client = Mock()
+        client.max_image_size = (200, 300)
+        client.ask.return_value = {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"},
+                                   "usage": {}}
+        agent = AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0))
+
+        agent.run("goal", max_steps=1)
+
+        image_b64 = client.ask.call_args[0][1]
+        width, height = Image.open(io.BytesIO(base64.b64decode(image_b64))).size
+        assert width <= 200 and height <= 300
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,140 @@
+"""
+离线 Benchmark 套件测试 (Fake device + Mock Ark server)
+"""
+
+import base64
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from PIL import Image
+
+from android_phone.bench import MockArkServer, BenchConfig, run_benchmarks, scripted_task
+from android_phone.integrations.volcengine import VolcengineGUIClient
+
+
+class TestFakeDevice:
+    """测试 FakeDevice 与 AndroidController 的兼容性"""
+
+    def test_screenshot_through_controller(self, fake_controller):
+        """测试通过 controller 截图"""
+        controller = fake_controller()
+
+        image_b64 = controller.get_screenshot(scale=0.5, quality=60)
+        image = Image.open(io.BytesIO(base64.b64decode(image_b64)))
+
+        assert image.size == (540, 1200)
+
+    def test_frames_not_mutated(self, fake_controller):
+        """测试截图缩放不会修改原始帧"""
+        controller = fake_controller()
+        device = controller._device
+
+        controller.get_screenshot(scale=0.3)
+
+        assert device.frames[0].size == (1080, 2400)
+
+    def test_action_advances_frame(self, fake_controller):
+        """测试操作后切换到下一帧"""
+        controller = fake_controller()
+        device = controller._device
+
+        assert controller.click(10, 10) is True
+        assert device.frame_index == 1
+        assert device.call_count("click") == 1
+
+    def test_compact_hierarchy(self, fake_controller):
+        """测试 compact hierarchy 可解析"""
+        controller = fake_controller()
+
+        xml = controller.get_compact_ui_hierarchy()
+
+        assert 'text="Item 0"' in xml
+        assert 'scrollable="true"' in xml
+
+
+class TestMockArkServer:
+    """测试 Mock Ark server"""
+
+    def test_client_roundtrip(self):
+        """测试 VolcengineGUIClient 可以与 mock server 通信"""
+        with MockArkServer(scripted_task(clicks=1)) as server:
+            client = VolcengineGUIClient(api_key="test")
+            client.API_URL = server.url
+
+            first = client.ask("open app", "aGVsbG8=")
+            second = client.ask("continue", "aGVsbG8=")
+
+        assert first["action_parsed"]["type"] == "click"
+        assert second["action_parsed"]["type"] == "finished"
+        assert len(server.requests) == 2
+        assert server.requests[1]["messages"] == 4
+
+
+class TestRunBenchmarks:
+    """测试 benchmark 报告"""
+
+    def test_report_is_json(self):
+        """测试报告可序列化为 JSON"""
+        report = run_benchmarks(["get_screenshot", "history_pruning"], BenchConfig(iterations=2, warmup=0))
+
+        data = json.loads(json.dumps(report))
+        assert set(data["results"]) == {"get_screenshot", "history_pruning"}
+        assert data["results"]["get_screenshot"]["iterations"] == 2
+
+    def test_agent_run_scenario(self, tmp_path, monkeypatch):
+        """测试 agent_run 场景完成脚本任务"""
+        monkeypatch.chdir(tmp_path)
+        report = run_benchmarks(["agent_run"], BenchConfig(iterations=1, warmup=0, agent_steps=2))
+
+        result = report["results"]["agent_run"]
+        assert result["steps_per_run"] == 3
+        assert result["model_requests_per_run"] == 3
+
+    def test_set_of_mark_scenario(self, tmp_path, monkeypatch):
+        """测试 set_of_mark 场景: 按编号点击不会点偏"""
+        monkeypatch.chdir(tmp_path)
+        report = run_benchmarks(["set_of_mark"], BenchConfig(iterations=8, warmup=0))
+
+        result = report["results"]["set_of_mark"]
+        assert result["som"]["click_failure_rate"] == 0.0
+        assert result["som"]["steps_per_task"] == 5.0
+        assert result["screenshot"]["steps_per_task"] >= result["som"]["steps_per_task"]
+
+    def test_action_verification_scenario(self, tmp_path, monkeypatch):
+        """测试 action_verification 场景: 验证后就近重试, 点偏不再多花一步"""
+        monkeypatch.chdir(tmp_path)
+        report = run_benchmarks(["action_verification"], BenchConfig(iterations=8, warmup=0))
+
+        result = report["results"]["action_verification"]
+        assert result["verified"]["steps_per_task"] <= result["unverified"]["steps_per_task"]
+        assert result["unverified"]["local_retries"] == 0
+
+    def test_frame_reuse_scenario(self):
+        """测试 frame_reuse 场景: 同一屏幕的多次观察只截图一次"""
+        report = run_benchmarks(["frame_reuse"], BenchConfig(iterations=4, warmup=0, latency={"screenshot": 0.002}))
+
+        result = report["results"]["frame_reuse"]
+        assert result["fresh"]["screenshots_per_observation"] == 4
+        assert result["reused"]["screenshots_per_observation"] == 1
+
+    def test_observation_levels_encode_every_iteration(self):
+        """测试 observation_levels 场景每次迭代都真正编码 (不命中编码缓存)"""
+        report = run_benchmarks(["observation_levels"], BenchConfig(iterations=2, warmup=1))
+
+        assert report["results"]["observation_levels"]["rendition_hits"] == 0
+
+    def test_unknown_scenario(self):
+        """测试未知场景报错"""
+        with pytest.raises(ValueError):
+            run_benchmarks(["nope"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,182 @@
+"""
+最近一帧截图缓存测试 (帧复用、操作后失效、编码结果 LRU、Agent screenshot 动作)
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.core.agent import AutonomousAgent
+from android_phone.core.controller import RENDITION_CACHE_SIZE
+
+
+class TestLatestFrame:
+    """测试最近一帧的复用与失效"""
+
+    def test_reused_within_max_age(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        frame = controller.capture_frame()
+
+        assert controller.latest_frame(max_age=5) is frame
+        assert controller._device.call_count("screenshot") == 1
+        assert controller.frame_stats["reuses"] == 1
+
+    def test_expired(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        frame = controller.capture_frame()
+        time.sleep(0.02)
+
+        assert controller.latest_frame(max_age=0.01) is not frame
+        assert controller._device.call_count("screenshot") == 2
+
+    def test_zero_max_age_captures(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        controller.capture_frame()
+
+        controller.get_screenshot(scale=0.5)
+
+        assert controller._device.call_count("screenshot") == 2
+
+    def test_invalidated_by_input(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        frame = controller.capture_frame()
+
+        controller.click(10, 10)
+
+        assert controller.latest_frame(max_age=5) is not frame
+        assert controller.frame_stats["invalidations"] == 1
+
+    def test_invalidated_by_batched_input(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        controller.capture_frame()
+
+        controller.press_keys(["back", "back"])
+
+        assert controller._last_frame is None
+
+    def test_capture_during_action_not_kept(self, fake_controller):
+        """测试操作之前开始的截图不会成为最近一帧"""
+        controller = fake_controller(advance_on_action=False)
+        device = controller._device
+        screenshot = device.screenshot
+
+        def racing_screenshot(**kwargs):
+            frame = screenshot(**kwargs)
+            controller.invalidate_screen()
+            return frame
+
+        device.screenshot = racing_screenshot
+        controller.capture_frame()
+
+        assert controller._last_frame is None
+
+
+class TestRenditions:
+    """测试同一帧不同编码参数的 LRU 缓存"""
+
+    def test_repeat_encode_hits(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        frame = controller.capture_frame()
+
+        first = controller.encode_frame(frame, scale=0.5, quality=60)
+        second = controller.encode_frame(frame, scale=0.5, quality=60)
+        other = controller.encode_frame(frame, scale=0.3, quality=60)
+
+        assert first == second != other
+        assert controller.frame_stats["rendition_hits"] == 1
+        assert controller.frame_stats["rendition_misses"] == 2
+
+    def test_same_output_size_shared(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        frame = controller.capture_frame()
+
+        controller.encode_frame(frame, scale=1.0, max_size=(540, 1200))
+        controller.encode_frame(frame, scale=0.5)
+
+        assert controller.frame_stats["rendition_hits"] == 1
+
+    def test_other_images_not_cached(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        frame = controller.capture_frame()
+        crop = frame.crop((0, 0, 100, 100))
+
+        controller.encode_frame(crop)
+        controller.encode_frame(crop)
+
+        assert controller.frame_stats["rendition_hits"] == 0
+        assert len(controller._renditions) == 0
+
+    def test_lru_bounded(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        frame = controller.capture_frame()
+
+        for quality in range(10, 10 + RENDITION_CACHE_SIZE + 3):
+            controller.encode_frame(frame, quality=quality)
+
+        assert len(controller._renditions) == RENDITION_CACHE_SIZE
+        assert ((1080, 1920 * 1080 // 2400), "JPEG", 10) not in controller._renditions
+
+    def test_new_frame_clears(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        frame = controller.capture_frame()
+        controller.encode_frame(frame, scale=0.5)
+
+        controller.capture_frame()
+
+        assert len(controller._renditions) == 0
+
+
+class TestScreenStateReuse:
+    """测试 MCP 观察工具复用同一帧"""
+
+    def test_scales_and_zoom_share_one_capture(self, fake_controller, monkeypatch):
+        from android_phone import server
+
+        controller = fake_controller(advance_on_action=False)
+        monkeypatch.setattr(server, "_controller", controller)
+
+        first = json.loads(asyncio.run(server.get_screen_state(scale=0.3, max_age=5)))
+        json.loads(asyncio.run(server.get_screen_state(scale=0.5, max_age=5)))
+        again = json.loads(asyncio.run(server.get_screen_state(scale=0.3, max_age=5)))
+        json.loads(server.zoom(500, 500, max_age=5))
+
+        assert controller._device.call_count("screenshot") == 1
+        assert again["image"] == first["image"]
+        assert again["capture_timestamp"] == first["capture_timestamp"]
+
+    def test_max_age_zero(self, fake_controller, monkeypatch):
+        from android_phone import server
+
+        controller = fake_controller(advance_on_action=False)
+        monkeypatch.setattr(server, "_controller", controller)
+
+        asyncio.run(server.get_screen_state(scale=0.3, max_age=0))
+        asyncio.run(server.get_screen_state(scale=0.3, max_age=0))
+
+        assert controller._device.call_count("screenshot") == 2
+
+
+class TestAgentScreenshotAction:
+    """测试 Agent 的 screenshot 动作保存该步观察到的帧"""
+
+    def test_no_second_capture(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [
+            {"thought": "save", "action_parsed": {"type": "screenshot", "filename": "shot"}, "usage": {}},
+            {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}},
+        ]
+        agent = AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0))
+        agent.screenshot_dir = str(tmp_path / "shots")
+
+        agent.run("save the screen", max_steps=3)
+
+        assert (tmp_path / "shots" / "shot.png").exists()
+        # One observation per step, nothing extra for the screenshot action
+        assert controller._device.call_count("screenshot") == 2
@@ -0,0 +1,242 @@
+"""
+连接健康监控 (ConnectionMonitor) 测试
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench import FakeDevice
+from android_phone.core.controller import AndroidController
+from android_phone.core.health import ConnectionMonitor, ConnectionState
+
+
+class TestController:
+    """测试 controller 的 ping / warm_up"""
+
+    def test_ping(self, fake_controller):
+        """测试 ping 成功与失败"""
+        controller = fake_controller()
+        assert controller.ping() is True
+
+        controller._device = None
+        assert controller.ping() is False
+
+    def test_warm_up_primes_all_stages(self, fake_controller):
+        """测试 warm_up 依次预热各个通道"""
+        controller = fake_controller()
+
+        timings = controller.warm_up()
+
+        assert set(timings) == {"info", "window_size", "screenshot", "dump_hierarchy"}
+        assert controller._device.call_count("screenshot") == 1
+        assert controller._device.call_count("dump_hierarchy") == 1
+
+
+class TestConnectionMonitor:
+    """测试重连状态机"""
+
+    def test_reconnect_with_backoff(self, fake_controller):
+        """测试失败两次后重连成功, 并记录指标"""
+        controller = fake_controller()
+        controller.reconnect = Mock(side_effect=[ConnectionError("usb"), ConnectionError("usb"), True])
+        monitor = ConnectionMonitor(controller, backoff_base=0.001, warm_up=False)
+
+        assert monitor.reconnect(reason="test") is True
+
+        metrics = monitor.metrics()
+        assert monitor.state == ConnectionState.CONNECTED
+        assert metrics["reconnects"] == 1
+        assert metrics["reconnect_attempts"] == 3
+        assert metrics["reconnect_failures"] == 2
+        assert metrics["last_reconnect_ms"] is not None
+
+    def test_gives_up_after_max_attempts(self, fake_controller):
+        """测试超过最大次数后进入 FAILED"""
+        controller = fake_controller()
+        controller.reconnect = Mock(side_effect=ConnectionError("usb"))
+        monitor = ConnectionMonitor(controller, backoff_base=0.001, max_attempts=3, warm_up=False)
+
+        assert monitor.reconnect() is False
+        assert monitor.state == ConnectionState.FAILED
+        assert controller.reconnect.call_count == 3
+
+    def test_check_reconnects_on_ping_failure(self, fake_controller):
+        """测试 ping 失败时触发重连和预热"""
+        controller = fake_controller()
+        device = controller._device
+        controller.ping = Mock(return_value=False)
+
+        def reconnect():
+            controller._device = device
+            return True
+
+        controller.reconnect = Mock(side_effect=reconnect)
+        monitor = ConnectionMonitor(controller, backoff_base=0.001)
+
+        assert monitor.check() is True
+        assert controller.reconnect.call_count == 1
+        assert monitor.metrics()["ping_failures"] == 1
+        assert monitor.metrics()["last_warm_up_ms"] is not None
+
+    def test_connect_without_retry_raises(self):
+        """测试 retry=False 时连接失败直接抛出"""
+        controller = AndroidController()
+        controller.connect = Mock(side_effect=ConnectionError("no device"))
+        monitor = ConnectionMonitor(controller)
+
+        with pytest.raises(ConnectionError):
+            monitor.connect(retry=False)
+        assert monitor.state == ConnectionState.DISCONNECTED
+
+
+    def test_metrics_updated_under_lock(self, fake_controller):
+        """测试重连时在锁内更新指标 (与 metrics() 读取互斥)"""
+        controller = fake_controller()
+        controller.reconnect = Mock(return_value=True)
+        monitor = ConnectionMonitor(controller, warm_up=False)
+        held = threading.Event()
+
+        def hold():
+            with monitor._lock:
+                held.set()
+                time.sleep(0.2)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait(1)
+        started = time.perf_counter()
+        monitor.reconnect()
+        thread.join()
+
+        assert time.perf_counter() - started >= 0.15
+        assert monitor.metrics()["reconnects"] == 1
+
+
+class TestMonitorThread:
+    """测试后台线程只在首次连接成功后运行"""
+
+    def test_not_started_before_first_connect(self):
+        controller = AndroidController()
+        controller.connect = Mock(side_effect=ConnectionError("no device"))
+        monitor = ConnectionMonitor(controller, interval=0.01, warm_up=False).start()
+
+        with pytest.raises(ConnectionError):
+            monitor.connect(retry=False)
+        time.sleep(0.05)
+
+        assert monitor.running is False
+        assert controller.connect.call_count == 1
+        monitor.stop()
+
+    def test_started_by_successful_connect(self, fake_controller):
+        controller = fake_controller()
+        controller._device = None
+        device = FakeDevice()
+
+        def connect():
+            controller._device = device
+            return True
+
+        controller.connect = Mock(side_effect=connect)
+        monitor = ConnectionMonitor(controller, interval=0.01, warm_up=False).start()
+        assert monitor.running is False
+
+        monitor.connect(retry=False)
+
+        assert monitor.running is True
+        monitor.stop()
+        assert monitor.running is False
+
+    def test_stopped_before_connect_stays_stopped(self, fake_controller):
+        controller = fake_controller()
+        controller._device = None
+        controller.connect = Mock(return_value=True)
+        monitor = ConnectionMonitor(controller, interval=0.01, warm_up=False).start()
+        monitor.stop()
+
+        monitor.connect(retry=False)
+
+        assert monitor.running is False
+
+    def test_failed_state_not_retried_in_background(self, fake_controller):
+        """测试进入 FAILED 后后台线程不再重连, 直到显式调用 ensure_connected"""
+        controller = fake_controller()
+        controller.ping = Mock(return_value=False)
+        controller.reconnect = Mock(side_effect=ConnectionError("usb"))
+        monitor = ConnectionMonitor(controller, interval=0.01, backoff_base=0.001, max_attempts=2,
+                                    warm_up=False).start()
+        deadline = time.monotonic() + 2
+        while monitor.state != ConnectionState.FAILED and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+
+        assert monitor.state == ConnectionState.FAILED
+        assert controller.reconnect.call_count == 2
+
+        controller.reconnect = Mock(return_value=True)
+        assert monitor.ensure_connected() is True
+        assert monitor.state == ConnectionState.CONNECTED
+        monitor.stop()
+
+    def test_no_background_reconnect_while_in_use(self, fake_controller):
+        """测试任务占用设备时后台线程不替换连接"""
+        controller = fake_controller()
+        controller.ping = Mock(return_value=False)
+        controller.reconnect = Mock(return_value=True)
+        monitor = ConnectionMonitor(controller, interval=0.01, warm_up=False)
+
+        with monitor.in_use():
+            monitor.start()
+            time.sleep(0.1)
+            assert controller.reconnect.call_count == 0
+
+        deadline = time.monotonic() + 2
+        while controller.reconnect.call_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        monitor.stop()
+        assert controller.reconnect.call_count >= 1
+
+    def test_agent_holds_device_during_task(self, fake_controller, tmp_path):
+        """测试 Agent 任务运行期间占用设备, 结束后释放"""
+        from android_phone.core.agent import AutonomousAgent
+
+        controller = fake_controller(advance_on_action=False)
+        monitor = ConnectionMonitor(controller, warm_up=False)
+        controller.health = monitor
+        holders = []
+
+        def ask(*args, **kwargs):
+            holders.append(monitor._holders)
+            return {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}}
+
+        client = Mock()
+        client.ask.side_effect = ask
+        AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0)).run("goal", max_steps=1)
+
+        assert holders == [1]
+        assert monitor._holders == 0
+
+    def test_connect_tool_failure_drops_monitor(self, monkeypatch):
+        from android_phone import server
+
+        controller = AndroidController()
+        controller.connect = Mock(side_effect=ConnectionError("no device"))
+        monkeypatch.setattr(server, "_controller", controller)
+
+        result = asyncio.run(server.connect())
+
+        assert '"error"' in result
+        assert controller.health is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
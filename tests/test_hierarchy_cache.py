@@ -0,0 +1,98 @@
+"""
+UI 树缓存测试 (按帧指纹 + 前台 Activity 复用、动作后失效)
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+
+
+class TestHierarchyCache:
+    """测试 UI 树缓存"""
+
+    def test_static_screen_dumps_once(self, fake_controller):
+        controller = fake_controller()
+
+        first = controller.get_compact_ui_hierarchy()
+        second = controller.get_compact_ui_hierarchy()
+        raw = controller.get_ui_hierarchy()
+
+        assert first == second
+        assert raw == controller._device.current_hierarchy()
+        assert controller._device.call_count("dump_hierarchy") == 1
+        assert controller.hierarchy_stats["hits"] == 2
+
+    def test_action_invalidates(self, fake_controller):
+        controller = fake_controller()
+        controller.get_compact_ui_hierarchy()
+
+        controller.click(100, 100)
+        xml = controller.get_ui_hierarchy()
+
+        assert xml == controller._device.hierarchies[1]
+        assert controller._device.call_count("dump_hierarchy") == 2
+        assert controller.hierarchy_stats["invalidations"] == 1
+
+    def test_key_invalidates_without_action(self, fake_controller):
+        """测试屏幕自行变化 (例如加载完成) 时重新获取"""
+        controller = fake_controller(advance_on_action=False)
+        controller.get_ui_hierarchy()
+
+        controller._device.frame_index = 1
+        xml = controller.dump_hierarchy(max_age=0)
+
+        assert xml == controller._device.hierarchies[1]
+        assert controller._device.call_count("dump_hierarchy") == 2
+
+    def test_hit_reuses_fresh_frame(self, fake_controller):
+        """测试最近一帧足够新时命中缓存不截图, 也不丢弃该帧的编码结果"""
+        controller = fake_controller()
+        frame = controller.capture_frame()
+        controller.encode_frame(frame, scale=0.5)
+        controller.dump_hierarchy(max_age=5)
+
+        controller.dump_hierarchy(max_age=5)
+
+        assert controller._device.call_count("screenshot") == 1
+        assert controller._last_frame[0] is frame
+        assert len(controller._renditions) == 1
+        assert controller.hierarchy_stats["hits"] == 1
+
+    def test_shell_key_invalidates(self, fake_controller):
+        controller = fake_controller()
+        controller.get_ui_hierarchy()
+
+        controller.press_keys(["back", "back"])
+
+        assert controller._hierarchy_cache is None
+
+    def test_shared_with_screen_state(self, fake_controller):
+        controller = fake_controller()
+        controller.capture_screen_state(include_hierarchy=True)
+
+        controller.get_compact_ui_hierarchy()
+        state = controller.capture_screen_state(include_hierarchy=True)
+
+        assert state["xml"] == controller.compact_hierarchy(controller._device.current_hierarchy())
+        assert controller._device.call_count("dump_hierarchy") == 1
+        assert controller.hierarchy_stats["hits"] == 2
+
+    def test_wait_for_element_on_static_screen(self, fake_controller):
+        controller = fake_controller()
+
+        result = controller.wait_for_element(text="never there", timeout=0.3, interval=0.05)
+
+        assert result["matched"] is False
+        assert result["polls"] > 1
+        assert controller._device.call_count("dump_hierarchy") == 1
+
+    def test_bypass(self, fake_controller):
+        controller = fake_controller()
+        controller.dump_hierarchy()
+
+        controller.dump_hierarchy(cache=False)
+
+        assert controller._device.call_count("dump_hierarchy") == 2
@@ -0,0 +1,94 @@
+"""
+按键 shell 命令合并 (batch_input / press_keys) 测试
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench.fake_device import ShellResponse
+from android_phone.core.controller import coalesce_shell_commands
+
+
+class TestCoalesce:
+    """测试命令合并规则"""
+
+    def test_merge_consecutive_keyevents(self):
+        """测试连续 keyevent 合并为一条"""
+        commands = ["input keyevent 4", "input keyevent 4", "input text abc", "input keyevent 66"]
+
+        assert coalesce_shell_commands(commands) == [
+            "input keyevent 4 4",
+            "input text abc",
+            "input keyevent 66",
+        ]
+
+
+class TestPressKeys:
+    """测试 press_keys 批量发送"""
+
+    def test_single_shell_invocation(self, fake_controller):
+        """测试多个按键只调用一次 shell"""
+        controller = fake_controller()
+
+        assert controller.press_keys(["back", "back", "enter"]) is True
+        assert controller._device.shell_commands == ["input keyevent 4 4 66"]
+
+    def test_ordering_with_non_shell_action(self, fake_controller):
+        """测试批处理中的非 shell 操作会先刷新队列, 保持顺序"""
+        controller = fake_controller()
+        device = controller._device
+
+        with controller.batch_input() as batch:
+            controller.press_key("back")
+            controller.click(10, 20)
+            controller.press_key("home")
+
+        order = [name for name, _ in device.calls]
+        assert order == ["shell", "click", "shell"]
+        assert batch.commands == ["input keyevent 4", "input keyevent 3"]
+        assert batch.ok is True
+
+    def test_error_reports_failed_command(self, fake_controller):
+        """测试失败时报告具体失败的命令"""
+        controller = fake_controller()
+        controller._device.shell_handler = lambda cmd: ShellResponse("", 2) if cmd.startswith("sh -c") else None
+
+        with controller.batch_input() as batch:
+            controller.press_key("back")
+            controller._shell_input("input text hi")
+
+        assert batch.ok is False
+        assert batch.failed_command == "input text hi"
+
+    def test_single_key_not_batched(self, fake_controller):
+        """测试单个按键保持原有行为"""
+        controller = fake_controller()
+
+        assert controller.press_key("返回") is True
+        assert controller._device.shell_commands == ["input keyevent 4"]
+
+    def test_batch_is_per_thread(self, fake_controller):
+        """测试其他线程的按键不会进入当前线程的批处理"""
+        controller = fake_controller()
+        device = controller._device
+
+        with controller.batch_input() as batch:
+            controller.press_key("back")
+            other = threading.Thread(target=controller.press_key, args=("home",))
+            other.start()
+            other.join()
+            # The other thread's key went out immediately, ours is still queued
+            assert device.shell_commands == ["input keyevent 3"]
+
+        assert device.shell_commands == ["input keyevent 3", "input keyevent 4"]
+        assert batch.commands == ["input keyevent 4"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
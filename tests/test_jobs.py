@@ -0,0 +1,271 @@
+"""
+后台任务测试 (提交、进度查询、取消、MCP 进度通知)
+"""
+
+import asyncio
+import json
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.core.agent import AutonomousAgent
+from android_phone.core.controller import AndroidController
+from android_phone.core.jobs import JobManager
+
+SCROLL = {"thought": "scroll down", "action_parsed": {"type": "scroll", "x": 500, "y": 500, "direction": "down"},
+          "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}}
+FINISHED = {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {"total_tokens": 5}}
+
+
+@pytest.fixture
+def make_agent(fake_controller, tmp_path):
+    """Agent 工厂: make_agent(responses, gate=None), 给定 gate 时模型调用阻塞到 gate 被 set"""
+    def make(responses, gate: threading.Event = None):
+        client = Mock()
+        answers = iter(responses)
+
+        def ask(*args, **kwargs):
+            if gate is not None:
+                gate.wait(5)
+            return next(answers)
+
+        client.ask.side_effect = ask
+        return AutonomousAgent(fake_controller(advance_on_action=False), client, log_dir=str(tmp_path),
+                               settle_delay=(0, 0), verify_actions=False)
+    return make
+
+
+def _events(tmp_path):
+    return [json.loads(line) for f in tmp_path.glob("*.jsonl") for line in f.read_text(encoding="utf-8").splitlines()]
+
+
+class TestAgentCancel:
+    """测试 Agent 的取消与每步回调"""
+
+    def test_cancel_between_steps(self, make_agent, tmp_path):
+        agent = make_agent([SCROLL, SCROLL, FINISHED])
+        cancel = threading.Event()
+        seen = []
+
+        def on_step(info):
+            seen.append(info)
+            cancel.set()
+
+        result = agent.run("scroll", max_steps=5, cancel_event=cancel, on_step=on_step)
+
+        assert result["status"] == "cancelled"
+        assert result["steps"] == 1
+        assert agent.client.ask.call_count == 1
+        assert seen[0]["step"] == 1 and seen[0]["thought"] == "scroll down"
+        assert seen[0]["total_usage"]["total_tokens"] == 12
+        end = [e for e in _events(tmp_path) if e.get("event") == "task_end"]
+        assert len(end) == 1 and end[0]["total_steps"] == 1
+
+    def test_callback_errors_ignored(self, make_agent):
+        agent = make_agent([FINISHED])
+
+        result = agent.run("x", max_steps=2, on_step=Mock(side_effect=RuntimeError("boom")))
+
+        assert result["status"] == "completed"
+
+
+class TestAgentEnd:
+    """测试每种结束方式都记录 task_end"""
+
+    def test_model_error_logs_task_end(self, make_agent, tmp_path):
+        agent = make_agent([])
+        agent.client.ask.side_effect = RuntimeError("api down")
+
+        result = agent.run("x", max_steps=3)
+
+        assert result["status"] == "error"
+        end = [e for e in _events(tmp_path) if e.get("event") == "task_end"]
+        assert len(end) == 1 and end[0]["result"] == result["result"]
+
+    def test_capture_error_logs_task_end(self, make_agent, tmp_path):
+        agent = make_agent([FINISHED])
+        agent.controller.capture_frame = Mock(side_effect=RuntimeError("no screen"))
+
+        result = agent.run("x", max_steps=3)
+
+        assert result["status"] == "error"
+        assert "click_stats" in result
+        assert any(e.get("event") == "task_end" for e in _events(tmp_path))
+
+
+class TestJobManager:
+    """测试后台任务管理器"""
+
+    def test_submit_and_wait(self, make_agent):
+        manager = JobManager(lambda: make_agent([SCROLL, FINISHED]))
+
+        job = manager.submit("scroll", max_steps=5)
+        job = manager.wait(job.job_id, timeout=5, version=10 ** 6)
+
+        assert job.status == "completed"
+        assert job.step == 2
+        assert job.result["result"] == "ok"
+        assert job.usage["total_tokens"] == 17
+        assert job.to_dict()["last_thought"] == "done"
+
+    def test_progress_visible_while_running(self, make_agent):
+        gate = threading.Event()
+        manager = JobManager(lambda: make_agent([SCROLL, FINISHED], gate))
+        job = manager.submit("scroll", max_steps=5)
+
+        running = manager.wait(job.job_id, timeout=2, version=job.version)
+        assert running.status == "running"
+        assert running.step == 0
+
+        gate.set()
+        assert manager.wait(job.job_id, timeout=5, version=10 ** 6).status == "completed"
+
+    def test_cancel_running(self, make_agent, tmp_path):
+        """测试运行中的任务在当前一步结束后停止"""
+        gate = threading.Event()
+        agent = make_agent([SCROLL, SCROLL, FINISHED], gate)
+        manager = JobManager(lambda: agent)
+        job = manager.submit("scroll", max_steps=5)
+        # Wait until the first step is waiting on the model
+        for _ in range(200):
+            if agent.client.ask.call_count:
+                break
+            threading.Event().wait(0.01)
+
+        manager.cancel(job.job_id)
+        gate.set()
+        job = manager.wait(job.job_id, timeout=5, version=10 ** 6)
+
+        assert job.status == "cancelled"
+        assert job.step == 1
+        assert agent.client.ask.call_count == 1
+        assert any(e.get("event") == "task_end" for e in _events(tmp_path))
+
+    def test_queued_jobs_run_in_order_and_cancel(self, make_agent):
+        gate = threading.Event()
+        agents = iter([make_agent([FINISHED], gate), make_agent([FINISHED])])
+        manager = JobManager(lambda: next(agents))
+
+        first = manager.submit("first")
+        second = manager.submit("second")
+        third = manager.submit("third")
+        manager.cancel(third.job_id)
+        gate.set()
+
+        assert manager.wait(first.job_id, timeout=5, version=10 ** 6).status == "completed"
+        assert manager.wait(second.job_id, timeout=5, version=10 ** 6).status == "completed"
+        assert manager.get(third.job_id).status == "cancelled"
+        assert manager.get(third.job_id).started_at is None
+
+    def test_agent_exception(self):
+        manager = JobManager(Mock(side_effect=RuntimeError("no device")))
+
+        job = manager.submit("x")
+        job = manager.wait(job.job_id, timeout=5, version=10 ** 6)
+
+        assert job.status == "error"
+        assert job.error == "no device"
+
+    def test_finished_jobs_pruned(self, make_agent):
+        manager = JobManager(lambda: make_agent([FINISHED]), max_finished=1)
+        first = manager.submit("a")
+        manager.wait(first.job_id, timeout=5, version=10 ** 6)
+        second = manager.submit("b")
+        manager.wait(second.job_id, timeout=5, version=10 ** 6)
+
+        manager.submit("c")
+
+        assert manager.get(first.job_id) is None
+
+
+class _Context:
+    """记录进度通知的 Context 替身"""
+
+    def __init__(self):
+        self.progress = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.progress.append((progress, total, message))
+
+
+class TestServerJobs:
+    """测试 MCP 后台任务工具"""
+
+    def _server(self, monkeypatch, agent):
+        from android_phone import server
+
+        monkeypatch.setattr(server, "_job_manager", JobManager(lambda: agent))
+        return server
+
+    def test_run_autonomous_task_reports_progress(self, make_agent, monkeypatch):
+        server = self._server(monkeypatch, make_agent([SCROLL, FINISHED]))
+        ctx = _Context()
+
+        result = json.loads(asyncio.run(server.run_autonomous_task("scroll", 5, ctx=ctx)))
+
+        assert result["status"] == "ok"
+        assert result["result"]["status"] == "completed"
+        assert ctx.progress[-1][0] == 2
+        assert ctx.progress[-1][1] == 5
+        assert "[completed]" in ctx.progress[-1][2]
+
+    def test_submit_status_cancel(self, make_agent, monkeypatch):
+        gate = threading.Event()
+        server = self._server(monkeypatch, make_agent([SCROLL, SCROLL, FINISHED], gate))
+
+        job_id = json.loads(server.submit_autonomous_task("scroll", 5))["job_id"]
+        status = json.loads(server.get_task_status(job_id))["job"]
+        assert status["status"] in ("queued", "running")
+
+        assert json.loads(server.cancel_task(job_id))["job"]["cancel_requested"] is True
+        gate.set()
+        job = json.loads(asyncio.run(server.wait_for_task(job_id, timeout=5)))["job"]
+
+        assert job["status"] == "cancelled"
+        assert json.loads(server.get_task_status())["jobs"][0]["job_id"] == job_id
+
+    def test_wait_timeout_returns_current_state(self, make_agent, monkeypatch):
+        gate = threading.Event()
+        server = self._server(monkeypatch, make_agent([FINISHED], gate))
+
+        job_id = json.loads(server.submit_autonomous_task("x"))["job_id"]
+        job = json.loads(asyncio.run(server.wait_for_task(job_id, timeout=0.2)))["job"]
+        gate.set()
+
+        assert job["status"] == "running"
+
+    def test_unknown_job(self, make_agent, monkeypatch):
+        server = self._server(monkeypatch, make_agent([]))
+
+        assert json.loads(server.get_task_status("nope"))["status"] == "error"
+        assert json.loads(server.cancel_task("nope"))["status"] == "error"
+
+    def test_agent_has_own_client(self, monkeypatch):
+        """测试后台任务的 Agent 不与 ask_volcengine_agent 共享模型会话"""
+        from android_phone import server
+
+        monkeypatch.setenv("ARK_API_KEY", "test")
+        monkeypatch.delenv("ANDROID_AGENT_BACKEND", raising=False)
+        monkeypatch.setattr(server, "_agent", None)
+        monkeypatch.setattr(server, "_volcengine_client", None)
+        monkeypatch.setattr(server, "_controller", AndroidController())
+
+        agent = server.get_agent()
+
+        assert agent.client is not server.get_volcengine_client()
+        assert agent.client.name == "volcengine"
+
+    def test_tools_registered(self):
+        from android_phone import server
+
+        names = {tool.name for tool in asyncio.run(server.app.list_tools())}
+
+        assert {"submit_autonomous_task", "get_task_status", "wait_for_task", "cancel_task"} <= names
+        schema = next(t for t in asyncio.run(server.app.list_tools()) if t.name == "run_autonomous_task").inputSchema
+        assert "ctx" not in schema["properties"]
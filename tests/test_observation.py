@@ -0,0 +1,98 @@
+"""
+自适应截图分辨率 (AdaptiveResolution) 测试
+"""
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.core.agent import AutonomousAgent
+from android_phone.core.observation import AdaptiveResolution, ECO_LEVELS, NORMAL_LEVELS, is_uncertain
+
+
+class TestPolicy:
+    """测试分辨率升降策略"""
+
+    def test_starts_low(self):
+        assert AdaptiveResolution().settings == NORMAL_LEVELS[0]
+        assert AdaptiveResolution.for_mode(eco_mode=True).settings == ECO_LEVELS[0]
+
+    def test_escalates_on_problems(self):
+        """测试失败 / 无变化 / 不确定时升级"""
+        policy = AdaptiveResolution()
+
+        assert policy.update(action_ok=False) == "failed"
+        assert policy.update(screen_changed=False) == "no_change"
+        assert policy.update(uncertain=True) == "uncertain"
+        assert policy.level == 3
+        policy.update(action_ok=False)
+        assert policy.level == 3
+
+    def test_decays_after_successes(self):
+        """测试连续成功后降级"""
+        policy = AdaptiveResolution(decay_after=2)
+        policy.update(action_ok=False)
+        policy.update(action_ok=False)
+
+        assert policy.update(action_ok=True, screen_changed=True) == "hold"
+        assert policy.update(action_ok=True, screen_changed=True) == "decay"
+        assert policy.level == 1
+
+    def test_non_adaptive_is_fixed(self):
+        policy = AdaptiveResolution.for_mode(adaptive=False)
+        policy.update(action_ok=False)
+
+        assert policy.settings == (0.5, 60)
+
+    def test_uncertainty_markers(self):
+        assert is_uncertain("The text is too small to read")
+        assert is_uncertain("价格看不清，需要放大")
+        assert not is_uncertain("Click the search button")
+
+    def test_describe_bytes(self):
+        info = AdaptiveResolution().describe("aGVsbG8=")
+
+        assert info["bytes"] == 5
+        assert info["scale"] == 0.35
+
+
+class TestAgentIntegration:
+    """测试 Agent 循环使用自适应分辨率并记录日志"""
+
+    def _run(self, controller, tmp_path):
+        client = Mock()
+        click = {"type": "click", "x": 500, "y": 500}
+        client.ask.side_effect = [
+            {"thought": "tap", "action_parsed": click, "usage": {}},
+            {"thought": "tap", "action_parsed": click, "usage": {}},
+            {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}},
+        ]
+        agent = AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0))
+        agent.run("goal", max_steps=3)
+        log_file = next(tmp_path.glob("*.jsonl"))
+        steps = [json.loads(line) for line in log_file.read_text().splitlines()]
+        return [entry["observation"] for entry in steps if entry["event"] == "step"]
+
+    def test_no_change_escalates(self, fake_controller, tmp_path):
+        """测试点击后屏幕没有变化时提高下一步分辨率"""
+        observations = self._run(fake_controller(advance_on_action=False), tmp_path)
+
+        assert [o["level"] for o in observations] == [0, 1, 2]
+        assert observations[1]["reason"] == "no_change"
+        assert observations[2]["bytes"] > observations[0]["bytes"]
+
+    def test_changes_stay_low(self, fake_controller, tmp_path):
+        """测试屏幕正常变化时保持低分辨率"""
+        observations = self._run(fake_controller(advance_on_action=True), tmp_path)
+
+        assert [o["level"] for o in observations] == [0, 0, 0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,142 @@
+"""
+无法解析的模型输出测试 (本地容错修复、纯文本重新提问、解析失败统计)
+"""
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.core.agent import FORMAT_REMINDER, AutonomousAgent
+from android_phone.integrations.parser import parse_action_from_text, repair_action_text
+from android_phone.integrations.volcengine import VolcengineGUIClient
+
+UNPARSED = {"thought": "hmm", "action_parsed": None, "raw_content": "I will tap the icon", "usage": {"total_tokens": 10}}
+FINISHED = {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {"total_tokens": 5}}
+
+
+def _agent(controller, client, tmp_path, **kwargs):
+    return AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0), **kwargs)
+
+
+class TestRepairAction:
+    """测试容错语法修复"""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("Action: click(start_box='<|box_start|>(500,300)<|box_end|>')", {"type": "click", "x": 500, "y": 300}),
+        ("```\nAction: tap(500, 300)\n```", {"type": "click", "x": 500, "y": 300}),
+        ("Action: Click(point='<point>500,300</point>')", {"type": "click", "x": 500, "y": 300}),
+        ("Action: click(point='[100, 200, 300, 400]')", {"type": "click", "x": 200, "y": 300}),
+        ("click(x=12, y=34)", {"type": "click", "x": 12, "y": 34}),
+        ("Action: type(hello world)", {"type": "type", "content": "hello world"}),
+        ("Action: press_key(key=back)", {"type": "hotkey", "key": "back"}),
+        ("Action: finished(\"done\")", {"type": "finished", "content": "done"}),
+    ])
+    def test_repaired(self, text, expected):
+        result = parse_action_from_text(text)
+
+        assert result["action_parsed"] == expected
+        assert result["repaired"] is True
+
+    def test_drag_boxes(self):
+        action = parse_action_from_text("Action: drag(start_box='(1,2)', end_box='(3,4)')")["action_parsed"]
+
+        assert (action["start_x"], action["start_y"], action["end_x"], action["end_y"]) == (1, 2, 3, 4)
+
+    def test_canonical_not_marked(self):
+        result = parse_action_from_text("Action: click(point='<point>500 300</point>')")
+
+        assert "repaired" not in result
+
+    def test_no_call(self):
+        assert repair_action_text("I think the button is at the top") is None
+        assert parse_action_from_text("Thought: just thinking")["action_parsed"] is None
+
+
+class TestAskText:
+    """测试纯文本追问不发送截图"""
+
+    def test_no_image_in_request(self):
+        client = VolcengineGUIClient(api_key="test")
+        payloads = []
+
+        def send(headers, payload, url=None, timeout=None):
+            payloads.append(json.loads(json.dumps(payload)))
+            return {"choices": [{"message": {"content": "Thought: ok\nAction: wait()"}}], "usage": {}}
+
+        client._send = send
+        client.ask("open", "aGVsbG8=")
+        client.ask_text("again")
+
+        last = payloads[-1]["messages"][-1]
+        assert last["content"] == [{"type": "text", "text": "again"}]
+        assert sum(1 for m in payloads[-1]["messages"] if "image_url" in json.dumps(m)) == 1
+        assert len(client.history) == 4
+
+
+class TestAgentReprompt:
+    """测试 Agent 对无法解析的输出的处理"""
+
+    def test_text_only_reprompt(self, fake_controller, tmp_path):
+        """测试重新提问复用同一帧, 不重新截图"""
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [UNPARSED]
+        client.ask_text.side_effect = [FINISHED]
+
+        result = _agent(controller, client, tmp_path).run("open", max_steps=3)
+
+        assert result["status"] == "completed"
+        assert result["steps"] == 1
+        assert client.ask_text.call_args.args[0] == FORMAT_REMINDER
+        assert controller._device.call_count("screenshot") == 1
+        assert result["parse_stats"] == {"failures": 1, "repaired": 0, "reprompts": 1, "recovered": 1}
+        assert result["total_usage"]["total_tokens"] == 15
+
+    def test_falls_back_to_new_screenshot(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [UNPARSED, FINISHED]
+        client.ask_text.side_effect = [UNPARSED]
+
+        result = _agent(controller, client, tmp_path).run("open", max_steps=3)
+
+        assert result["steps"] == 2
+        assert "could not parse" in client.ask.call_args_list[1].args[0]
+        assert result["parse_stats"]["failures"] == 2
+        assert result["parse_stats"]["recovered"] == 0
+
+    def test_reprompt_error_falls_back(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [UNPARSED, FINISHED]
+        client.ask_text.side_effect = RuntimeError("boom")
+
+        result = _agent(controller, client, tmp_path).run("open", max_steps=3)
+
+        assert result["status"] == "completed"
+        assert result["parse_stats"]["failures"] == 1
+
+    def test_disabled(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [UNPARSED, FINISHED]
+
+        result = _agent(controller, client, tmp_path, format_retries=0).run("open", max_steps=3)
+
+        client.ask_text.assert_not_called()
+        assert result["steps"] == 2
+
+    def test_repaired_counted(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [dict(FINISHED, repaired=True)]
+
+        result = _agent(controller, client, tmp_path).run("open", max_steps=2)
+
+        assert result["parse_stats"]["repaired"] == 1
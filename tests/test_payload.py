@@ -0,0 +1,115 @@
+"""
+请求体拼装测试 (预序列化消息片段、历史片段缓存)
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.integrations import openai_compat
+from android_phone.integrations.payload import MessageList, encode_payload
+from android_phone.integrations.volcengine import VolcengineGUIClient
+
+ANSWER = {"choices": [{"message": {"content": "Thought: ok\nAction: wait()"}}], "usage": {}}
+
+
+def _client(**kwargs):
+    client = VolcengineGUIClient(api_key="test", **kwargs)
+    client.bodies = []
+
+    def send(headers, payload, url=None, timeout=None):
+        client.bodies.append(encode_payload(payload))
+        return ANSWER
+
+    client._send = send
+    return client
+
+
+class TestEncodePayload:
+    """测试请求体编码"""
+
+    def test_same_json_as_plain_dumps(self):
+        messages = [{"role": "system", "content": "你好"}, {"role": "user", "content": [{"type": "text", "text": "x"}]}]
+        payload = {"model": "m", "messages": MessageList(messages), "temperature": 0.1}
+
+        assert json.loads(encode_payload(payload)) == {"model": "m", "messages": messages, "temperature": 0.1}
+
+    def test_plain_dict_fallback(self):
+        payload = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+
+        assert json.loads(encode_payload(payload)) == payload
+
+    def test_slice_keeps_fragments(self):
+        messages = MessageList([{"role": "system", "content": "s"}, {"role": "user", "content": "u"}])
+
+        tail = messages[1:]
+
+        assert isinstance(tail, MessageList)
+        assert tail.fragments == messages.fragments[1:]
+        assert json.loads(encode_payload({"messages": tail})) == {"messages": [{"role": "user", "content": "u"}]}
+
+
+class TestFragmentCache:
+    """测试历史消息只序列化一次"""
+
+    def test_body_matches_messages(self):
+        client = _client()
+        for step in range(14):
+            client.ask(f"step {step}", f"IMG{step}")
+
+        body = json.loads(client.bodies[-1])
+        assert body["messages"][0]["role"] == "system"
+        assert body["messages"][-1]["content"][1]["image_url"]["url"] == "data:image/jpeg;base64,IMG13"
+        images = [m for m in body["messages"] if isinstance(m["content"], list)
+                  and any(i["type"] == "image_url" for i in m["content"])]
+        assert len(images) <= client.max_history_images + 1
+
+    def test_each_message_serialized_once(self, monkeypatch):
+        calls = []
+        original = openai_compat.dumps_message
+
+        def counting(message):
+            calls.append(message)
+            return original(message)
+
+        monkeypatch.setattr(openai_compat, "dumps_message", counting)
+        client = _client()
+        client.ask("step 0", "IMG0")
+        calls.clear()
+
+        client.ask("step 1", "IMG1")
+
+        # Only the new user message and the previous assistant answer are encoded
+        assert len(calls) == 2
+        assert calls[0]["role"] == "user" and calls[1]["role"] == "assistant"
+
+    def test_cache_limited_to_window(self):
+        client = _client()
+        for step in range(30):
+            client.ask(f"step {step}", f"IMG{step}")
+
+        assert len(client._fragments) <= client.max_history_turns * 2 + 1
+        assert min(index for index, _ in client._fragments) >= client._history_start
+
+    def test_sliding_window_matches_legacy_pruning(self):
+        client = _client(prefix_stable=False)
+        for step in range(13):
+            client.ask(f"step {step}", f"IMG{step}")
+
+        legacy = client._prune_history_turns(client.history, max_turns=10)
+        legacy = client._prune_history_images(legacy, max_images=4)
+        window = [client._window_message(i, strip) for i, strip in client._sliding_window(10, 4)]
+
+        assert window == legacy
+
+    def test_reset_clears_fragments(self):
+        client = _client()
+        client.ask("step 0", "IMG0")
+
+        client.reset_session()
+        client.ask("again", "IMG1")
+
+        assert len(json.loads(client.bodies[-1])["messages"]) == 2
@@ -0,0 +1,121 @@
+"""
+前缀稳定的历史裁剪与 Ark 上下文缓存测试
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench import MockArkServer, scripted_task
+from android_phone.integrations.volcengine import VolcengineGUIClient
+
+
+def _client(**kwargs):
+    return VolcengineGUIClient(api_key="test", **kwargs)
+
+
+def _add_turns(client, count):
+    for i in range(count):
+        client.history.append({"role": "user", "content": [
+            {"type": "text", "text": f"step {i}"},
+            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{i}"}},
+        ]})
+        client.history.append({"role": "assistant", "content": f"Action: wait() {i}"})
+
+
+def _images(messages):
+    return sum(1 for m in messages if isinstance(m["content"], list)
+               for item in m["content"] if item["type"] == "image_url")
+
+
+class TestStableHistory:
+    """测试分块裁剪: 两次裁剪之间请求前缀保持不变"""
+
+    def test_prefix_is_append_only_between_evictions(self):
+        client = _client()
+        previous = None
+        breaks = 0
+        for _ in range(30):
+            _add_turns(client, 1)
+            window = client._stable_history(max_turns=10, max_images=4)
+            assert _images(window) <= 4
+            assert len(window) <= 20
+            if previous is not None and window[:len(previous)] != previous:
+                breaks += 1
+            previous = window
+
+        assert breaks == client.cache_stats["prefix_breaks"]
+        assert breaks < 10
+
+    def test_history_not_mutated(self):
+        client = _client()
+        _add_turns(client, 8)
+
+        client._stable_history(max_turns=10, max_images=4)
+
+        assert _images(client.history) == 8
+
+    def test_window_starts_with_user_message(self):
+        client = _client()
+        _add_turns(client, 11)
+
+        window = client._stable_history(max_turns=10, max_images=4)
+
+        assert window[0]["role"] == "user"
+        assert len(window) == 10
+
+
+class TestRequests:
+    """测试请求的 cached_tokens 统计与上下文缓存"""
+
+    def test_cached_tokens_reported(self):
+        with MockArkServer(scripted_task(5)) as server:
+            client = _client()
+            client.API_URL = server.url
+            usages = [client.ask(f"step {i}", "aGVsbG8=")["usage"] for i in range(3)]
+
+        assert usages[0]["cached_tokens"] == 0
+        assert usages[1]["cached_tokens"] > 0
+        assert usages[2]["cached_tokens"] > usages[1]["cached_tokens"]
+        assert client.cache_stats["cached_tokens"] == sum(u["cached_tokens"] for u in usages)
+
+    def test_context_cache(self):
+        """测试开启上下文缓存后系统提示词只发送一次"""
+        with MockArkServer(scripted_task(5)) as server:
+            client = _client(context_cache=True)
+            client.API_URL = server.url
+            client.ask("step 0", "aGVsbG8=")
+            client.ask("step 1", "aGVsbG8=")
+
+            assert len(server.contexts) == 1
+            paths = [r["path"] for r in server.requests]
+
+        assert paths == ["/api/v3/context/chat/completions"] * 2
+        assert client.context_cache is True
+
+    def test_context_cache_fallback(self):
+        """测试上下文接口不可用时回退到普通请求"""
+        client = _client(context_cache=True)
+        calls = []
+
+        def send(headers, payload, url=None, timeout=None):
+            calls.append(url)
+            if url and url.endswith("/context/create"):
+                raise RuntimeError("404")
+            return {"choices": [{"message": {"content": "Action: wait()"}}], "usage": {}}
+
+        client._send = send
+        result = client.ask("go", "aGVsbG8=")
+
+        assert result["usage"]["cached_tokens"] == 0
+        assert client.context_cache is False
+        assert calls[-1] is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,114 @@
+"""
+性能分析模式测试 (每步 cProfile、tracemalloc 快照、汇总与任务日志)
+"""
+
+import json
+import pstats
+import sys
+import tracemalloc
+from pathlib import Path
+from unittest.mock import Mock
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.core.agent import AutonomousAgent
+from android_phone.core.profiling import TaskProfiler
+
+STEPS = [
+    {"thought": "scroll", "action_parsed": {"type": "scroll", "x": 500, "y": 500, "direction": "down"}, "usage": {}},
+    {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}},
+]
+
+
+def _busy(n):
+    return sum(i * i for i in range(n))
+
+
+class TestTaskProfiler:
+    """测试 TaskProfiler 输出的文件与汇总"""
+
+    def test_files_and_summary(self, tmp_path):
+        profiler = TaskProfiler("t1", log_dir=str(tmp_path))
+        profiler.start()
+        for step in range(2):
+            profiler.begin_step(step)
+            _busy(20000)
+            kept = [bytearray(4096) for _ in range(50)]
+        summary = profiler.finish()
+
+        out = tmp_path / "profiles" / "t1"
+        assert sorted(p.name for p in out.iterdir()) == [
+            "end.tracemalloc", "start.tracemalloc", "step_001.prof", "step_002.prof",
+            "summary.json", "summary.txt", "task.prof"]
+        assert summary["steps"] == 2
+        assert any("_busy" in row["function"] for row in summary["top_cumulative"])
+        assert summary["memory_growth"][0]["size_diff_kb"] > 0
+        assert json.loads((out / "summary.json").read_text(encoding="utf-8"))["task_id"] == "t1"
+        assert "Top functions by cumulative time" in (out / "summary.txt").read_text(encoding="utf-8")
+        assert kept
+
+    def test_profiles_loadable(self, tmp_path):
+        profiler = TaskProfiler("t2", log_dir=str(tmp_path))
+        profiler.start()
+        profiler.begin_step(0)
+        _busy(1000)
+        profiler.finish()
+
+        out = tmp_path / "profiles" / "t2"
+        assert pstats.Stats(str(out / "task.prof")).total_calls > 0
+        assert tracemalloc.Snapshot.load(str(out / "end.tracemalloc")).traces is not None
+
+    def test_tracemalloc_left_as_found(self, tmp_path):
+        was_tracing = tracemalloc.is_tracing()
+        profiler = TaskProfiler("t3", log_dir=str(tmp_path))
+        profiler.start()
+        profiler.finish()
+
+        assert tracemalloc.is_tracing() == was_tracing
+
+
+class TestAgentProfile:
+    """测试 Agent 的 profiling 开关"""
+
+    def test_profiled_run(self, fake_controller, tmp_path):
+        client = Mock()
+        client.ask.side_effect = list(STEPS)
+        agent = AutonomousAgent(fake_controller(advance_on_action=False), client, log_dir=str(tmp_path), settle_delay=(0, 0), profile=True)
+
+        result = agent.run("scroll once", max_steps=3)
+
+        profile_dir = Path(result["profile"]["dir"])
+        assert result["profile"]["steps"] == 2
+        assert (profile_dir / "step_001.prof").exists()
+        assert (profile_dir / "step_002.prof").exists()
+        assert profile_dir.parent == tmp_path / "profiles"
+        events = [json.loads(line) for f in tmp_path.glob("*.jsonl") for line in f.read_text(encoding="utf-8").splitlines()]
+        assert any(e.get("event") == "profile" and e["dir"] == str(profile_dir) for e in events)
+
+    def test_env_flag(self, fake_controller, tmp_path, monkeypatch):
+        monkeypatch.setenv("ANDROID_AGENT_PROFILE", "1")
+
+        assert AutonomousAgent(fake_controller(advance_on_action=False), Mock(), log_dir=str(tmp_path)).profile is True
+
+    def test_off_by_default(self, fake_controller, tmp_path, monkeypatch):
+        monkeypatch.delenv("ANDROID_AGENT_PROFILE", raising=False)
+        client = Mock()
+        client.ask.side_effect = list(STEPS)
+
+        result = AutonomousAgent(fake_controller(advance_on_action=False), client, log_dir=str(tmp_path), settle_delay=(0, 0)).run("x", max_steps=3)
+
+        assert "profile" not in result
+        assert not (tmp_path / "profiles").exists()
+
+    def test_profile_written_when_task_raises(self, fake_controller, tmp_path):
+        client = Mock()
+        client.ask.side_effect = KeyboardInterrupt
+        agent = AutonomousAgent(fake_controller(advance_on_action=False), client, log_dir=str(tmp_path), settle_delay=(0, 0), profile=True)
+
+        try:
+            agent.run("x", max_steps=2)
+        except KeyboardInterrupt:
+            pass
+
+        assert list((tmp_path / "profiles").glob("*/summary.json"))
@@ -0,0 +1,179 @@
+"""
+模型请求限流测试 (RPM/TPM 令牌桶、公平排队、跨进程共享、429 暂停)
+"""
+
+import base64
+import io
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from PIL import Image
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.integrations import ratelimit
+from android_phone.integrations.ratelimit import (
+    RateLimiter, estimate_request_tokens, image_tokens, shared_limiter,
+)
+from android_phone.integrations.volcengine import VolcengineGUIClient
+
+ANSWER = {"choices": [{"message": {"content": "Thought: ok\nAction: wait()"}}],
+          "usage": {"total_tokens": 50}}
+
+
+def _data_url(size, fmt="JPEG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (10, 20, 30)).save(buffer, format=fmt)
+    mime = "jpeg" if fmt == "JPEG" else "png"
+    return f"data:image/{mime};base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+class TestEstimates:
+    """测试 Token 估算"""
+
+    def test_image_tokens_from_header(self):
+        assert image_tokens(_data_url((378, 672))) == 14 * 24
+        assert image_tokens(_data_url((56, 28), fmt="PNG")) == 2
+
+    def test_unknown_image(self):
+        assert image_tokens("https://example.com/a.jpg") == ratelimit.DEFAULT_IMAGE_TOKENS
+
+    def test_request_estimate(self):
+        payload = {"messages": [
+            {"role": "system", "content": "x" * 400},
+            {"role": "user", "content": [{"type": "text", "text": "y" * 40},
+                                         {"type": "image_url", "image_url": {"url": _data_url((280, 280))}}]},
+        ]}
+
+        assert estimate_request_tokens(payload, completion_tokens=0) == 100 + 10 + 100
+
+
+class TestRateLimiter:
+    """测试令牌桶"""
+
+    def test_rpm_waits(self):
+        limiter = RateLimiter(rpm=600, burst_s=0.1)  # 1 request burst, 10 per second
+
+        limiter.acquire()
+        waited = limiter.acquire()
+
+        assert 0.05 < waited < 0.5
+        assert limiter.stats["waited"] == 1
+
+    def test_tpm_waits(self):
+        limiter = RateLimiter(tpm=60000, burst_s=0.1)  # 100 token burst, 1000 per second
+
+        assert limiter.acquire(100) < 0.01
+        assert limiter.acquire(100) > 0.05
+
+    def test_timeout(self):
+        limiter = RateLimiter(rpm=6, burst_s=10)
+
+        limiter.acquire()
+        with pytest.raises(TimeoutError):
+            limiter.acquire(timeout=0.05)
+        assert limiter.stats["timeouts"] == 1
+
+    def test_fifo_order(self):
+        limiter = RateLimiter(rpm=1200, burst_s=0.05)
+        limiter.acquire()
+        order = []
+
+        def worker(i):
+            limiter.acquire()
+            order.append(i)
+
+        threads = []
+        for i in range(5):
+            thread = threading.Thread(target=worker, args=(i,))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.005)
+        for thread in threads:
+            thread.join()
+
+        assert order == [0, 1, 2, 3, 4]
+
+    def test_settle_refunds_overestimate(self):
+        limiter = RateLimiter(tpm=60000, burst_s=0.1)
+
+        limiter.acquire(100)
+        limiter.settle(100, 10)
+
+        assert limiter.acquire(80) < 0.01
+
+    def test_pause(self):
+        limiter = RateLimiter(rpm=6000)
+
+        limiter.pause(0.1)
+
+        assert limiter.acquire() > 0.05
+
+    def test_shared_between_processes_via_file(self, tmp_path):
+        lock_file = str(tmp_path / "ark.limit")
+        a = RateLimiter(rpm=600, burst_s=0.1, lock_file=lock_file)
+        b = RateLimiter(rpm=600, burst_s=0.1, lock_file=lock_file)
+
+        a.acquire()
+        waited = b.acquire()
+
+        assert waited > 0.05
+
+    def test_shared_limiter_is_per_config(self):
+        assert shared_limiter("T", rpm=60) is shared_limiter("T", rpm=60)
+        assert shared_limiter("T", rpm=60) is not shared_limiter("T", rpm=120)
+
+
+class TestClientIntegration:
+    """测试客户端接入限流"""
+
+    def test_env_configures_shared_limiter(self, monkeypatch):
+        monkeypatch.setenv("ARK_RPM", "77")
+        monkeypatch.setenv("ARK_TPM", "5000")
+
+        a = VolcengineGUIClient(api_key="k")
+        b = VolcengineGUIClient(api_key="k")
+
+        assert a.rate_limiter is b.rate_limiter
+        assert a.rate_limiter.rpm == 77 and a.rate_limiter.tpm == 5000
+
+    def test_no_limiter_by_default(self, monkeypatch):
+        monkeypatch.delenv("ARK_RPM", raising=False)
+        monkeypatch.delenv("ARK_TPM", raising=False)
+
+        assert VolcengineGUIClient(api_key="k").rate_limiter is None
+
+    def test_wait_reported_in_metrics(self):
+        limiter = RateLimiter(rpm=600, burst_s=0.1)
+        client = VolcengineGUIClient(api_key="k", rate_limiter=limiter)
+        client._send = lambda headers, payload, url=None, timeout=None: ANSWER
+
+        client.ask("go", "aGVsbG8=")
+        client.ask("go", "aGVsbG8=")
+
+        assert client.request_stats["limiter_waits"] == 1
+        assert client.request_stats["limiter_wait_s"] > 0.05
+
+    def test_429_pauses_limiter_and_retries(self):
+        limiter = RateLimiter(rpm=6000)
+        client = VolcengineGUIClient(api_key="k", rate_limiter=limiter, backoff_base=0.001, backoff_max=0.05)
+        request = httpx.Request("POST", client.API_URL)
+        errors = [httpx.HTTPStatusError("429", request=request,
+                                        response=httpx.Response(429, request=request, headers={"Retry-After": "0.05"}))]
+
+        def send(headers, payload, url=None, timeout=None):
+            if errors:
+                raise errors.pop(0)
+            return ANSWER
+
+        client._send = send
+        result = client.ask("go", "aGVsbG8=")
+
+        assert result["action_parsed"]["type"] == "wait"
+        assert limiter.stats["pauses"] == 1
+        assert client.request_stats["retries"] == 1
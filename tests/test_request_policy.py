@@ -0,0 +1,148 @@
+"""
+模型请求策略测试 (分类重试 / 对冲请求 / 截止时间)
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.integrations.openai_compat import is_retryable
+from android_phone.integrations.volcengine import VolcengineGUIClient
+
+ANSWER = {"choices": [{"message": {"content": "Thought: ok\nAction: wait()"}}], "usage": {}}
+
+
+def _status_error(code, headers=None):
+    request = httpx.Request("POST", "https://ark.example/api/v3/chat/completions")
+    response = httpx.Response(code, request=request, headers=headers or {})
+    return httpx.HTTPStatusError(f"{code}", request=request, response=response)
+
+
+def _client(**kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    kwargs.setdefault("backoff_max", 0.01)
+    return VolcengineGUIClient(api_key="test", **kwargs)
+
+
+class TestClassification:
+    """测试错误分类"""
+
+    def test_retryable(self):
+        assert is_retryable(_status_error(429))
+        assert is_retryable(_status_error(503))
+        assert is_retryable(httpx.ReadTimeout("slow"))
+        assert is_retryable(httpx.ConnectError("down"))
+
+    def test_not_retryable(self):
+        assert not is_retryable(_status_error(400))
+        assert not is_retryable(_status_error(401))
+        assert not is_retryable(ValueError("bad json"))
+
+
+class TestRetries:
+    """测试重试与历史一致性"""
+
+    def test_retry_then_success(self):
+        """测试瞬时错误重试后成功, 历史只追加一轮"""
+        client = _client()
+        errors = [_status_error(503), httpx.ReadTimeout("slow")]
+
+        def send(headers, payload, url=None, timeout=None):
+            if errors:
+                raise errors.pop(0)
+            return ANSWER
+
+        client._send = send
+        result = client.ask("go", "aGVsbG8=")
+
+        assert result["action_parsed"]["type"] == "wait"
+        assert client.request_stats["retries"] == 2
+        assert client.request_stats["attempts"] == 3
+        assert len(client.history) == 2
+
+    def test_non_retryable_fails_fast(self):
+        client = _client()
+        calls = []
+
+        def send(headers, payload, url=None, timeout=None):
+            calls.append(1)
+            raise _status_error(401)
+
+        client._send = send
+        with pytest.raises(RuntimeError):
+            client.ask("go", "aGVsbG8=")
+
+        assert len(calls) == 1
+        assert client.history == []
+        assert client.request_stats["failures"] == 1
+
+    def test_retries_exhausted(self):
+        client = _client(max_retries=2)
+
+        def send(headers, payload, url=None, timeout=None):
+            raise _status_error(429)
+
+        client._send = send
+        with pytest.raises(RuntimeError):
+            client.ask("go", "aGVsbG8=")
+
+        assert client.request_stats["attempts"] == 3
+        assert client.history == []
+
+    def test_deadline(self):
+        """测试总截止时间内停止重试"""
+        client = _client(deadline=0.05, backoff_base=1.0, backoff_max=1.0)
+
+        def send(headers, payload, url=None, timeout=None):
+            raise _status_error(503, headers={"Retry-After": "1"})
+
+        client._send = send
+        started = time.monotonic()
+        with pytest.raises(RuntimeError):
+            client.ask("go", "aGVsbG8=")
+
+        assert time.monotonic() - started < 0.5
+        assert client.request_stats["deadline_exceeded"] == 1
+
+
+class TestHedging:
+    """测试对冲请求"""
+
+    def test_hedge_wins_over_slow_request(self):
+        """测试第一个请求过慢时发送对冲请求并采用先返回的结果"""
+        client = _client(hedge_percentile=0.9, hedge_min_samples=3, hedge_min_delay=0.0)
+        client._latencies.extend([0.02, 0.02, 0.02])
+        calls = []
+        lock = threading.Lock()
+
+        def send(headers, payload, url=None, timeout=None):
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+            time.sleep(1.0 if first else 0.01)
+            return ANSWER
+
+        client._send = send
+        started = time.monotonic()
+        client.ask("go", "aGVsbG8=")
+
+        assert time.monotonic() - started < 0.5
+        assert client.request_stats["hedges"] == 1
+        assert client.request_stats["hedge_wins"] == 1
+        assert len(client.history) == 2
+
+    def test_no_hedge_without_samples(self):
+        client = _client(hedge_percentile=0.9)
+
+        assert client._hedge_delay() is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,271 @@
+"""
+多设备任务调度测试 (优先级、设备亲和、并发上限、重试、汇总报告)
+"""
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.core.scheduler import AgentRunner, Scheduler, TaskSpec, load_tasks
+
+
+class FakeRunner:
+    """记录每次运行的设备和并发情况, 不需要真机和模型"""
+
+    def __init__(self, duration=0.02, results=None):
+        self.duration = duration
+        self.results = results or {}
+        self.calls = []
+        self.active = {}
+        self.max_active = 0
+        self.max_per_device = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, spec, serial):
+        with self._lock:
+            self.calls.append((spec.goal, serial))
+            self.active[serial] = self.active.get(serial, 0) + 1
+            self.max_per_device = max(self.max_per_device, self.active[serial])
+            self.max_active = max(self.max_active, sum(self.active.values()))
+        time.sleep(self.duration)
+        with self._lock:
+            self.active[serial] -= 1
+        script = self.results.get(spec.goal)
+        if script:
+            outcome = script.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return {"status": "completed", "result": spec.goal, "steps": 3, "total_usage": {"total_tokens": 100}}
+
+
+class TestScheduling:
+    """测试任务分发"""
+
+    def test_runs_all_tasks_one_per_device(self):
+        runner = FakeRunner()
+        scheduler = Scheduler(["a", "b", "c"], runner, retry_delay=0)
+
+        report = scheduler.run([TaskSpec(goal=f"goal {i}") for i in range(9)])
+
+        assert report["by_status"] == {"completed": 9}
+        assert runner.max_per_device == 1
+        assert runner.max_active <= 3
+        assert sum(d["tasks"] for d in report["devices"].values()) == 9
+
+    def test_global_concurrency_cap(self):
+        runner = FakeRunner()
+        scheduler = Scheduler(["a", "b", "c", "d"], runner, max_concurrency=2)
+
+        scheduler.run([TaskSpec(goal=f"goal {i}") for i in range(8)])
+
+        assert runner.max_active <= 2
+        assert len(runner.calls) == 8
+
+    def test_priority_order(self):
+        runner = FakeRunner(duration=0)
+        scheduler = Scheduler(["a"], runner)
+
+        scheduler.run([TaskSpec(goal="low"), TaskSpec(goal="high", priority=5), TaskSpec(goal="mid", priority=1),
+                       TaskSpec(goal="low 2")])
+
+        assert [goal for goal, _ in runner.calls] == ["high", "mid", "low", "low 2"]
+
+    def test_serial_affinity(self):
+        runner = FakeRunner()
+        scheduler = Scheduler(["a", "b"], runner)
+
+        scheduler.run([TaskSpec(goal=f"pinned {i}", serial="b") for i in range(3)])
+
+        assert {serial for _, serial in runner.calls} == {"b"}
+
+    def test_required_app_affinity(self):
+        installed = {"a": {"com.tencent.mm"}, "b": {"com.hexin.plug"}}
+        runner = FakeRunner()
+        scheduler = Scheduler(["a", "b"], runner, app_checker=lambda serial, pkg: pkg in installed[serial])
+
+        report = scheduler.run([
+            TaskSpec(goal="wechat", required_app="com.tencent.mm"),
+            TaskSpec(goal="stocks", required_app="com.hexin.plug"),
+            TaskSpec(goal="missing", required_app="com.example.none"),
+            TaskSpec(goal="offline", serial="zzz"),
+        ])
+
+        assert dict(runner.calls) == {"wechat": "a", "stocks": "b"}
+        assert report["by_status"] == {"completed": 2, "unschedulable": 2}
+
+    def test_uses_runner_has_app(self):
+        runner = FakeRunner()
+        runner.has_app = lambda serial, pkg: serial == "b"
+        scheduler = Scheduler(["a", "b"], runner)
+
+        scheduler.run([TaskSpec(goal="needs app", required_app="com.tencent.mm")])
+
+        assert runner.calls == [("needs app", "b")]
+
+    def test_app_check_outside_lock(self):
+        """测试检查设备上的应用时不持有调度锁 (慢设备不阻塞其他设备)"""
+        runner = FakeRunner()
+        lock_free = []
+
+        def probe():
+            acquired = scheduler._cond.acquire(timeout=1)
+            lock_free.append(acquired)
+            if acquired:
+                scheduler._cond.release()
+
+        def checker(serial, pkg):
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            return serial == "a"
+
+        scheduler = Scheduler(["a", "b"], runner, app_checker=checker)
+        scheduler.run([TaskSpec(goal="one", required_app="com.tencent.mm"),
+                       TaskSpec(goal="two", required_app="com.tencent.mm")])
+
+        assert lock_free == [True, True]
+        assert {serial for _, serial in runner.calls} == {"a"}
+
+    def test_requires_devices(self):
+        with pytest.raises(ValueError):
+            Scheduler([], FakeRunner())
+
+
+class TestRetries:
+    """测试瞬时失败重试"""
+
+    def test_retries_error_and_exception(self):
+        runner = FakeRunner(results={
+            "flaky": [{"status": "error", "result": "device offline"}],
+            "crashy": [RuntimeError("adb died")],
+        })
+        scheduler = Scheduler(["a", "b"], runner, retry_delay=0)
+
+        report = scheduler.run([TaskSpec(goal="flaky"), TaskSpec(goal="crashy")])
+
+        assert report["by_status"] == {"completed": 2}
+        assert report["retries"] == 2
+        assert {o["spec"]["goal"]: o["attempts"] for o in report["outcomes"]} == {"flaky": 2, "crashy": 2}
+
+    def test_gives_up_after_max_retries(self):
+        runner = FakeRunner(results={"broken": [RuntimeError("x"), RuntimeError("y"), RuntimeError("z")]})
+        scheduler = Scheduler(["a"], runner, retry_delay=0)
+
+        report = scheduler.run([TaskSpec(goal="broken", max_retries=2)])
+
+        assert report["by_status"] == {"error": 1}
+        assert report["outcomes"][0]["attempts"] == 3
+        assert report["outcomes"][0]["result"] == "z"
+
+    def test_failed_is_not_retried(self):
+        runner = FakeRunner(results={"too long": [{"status": "failed", "result": "Max steps reached"}]})
+        scheduler = Scheduler(["a"], runner, retry_delay=0)
+
+        report = scheduler.run([TaskSpec(goal="too long", max_retries=3)])
+
+        assert report["by_status"] == {"failed": 1}
+        assert len(runner.calls) == 1
+
+
+class TestReport:
+    """测试汇总报告"""
+
+    def test_summary_fields(self):
+        scheduler = Scheduler(["a", "b"], FakeRunner())
+
+        report = scheduler.run([TaskSpec(goal=f"goal {i}") for i in range(4)])
+
+        assert report["tasks"] == 4
+        assert report["throughput_per_min"] > 0
+        assert 0 < report["latency_s"]["p50"] <= report["latency_s"]["p95"] <= report["latency_s"]["max"]
+        assert report["run_s"]["mean"] > 0
+        assert report["outcomes"][0]["steps"] == 3
+        json.dumps(report)
+
+
+class TestAgentRunner:
+    """测试 AgentRunner 的设备连接"""
+
+    def test_failed_connect_drops_monitor(self, monkeypatch):
+        """测试连接失败时停止健康检查, 下一个任务重新连接"""
+        from unittest.mock import Mock
+
+        from android_phone.core.controller import AndroidController
+
+        connect = Mock(side_effect=ConnectionError("no device"))
+        monkeypatch.setattr(AndroidController, "connect", connect)
+        runner = AgentRunner()
+
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                runner.controller("x")
+
+        assert runner._controllers["x"].health is None
+        assert connect.call_count == 2
+
+
+class TestLoadTasks:
+    """测试任务文件解析"""
+
+    def test_plain_text(self, tmp_path):
+        path = tmp_path / "tasks.txt"
+        path.write_text("# comment\n打开微信\n\n打开设置\n", encoding="utf-8")
+
+        assert [t.goal for t in load_tasks(str(path))] == ["打开微信", "打开设置"]
+
+    def test_json_lines(self, tmp_path):
+        path = tmp_path / "tasks.jsonl"
+        path.write_text('{"goal": "打开微信", "priority": 2, "required_app": "com.tencent.mm"}\n'
+                        '"打开设置"\n', encoding="utf-8")
+
+        tasks = load_tasks(str(path))
+
+        assert tasks[0].priority == 2 and tasks[0].required_app == "com.tencent.mm"
+        assert tasks[1].goal == "打开设置"
+
+    def test_json_list_rejects_unknown_fields(self, tmp_path):
+        path = tmp_path / "tasks.json"
+        path.write_text(json.dumps([{"goal": "x", "deadline": 3}]), encoding="utf-8")
+
+        with pytest.raises(ValueError):
+            load_tasks(str(path))
+
+
+class TestServerBatch:
+    """测试 MCP run_task_batch 不阻塞事件循环"""
+
+    def test_event_loop_not_blocked(self, monkeypatch):
+        import asyncio
+
+        from android_phone import server
+        from android_phone.core import scheduler as scheduler_module
+
+        runner = FakeRunner(duration=0.2)
+        runner.close = lambda: None
+        monkeypatch.setattr(scheduler_module, "AgentRunner", lambda: runner)
+
+        async def main():
+            ticks = []
+
+            async def ticker():
+                while True:
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.02)
+
+            task = asyncio.create_task(ticker())
+            report = json.loads(await server.run_task_batch([{"goal": "a"}, {"goal": "b"}], devices=["x"]))
+            task.cancel()
+            return report, ticks
+
+        report, ticks = asyncio.run(main())
+
+        assert report["by_status"] == {"completed": 2}
+        assert len(ticks) >= 5
@@ -0,0 +1,87 @@
+"""
+并发采集屏幕状态测试 (截图与 UI 树并发获取、共享采集时间戳)
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+
+LATENCY = {"screenshot": 0.1, "info": 0.05, "dump_hierarchy": 0.2}
+
+
+class TestCaptureScreenState:
+    """测试 capture_screen_state"""
+
+    def test_overlaps_hierarchy_dump(self, fake_controller):
+        """测试 UI 树获取与截图并发, 总耗时接近最慢的一项"""
+        controller = fake_controller(latency=LATENCY)
+
+        started = time.perf_counter()
+        state = controller.capture_screen_state(include_hierarchy=True, scale=0.5)
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < sum(LATENCY.values()) - 0.05
+        assert state["image"] and state["info"]["productName"] == "fake"
+        assert state["xml"].startswith("<hierarchy")
+
+    def test_shared_timestamp(self, fake_controller):
+        controller = fake_controller()
+
+        before = time.time()
+        state = controller.capture_screen_state(include_hierarchy=True)
+
+        assert before - 0.001 <= state["capture_timestamp"] <= time.time()
+        assert state["capture_ms"] >= 0
+
+    def test_compact_matches_sequential(self, fake_controller):
+        controller = fake_controller()
+
+        state = controller.capture_screen_state(include_hierarchy=True)
+
+        assert state["xml"] == controller.get_compact_ui_hierarchy()
+
+    def test_raw_hierarchy(self, fake_controller):
+        controller = fake_controller()
+
+        state = controller.capture_screen_state(include_hierarchy=True, compact=False)
+
+        assert state["xml"] == controller._device.current_hierarchy()
+
+    def test_no_hierarchy_by_default(self, fake_controller):
+        controller = fake_controller()
+
+        state = controller.capture_screen_state()
+
+        assert "xml" not in state
+        assert controller._device.call_count("dump_hierarchy") == 0
+
+    def test_hierarchy_error(self, fake_controller):
+        controller = fake_controller()
+
+        def broken(**kwargs):
+            raise OSError("uiautomator crashed")
+
+        controller._device.dump_hierarchy = broken
+        with pytest.raises(RuntimeError, match="UI hierarchy"):
+            controller.capture_screen_state(include_hierarchy=True)
+
+
+class TestGetScreenStateTool:
+    """测试 MCP get_screen_state 工具"""
+
+    def test_tool_returns_timestamp(self, fake_controller, monkeypatch):
+        from android_phone import server
+
+        monkeypatch.setattr(server, "_controller", fake_controller())
+        data = json.loads(asyncio.run(server.get_screen_state(include_xml=True, scale=0.5)))
+
+        assert data["status"] == "ok"
+        assert {"image", "info", "xml", "capture_timestamp"} <= set(data)
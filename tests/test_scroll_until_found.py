@@ -0,0 +1,100 @@
+"""
+scroll_until_found 测试 (本地滚动查找, 不调用模型)
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench import synthetic_hierarchy
+from android_phone.core.hierarchy import parse_bounds, parse_hierarchy, find_nodes, find_scrollables
+from android_phone.integrations.parser import parse_action_from_text
+
+
+class TestHierarchyHelpers:
+    """测试 hierarchy 辅助函数"""
+
+    def test_parse_bounds(self):
+        assert parse_bounds("[0,240][1080,2400]") == (0, 240, 1080, 2400)
+        assert parse_bounds("") is None
+
+    def test_find_nodes_and_scrollables(self):
+        root = parse_hierarchy(synthetic_hierarchy(0))
+
+        assert len(find_nodes(root, text="Item 3")) == 1
+        assert len(find_nodes(root, resource_id="title")) == 10
+        assert find_scrollables(root)[0].get("resource-id") == "com.example.list:id/list"
+
+
+class TestScrollUntilFound:
+    """测试 controller.scroll_until_found"""
+
+    def test_found_after_swipes(self, fake_controller):
+        """测试滑动两次后找到元素"""
+        controller = fake_controller()
+
+        result = controller.scroll_until_found(text="Item 25", settle=0)
+
+        assert result["found"] is True
+        assert result["swipes"] == 2
+        assert result["bounds"][0] == 32
+        assert controller._device.call_count("swipe") == 2
+        assert controller._device.call_count("screenshot") == 0
+
+    def test_end_of_list(self, fake_controller):
+        """测试 UI 树不再变化时判定到达列表末尾"""
+        controller = fake_controller(hierarchies=[synthetic_hierarchy(0)])
+
+        result = controller.scroll_until_found(text="Item 99", settle=0)
+
+        assert result["found"] is False
+        assert result["reason"] == "end of list"
+        assert result["swipes"] == 1
+
+    def test_max_swipes(self, fake_controller):
+        """测试达到最大滑动次数"""
+        controller = fake_controller()
+
+        result = controller.scroll_until_found(text="Nope", max_swipes=2, settle=0)
+
+        assert result["found"] is False
+        assert result["reason"] == "max swipes reached"
+
+    def test_swipe_direction(self, fake_controller):
+        """测试 down 方向为向上滑动"""
+        controller = fake_controller()
+
+        controller.scroll_until_found(text="Item 15", settle=0)
+
+        _, (x1, y1, x2, y2, _) = next(call for call in controller._device.calls if call[0] == "swipe")
+        assert y1 > y2
+
+
+class TestAgentAction:
+    """测试 Agent 的 scroll_until_found 动作"""
+
+    def test_parse_action(self):
+        text = "Thought: find settings\nAction: scroll_until_found(content='设置', direction='down')"
+
+        action = parse_action_from_text(text)["action_parsed"]
+
+        assert action == {"type": "scroll_until_found", "content": "设置", "direction": "down"}
+
+    def test_handle_action_reports_point(self, fake_controller):
+        from android_phone.core.agent import AutonomousAgent
+
+        agent = AutonomousAgent(fake_controller(), Mock())
+
+        success, message = agent._handle_scroll_until_found({"content": "Item 25", "direction": "down"})
+
+        assert success is True
+        assert "<point>500" in message
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
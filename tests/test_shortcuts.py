@@ -0,0 +1,205 @@
+"""
+快捷跳转注册表测试 (目标匹配、Intent 参数、就绪检查、Agent 在调用模型前跳转)
+"""
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.core.agent import AutonomousAgent
+from android_phone.core.shortcuts import Shortcut, ShortcutRegistry
+
+FINISHED = {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {"total_tokens": 5}}
+
+SEARCH = {
+    "name": "list_search",
+    "description": "Example search results",
+    "patterns": [r"^在Example(?:里)?搜索(?P<query>[^,，]+)"],
+    "intent": {"action": "android.intent.action.VIEW", "data": "example://search?q={query|url}",
+               "package": "com.example.list", "extras": {"source": "agent", "page": 1}},
+    "ready": {"activity": "com.example.list/", "timeout": 0.5},
+}
+
+
+def _events(tmp_path, event):
+    lines = [json.loads(line) for f in tmp_path.glob("*.jsonl") for line in f.read_text(encoding="utf-8").splitlines()]
+    return [e for e in lines if e.get("event") == event]
+
+
+class TestShortcutMatch:
+    """测试目标匹配与参数"""
+
+    @pytest.mark.parametrize("goal, name, rest", [
+        ("打开WLAN设置", "wifi_settings", ""),
+        ("打开wifi设置，连接家里的网络", "wifi_settings", "连接家里的网络"),
+        ("Open bluetooth settings and pair the headphones", "bluetooth_settings", "pair the headphones"),
+        ("打开网址 https://example.com/a?b=1", "open_url", ""),
+    ])
+    def test_builtin(self, goal, name, rest):
+        shortcut, params, remainder = ShortcutRegistry(builtin=True).match(goal)
+
+        assert shortcut.name == name
+        assert remainder == rest
+
+    def test_params_rendered(self):
+        registry = ShortcutRegistry([SEARCH], builtin=False)
+
+        shortcut, params, rest = registry.match("在Example里搜索 红色 外套，打开第一个")
+
+        assert params == {"query": "红色 外套"}
+        assert rest == "打开第一个"
+        assert shortcut.render(params)["data"] == "example://search?q=%E7%BA%A2%E8%89%B2%20%E5%A4%96%E5%A5%97"
+        assert shortcut.params == ["query"]
+
+    def test_no_match(self):
+        assert ShortcutRegistry().match("给妈妈发消息") is None
+
+    def test_file_overrides_builtin(self, tmp_path):
+        path = tmp_path / "shortcuts.json"
+        override = {"name": "wifi_settings", "patterns": ["^wifi"], "intent": {"action": "custom.WIFI"}}
+        path.write_text(json.dumps({"shortcuts": [override, SEARCH]}), encoding="utf-8")
+
+        registry = ShortcutRegistry(path=str(path))
+
+        assert registry.shortcuts[0].name == "wifi_settings"
+        assert registry.get("wifi_settings").intent == {"action": "custom.WIFI"}
+        assert [s.name for s in registry.shortcuts].count("wifi_settings") == 1
+
+    def test_unknown_field(self):
+        with pytest.raises(ValueError, match="intent fields"):
+            Shortcut("bad", ["^x"], {"activity": "x"})
+
+
+class TestExecute:
+    """测试通过控制器执行 Intent 并检查就绪"""
+
+    def test_am_start_command(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        registry = ShortcutRegistry([SEARCH], builtin=False)
+        shortcut, params, _ = registry.match("在Example搜索外套")
+
+        outcome = registry.execute(controller, shortcut, params)
+
+        assert outcome["ok"] is True
+        assert controller._device.shell_commands[-1] == (
+            "am start -a android.intent.action.VIEW -d 'example://search?q=%E5%A4%96%E5%A5%97' "
+            "--es source agent --ei page 1 com.example.list")
+
+    def test_default_readiness_is_activity_change(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        registry = ShortcutRegistry()
+
+        outcome = registry.execute(controller, registry.get("wifi_settings"))
+
+        assert outcome["ok"] is True
+        assert controller.current_activity().startswith("com.android.settings/")
+
+    def test_not_ready(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        shortcut = Shortcut("other", ["^x"], {"component": "com.example.list/.Main"},
+                            ready={"activity": "com.other/", "timeout": 0.2})
+
+        outcome = ShortcutRegistry([shortcut], builtin=False).execute(controller, shortcut)
+
+        assert outcome["started"] is True
+        assert outcome["ok"] is False
+        assert outcome["error"] == "target not ready"
+
+    def test_unresolved_intent(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        shortcut = Shortcut("missing", ["^x"], {"package": "com.not.installed", "action": "android.intent.action.MAIN"})
+
+        outcome = ShortcutRegistry([shortcut], builtin=False).execute(controller, shortcut)
+
+        assert outcome["started"] is False
+        assert outcome["ok"] is False
+
+    def test_missing_param(self, fake_controller):
+        shortcut = Shortcut("url", ["^x"], {"data": "{url}"})
+
+        outcome = ShortcutRegistry([shortcut], builtin=False).execute(fake_controller(advance_on_action=False), shortcut)
+
+        assert outcome["error"] == "missing parameter 'url'"
+
+
+class TestAgentShortcut:
+    """测试 Agent 在调用模型前使用快捷跳转"""
+
+    def test_shortcut_only_needs_no_model(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+
+        result = AutonomousAgent(controller, client, log_dir=str(tmp_path)).run("打开WLAN设置", max_steps=3)
+
+        assert result["status"] == "completed"
+        assert result["steps"] == 0
+        assert result["result"] == "Opened Wi-Fi settings"
+        client.ask.assert_not_called()
+        assert _events(tmp_path, "shortcut")[0]["hit"] is True
+
+    def test_rest_left_to_model(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [FINISHED]
+        agent = AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0),
+                                shortcut_registry=ShortcutRegistry([SEARCH], builtin=False))
+
+        agent.run("在Example搜索外套，打开第一个", max_steps=3)
+
+        assert "Example search results has already been opened" in client.ask.call_args.args[0]
+        event = _events(tmp_path, "shortcut")[0]
+        assert event["name"] == "list_search"
+        assert event["params"] == {"query": "外套"}
+
+    def test_miss_logged(self, fake_controller, tmp_path):
+        client = Mock()
+        client.ask.side_effect = [FINISHED]
+
+        AutonomousAgent(fake_controller(advance_on_action=False), client, log_dir=str(tmp_path), settle_delay=(0, 0)).run("看看天气", max_steps=2)
+
+        assert [e["hit"] for e in _events(tmp_path, "shortcut")] == [False]
+
+    def test_disabled(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [FINISHED]
+
+        AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0),
+                        shortcuts=False).run("打开WLAN设置", max_steps=2)
+
+        assert not any(cmd.startswith("am start") for cmd in controller._device.shell_commands)
+        assert _events(tmp_path, "shortcut") == []
+
+
+class TestServerShortcuts:
+    """测试 MCP list_shortcuts / run_shortcut 工具"""
+
+    def test_run_by_goal_and_name(self, fake_controller, monkeypatch):
+        from android_phone import server
+
+        monkeypatch.setattr(server, "_controller", fake_controller(advance_on_action=False))
+        monkeypatch.setattr(server, "_shortcut_registry", ShortcutRegistry([SEARCH]))
+
+        by_goal = json.loads(server.run_shortcut(goal="在Example搜索外套，打开第一个"))
+        by_name = json.loads(server.run_shortcut(name="wifi_settings"))
+
+        assert by_goal["status"] == "ok"
+        assert by_goal["rest"] == "打开第一个"
+        assert by_name["name"] == "wifi_settings"
+        assert json.loads(server.run_shortcut(name="nope"))["status"] == "error"
+
+    def test_list(self, monkeypatch):
+        from android_phone import server
+
+        monkeypatch.setattr(server, "_shortcut_registry", ShortcutRegistry([SEARCH]))
+
+        shortcuts = json.loads(server.list_shortcuts())["shortcuts"]
+
+        assert shortcuts[0]["name"] == "list_search"
+        assert shortcuts[0]["params"] == ["query"]
@@ -0,0 +1,192 @@
+"""
+Set-of-Mark 观察模式测试 (截图上的元素编号、click(element=N))
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench import FakeDevice
+from android_phone.core.agent import AutonomousAgent
+from android_phone.core.som import draw_marks, extract_marks, marks_legend
+from android_phone.integrations.parser import parse_action_from_text
+from android_phone.integrations.prompt import COMPUTER_USE_DOUBAO, SET_OF_MARK
+from android_phone.integrations.volcengine import VolcengineGUIClient
+
+
+def _agent(controller, client, tmp_path, mode="som"):
+    return AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0),
+                           observation_mode=mode)
+
+
+class TestExtractMarks:
+    """测试从 UI 树提取可交互元素"""
+
+    def test_rows_numbered_in_reading_order(self):
+        marks = extract_marks(FakeDevice().current_hierarchy(), screen_size=(1080, 2400))
+
+        assert [m.label for m in marks[:3]] == ["Item 0", "Item 1", "Item 2"]
+        assert [m.id for m in marks] == list(range(1, len(marks) + 1))
+        assert marks[0].bounds == (32, 260, 1048, 416)
+        assert marks[0].center == (540, 338)
+
+    def test_scroll_container_dropped(self):
+        """测试只可滚动的列表容器不会盖住列表项"""
+        marks = extract_marks(FakeDevice().current_hierarchy())
+
+        assert all(m.bounds != (0, 240, 1080, 2400) for m in marks)
+
+    def test_clamped_to_screen_and_capped(self):
+        marks = extract_marks(FakeDevice().current_hierarchy(), screen_size=(1080, 700), max_marks=2)
+
+        assert len(marks) == 2
+        assert marks[1].bounds[3] <= 700
+
+    def test_disabled_and_tiny_nodes_skipped(self):
+        xml = ('<hierarchy><node clickable="true" enabled="false" text="off" bounds="[0,0][200,200]" />'
+               '<node clickable="true" enabled="true" text="dot" bounds="[0,300][10,310]" />'
+               '<node class="android.widget.EditText" enabled="true" text="" resource-id="app:id/search" '
+               'bounds="[0,400][500,480]" /></hierarchy>')
+
+        marks = extract_marks(xml)
+
+        assert [(m.id, m.label) for m in marks] == [(1, "search")]
+
+    def test_legend(self):
+        marks = extract_marks(FakeDevice().current_hierarchy(), max_marks=2)
+
+        assert marks_legend(marks) == "[1] Item 0; [2] Item 1"
+
+    def test_draw_keeps_original(self):
+        frame = FakeDevice().current_frame()
+        marks = extract_marks(FakeDevice().current_hierarchy())
+
+        annotated = draw_marks(frame, marks)
+
+        assert annotated.size == frame.size
+        assert annotated.tobytes() != frame.tobytes()
+        assert frame.tobytes() == FakeDevice().current_frame().tobytes()
+
+
+class TestParseElement:
+    """测试 element=N 的解析"""
+
+    @pytest.mark.parametrize("args", ["element=3", "element='3'", "element=\"3\"", "element=[3]"])
+    def test_click_element(self, args):
+        action = parse_action_from_text(f"Thought: tap it\nAction: click({args})")["action_parsed"]
+
+        assert action == {"type": "click", "element": 3}
+
+    def test_long_press_element(self):
+        action = parse_action_from_text("long_press(element=12)")["action_parsed"]
+
+        assert action == {"type": "long_press", "element": 12}
+
+
+class TestControllerMarks:
+    """测试控制器把编号换算回精确坐标"""
+
+    def test_click_mark(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        controller.annotate_frame(controller.capture_frame())
+
+        assert controller.click_mark(2) is True
+        assert controller._device.calls[-1] == ("click", (540, 518))
+
+    def test_unknown_mark(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        controller.annotate_frame(controller.capture_frame())
+
+        assert controller.resolve_mark(99) is None
+        assert controller.click_mark(99) is False
+        assert controller._device.call_count("click") == 0
+
+
+class TestAgentSetOfMark:
+    """测试 Agent 的 Set-of-Mark 模式"""
+
+    def test_element_click(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [
+            {"thought": "tap item 1", "action_parsed": {"type": "click", "element": 2}, "usage": {}},
+            {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}},
+        ]
+
+        result = _agent(controller, client, tmp_path).run("open item 1", max_steps=3)
+
+        instruction = client.ask.call_args_list[0].args[0]
+        assert "Marked elements: [1] Item 0; [2] Item 1" in instruction
+        assert ("click", (540, 518)) in controller._device.calls
+        assert result["click_stats"]["element_clicks"] == 1
+        assert result["click_stats"]["no_effect_clicks"] == 1
+
+    def test_unknown_element_reported(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [
+            {"thought": "tap", "action_parsed": {"type": "click", "element": 99}, "usage": {}},
+            {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}},
+        ]
+
+        result = _agent(controller, client, tmp_path).run("open", max_steps=3)
+
+        assert "element 99 is not marked" in client.ask.call_args_list[1].args[0]
+        assert result["click_stats"]["failed_clicks"] == 1
+
+    def test_zoom_close_up_has_no_legend(self, fake_controller, tmp_path):
+        """测试 zoom 特写那一步不再附带上一张截图的元素编号"""
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [
+            {"thought": "read", "action_parsed": {"type": "zoom", "x": 500, "y": 500}, "usage": {}},
+            {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}},
+        ]
+
+        _agent(controller, client, tmp_path).run("read", max_steps=3)
+
+        assert "Marked elements" in client.ask.call_args_list[0].args[0]
+        assert "Marked elements" not in client.ask.call_args_list[1].args[0]
+
+    def test_screenshot_mode_unchanged(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [
+            {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}},
+        ]
+
+        _agent(controller, client, tmp_path, mode="screenshot").run("open", max_steps=2)
+
+        assert "Marked elements" not in client.ask.call_args.args[0]
+        assert controller._device.call_count("dump_hierarchy") == 0
+
+    def test_system_prompt_extended_and_restored(self, fake_controller, tmp_path):
+        client = VolcengineGUIClient(api_key="test")
+        client.ask = Mock(return_value={"thought": "", "action_parsed": {"type": "finished", "content": ""}})
+
+        _agent(fake_controller(advance_on_action=False), client, tmp_path).run("open", max_steps=1)
+        assert client.SYSTEM_PROMPT == COMPUTER_USE_DOUBAO + SET_OF_MARK
+
+        _agent(fake_controller(advance_on_action=False), client, tmp_path, mode="screenshot").run("open", max_steps=1)
+        assert client.SYSTEM_PROMPT == COMPUTER_USE_DOUBAO
+
+    def test_system_prompt_stable_across_runs(self, fake_controller, tmp_path):
+        """测试多次运行使用同一个 SoM 提示词对象, 客户端的提示词缓存不失效"""
+        client = VolcengineGUIClient(api_key="test")
+        client.ask = Mock(return_value={"thought": "", "action_parsed": {"type": "finished", "content": ""}})
+
+        _agent(fake_controller(advance_on_action=False), client, tmp_path).run("open", max_steps=1)
+        prompt = client.SYSTEM_PROMPT
+        _agent(fake_controller(advance_on_action=False), client, tmp_path).run("open", max_steps=1)
+
+        assert client.SYSTEM_PROMPT is prompt
+        assert VolcengineGUIClient(api_key="test").SYSTEM_PROMPT == COMPUTER_USE_DOUBAO
+
+    def test_unknown_mode(self, fake_controller, tmp_path):
+        with pytest.raises(ValueError, match="observation mode"):
+            _agent(fake_controller(advance_on_action=False), Mock(), tmp_path, mode="boxes")
@@ -0,0 +1,68 @@
+"""
+启动性能测试: 延迟导入 + import-time 预算 (python -X importtime)
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = str(Path(__file__).resolve().parent.parent / "src")
+
+# Cumulative import time budget for the CLI entry point (microseconds).
+# Override with ANDROID_PHONE_IMPORT_BUDGET_MS on slow CI machines.
+CLI_IMPORT_BUDGET_US = int(float(os.environ.get("ANDROID_PHONE_IMPORT_BUDGET_MS", "150")) * 1000)
+
+
+def _importtime(module: str, cwd: str):
+    """Import ``module`` in a fresh interpreter and return {module: cumulative_us}."""
+    env = dict(os.environ, PYTHONPATH=SRC)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=cwd,
+    )
+    assert proc.returncode == 0, proc.stderr
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        timings[name] = int(cumulative_us)
+    return timings
+
+
+def test_cli_import_budget(tmp_path):
+    """测试 CLI 入口导入时间在预算内, 且不导入重型依赖"""
+    timings = _importtime("android_phone.main", str(tmp_path))
+
+    for heavy in ("uiautomator2", "httpx", "PIL", "mcp"):
+        assert heavy not in timings, f"{heavy} imported eagerly by android_phone.main"
+    assert timings["android_phone.main"] < CLI_IMPORT_BUDGET_US
+
+
+def test_server_import_is_lazy(tmp_path):
+    """测试导入 server 不加载设备依赖, 也不在工作目录创建文件"""
+    timings = _importtime("android_phone.server", str(tmp_path))
+
+    assert "uiautomator2" not in timings
+    assert "PIL" not in timings
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cli_help_is_fast(tmp_path):
+    """测试 android-agent --help 可以在没有设备依赖的情况下运行"""
+    env = dict(os.environ, PYTHONPATH=SRC)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "android_phone.main", "--help"],
+        capture_output=True, text=True, env=env, cwd=str(tmp_path),
+    )
+
+    assert proc.returncode == 0
+    assert "Android Phone Autonomous Agent CLI" in proc.stdout
+    assert "uiautomator2" not in proc.stderr
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,120 @@
+"""
+轨迹归档 (TrajectoryArchive) 与回放模拟器测试
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench import MockArkServer, scripted_task
+from android_phone.bench.replay import load_replay_device, replay_trajectory
+from android_phone.core.agent import AutonomousAgent
+from android_phone.core.trajectory import TrajectoryArchive
+from android_phone.integrations.volcengine import VolcengineGUIClient
+
+
+def _frame_b64(controller, index=0):
+    controller._device.frame_index = index
+    return controller.get_screenshot(scale=0.3, quality=50)
+
+
+class TestTrajectoryArchive:
+    """测试归档写入"""
+
+    def test_frames_are_deduplicated(self, fake_controller, tmp_path):
+        """测试相同帧只存储一次"""
+        archive = TrajectoryArchive.create(str(tmp_path), "task")
+        frame = _frame_b64(fake_controller())
+
+        first = archive.add_frame(frame)
+        second = archive.add_frame(frame)
+        other = archive.add_frame(_frame_b64(fake_controller(), 1))
+
+        assert first == second
+        assert first != other
+        assert len(list(archive.frames_dir.glob("*.webp"))) == 2
+
+    def test_size_cap_drops_blobs(self, fake_controller, tmp_path):
+        """测试超出大小上限后丢弃新帧但继续记录步骤"""
+        archive = TrajectoryArchive.create(str(tmp_path), "task", max_bytes=10)
+
+        entry = archive.record_step(step=0, instruction="go", image_b64=_frame_b64(fake_controller()), raw_content="x",
+                                    usage={}, hierarchy=None)
+
+        assert entry["frame"] is None
+        assert archive.dropped == 1
+        assert len(archive.load_steps()) == 1
+
+    def test_hierarchy_roundtrip(self, tmp_path):
+        """测试 hierarchy 压缩存储与读取"""
+        archive = TrajectoryArchive.create(str(tmp_path), "task")
+
+        digest = archive.add_hierarchy("<hierarchy><node text='a'/></hierarchy>")
+
+        assert archive.load_hierarchy(digest) == "<hierarchy><node text='a'/></hierarchy>"
+
+
+class TestReplay:
+    """测试录制后确定性回放"""
+
+    def test_record_and_replay(self, fake_controller, tmp_path):
+        """测试 Agent 录制的轨迹可以离线回放"""
+        controller = fake_controller()
+
+        with MockArkServer(scripted_task(clicks=3)) as server:
+            client = VolcengineGUIClient(api_key="test")
+            client.API_URL = server.url
+            agent = AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0.0, 0.0), archive=True)
+            outcome = agent.run("replay me", max_steps=10)
+
+        assert outcome["status"] == "completed"
+        archives = list((tmp_path / "trajectories").iterdir())
+        assert len(archives) == 1
+
+        archive = TrajectoryArchive(str(archives[0]))
+        meta = archive.load_meta()
+        steps = archive.load_steps()
+        assert meta["status"] == "completed"
+        assert meta["window_size"] == [1080, 2400]
+        assert meta["observation_mode"] == "screenshot"
+        assert len(steps) == 4
+        assert all(step["hierarchy"] for step in steps)
+        assert "model" in steps[0]["timings_ms"]
+
+        report = replay_trajectory(str(archives[0]))
+
+        assert report["deterministic"] is True
+        assert report["replayed_status"] == "completed"
+        assert report["replayed_steps"] == 4
+
+    def test_zoom_close_up_not_replayed_as_frame(self, fake_controller, tmp_path):
+        """测试 zoom 特写按特写记录, 回放时该步仍显示上一张完整截图"""
+        script = ["Thought: Read the small text.\nAction: zoom(point='<point>500 500</point>', size='300 200')",
+                  "Thought: Done.\nAction: finished(content='done')"]
+        with MockArkServer(script) as server:
+            client = VolcengineGUIClient(api_key="test")
+            client.API_URL = server.url
+            agent = AutonomousAgent(fake_controller(advance_on_action=False), client, log_dir=str(tmp_path),
+                                    settle_delay=(0.0, 0.0), archive=True)
+            assert agent.run("zoom in", max_steps=5)["status"] == "completed"
+
+        path = str(next((tmp_path / "trajectories").iterdir()))
+        archive = TrajectoryArchive(path)
+        steps = archive.load_steps()
+        assert steps[0]["observation"].get("zoom") is None
+        assert steps[1]["observation"]["zoom"]
+        assert archive.load_frame(steps[1]["frame"]).size != (1080, 2400)
+
+        device = load_replay_device(archive)
+        assert device.frames[1] is device.frames[0]
+
+        report = replay_trajectory(path)
+        assert report["deterministic"] is True
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
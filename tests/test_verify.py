@@ -0,0 +1,127 @@
+"""
+动作效果验证测试 (无变化 / 跳转 / 局部变化分类、就近元素重试)
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+from PIL import Image, ImageDraw
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench import FakeDevice
+from android_phone.core.agent import AutonomousAgent
+from android_phone.core.fingerprint import frame_fingerprint
+from android_phone.core.verify import NAVIGATION, NO_EFFECT, PARTIAL_CHANGE, classify_effect, snap_target
+
+SIZE = (1080, 2400)
+
+
+class RowDevice(FakeDevice):
+    """点击落在某一行上时才进入下一屏"""
+
+    def click(self, x, y):
+        self._rpc("click", x, y)
+        top = 260 + (y - 260) // 180 * 180
+        if 32 <= x < SIZE[0] - 32 and y >= 260 and y < top + 156:
+            self.frame_index = (self.frame_index + 1) % len(self.frames)
+
+
+def _run(controller, actions, tmp_path, **kwargs):
+    client = Mock()
+    client.ask.side_effect = [{"thought": "", "action_parsed": a, "usage": {}} for a in actions] + [
+        {"thought": "", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}}]
+    agent = AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0), **kwargs)
+    return agent.run("open a row", max_steps=len(actions) + 1), client
+
+
+class TestClassifyEffect:
+    """测试效果分类"""
+
+    def _frame(self, box=None):
+        image = Image.new("RGB", SIZE, (250, 250, 250))
+        if box:
+            ImageDraw.Draw(image).rectangle(box, fill=(0, 0, 0))
+        return frame_fingerprint(image)
+
+    def test_no_effect(self):
+        assert classify_effect(self._frame(), self._frame()).outcome == NO_EFFECT
+
+    def test_partial_change(self):
+        effect = classify_effect(self._frame(), self._frame((0, 0, 1080, 300)))
+
+        assert effect.outcome == PARTIAL_CHANGE
+        assert 0 < effect.changed < 0.5
+
+    def test_navigation_by_area(self):
+        assert classify_effect(self._frame(), self._frame((0, 0, 1080, 2000))).outcome == NAVIGATION
+
+    def test_navigation_by_activity(self):
+        effect = classify_effect(self._frame(), self._frame((0, 0, 100, 100)), "app/.Main", "app/.Detail")
+
+        assert effect.outcome == NAVIGATION
+        assert "app/.Detail" in effect.describe()
+
+
+class TestSnapTarget:
+    """测试就近吸附到可交互元素"""
+
+    def test_gap_snaps_to_nearest_row(self):
+        center, label = snap_target(FakeDevice().current_hierarchy(), 540, 420, SIZE)
+
+        assert center == (540, 338)
+        assert label == "Item 0"
+
+    def test_point_on_element(self):
+        assert snap_target(FakeDevice().current_hierarchy(), 540, 338, SIZE) is None
+
+    def test_too_far(self):
+        assert snap_target(FakeDevice().current_hierarchy(), 540, 120, SIZE) is None
+
+
+class TestAgentVerification:
+    """测试 Agent 动作后验证"""
+
+    def test_missed_tap_retried(self, fake_controller, tmp_path):
+        """测试点在行间空隙上: 没有变化 -> 吸附到最近的行重试 -> 跳转"""
+        controller = fake_controller(RowDevice(advance_on_action=False))
+
+        result, client = _run(controller, [{"type": "click", "x": 500, "y": 175}], tmp_path)
+
+        instruction = client.ask.call_args_list[1].args[0]
+        assert "did not change" in instruction and "retried on the nearest element 'Item 0'" in instruction
+        assert "a new screen opened" in instruction
+        assert result["effect_stats"]["retries"] == 1
+        assert result["effect_stats"]["retry_recovered"] == 1
+        # The verification frame is the next step's observation
+        assert controller._device.call_count("screenshot") == 3
+
+    def test_no_effect_reported(self, fake_controller, tmp_path):
+        """测试点在元素上但屏幕没有变化: 不重试, 如实告诉模型"""
+        controller = fake_controller(advance_on_action=False)
+
+        result, client = _run(controller, [{"type": "click", "x": 500, "y": 141}], tmp_path)
+
+        assert "Click successful, but the screen did not change" in client.ask.call_args_list[1].args[0]
+        assert result["effect_stats"]["no_effect"] == 1
+        assert result["effect_stats"]["retries"] == 0
+        assert controller._device.call_count("click") == 1
+
+    def test_navigation_reported(self, fake_controller, tmp_path):
+        controller = fake_controller(RowDevice(advance_on_action=False))
+
+        result, client = _run(controller, [{"type": "click", "x": 500, "y": 141}], tmp_path)
+
+        assert "a new screen opened (com.example.list/.Page1)" in client.ask.call_args_list[1].args[0]
+        assert result["effect_stats"]["navigation"] == 1
+        assert controller._device.call_count("screenshot") == 2
+
+    def test_disabled(self, fake_controller, tmp_path):
+        controller = fake_controller(RowDevice(advance_on_action=False))
+
+        result, client = _run(controller, [{"type": "click", "x": 500, "y": 175}], tmp_path, verify_actions=False)
+
+        assert "Result: Click successful." in client.ask.call_args_list[1].args[0]
+        assert result["effect_stats"]["verified"] == 0
@@ -0,0 +1,186 @@
+"""
+wait_for_element / wait_for_change 测试 (事件式等待替代固定 sleep)
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.bench import synthetic_frames
+from android_phone.core.fingerprint import frame_fingerprint, fingerprint_distance
+
+
+def _advance_later(device, delay):
+    def advance():
+        time.sleep(delay)
+        device.frame_index += 1
+    thread = threading.Thread(target=advance, daemon=True)
+    thread.start()
+    return thread
+
+
+class TestFingerprint:
+    """测试帧指纹"""
+
+    def test_identical_and_different_frames(self):
+        frames = synthetic_frames(2)
+        a, b = (frame_fingerprint(f) for f in frames)
+
+        assert fingerprint_distance(a, frame_fingerprint(frames[0])) == 0.0
+        assert fingerprint_distance(a, b) > 0.02
+
+    def test_length_mismatch(self):
+        assert fingerprint_distance(b"\x00" * 4, b"\x00" * 8) == 1.0
+
+
+class TestWaitForElement:
+    """测试 controller.wait_for_element"""
+
+    def test_present_returns_immediately(self, fake_controller):
+        """测试元素已存在时第一次轮询即返回"""
+        controller = fake_controller(advance_on_action=False)
+
+        result = controller.wait_for_element(text="Item 3", timeout=1)
+
+        assert result["matched"] is True
+        assert result["polls"] == 1
+        assert result["element"]["text"] == "Item 3"
+
+    def test_appears_later(self, fake_controller):
+        """测试元素稍后出现"""
+        controller = fake_controller(advance_on_action=False)
+        _advance_later(controller._device, 0.1)
+
+        result = controller.wait_for_element(text="Item 15", timeout=2, interval=0.02)
+
+        assert result["matched"] is True
+        assert result["polls"] > 1
+
+    def test_disappear(self, fake_controller):
+        """测试等待元素消失"""
+        controller = fake_controller(advance_on_action=False)
+        _advance_later(controller._device, 0.1)
+
+        result = controller.wait_for_element(text="Item 3", state="disappear", timeout=2, interval=0.02)
+
+        assert result["matched"] is True
+        assert "element" not in result
+
+    def test_disappear_needs_a_successful_dump(self, fake_controller):
+        """测试层级获取失败时不会误报元素已消失"""
+        controller = fake_controller(advance_on_action=False)
+        controller.dump_hierarchy = Mock(side_effect=RuntimeError("uiautomator down"))
+
+        result = controller.wait_for_element(text="Item 3", state="disappear", timeout=0.1, interval=0.02)
+
+        assert result["matched"] is False
+        assert "error" in result
+
+    def test_disappear_after_failed_dump(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+        dump = controller.dump_hierarchy
+        controller.dump_hierarchy = Mock(side_effect=[RuntimeError("uiautomator down"), dump()])
+
+        result = controller.wait_for_element(text="Nope", state="disappear", timeout=2, interval=0.02)
+
+        assert result["matched"] is True
+        assert result["polls"] == 2
+
+    def test_timeout(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+
+        result = controller.wait_for_element(text="Nope", timeout=0.1, interval=0.02)
+
+        assert result["matched"] is False
+
+    def test_requires_selector(self, fake_controller):
+        with pytest.raises(ValueError):
+            fake_controller().wait_for_element()
+
+
+class TestWaitForChange:
+    """测试 controller.wait_for_change"""
+
+    def test_detects_change(self, fake_controller):
+        """测试屏幕变化后提前返回"""
+        controller = fake_controller(advance_on_action=False)
+        _advance_later(controller._device, 0.1)
+
+        result = controller.wait_for_change(timeout=3, interval=0.02)
+
+        assert result["changed"] is True
+        assert result["elapsed_ms"] < 3000
+
+    def test_static_screen_times_out(self, fake_controller):
+        controller = fake_controller(advance_on_action=False)
+
+        result = controller.wait_for_change(timeout=0.1, interval=0.02)
+
+        assert result["changed"] is False
+        assert result["distance"] == 0.0
+
+
+class TestWaitTools:
+    """测试 MCP 等待工具不阻塞事件循环"""
+
+    def test_event_loop_not_blocked(self, fake_controller, monkeypatch):
+        import asyncio
+        import json
+
+        from android_phone import server
+
+        monkeypatch.setattr(server, "_controller", fake_controller(advance_on_action=False))
+
+        async def main():
+            ticks = []
+
+            async def ticker():
+                while True:
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.02)
+
+            task = asyncio.create_task(ticker())
+            result = json.loads(await server.wait_for_element(text="Nope", timeout=0.3))
+            task.cancel()
+            return result, ticks
+
+        result, ticks = asyncio.run(main())
+
+        assert result["status"] == "timeout"
+        assert len(ticks) >= 5
+
+
+class TestAgentWait:
+    """测试 Agent 的 wait 动作不再固定 sleep 5 秒"""
+
+    def test_wait_returns_on_change(self, tmp_path):
+        from android_phone.core.agent import AutonomousAgent
+
+        controller = Mock()
+        controller.wait_for_change.return_value = {"changed": True, "elapsed_ms": 400, "distance": 0.1, "polls": 2}
+        client = Mock()
+        client.ask.side_effect = [
+            {"thought": "loading", "action_parsed": {"type": "wait"}, "usage": {}},
+            {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}},
+        ]
+        controller.encode_frame.return_value = "aGVsbG8="
+        controller.get_compact_hierarchy.return_value = "<hierarchy/>"
+
+        agent = AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0))
+        result = agent.run("goal", max_steps=3)
+
+        assert result["status"] == "completed"
+        assert "Screen changed" in client.ask.call_args_list[1][0][0]
+
+        controller.wait_for_change.assert_called_once_with(timeout=5.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
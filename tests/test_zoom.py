@@ -0,0 +1,96 @@
+"""
+zoom 动作测试 (区域全分辨率特写)
+"""
+
+import base64
+import io
+import json
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+from PIL import Image
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from android_phone.core.agent import AutonomousAgent
+from android_phone.integrations.parser import parse_action_from_text
+
+
+def _size(image_b64):
+    return Image.open(io.BytesIO(base64.b64decode(image_b64))).size
+
+
+class TestParseZoom:
+    """测试 zoom 动作解析"""
+
+    def test_parse(self):
+        text = "Thought: the price is tiny\nAction: zoom(point='<point>500 300</point>', size='400 100')"
+
+        action = parse_action_from_text(text)["action_parsed"]
+
+        assert action == {"type": "zoom", "x": 500, "y": 300, "width": 400, "height": 100}
+
+
+class TestControllerZoom:
+    """测试 controller.zoom 裁剪"""
+
+    def test_full_resolution_crop(self, fake_controller):
+        """测试裁剪区域不缩放"""
+        controller = fake_controller(advance_on_action=False)
+
+        image_b64, box = controller.zoom(540, 1200, 300, 200)
+
+        assert box == (390, 1100, 690, 1300)
+        assert _size(image_b64) == (300, 200)
+
+    def test_box_shifted_onto_screen(self, fake_controller):
+        """测试越界区域被平移回屏幕内"""
+        controller = fake_controller(advance_on_action=False)
+
+        _, box = controller.zoom(10, 2390, 300, 200)
+
+        assert box == (0, 2200, 300, 2400)
+
+
+class TestAgentZoom:
+    """测试 Agent 把特写作为下一步观察"""
+
+    def test_close_up_sent_as_next_observation(self, fake_controller, tmp_path):
+        controller = fake_controller(advance_on_action=False)
+        client = Mock()
+        client.ask.side_effect = [
+            {"thought": "too small", "action_parsed": {"type": "zoom", "x": 500, "y": 500, "width": 200, "height": 100},
+             "usage": {}},
+            {"thought": "done", "action_parsed": {"type": "finished", "content": "ok"}, "usage": {}},
+        ]
+        agent = AutonomousAgent(controller, client, log_dir=str(tmp_path), settle_delay=(0, 0))
+
+        agent.run("read the price", max_steps=3)
+
+        instruction, image_b64 = client.ask.call_args_list[1][0]
+        assert "close-up" in instruction
+        assert _size(image_b64) == (216, 240)
+        # The close-up reuses the step's frame instead of capturing again
+        assert controller._device.call_count("screenshot") == 1
+
+
+class TestServerZoom:
+    """测试 MCP zoom 工具"""
+
+    def test_normalized_box(self, fake_controller, monkeypatch):
+        from android_phone import server
+
+        monkeypatch.setattr(server, "_controller", fake_controller(advance_on_action=False))
+
+        result = json.loads(server.zoom(500, 500, 200, 100))
+
+        assert result["status"] == "ok"
+        assert result["box"] == [400, 450, 600, 550]
+        assert _size(result["image"]) == (216, 240)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])